@@ -420,7 +420,7 @@ class Clusters(Groups):
             for group, obj, categ_tmp, name_tmp in db.readPropertiesGen(
                 category=categ, identifier=identifier, 
                 properties=inst._full_properties, index=index_full_name, 
-                indexed=inst._full_indexed, multi=group):
+                indexed=inst._full_indexed, multi=group, objects=False):
 
                 logging.debug('Read data of experiment ' + name_tmp) 
 
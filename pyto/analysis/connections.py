@@ -467,7 +467,7 @@ class Connections(Groups):
             for group, obj, categ_tmp, name_tmp in db.readPropertiesGen(
                 category=categ, identifier=identifier, 
                 properties=inst._full_properties, deep=inst._deep, index='ids', 
-                indexed=inst._full_indexed, multi=group):
+                indexed=inst._full_indexed, multi=group, objects=False):
 
                 logging.debug('Read data of experiment ' + name_tmp) 
 
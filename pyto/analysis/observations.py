@@ -220,19 +220,87 @@ class Observations(object):
           - identifier: experiment identifier
         """
 
+        # make identifier to index map if identifiers changed
+        cache = getattr(self, '_identifier_cache', None)
+        if (cache is None) or (cache[0] != self.identifiers):
+            positions = {}
+            duplicates = set()
+            for index, ident in enumerate(self.identifiers):
+                try:
+                    if ident in positions:
+                        duplicates.add(ident)
+                    else:
+                        positions[ident] = index
+                except TypeError:
+                    # unhashable identifier, use list 
+                    positions = None
+                    break
+            cache = (list(self.identifiers), positions, duplicates)
+            self._identifier_cache = cache
+        positions, duplicates = cache[1:]
+
         # get index corresponding to the identifier
-        try:
-            index = self.identifiers.index(identifier)
-        except ValueError:
-            return None
+        if positions is None:
+            try:
+                index = self.identifiers.index(identifier)
+            except ValueError:
+                return None
+            if self.identifiers.count(identifier) > 1:
+                duplicates = set([identifier])
+        else:
+            try:
+                index = positions.get(identifier)
+            except TypeError:
+                index = None
+            if index is None:
+                return None
 
         # test
-        if self.identifiers.count(identifier) > 1:
+        if identifier in duplicates:
             raise ValueError("Identifier " + identifier + " occurs at more "
                              + " than one position in the identifiers list.")
 
         return index
 
+    def _getIdPositions(self, exp_index):
+        """
+        Returns ids of the specified experiment and maps needed to find 
+        positions of ids.
+
+        The maps are made once for each ids array and saved, so they are 
+        remade only when ids of an experiment are replaced by another 
+        object. Should not be used if ids are modified in place.
+
+        Argument:
+          - exp_index: experiment index
+
+        Returns all_ids, sorted_ids, arg_ids, positions:
+          - all_ids: (ndarray) ids of the experiment 
+          - sorted_ids: sorted ids
+          - arg_ids: indices that sort ids
+          - positions: (dict) id to position map, empty if ids are not
+          unique
+        """
+
+        all_ids = self.ids[exp_index]
+        cache = getattr(self, '_ids_cache', None)
+        if cache is None:
+            cache = {}
+            self._ids_cache = cache
+        cached = cache.get(exp_index)
+        if (cached is None) or (cached[0] is not all_ids):
+            arg_ids = all_ids.argsort()
+            sorted_ids = all_ids[arg_ids]
+            positions = dict(
+                (id_, pos) for pos, id_ in enumerate(all_ids.tolist()))
+            if len(positions) < len(all_ids):
+                # ids not unique, positions not used
+                positions = {}
+            cached = (all_ids, sorted_ids, arg_ids, positions)
+            cache[exp_index] = cached
+
+        return cached
+
     def addExperiment(self, experiment, identifier=None):
         """
         Adds experiment (deepcopied) to this instance.
@@ -331,13 +399,28 @@ class Observations(object):
         # get values corresponding to ids
         if ids is not None:
             all_ids = self.ids[exp_index]
-            if isinstance(ids, (list, numpy.ndarray)):
-                sorted_ids = numpy.sort(all_ids)
-                arg_ids = all_ids.argsort()
-                id_pos = arg_ids[sorted_ids.searchsorted(ids)]
-                result = value[id_pos]
+            if ((not isinstance(all_ids, numpy.ndarray)) 
+                    or (all_ids.ndim != 1)):
+                if isinstance(ids, (list, numpy.ndarray)):
+                    sorted_ids = numpy.sort(all_ids)
+                    arg_ids = all_ids.argsort()
+                    id_pos = arg_ids[sorted_ids.searchsorted(ids)]
+                    result = value[id_pos]
+                else:
+                    result = value[all_ids == ids][0]
             else:
-                result = value[all_ids == ids][0]
+                all_ids, sorted_ids, arg_ids, positions = \
+                    self._getIdPositions(exp_index=exp_index)
+                if isinstance(ids, (list, numpy.ndarray)):
+                    id_pos = arg_ids[sorted_ids.searchsorted(ids)]
+                    result = value[id_pos]
+                else:
+                    try:
+                        result = value[positions[ids]]
+                        if isinstance(result, numpy.ndarray):
+                            result = result.copy()
+                    except (KeyError, TypeError):
+                        result = value[all_ids == ids][0]
         else:
             result = value
 
@@ -515,10 +598,21 @@ class Observations(object):
             old_values = self.getValue(identifier=identifier, name=property)
             ids = self.getValue(identifier=identifier, name='ids')
             if isinstance(id_, (list, tuple, numpy.ndarray)):
-                for one_id, one_val in zip(id_, value):
-                    old_values[ids == one_id] = one_val
+                multi_id = True
+            else:
+                multi_id = False
+                id_ = [id_]
+                value = [value]
+            if isinstance(ids, numpy.ndarray) and (ids.ndim == 1):
+                positions = self._getIdPositions(
+                    exp_index=self.getExperimentIndex(identifier))[3]
             else:
-                old_values[ids == id_] = value
+                positions = {}
+            for one_id, one_val in zip(id_, value):
+                try:
+                    old_values[positions[one_id]] = one_val
+                except (KeyError, TypeError):
+                    old_values[ids == one_id] = one_val
             value = old_values
 
         # find experiment index
@@ -612,6 +706,7 @@ class Observations(object):
 
         # get data for all experiments
         no_indexed = False
+        data_indexed_list = []
         for ident in identifiers:
             if ident not in self.identifiers: continue
 
@@ -641,14 +736,15 @@ class Observations(object):
                 data[name] = data_value
 
             # update data
-            data_indexed_local = pd.DataFrame(data, columns=columns)
-            try:
-                #data_indexed = data_indexed.append(
-                #    data_indexed_local, ignore_index=True)
-                data_indexed = pd.concat(
-                    [data_indexed, data_indexed_local], ignore_index=True)
-            except (NameError, AttributeError):
-                data_indexed = pd.DataFrame(data, columns=columns)
+            data_indexed_list.append(pd.DataFrame(data, columns=columns))
+
+        # concatenate data of all experiments at once
+        if len(data_indexed_list) == 0:
+            return None
+        elif len(data_indexed_list) == 1:
+            data_indexed = data_indexed_list[0]
+        else:
+            data_indexed = pd.concat(data_indexed_list, ignore_index=True)
 
         return data_indexed
 
@@ -219,6 +219,16 @@ class TestObservations(np_test.TestCase):
         np_test.assert_equal(self.obs.getExperimentIndex(identifier='exp_1'), 0)
         np_test.assert_equal(self.obs.getExperimentIndex(identifier='exp_6'), 3)
 
+        # identifiers changed after lookup
+        obs = deepcopy(self.obs)
+        np_test.assert_equal(obs.getExperimentIndex(identifier='exp_6'), 3)
+        obs.identifiers.reverse()
+        np_test.assert_equal(obs.getExperimentIndex(identifier='exp_6'), 0)
+        obs.identifiers[1] = 'exp_6'
+        np_test.assert_raises(ValueError, obs.getExperimentIndex, 'exp_6')
+        obs.identifiers = ['exp_7']
+        np_test.assert_equal(obs.getExperimentIndex(identifier='exp_6'), None)
+
     def testAddExperiment(self):
         """
         Tests addExperiment()
@@ -507,6 +517,16 @@ class TestObservations(np_test.TestCase):
                                   ids=[3,2])
         np_test.assert_equal(value, [6, 4])
 
+        # ids changed after lookup
+        obs = deepcopy(self.obs)
+        np_test.assert_equal(
+            obs.getValue(identifier='exp_1', name='mean', ids=3), 6)
+        obs.ids[0] = numpy.array([5, 1, 3])
+        np_test.assert_equal(
+            obs.getValue(identifier='exp_1', name='mean', ids=3), 10)
+        np_test.assert_equal(
+            obs.getValue(identifier='exp_1', name='mean', ids=[3, 5]), [10, 2])
+
         # non-existing identifier
         np_test.assert_raises(
             ValueError, self.obs.getValue,
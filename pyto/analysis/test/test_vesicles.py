@@ -743,6 +743,81 @@ class TestVesicles(np_test.TestCase):
         #    {'cluster':clust, 'dist_name':'bound_dist'})
 
 
+class TestVesiclesLinked(np_test.TestCase):
+    """
+    Tests methods based on linked vesicles, on data that is set directly.
+    """
+
+    def testLinkedGraph(self):
+        """
+        Tests getLinkedGraph() and getConnectivityDistance(), getNLinked()
+        and getClusterSize() on linked vesicles that are set directly 
+        """
+
+        # vesicles 2-4-6-8 in a chain, 10-12 linked, 14 alone, 5 not in ids
+        sv = Vesicles()
+        sv['group'] = Observations()
+        sv['group'].setValue(
+            identifier='exp', name='ids', 
+            value=numpy.array([2, 4, 6, 8, 10, 12, 14]), indexed=True)
+        linked = numpy.array(
+            [numpy.array([4]), numpy.array([2, 5, 6]), numpy.array([4, 8]),
+             numpy.array([6]), numpy.array([12]), numpy.array([10]),
+             numpy.array([], dtype=int)],
+            dtype=object)
+        sv['group'].setValue(
+            identifier='exp', name='linked', value=linked, indexed=True)
+        initial = Vesicles()
+        initial['group'] = Observations()
+        initial['group'].setValue(
+            identifier='exp', name='ids', value=numpy.array([4, 12]), 
+            indexed=True)
+
+        # graph
+        graph = sv.getLinkedGraph(category='group', identifier='exp')
+        np_test.assert_equal(graph.shape, (7, 7))
+        np_test.assert_equal(graph[1].nonzero()[1], [0, 2])
+        np_test.assert_equal(
+            sv.getLinkedGraph(category='group', identifier='exp') is graph,
+            True)
+
+        # connectivity distance
+        sv.getConnectivityDistance(initial=initial, distance=1)
+        np_test.assert_equal(
+            sv['group'].getValue(identifier='exp', name='conn_distance'),
+            [2, 1, 2, 3, 2, 1, -1])
+        np_test.assert_raises(
+            ValueError, sv.getConnectivityDistance, initial, 1, 
+            'conn_distance_max', None, -1, 3)
+
+        # n linked and cluster size
+        sv.getNLinked()
+        np_test.assert_equal(
+            sv['group'].getValue(identifier='exp', name='n_linked'),
+            [1, 3, 2, 1, 1, 1, 0])
+        sv.getClusterSize()
+        np_test.assert_equal(
+            sv['group'].getValue(identifier='exp', name='cluster_size'),
+            [4, 4, 4, 4, 2, 2, 1])
+
+        # cluster size from clusters
+        clusters = Clusters()
+        clusters['group'] = Observations()
+        clusters['group'].ids = [numpy.array([1, 2, 3])]
+        clusters['group'].bound_clusters = [
+            [numpy.array([14]), numpy.array([12, 10, 2, 4, 6, 8, 5])]]
+        clusters['group'].n_bound_clust = [[1, 7]]
+        sv.getClusterSize(clusters=clusters)
+        np_test.assert_equal(
+            sv['group'].getValue(identifier='exp', name='cluster_size'),
+            [7, 7, 7, 7, 7, 7, 1])
+
+        # no clusters
+        clusters['group'].bound_clusters = [[]]
+        clusters['group'].n_bound_clust = [[]]
+        np_test.assert_raises(KeyError, sv.getClusterSize, clusters)
+
+
 if __name__ == '__main__':
     suite = unittest.TestLoader().loadTestsFromTestCase(TestVesicles)
     unittest.TextTestRunner(verbosity=2).run(suite)
@@ -22,6 +22,8 @@ from copy import copy, deepcopy
 
 import numpy
 import scipy
+import scipy.sparse
+import scipy.sparse.csgraph
 
 import pyto
 from ..util import nested
@@ -548,7 +550,6 @@ class Vesicles(Groups):
             categories = list(self.keys())
 
         # calculate number of linked vesicles for each vesicle
-        n_link = {}
         for categ in categories:
 
             # loop over observations
@@ -560,7 +561,77 @@ class Vesicles(Groups):
             # adjust property lists
             self[categ].properties.add('n_linked')
             self[categ].indexed.add('n_linked')
-    
+
+    def getLinkedGraph(self, category, identifier):
+        """
+        Returns the graph of vesicles linked by connectors for one 
+        observation (experiment).
+
+        The graph is returned as a sparse (csr) adjacency matrix, where 
+        rows and columns correspond to vesicles in the order of ids. 
+        Element [i, j] is 1 if vesicle ids[j] is linked to vesicle 
+        ids[i] (that is if ids[j] is in linked[i]). Linked vesicles that 
+        do not exist in ids are ignored.
+
+        The graph is made once for each observation and saved. It is 
+        remade if ids or linked of the observation are replaced by other 
+        objects. 
+
+        Property 'linked' has to be set (see addLinked()), otherwise 
+        ValueError is raised.
+
+        Arguments:
+          - category: group name
+          - identifier: observation identifier
+
+        Returns (scipy.sparse.csr_matrix) adjacency matrix
+        """
+
+        # get data
+        group = self[category]
+        if 'linked' not in group.properties:
+            raise ValueError("Property 'linked' has to be set in order"
+                             + " to make the graph of linked vesicles.")
+        ids = numpy.asarray(group.getValue(identifier=identifier, name='ids'))
+        linked = group.getValue(identifier=identifier, name='linked')
+
+        # check saved graph
+        graphs = getattr(self, '_linked_graphs', None)
+        if graphs is None:
+            graphs = {}
+            self._linked_graphs = graphs
+        saved = graphs.get((category, identifier))
+        if ((saved is not None) and (saved[0] is ids) 
+                and (saved[1] is linked)):
+            return saved[2]
+
+        # find positions of linked vesicles
+        n_ves = len(ids)
+        lengths = numpy.array([len(link) for link in linked], dtype=int)
+        rows = numpy.repeat(numpy.arange(n_ves), lengths)
+        if lengths.sum() > 0:
+            linked_flat = numpy.concatenate(
+                [numpy.asarray(link) for link in linked])
+        else:
+            linked_flat = numpy.array([], dtype=int)
+        sort_ind = ids.argsort()
+        sorted_ids = ids[sort_ind]
+        pos = sorted_ids.searchsorted(linked_flat)
+        pos[pos >= n_ves] = 0
+        exist = (n_ves > 0) & (sorted_ids[pos] == linked_flat)
+        cols = sort_ind[pos[exist]]
+        rows = rows[exist]
+
+        # make graph
+        graph = scipy.sparse.csr_matrix(
+            (numpy.ones(len(rows), dtype=int), (rows, cols)),
+            shape=(n_ves, n_ves))
+        graph.sum_duplicates()
+        graph.data[:] = 1
+        graphs[(category, identifier)] = (ids, linked, graph)
+
+        return graph
+
     def getMeanConnectionLength(self, conn, categories=None, 
                                 name='mean_connection_nm', value=-1):
         """
@@ -710,7 +781,6 @@ class Vesicles(Groups):
             self[categ].setValue(
                 identifier=None, name=name, indexed=True, default=default)
 
-            
             for ident in self[categ].identifiers:
 
                 # set initial distance
@@ -726,61 +796,65 @@ class Vesicles(Groups):
                     raise ValueError("Property 'linked' has to be set in order"
                                      + " to calculate connectivity distance.")
 
-                # set other distances
-                previous_ids = init_ids
-                curr_distance = distance + 1
-                while(True):
-                #for curr_distance in range(distance+1, max_distance+1):
-
-                    # loop over vesicles and set current distance
-                    found = False
-                    current_ids = []
-                    ids = self[categ].getValue(identifier=ident, name='ids')
-                    for id_ in previous_ids: 
-
-                        # find linked to this vesicle
-                        linked = self[categ].getValue(
-                            identifier=ident, name='linked', ids=id_)
-                        #print('ident: ', ident, ' dist: ', curr_distance, 
-                        #      ' id_: ', id_, ' linked: ', linked)
-
-                        # restrict to existing ids
-                        linked = numpy.intersect1d(linked, ids)
-
-                        # loop over linked, assign distance if has default dist 
-                        for linked_id in linked:
-                            linked_distance = self[categ].getValue(
-                                    identifier=ident, name=name, ids=linked_id)
-                            if linked_distance == default:
-                                self[categ].setValue(
-                                    identifier=ident, name=name, 
-                                    value=curr_distance,
-                                    id_=linked_id, indexed=True)
-                                current_ids.append(linked_id)
-                                found = True
-
-                    # break if no more linked 
-                    if not found: break
-
-                    # error if max distance reached
-                    if curr_distance == max_distance:
-                        raise ValueError(
-                            "Max connectivity distance reached, try increasing"
-                            + " the max_distance argument.")
-
-                    # prepare for the next iteration
-                    previous_ids = current_ids
-                    curr_distance =  curr_distance + 1
-
-    def getClusterSize(self, clusters, categories=None):
+                # vesicles that can get a distance assigned are those that 
+                # have the default distance
+                graph = self.getLinkedGraph(category=categ, identifier=ident)
+                values = numpy.array(
+                    self[categ].getValue(identifier=ident, name=name))
+                n_ves = len(ids)
+                if n_ves == 0:
+                    continue
+                available = (values == default)
+
+                # add source node linked to all initial vesicles and 
+                # remove links to vesicles that are not available
+                graph = graph.tocoo()
+                keep = available[graph.col]
+                source_links = numpy.nonzero(numpy.isin(ids, init_ids))[0]
+                rows = numpy.concatenate(
+                    [graph.row[keep], 
+                     numpy.zeros(len(source_links), dtype=int) + n_ves])
+                cols = numpy.concatenate([graph.col[keep], source_links])
+                graph = scipy.sparse.csr_matrix(
+                    (numpy.ones(len(rows), dtype=int), (rows, cols)),
+                    shape=(n_ves + 1, n_ves + 1))
+
+                # multi-source bfs
+                steps = scipy.sparse.csgraph.shortest_path(
+                    graph, method='D', directed=True, unweighted=True, 
+                    indices=n_ves)[:n_ves]
+                reached = (numpy.isfinite(steps) & (steps > 1) & available)
+                if not reached.any():
+                    continue
+                new_values = distance + steps[reached].astype(int) - 1
+
+                # error if max distance reached
+                if ((max_distance > distance) 
+                        and (new_values >= max_distance).any()):
+                    raise ValueError(
+                        "Max connectivity distance reached, try increasing"
+                        + " the max_distance argument.")
+
+                # set distances
+                values[reached] = new_values
+                self[categ].setValue(
+                    identifier=ident, name=name, value=values, indexed=True)
+
+    def getClusterSize(self, clusters=None, categories=None):
         """
         For each vesicle finds cluster size of the cluster that it belongs to.
 
-        Vesicles that appear in clusters but not in (self) ids are ignored, but
-        all vesicles from ids have to exist in clusters.
+        If arg clusters is specified, vesicle clusters are taken from 
+        (arg) clusters. Vesicles that appear in clusters but not in (self) 
+        ids are ignored, but all vesicles from ids have to exist in clusters.
+
+        Alternatively, if arg clusters is None, clusters are determined as 
+        connected components of the graph of linked vesicles (see 
+        getLinkedGraph()). In this case property 'linked' has to be set.
 
         Arguments:
-          - clusters: (Groups with Clusters values) vesicle clusters
+          - clusters: (Groups with Clusters values) vesicle clusters, or
+          None to use vesicles linked by connectors
 
         Sets property:
           - cluster_size (indexed)
@@ -793,19 +867,59 @@ class Vesicles(Groups):
         for categ in categories:
             self[categ].cluster_size = []
 
+            # clusters from linked vesicles
+            if clusters is None:
+                for ident in self[categ].identifiers:
+                    graph = self.getLinkedGraph(
+                        category=categ, identifier=ident)
+                    if graph.shape[0] == 0:
+                        self[categ].cluster_size.append(numpy.array([]))
+                        continue
+                    n_comp, labels = scipy.sparse.csgraph.connected_components(
+                        graph, directed=False)
+                    sizes = numpy.bincount(labels, minlength=n_comp)
+                    self[categ].cluster_size.append(sizes[labels])
+
             # loop over observations
-            for obs_ind in range(len(clusters[categ].ids)):
-
-                # make dictionary of cluster sizes for this observation
-                sizes = {}
-                for clust, clust_size \
-                        in zip(clusters[categ].bound_clusters[obs_ind], 
-                               clusters[categ].n_bound_clust[obs_ind]):
-                    sizes.update(dict(list(zip(clust, [clust_size] * clust_size))))
-
-                # make array of sizes in the same order as ids
-                ordered = [sizes[id_] for id_ in self[categ].ids[obs_ind]]
-                self[categ].cluster_size.append(numpy.array(ordered))
+            else:
+                for obs_ind in range(len(clusters[categ].ids)):
+
+                    # cluster sizes of all clustered vesicles, if a vesicle
+                    # is in more than one cluster, the last one is used 
+                    clust_ids = [
+                        numpy.asarray(clust) for clust 
+                        in clusters[categ].bound_clusters[obs_ind]]
+                    clust_ids = [
+                        clust[:clust_size] for clust, clust_size in zip(
+                            clust_ids, clusters[categ].n_bound_clust[obs_ind])]
+                    clust_sizes = [
+                        numpy.zeros(len(clust), dtype=int) + clust_size
+                        for clust, clust_size in zip(
+                            clust_ids, clusters[categ].n_bound_clust[obs_ind])]
+                    ids = numpy.asarray(self[categ].ids[obs_ind])
+                    if len(clust_ids) > 0:
+                        clust_ids = numpy.concatenate(clust_ids)[::-1]
+                        clust_sizes = numpy.concatenate(clust_sizes)[::-1]
+                    else:
+                        clust_ids = numpy.array([], dtype=int)
+                        clust_sizes = numpy.array([], dtype=int)
+                    clust_ids, first = numpy.unique(
+                        clust_ids, return_index=True)
+                    clust_sizes = clust_sizes[first]
+
+                    # make array of sizes in the same order as ids
+                    if len(ids) == 0:
+                        ordered = numpy.array([])
+                    elif len(clust_ids) == 0:
+                        raise KeyError(ids[0])
+                    else:
+                        pos = clust_ids.searchsorted(ids)
+                        pos[pos >= len(clust_ids)] = 0
+                        exist = (clust_ids[pos] == ids)
+                        if not exist.all():
+                            raise KeyError(ids[~exist][0])
+                        ordered = clust_sizes[pos]
+                    self[categ].cluster_size.append(ordered)
 
             # update property lists
             self[categ].properties.add('cluster_size')
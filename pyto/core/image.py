@@ -1309,7 +1309,7 @@ class Image(object):
         return image
 
     @classmethod
-    def cut(cls, old, new, inset, memmap=True):
+    def cut(cls, old, new, inset, memmap=True, slab_size=None):
         """
         Reads an image (arg old), cuts a subtomo defined by arg inset
         and writes the new image (arg new).
@@ -1319,11 +1319,17 @@ class Image(object):
         min/max/mean values, which are set according to the new image
         data.
 
+        The new image is written in slabs along z-axis (see 
+        pyto.io.ImageIO.writeSlabs()), so if arg memmap is True, 
+        only one slab is kept in memory at a time.
+
         Arguments:
           - old: old mrc image file name
           - new: new (subtomogram) mrc image file name
           - inset: defines the subtomogram
           - memmap: if True, read memory map instead of the whole image
+          - slab_size: number of z-sections in a slab, None for slabs of
+          about 2**24 voxels
 
         Returns an instance of this class that holds the new image. This
         instance contains attribute image_io (pyto.io.ImageIO) that
@@ -1340,8 +1346,15 @@ class Image(object):
         image.useInset(inset=inset)
 
         # write new
-        image_io.setData(data=image.data)
-        image_io.write(file=new, pixel=image_io.pixel)
+        shape = image.data.shape
+        if slab_size is None:
+            slab_size = max(1, 2**24 // int(np.prod(shape[:-1])))
+        slabs = (
+            image.data[..., z_start:z_start+slab_size]
+            for z_start in range(0, shape[-1], slab_size))
+        image_io.writeSlabs(
+            file=new, slabs=slabs, shape=shape,
+            dataType=image.data.dtype.name, pixel=image_io.pixel, rms=False)
 
         #
         image.image_io = image_io
@@ -1435,6 +1448,258 @@ class Image(object):
             inst = Image(data=data)
             return inst
 
+    @classmethod
+    def binPyramid(
+            cls, image, paths, factor=2, fun=np.mean, remain='correct',
+            filter_fun=ndimage.gaussian_filter, filter_kwds={"sigma": 1},
+            halo=None, slab_size=None, dataType=None):
+        """
+        Makes and writes multiple binned images (an image pyramid) in one 
+        pass over the image.
+
+        Image (arg image) is binned by (arg) factor to make the first 
+        level image, the first level image is binned by factor to 
+        make the second level and so on. Each level is written to 
+        the corresponding file (arg paths), so the number of levels is 
+        determined by the number of paths. For example, for factor=2 and
+        three paths, images binned 2, 4 and 8 times are written.
+
+        Each level is made in the same way as in bin() (the same 
+        arguments fun, remain, filter_fun and filter_kwds, see bin())
+        and written to file as soon as a slab is made. Consequently, 
+        the binned images are the same as the ones made by repeatedly 
+        applying bin().
+
+        The image is read in slabs along the last axis (z-axis for 3D
+        images), so if the image is memory mapped (or a file path is 
+        given) only a few slabs are kept in memory at each level. 
+        Binned slabs are made from the filtered (arg filter_fun) slabs
+        that are extended by (arg) halo sections on both sides, so that
+        the filtering is the same as when the entire image is filtered.
+        For the Gaussian filter, the halo is determined from filter 
+        arguments, for other filters it has to be specified.
+
+        Arguments:
+          - image: (Image or str) image, or image file path, in which
+          case the image is read as a memory map 
+          - paths: paths of the binned images, one for each level
+          - factor, fun, remain, filter_fun, filter_kwds: see bin()
+          - halo: number of sections on each side of a slab needed 
+          for filtering, has to be specified if filter_fun is not None 
+          and is not ndimage.gaussian_filter
+          - slab_size: number of sections in slabs (at each level), None
+          for slabs of about 2**24 voxels 
+          - dataType: data type of binned images, None for float32 if
+          binned images are float, and the same type otherwise
+
+        Returns list of shapes of binned images
+
+        Raises ValueError if an image binned at any level would have 
+        zero size.
+        """
+
+        # read image
+        from pyto.io.image_io import ImageIO as ImageIO
+        if isinstance(image, basestring):
+            image = cls.read(file=image, header=True, memmap=True)
+        pixel = getattr(image, 'pixelsize', 1)
+        header = getattr(image, 'header', None)
+        file_format = getattr(image, 'fileFormat', None)
+
+        # halo
+        if filter_fun is None:
+            halo = 0
+        elif halo is None:
+            if filter_fun is not ndimage.gaussian_filter:
+                raise ValueError(
+                    "Argument halo has to be specified for filter "
+                    + f"{filter_fun}.")
+            sigma = filter_kwds.get('sigma')
+            if not np.isscalar(sigma):
+                sigma = sigma[-1]
+            halo = filter_kwds.get(
+                'radius', int(filter_kwds.get('truncate', 4.0) * sigma + 0.5))
+            if not np.isscalar(halo):
+                halo = halo[-1]
+
+        # check that no level is binned to zero size
+        level_shape = np.asarray(image.data.shape)
+        for level in range(len(paths)):
+            level_shape = level_shape // factor
+            if (level_shape == 0).any():
+                raise ValueError(
+                    f"Image of shape {image.data.shape} can not be binned "
+                    + f"{factor**(level + 1)} times (level {level}), it would "
+                    + f"have shape {tuple(level_shape)}.")
+
+        # chain binning of all levels
+        data = image.data
+        slabs = cls._getSlabs(data=data, slab_size=slab_size)
+        shape = data.shape
+        shapes = []
+        writers = []
+        for level, path in enumerate(paths):
+            slabs, shape = cls._binSlabs(
+                slabs=slabs, shape=shape, factor=factor, fun=fun, 
+                remain=remain, filter_fun=filter_fun, 
+                filter_kwds=filter_kwds, halo=halo, slab_size=slab_size)
+            shapes.append(shape)
+
+            # write level
+            image_io = ImageIO()
+            image_io.setFileFormat(file_=path)
+            if image_io.fileFormat != file_format:
+                level_header = None
+            else:
+                level_header = header
+            writers.append(image_io)
+            slabs = cls._writeSlabs(
+                slabs=slabs, image_io=image_io, path=path, shape=shape,
+                dataType=dataType, header=level_header,
+                pixel=np.asarray(pixel) * factor**(level + 1))
+
+        # run
+        for _ in slabs:
+            pass
+        for image_io in writers:
+            image_io.finishWrite()
+
+        return shapes
+
+    @staticmethod
+    def _getSlabs(data, slab_size=None):
+        """
+        Generates slabs of arg data along the last axis.
+
+        Arguments:
+          - data: (ndarray) data
+          - slab_size: number of sections in slabs, None for slabs of 
+          about 2**24 elements
+        """
+        if slab_size is None:
+            slab_size = max(1, 2**24 // int(np.prod(data.shape[:-1])))
+        for start in range(0, data.shape[-1], slab_size):
+            yield data[..., start:start+slab_size]
+
+    @staticmethod
+    def _binSlabs(
+            slabs, shape, factor, fun, remain, filter_fun, filter_kwds,
+            halo, slab_size=None):
+        """
+        Bins data given by slabs, used by binPyramid().
+
+        Arguments:
+          - slabs: iterable of data slabs along the last axis
+          - shape: shape of the whole data
+          - halo: number of sections needed on each side for filtering 
+          - slab_size: number of sections in slabs, None for slabs of
+          about 2**24 elements
+          - other: see bin()
+
+        Returns (slabs, shape):
+          - slabs: generator of binned slabs
+          - shape: shape of binned data
+        """
+
+        # check whether shape divisible by bin factor
+        shape = np.array(shape)
+        remainder = shape % factor
+        if (remainder != 0).any() and (remain == 'raise'):
+            raise ValueError(
+                f"Array of shape {shape} can not be binned "
+                + f"exactly by factor {factor}")
+        corrected_shape = shape - remainder
+        new_shape = tuple(corrected_shape // factor)
+        n_sections = corrected_shape[-1]
+        if slab_size is None:
+            slab_size = max(1, 2**24 // int(np.prod(corrected_shape[:-1])))
+        slab_size = factor * max(1, slab_size // factor)
+        inset = tuple(slice(0, shap) for shap in corrected_shape[:-1])
+        bin_shape = np.array(
+            [[x//factor, factor] for x in corrected_shape[:-1]]).flatten()
+
+        def bin_slabs():
+            buffer = None
+            buffer_start = 0
+            start = 0
+            for slab in slabs:
+
+                # keep consuming slabs when all binned slabs are made, so 
+                # that upstream generators (writers) get all their slabs 
+                if start >= n_sections:
+                    continue
+
+                # add slab to buffer
+                slab = np.asarray(slab[inset])
+                if buffer is None:
+                    buffer = slab
+                else:
+                    buffer = np.concatenate([buffer, slab], axis=-1)
+                buffer_stop = min(buffer_start + buffer.shape[-1], n_sections)
+
+                # filter and bin all slabs that have enough data
+                while start < n_sections:
+                    stop = min(start + slab_size, n_sections)
+                    halo_stop = min(stop + halo, n_sections)
+                    if buffer_stop < halo_stop:
+                        break
+                    halo_start = max(start - halo, 0)
+                    data = buffer[
+                        ..., halo_start-buffer_start:halo_stop-buffer_start]
+                    if filter_fun is not None:
+                        data = filter_fun(data, **filter_kwds)
+                    data = data[..., start-halo_start:stop-halo_start]
+                    data = data.reshape(
+                        tuple(bin_shape) + ((stop - start) // factor, factor))
+                    for ind in range(1, len(bin_shape)//2 + 2):
+                        data = fun(data, -ind)
+                    yield data
+
+                    # remove data not needed anymore
+                    start = stop
+                    new_buffer_start = max(start - halo, 0)
+                    buffer = buffer[..., new_buffer_start-buffer_start:]
+                    buffer_start = new_buffer_start
+
+        return bin_slabs(), new_shape
+
+    @staticmethod
+    def _writeSlabs(slabs, image_io, path, shape, dataType, header, pixel):
+        """
+        Writes slabs as they are generated, used by binPyramid().
+
+        Starts writing (pyto.io.ImageIO.startWrite()) when the first slab
+        is generated. The writing has to be finished by 
+        image_io.finishWrite().
+
+        Arguments:
+          - slabs: iterable of slabs
+          - image_io: (pyto.io.ImageIO) object used for writing
+          - path: file path
+          - shape: shape of the written image
+          - dataType: data type, None for float32 if slabs are floats and
+          the type of slabs otherwise
+          - header: image header
+          - pixel: pixel size
+
+        Returns generator of slabs
+        """
+
+        started = False
+        for slab in slabs:
+            if not started:
+                if dataType is None:
+                    if np.issubdtype(slab.dtype, np.floating):
+                        dataType = 'float32'
+                    else:
+                        dataType = slab.dtype.name
+                image_io.startWrite(
+                    file=path, shape=shape, dataType=dataType, 
+                    header=header, pixel=pixel)
+                started = True
+            image_io.writeSlab(data=slab)
+            yield slab
+
     def expand(self, factor, filter_fun=None, filter_kwds={"sigma": 1},
                update=True):
         """
@@ -752,6 +752,73 @@ class TestImage(np_test.TestCase):
         np_test.assert_equal(
             np.nonzero(tomo.data > 0.1), (np.array([1]), np.array([2])))
 
+    def test_bin_pyramid(self):
+        """
+        Tests binPyramid()
+        """
+
+        np.random.seed(0)
+        data = (100 * np.random.random((21, 18, 37))).astype('float32')
+        image = Image(data)
+        image.pixelsize = 1.5
+        paths = [self.modified_file_name_mrc, self.small_file_name]
+
+        # compare with bin(), different slab sizes
+        for slab_size in [None, 2, 5]:
+            shapes = Image.binPyramid(
+                image=image, paths=paths, slab_size=slab_size)
+            prev = image
+            for level, path in enumerate(paths):
+                prev = prev.bin(update=False)
+                binned = Image.read(file=path, header=True)
+                np_test.assert_equal(shapes[level], prev.data.shape)
+                np_test.assert_equal(
+                    binned.data, prev.data.astype('float32'))
+                np_test.assert_almost_equal(
+                    binned.pixelsize, 1.5 * 2**(level + 1))
+
+        # odd z at the first level, the last slab holds only the section
+        # that is trimmed at the next level
+        data = (100 * np.random.random((8, 8, 30))).astype('float32')
+        image = Image(data)
+        for slab_size in [3, 5]:
+            shapes = Image.binPyramid(
+                image=image, paths=paths, slab_size=slab_size)
+            prev = image
+            for level, path in enumerate(paths):
+                prev = prev.bin(update=False)
+                binned = Image.read(file=path, header=True)
+                np_test.assert_equal(shapes[level], prev.data.shape)
+                np_test.assert_equal(binned.data.shape, prev.data.shape)
+                np_test.assert_almost_equal(
+                    binned.data, prev.data.astype('float32'), decimal=5)
+        np_test.assert_equal(shapes, [(4, 4, 15), (2, 2, 7)])
+
+        # max, no filter, from file, int
+        data = np.arange(6 * 8 * 12, dtype='int16').reshape(6, 8, 12)
+        Image(data).write(file=self.modified_file_name_mrc, pixel=1)
+        Image.binPyramid(
+            image=self.modified_file_name_mrc, paths=[self.small_file_name],
+            fun=np.max, filter_fun=None, slab_size=3)
+        binned = Image.read(file=self.small_file_name)
+        np_test.assert_equal(binned.data.dtype, np.dtype('int16'))
+        np_test.assert_equal(
+            binned.data,
+            Image(data).bin(fun=np.max, filter_fun=None, update=False).data)
+
+        # level of zero size
+        with np_test.assert_raises(ValueError):
+            Image.binPyramid(
+                image=Image(np.zeros((8, 8, 3))), paths=paths, slab_size=2)
+        with np_test.assert_raises(ValueError):
+            Image.binPyramid(image=Image(np.zeros((1, 8, 8))), paths=paths)
+
+        # halo needed for other filters
+        with np_test.assert_raises(ValueError):
+            Image.binPyramid(
+                image=image, paths=paths, filter_fun=sp.ndimage.uniform_filter,
+                filter_kwds={})
+
     def test_expand(self):
         """
         Tests expand()
@@ -20,7 +20,9 @@ __version__ = "$Revision$"
 
 import warnings
 import logging
+import itertools
 from copy import copy, deepcopy
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy
 import scipy
@@ -675,7 +677,8 @@ class Affine(object):
 
     def transformArray(
             self, array, center=None, shape=None, return_grid=False,
-            output=None, order=1, mode='constant', cval=0.0, prefilter=False):
+            output=None, order=1, mode='constant', cval=0.0, prefilter=False,
+            slab_size=None, n_jobs=None):
         """
         Transformes the given array, typically an image (arg array) 
         according to the transformation of this instance. Rotation 
@@ -715,6 +718,20 @@ class Affine(object):
         Rigid3D.recalculate_translation() where the rotation center is
         shifted, but the scaling center remains at 0.
 
+        The index grid and the transformed grid are float arrays that
+        are several times larger than the transformed array. To keep 
+        memory usage bounded for large arrays, arg slab_size should be 
+        specified. In this case the transformed array is calculated in 
+        slabs along the last axis (of arg slab_size sections each) using 
+        scipy.ndimage.affine_transform(), so that grids are not made. If 
+        possible (depending on arg mode), only the part of the input array 
+        needed for a slab is used, so arg array can be a memory map. 
+        The result is written directly to arg output if it is an array
+        (such as numpy.memmap). Slabs are processed by arg n_jobs threads.
+        The results are the same as without slabs, up to the floating 
+        point precision of coordinates. Arg return_grid has to be 
+        False in this case.
+
         Arguments:
           - array: array (image) to be transformed
           - center: coordinates of the center for the gl transformation, 
@@ -732,16 +749,31 @@ class Affine(object):
           for splines), default False
           - mode: how to deal with points outside boundaries, default 'constant'
           - cval: outside value for mode 'constant'
+          - slab_size: number of sections (along the last axis) in a slab,
+          None to transform the entire array at once
+          - n_jobs: number of threads used to process slabs (used only if
+          slab_size is not None)
 
         Returns:
           - transformed array (image)
           - (optional) grid used for the transformation
         """
         
-        # inverse transform original grid
-        inverse = self.inverse()
+        # transform by slabs
         if shape is None:
             shape = array.shape
+        if slab_size is not None:
+            if return_grid:
+                raise ValueError(
+                    "Transformation grid can not be returned when the array"
+                    + " is transformed by slabs (argument slab_size).")
+            return self.transformArraySlabs(
+                array=array, center=center, shape=shape, output=output,
+                order=order, mode=mode, cval=cval, prefilter=prefilter,
+                slab_size=slab_size, n_jobs=n_jobs)
+
+        # inverse transform original grid
+        inverse = self.inverse()
         ori_grid = numpy.mgrid[tuple([slice(0,sha) for sha in shape])]
         new_grid = inverse.transform(ori_grid, center=center, xy_axes='mgrid')
         # Note: new_grid should not be just rounded to a nearest int because
@@ -759,6 +791,111 @@ class Affine(object):
         else:
             return new_image
 
+    def transformArraySlabs(
+            self, array, slab_size, center=None, shape=None, output=None,
+            order=1, mode='constant', cval=0.0, prefilter=False, n_jobs=None):
+        """
+        Transformes the given array in slabs along the last axis.
+
+        Should give the same result as transformArray() without slabs, 
+        see transformArray() for the description of the transformation
+        and arguments.
+
+        Matrix and offset of the inverse transformation (including center)
+        are obtained from transform() of the inverse of this instance
+        and are passed to scipy.ndimage.affine_transform() for each slab.
+
+        For modes 'constant', 'grid-constant' and 'nearest', only the 
+        part of arg array that is needed for a slab is used. This is not 
+        done for the other modes because they may use data from the
+        opposite side of arg array. If prefiltering is needed (arg prefilter
+        is True and arg order > 1), the whole array is prefiltered once 
+        (except for modes 'nearest' and 'grid-constant', where each slab
+        is transformed using the whole prefiltered array).
+
+        Arguments:
+          - array: array (image) to be transformed
+          - slab_size: number of sections (along the last axis) in a slab
+          - center: transformation center
+          - shape: shape of the output (transformed) array, None to keep the
+          same shape as arg array
+          - output: (ndarray, can be numpy.memmap) array where the result 
+          is written, or dtype of the result, None for the dtype of arg array
+          - order, mode, cval, prefilter: arguments of 
+          scipy.ndimage.affine_transform()
+          - n_jobs: number of threads used to process slabs
+
+        Returns transformed array (image)
+        """
+
+        # matrix and offset of the inverse transformation
+        inverse = self.inverse()
+        ndim = array.ndim
+        offset = inverse.transform(
+            numpy.zeros((ndim, 1)), center=center, xy_axes='dim_point')[:, 0]
+        matrix = inverse.transform(
+            numpy.identity(ndim), d=0, xy_axes='dim_point')
+
+        # output
+        if shape is None:
+            shape = array.shape
+        shape = tuple(shape)
+        if isinstance(output, numpy.ndarray):
+            result = output
+        else:
+            if output is None:
+                output = array.dtype
+            result = numpy.empty(shape, dtype=output)
+
+        # prefilter once
+        if prefilter and (order > 1) and (
+                mode not in ['nearest', 'grid-constant']):
+            array = scipy.ndimage.spline_filter(
+                array, order, output=numpy.float64, mode=mode)
+            prefilter = False
+        crop = ((not prefilter or (order <= 1))
+                and (mode in ['constant', 'grid-constant', 'nearest']))
+        margin = order + 2
+
+        # corners of a slab in slab coordinates
+        corner_ind = numpy.array(list(itertools.product([0, 1], repeat=ndim)))
+
+        def transform_slab(start):
+            stop = min(start + slab_size, shape[-1])
+            slab_shape = shape[:-1] + (stop - start,)
+            slab_offset = offset + start * matrix[:, -1]
+            source = array
+
+            # use only the needed part of array
+            if crop:
+                corners = corner_ind * (numpy.asarray(slab_shape) - 1)
+                coords = numpy.dot(matrix, corners.transpose()) \
+                    + slab_offset[:, numpy.newaxis]
+                in_shape = numpy.asarray(array.shape)
+                low = numpy.floor(coords.min(axis=1)).astype(int) - margin
+                low = numpy.clip(low, 0, in_shape - 1)
+                high = numpy.ceil(coords.max(axis=1)).astype(int) + margin + 1
+                high = numpy.clip(high, low + 1, in_shape)
+                source = array[
+                    tuple(slice(lo, hi) for lo, hi in zip(low, high))]
+                slab_offset = slab_offset - low
+
+            result[..., start:stop] = scipy.ndimage.affine_transform(
+                numpy.asarray(source), matrix, offset=slab_offset,
+                output_shape=slab_shape, output=result.dtype, order=order,
+                mode=mode, cval=cval, prefilter=prefilter)
+
+        # transform slabs
+        starts = range(0, shape[-1], slab_size)
+        if (n_jobs is not None) and (n_jobs > 1):
+            with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+                list(executor.map(transform_slab, starts))
+        else:
+            for start in starts:
+                transform_slab(start)
+
+        return result
+
     def _transformArray_old(
             self, array, center, return_grid=False, output=None, 
             order=1, mode='constant', cval=0.0, prefilter=False):
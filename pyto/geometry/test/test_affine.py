@@ -13,6 +13,7 @@ from builtins import range
 __version__ = "$Revision$"
 
 from copy import copy, deepcopy
+import itertools
 import unittest
 
 import numpy
@@ -560,6 +561,44 @@ class TestAffine(np_test.TestCase):
         #desired[0,0] = desired[2,0] = 50
         np_test.assert_almost_equal(trans[1:3,1:4], desired[1:3,1:4])
 
+    def testTransformArraySlabs(self):
+        """
+        Tests transformArray() with arg slab_size (transformArraySlabs())
+        """
+
+        ar = numpy.arange(240, dtype=float).reshape(6, 5, 8)
+        q = Rigid3D.make_r_euler([20, 50, 70])
+        transforms = [
+            Rigid3D(q=q, scale=1.2, d=[1, -0.5, 2]),
+            Affine(gl=numpy.array(
+                [[1, 0.2, 0], [0.1, 0.9, 0], [0, 0.3, 1.1]]), d=[0, 1, -1])]
+        for af, center, shape, mode, order, prefilter in itertools.product(
+                transforms, [None, [3, 2, 4]], [None, (7, 4, 9)],
+                ['constant', 'nearest', 'reflect'], [1, 3], [False, True]):
+            desired = af.transformArray(
+                array=ar, center=center, shape=shape, mode=mode, cval=5, 
+                order=order, prefilter=prefilter)
+            for slab_size, n_jobs in [(1, None), (3, 2), (20, None)]:
+                actual = af.transformArray(
+                    array=ar, center=center, shape=shape, mode=mode, cval=5,
+                    order=order, prefilter=prefilter, slab_size=slab_size,
+                    n_jobs=n_jobs)
+                np_test.assert_almost_equal(actual, desired)
+
+        # output array
+        af = transforms[0]
+        desired = af.transformArray(array=ar, center=[3, 2, 4])
+        output = numpy.zeros(ar.shape, dtype='float32')
+        actual = af.transformArray(
+            array=ar, center=[3, 2, 4], output=output, slab_size=3)
+        np_test.assert_equal(actual is output, True)
+        np_test.assert_almost_equal(output, desired, decimal=4)
+
+        # grid can not be returned
+        np_test.assert_raises(
+            ValueError, af.transformArray, array=ar, slab_size=3,
+            return_grid=True)
+
     def testRemoveMasked(self):
         """
         Tests removeMasked()
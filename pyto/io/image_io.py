@@ -368,6 +368,222 @@ class ImageIO(object):
 
         return self.file_
 
+    ###########################################################
+    #
+    # Writing by slabs
+    #
+    ###########################################################
+
+    def startWrite(
+            self, file, shape, dataType, fileFormat=None, byteOrder=None,
+            length=None, pixel=None, header=None, extended=None, rms=True):
+        """
+        Starts writing an image file (em or mrc) slab by slab.
+
+        Meant for images that are too large to be kept in memory. Writes
+        the header, where shape and data type are taken from the arguments.
+        The data is subsequently written by writeSlab(), one slab (a
+        part of the image along the last axis, such as one or more 
+        z-sections) at a time. Finally, finishWrite() has to be called
+        to update the header and close the file. Alternatively, 
+        writeSlabs() does all these steps.
+
+        Data has to be written in the Fortran array order (x-axis 
+        fastest), which is the default for em and mrc formats.
+
+        Arguments:
+          - file: file name
+          - shape: (x_dim, y_dim, z_dim) image shape, the last dimension
+          is updated by finishWrite() if a different number of sections
+          is written 
+          - dataType: data type, has to be one of the data types used for 
+          the specified file format (see write())
+          - fileFormat: 'em' or 'mrc'
+          - byteOrder: '<' (little-endian), '>' (big-endian)
+          - length: (list aor ndarray) length in each dimension in nm (used 
+          only for mrc format)
+          - pixel: pixel size in nm (used only for mrc format if length is 
+          None)
+          - header: (list) image header
+          - extended: (str) extended header string, only for mrc 
+          - rms: flag indicating whether rms is set in the mrc header
+        """
+
+        # determine the file format 
+        self.setFileFormat(file_=file, fileFormat=fileFormat)
+        if self.fileFormat not in ['em', 'mrc']:
+            raise FileTypeError(requested=self.fileFormat,
+                                defined=['em', 'mrc'])
+
+        # set attributes
+        shape = list(shape)
+        if len(shape) < 3:
+            shape = shape + [1] * (3 - len(shape))
+        self.shape = shape
+        if isinstance(dataType, numpy.dtype):
+            dataType = str(dataType)
+        if dataType == 'uint8':
+            dataType = 'ubyte'
+        self.dataType = dataType
+        self.data = None
+        self.length = None
+        self.arrayOrder = 'F'
+
+        # write header (header is not passed because its shape would be used)
+        if self.fileFormat == 'em':
+            if header is not None:
+                self.emHeader = list(header)
+            self.writeEM(file=file, byteOrder=byteOrder, dataType=dataType)
+        elif self.fileFormat == 'mrc':
+            if header is not None:
+                self.mrcHeader = list(header)
+            self.writeMRC(
+                file=file, byteOrder=byteOrder, dataType=dataType,
+                length=length, pixel=pixel, extended=extended)
+
+        # initialize slab writing
+        self.slabWrite = {
+            'n_sections': 0, 'extended': extended, 
+            'adjust_length': length is None, 'rms': rms,
+            'n': 0, 'min': None, 'max': None, 'mean': 0., 'm2': 0.}
+
+    def writeSlab(self, data, casting='unsafe'):
+        """
+        Writes a slab of image data, see startWrite().
+
+        The slab has to have the same shape as the image, except along the
+        last axis. A section (2D array for a 3D image) is also accepted.
+        Data is converted to the data type specified in startWrite().
+
+        Min, max, mean and rms (standard deviation) of the data written
+        so far are updated (used for mrc header).
+
+        Arguments:
+          - data: (ndarray) slab
+          - casting: Controls what kind of data casting may occur: 'no', 
+          'equiv', 'safe', 'same_kind', 'unsafe'. Identical to numpy.astype()
+          method.
+        """
+
+        # check shape
+        data = numpy.asarray(data)
+        if data.ndim < len(self.shape):
+            data = data.reshape(
+                data.shape + (1,) * (len(self.shape) - data.ndim))
+        if list(data.shape[:-1]) != list(self.shape[:-1]):
+            raise ValueError(
+                "Slab shape " + str(data.shape) + " does not agree with "
+                + "image shape " + str(self.shape) + ".")
+
+        # convert data type
+        dtype = self.dataType
+        if dtype == 'ubyte':
+            dtype = 'uint8'
+        data = data.astype(dtype, casting=casting, copy=False)
+
+        # update statistics, combine mean and sum of squared differences
+        # from mean (m2) of the previous and the current slab 
+        stats = self.slabWrite
+        if data.size > 0:
+            data_min = data.min()
+            data_max = data.max()
+            if stats['min'] is None:
+                stats['min'] = data_min
+                stats['max'] = data_max
+            else:
+                stats['min'] = min(stats['min'], data_min)
+                stats['max'] = max(stats['max'], data_max)
+            n_slab = data.size
+            mean_slab = data.mean(dtype=numpy.result_type(data, 'float64'))
+            m2_slab = (numpy.abs(data - mean_slab)**2).sum()
+            n_total = stats['n'] + n_slab
+            delta = mean_slab - stats['mean']
+            stats['mean'] = stats['mean'] + delta * n_slab / n_total
+            stats['m2'] = (
+                stats['m2'] + m2_slab
+                + numpy.abs(delta)**2 * stats['n'] * n_slab / n_total)
+            stats['n'] = n_total
+
+        # write 
+        if self.byteOrder == '>':
+            data = data.byteswap()
+        self.file_.write(data.tobytes(order='F'))
+        stats['n_sections'] += data.shape[-1]
+
+    def finishWrite(self):
+        """
+        Finishes writing image data by slabs, see startWrite().
+
+        If the number of written sections differs from the shape specified
+        in startWrite(), the shape is updated. For mrc files, min, max, 
+        mean and rms (if arg rms of startWrite() was True) values are set 
+        to the values of the written data. 
+        The updated header is written and the file is closed.
+        """
+
+        stats = self.slabWrite
+        self.shape[-1] = stats['n_sections']
+
+        if self.fileFormat == 'em':
+            for k in range(len(self.shape)): 
+                self.emHeader[4+k] = self.shape[k]
+            header_string = struct.pack(
+                ImageIO.em['headerFormat'], *tuple(self.emHeader))
+
+        elif self.fileFormat == 'mrc':
+            if stats['adjust_length']:
+                self.adjustLength()
+            for k in range(len(self.shape)): 
+                self.mrcHeader[k] = self.shape[k]
+                self.mrcHeader[k+7] = self.shape[k]
+                self.mrcHeader[k+10] = self.length[k]
+            if stats['n'] > 0:
+                self.mrcHeader[19] = numpy.real(stats['min'])
+                self.mrcHeader[20] = numpy.real(stats['max'])
+                self.mrcHeader[21] = numpy.real(stats['mean'])
+                if stats['rms']:
+                    self.mrcHeader[53] = numpy.sqrt(stats['m2'] / stats['n'])
+            header_string = struct.pack(
+                ImageIO.mrc['headerFormat'], *tuple(self.mrcHeader))
+            if stats['extended'] is not None:
+                header_string = header_string + stats['extended']
+
+        # write header and close
+        self.headerString = header_string
+        self.file_.seek(0)
+        self.file_.write(header_string)
+        self.file_.close()
+        self.slabWrite = None
+
+    def writeSlabs(
+            self, file, slabs, shape, dataType, fileFormat=None, 
+            byteOrder=None, length=None, pixel=None, header=None, 
+            extended=None, rms=True, casting='unsafe'):
+        """
+        Writes an image file (em or mrc) given by slabs.
+
+        Slabs are given by an iterable (such as a generator) of slabs
+        or sections along the last image axis, so that only one slab is 
+        kept in memory at a time. Uses startWrite(), writeSlab() and 
+        finishWrite(), see these for more info and the arguments.
+
+        Arguments:
+          - slabs: iterable of slabs (ndarrays)
+          - all other: see startWrite() and writeSlab()
+        """
+
+        self.startWrite(
+            file=file, shape=shape, dataType=dataType, fileFormat=fileFormat,
+            byteOrder=byteOrder, length=length, pixel=pixel, header=header,
+            extended=extended, rms=rms)
+        try:
+            for slab in slabs:
+                self.writeSlab(data=slab, casting=casting)
+        except BaseException:
+            self.file_.close()
+            raise
+        self.finishWrite()
+
     ###########################################################
     #
     # EM format
@@ -551,7 +767,9 @@ class ImageIO(object):
         # convert data to another dtype if needed
         wrong_data_type = False
         try:
-            if self.dataType == 'uint8':
+            if self.data is None:
+                pass
+            elif self.dataType == 'uint8':
                 if self.data.dtype.name != 'uint8':
                     self.data = self.data.astype(dtype='uint8', casting=casting)
             elif self.dataType == 'uint16':
@@ -918,7 +1136,9 @@ class ImageIO(object):
         # convert data to another dtype if needed
         wrong_data_type = False
         try:
-            if (self.dataType == 'ubyte') or (self.dataType == 'uint8'):
+            if self.data is None:
+                pass
+            elif (self.dataType == 'ubyte') or (self.dataType == 'uint8'):
                 if self.data.dtype.name != 'uint8':
                     self.data = self.data.astype(dtype='uint8', casting=casting)
             elif self.dataType == 'int16':
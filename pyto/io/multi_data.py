@@ -133,6 +133,26 @@ class MultiData(object):
         Yields: object, category, identifier
         """
 
+        for categ, ident in self.observations(
+                category=category, identifier=identifier):
+            obj = self.getSingle(category=categ, identifier=ident)
+            yield obj, categ, ident
+
+    def observations(self, category=None, identifier=None):
+        """
+        Generator that yields category and identifier of observations 
+        specified by args category and identifier, in the same order as 
+        data() and propertiesData().
+
+        Argument:
+          - category: None for all categories, single category or a list of
+          categories
+          - identifier: None for all identifiers, single identifier, or a list
+          of identifiers
+
+        Yields: category, identifier
+        """
+
         # chose category iterator
         if category is None:
             categ_iter = self.categories()
@@ -154,8 +174,76 @@ class MultiData(object):
 
             # iterate over identifiers and yield
             for ident in ident_iter:
-                obj = self.getSingle(category=categ, identifier=ident)
-                yield obj, categ, ident
+                yield categ, ident
+
+    def propertiesData(self, properties, category=None, identifier=None):
+        """
+        Generator that yields values of specified properties for specified 
+        category(ies), and/or specified identifier(s).
+
+        Observations are specified in the same way as in data(). Property
+        values are the values of the corresponding (deep) attributes of 
+        objects containing data (as returned by getSingle()).
+
+        Subclasses may override this method (or getProperties()) to 
+        obtain property values without reading the whole objects.
+
+        Arguments:
+          - properties: list of property (attribute) names
+          - category: None for all categories, single category or a list of
+          categories
+          - identifier: None for all identifiers, single identifier, or a list
+          of identifiers
+
+        Yields values, category, identifier:
+          - values: (dict) property values where keys are property names, 
+          properties that were not found are omitted, or None if the
+          observation could not be read 
+          - category, identifier: observation category and identifier
+        """
+        for categ, ident in self.observations(
+                category=category, identifier=identifier):
+            values = self.getProperties(
+                category=categ, identifier=ident, properties=properties)
+            yield values, categ, ident
+
+    def getProperties(self, category, identifier, properties):
+        """
+        Returns values of the specified properties of one observation.
+
+        Arguments:
+          - category: observation category
+          - identifier: observation identifier
+          - properties: list of property (attribute) names
+
+        Returns (dict) property values where keys are property names 
+        (properties that were not found are omitted), or None if the 
+        observation could not be read.
+        """
+        obj = self.getSingle(category=category, identifier=identifier)
+        return self.extractValues(obj=obj, properties=properties)
+
+    @staticmethod
+    def extractValues(obj, properties):
+        """
+        Extracts values of (deep) attributes of an object.
+
+        Arguments:
+          - obj: object
+          - properties: list of (deep) attribute names
+
+        Returns (dict) property values where keys are property names 
+        (properties that were not found are omitted), or None if obj is None.
+        """
+        if obj is None:
+            return None
+        values = {}
+        for attr in properties:
+            try:
+                values[attr] = pyto.util.attributes.getattr_deep(obj, attr)
+            except AttributeError:
+                pass
+        return values
 
 
     ###############################################################
@@ -251,9 +339,10 @@ class MultiData(object):
             raise ValueError("Sorry, 'categories' and 'identifiers' are " \
                 "reserved names and can't be present in properties argument.")
 
-        # get objects and extract properties
-        for obj, category, name in self.data(category=category, 
-                                             identifier=identifier):
+        # get property values
+        for values, category, name in self.propertiesData(
+                properties=properties, category=category, 
+                identifier=identifier):
 
             # append current values of category and image name
             multi.categories.append(category)
@@ -273,14 +362,18 @@ class MultiData(object):
                     old_values  = []
 
                 # get obj.attr
-                if obj is None:
+                if values is None:
                     new_value = None
                 else:
                     try:
-                        new_value = pyto.util.attributes.getattr_deep(obj, attr)
+                        if attr not in values:
+                            raise AttributeError()
+                        new_value = values[attr]
                         if (not self.compact) and compactify \
                                 and (attr != index):
-                            new_value = new_value[getattr(obj, index)]
+                            if index not in values:
+                                raise AttributeError()
+                            new_value = new_value[values[index]]
                     except AttributeError:
                         logging.warning("Object " + name \
                                       + " does not have attribute " + attr) 
@@ -306,7 +399,8 @@ class MultiData(object):
 
     def readPropertiesGen(
             self, properties, index='ids', indexed=[], category=None,
-            identifier=None, multi=None, compactify=True, deep='_'):
+            identifier=None, multi=None, compactify=True, deep='_',
+            objects=True):
 
         """
         Reads data for each observation (experiment) separately, extracts 
@@ -380,6 +474,11 @@ class MultiData(object):
         properties that are read. The values are the names under which these
         properties are saved.
 
+        If arg objects is False, property values are obtained by 
+        propertiesData(), which may avoid reading whole objects (see 
+        Pickled.propertiesData()), and None is yielded instead of the 
+        object. Should be used when the objects are not needed.
+
         Note: can be called only on objects of subclasses of MultiData that 
         implement getSingle() method.
 
@@ -394,10 +493,13 @@ class MultiData(object):
           - multi: instance that will hold the resulting data
           - compactify: convert all property arrays to compact form
           - deep: the mode of converting names of properties
+          - objects: flag indicating whether objects containing data are 
+          read and yielded
 
         Yields multi, object, category, identifier:
           - multi: (..analysis.Observations) holds requested properties
-          - obj: contains data of the curent observation (experiment)
+          - obj: contains data of the curent observation (experiment), 
+          None if arg objects is False
           - category: category
           - identifier: experiment identifier
         """
@@ -425,16 +527,32 @@ class MultiData(object):
             raise ValueError("Sorry, 'categories' and 'identifiers' are " \
                 "reserved names and can't be present in properties argument.")
 
-        # get objects and extract properties
-        for obj, category, name in self.data(
-                category=category, identifier=identifier):
+        # get objects and / or property values
+        if objects:
+            data = (
+                (obj, self.extractValues(obj=obj, properties=properties), 
+                 categ, ident) 
+                for obj, categ, ident in self.data(
+                    category=category, identifier=identifier))
+        else:
+            data = (
+                (None, values, categ, ident) 
+                for values, categ, ident in self.propertiesData(
+                    properties=list(properties), category=category, 
+                    identifier=identifier))
+
+        # extract properties
+        for obj, values, category, name in data:
 
             # append current values of category and image name
             multi.categories.append(category)
             multi.identifiers.append(name)
 
             # get ids
-            ids = pyto.util.attributes.getattr_deep(obj, index)
+            if objects:
+                ids = pyto.util.attributes.getattr_deep(obj, index)
+            else:
+                ids = values.get(index) if values is not None else None
 
             # find values of all properties and add them to the result object
             for attr in properties:
@@ -455,11 +573,13 @@ class MultiData(object):
                     old_values  = []
 
                 # get property of the current observation 
-                if obj is None:
+                if values is None:
                     new_value = None
                 else:
                     try:
-                        new_value = pyto.util.attributes.getattr_deep(obj, attr)
+                        if attr not in values:
+                            raise AttributeError()
+                        new_value = values[attr]
                         if (attr in indexed) and (attr != index) \
                                 and (not self.compact) and compactify:
                             new_value = new_value[ids] 
@@ -12,6 +12,7 @@ import os
 import sys
 import importlib
 import pickle
+import json
 
 import numpy as np
 import pandas as pd
@@ -28,10 +29,19 @@ class PandasIO(object):
       - directly pickled dataframe
       - dataframe serialized by json and then pickled
       - hdf5 format
+      - columnar format, where each column is saved as a separate numpy
+      (.npy) file in a directory, together with a (json) manifest file
 
     The default approach is to write all versions (if possible) and to 
     read one by one until it is sucessful.    
 
+    The columnar (npy) format is meant for large tables. Only the 
+    requested columns are read and numerical columns are memory-mapped,
+    so that when rows are selected (arg filters of read() and 
+    read_table()) only the selected rows are loaded. The other formats
+    accept the same column and row selection arguments, but the 
+    selection is made after the entire table is read.
+
     Usage from an external program like a python shell or a notebook. On
     one system:
 
@@ -93,6 +103,10 @@ class PandasIO(object):
 
         # temporaty column to store (a non-unique) index for write / read
         self.index_col = '_index'
+
+        # columnar (npy) format
+        self.npy_manifest = 'manifest.json'
+        self.npy_index_file = 'index.npy'
         
     @classmethod
     def write(
@@ -107,13 +121,14 @@ class PandasIO(object):
           - 'pkl': pickled dataframe, extension 'pkl'
           - 'json': pickled json serialized dataframe, extension '_json.pkl'
           - 'hdf5': hdf5 format, extension _hdf5_name'.h5' (experimental) 
+          - 'npy': columnar format, directory with extension '_npy'
 
         Writes the dataframe in all formats specified by arg file_formats.
         If arg file_formats is None, writes in all three formats.
 
         The specified file path (arg base) should 
         not contain an extension, or it can end with .pkl in which case
-        .pkl is replaced by '_json.pkl' or _hdf5_name'.h5'.
+        .pkl is replaced by '_json.pkl', _hdf5_name'.h5' or '_npy'.
 
         Makes new directories if those of arg base do not exist.
 
@@ -139,24 +154,35 @@ class PandasIO(object):
     @classmethod
     def read(
             cls, base, calling_dir=None, file_formats=['pkl', 'json', 'hd5'],
-            hdf5_name=None, verbose=True, out_desc='', info_fd=None):
+            hdf5_name=None, columns=None, filters=None, verbose=True,
+            out_desc='', info_fd=None):
         """Reads pandas DataFrame written by write() or write_table().
 
         Currently supported formats are:
           - 'pkl': pickled dataframe, extension 'pkl'
           - 'json': pickled json serialized dataframe, extension '_json.pkl'
           - 'hdf5': hdf5 format, extension _hdf5_name'.h5' (experimental) 
+          - 'npy': columnar format, directory with extension '_npy'
 
         Files of formats specified in arg file_formats, (or self.file_formats, 
         if this arg is None) are attempted to be read in the order given by
         file_formats. As soon as one file is sucessfully read, the 
         corresponding table is returned.
 
+        If arg columns is specified, only the specified columns are returned.
+        If arg filters is specified, only the rows whose values of the 
+        filter columns are among the specified values are returned, see 
+        select() for details. For 'npy' format, only the selected columns 
+        and rows are read.
+
         Arguments:
           - base: file path, can be absolute or relative to self.calling_dir
           - calling_dir: directory from which this method is called
           - file formats: default ['pkl', 'hdf5', 'json'] or a subset of
           - hdf5_name: used to make hdf5 file name
+          - columns: (list) columns to read, None for all columns 
+          - filters: (dict) row selection, column names are keys and 
+          allowed values of the columns (single value or a list) are values  
           - verbose: flag indicating if a statement is printed for every
           file that is read
           - out_desc: description of the file that is read or written, used
@@ -167,7 +193,8 @@ class PandasIO(object):
             calling_dir=calling_dir, file_formats=file_formats, verbose=verbose,
             info_fd=info_fd)
         data = pdio.read_table(
-            base=base, hdf5_name=hdf5_name, out_desc=out_desc)
+            base=base, hdf5_name=hdf5_name, columns=columns, filters=filters,
+            out_desc=out_desc)
         return data
                
     def write_table(
@@ -181,6 +208,7 @@ class PandasIO(object):
           - 'pkl': pickled dataframe, extension 'pkl'
           - 'json': pickled json serialized dataframe, extension '_json.pkl'
           - 'hdf5': hdf5 format, extension _hdf5_name'.h5' (experimental) 
+          - 'npy': columnar format, directory with extension '_npy'
 
         Writes the dataframe in all formats specified by arg file_formats.
         If arg file_formats is None, writes in all three formats.
@@ -189,9 +217,11 @@ class PandasIO(object):
         self.index_col and resets index. Reading the saved file using 
         self.read_table(), recovers the original index. 
 
+        For npy, see write_npy().
+
         The specified file path (arg base) should 
         not contain an extension, or it can end with .pkl in which case
-        .pkl is replaced by '_json.pkl' or _hdf5_name'.h5'.
+        .pkl is replaced by '_json.pkl', _hdf5_name'.h5' or '_npy'.
 
         Makes new directories if those of arg base do not exist.
 
@@ -267,13 +297,29 @@ class PandasIO(object):
                     f"Did not pickle {out_desc} to {path_short} because "
                     + "the file exists and overwrite flag is True")
 
-    def read_table(self, base, file_formats=None, hdf5_name=None, out_desc=''):
+        if ('npy' in file_formats) and (base is not None):
+            path, path_short = self.get_npy_path(base)
+            if overwrite or not (os.path.exists(path)):
+                self.write_npy(table=table, path=path)
+                if verbose:
+                    print(
+                        f"Wrote columns of {out_desc} to {path_short}",
+                        file=self.info_fd)
+            else:
+                raise ValueError(
+                    f"Did not write {out_desc} to {path_short} because "
+                    + "the file exists and overwrite flag is True")
+
+    def read_table(
+            self, base, file_formats=None, hdf5_name=None, columns=None,
+            filters=None, out_desc=''):
         """Reads pandas.DataFrame tables written by write() or write_table().
 
         Currently supported formats are:
           - 'pkl': pickled dataframe, extension 'pkl'
           - 'json': pickled json serialized dataframe, extension '_json.pkl'
           - 'hdf5': hdf5 format, extension _hdf5_name'.h5' (experimental) 
+          - 'npy': columnar format, directory with extension '_npy'
 
         Files of formats specified in arg file_formats, (or self.file_formats, 
         if this arg is None) are attempted to be read in the order given by
@@ -283,10 +329,20 @@ class PandasIO(object):
         For json, if col self.index_col exists in the saved file, replaces
         the ndex by this column. It is thus comparible with write_table()
 
+        If arg columns and / or filters are specified, only the specified
+        columns and rows are returned (see select()). For npy format, 
+        the filter columns are read first and only the selected rows
+        of the requested columns are loaded (see read_npy()). For other
+        formats, the whole table is read and the selection is made
+        afterwards.
+
         Arguments:
           - base: file path, can be absolute or relative to self.calling_dir
           - file formats: default ['pkl', 'hdf5', 'json'] or a subset of
           - hdf5_name: used to make hdf5 file name
+          - columns: (list) columns to read, None for all columns 
+          - filters: (dict) row selection, column names are keys and 
+          allowed values of the columns (single value or a list) are values  
           - out_desc: description of the file that is read or written, used
           only for the out messages if self.verbose is True 
 
@@ -306,7 +362,8 @@ class PandasIO(object):
                     table = pd.read_pickle(path)
                     if verbose:
                         print(f"Read {out_desc} pickle {path_short}")
-                    return table
+                    return self.select(
+                        table=table, columns=columns, filters=filters)
                 except AttributeError:
                     if verbose:
                         print(
@@ -325,7 +382,8 @@ class PandasIO(object):
                         print(
                             f"Read {out_desc} hdf5 file {path_short} "
                             + f"with key {key}") 
-                    return table
+                    return self.select(
+                        table=table, columns=columns, filters=filters)
                 except OSError:
                     pass
 
@@ -340,6 +398,18 @@ class PandasIO(object):
                         print(
                             f"Read {out_desc} pickled json string "
                             + f"from {path_short}")
+                    return self.select(
+                        table=table, columns=columns, filters=filters)
+                except OSError:
+                    pass
+
+            if ff == 'npy':
+                path, path_short = self.get_npy_path(base)
+                try:
+                    table = self.read_npy(
+                        path=path, columns=columns, filters=filters)
+                    if verbose:
+                        print(f"Read {out_desc} columns from {path_short}")
                     return table
                 except OSError:
                     pass
@@ -378,6 +448,23 @@ class PandasIO(object):
             
         return path, path_short
 
+    def get_npy_path(self, base):
+        """Makes path of the directory for npy (columnar) format.
+
+        First removes '_json.pkl' or '.pkl' from arg base, if possible. 
+        Then adds '_npy'.
+
+        Arguments:
+          - base: base path
+
+        Returns (path, path_short): Paths that include and do not incude the
+        calling directory (self.calling_dir), respectfully
+        """
+        pkl_path, pkl_path_short = self.get_pickle_path(base)
+        path = pkl_path.removesuffix('.pkl') + '_npy'
+        path_short = pkl_path_short.removesuffix('.pkl') + '_npy'
+        return path, path_short
+
     def get_hdf5_path_key(self, base, hdf5_name):
         """Makes path for hdf5 format.
 
@@ -426,3 +513,240 @@ class PandasIO(object):
             table = table.set_index(self.index_col)
             table.index.name = None
         return table
+
+    def write_npy(self, table, path):
+        """Writes table in the columnar (npy) format.
+
+        Each column, as well as the index (unless it is a RangeIndex), is 
+        saved in a separate numpy (.npy) file in directory (arg) path. 
+        Column names, dtypes and file names are saved in a json manifest 
+        (self.npy_manifest). 
+
+        Numerical, boolean and datetime columns are saved as they are, 
+        so that they can be memory-mapped when read. Object columns 
+        that contain only strings are saved as unicode arrays (also 
+        memory-mapped). Other object columns are saved as pickled object 
+        arrays and columns of pandas extension dtypes (such as categorical)
+        as pickled pandas arrays.
+
+        Column files of a previously written table in the same directory
+        that are not used by the current table are removed.
+
+        Arguments:
+          - table: (pandas.DataFrame) table
+          - path: directory path
+        """
+
+        os.makedirs(path, exist_ok=True)
+
+        # columns
+        column_entries = []
+        for ind, name in enumerate(table.columns):
+            entry = self._write_npy_column(
+                values=table.iloc[:, ind], path=path, file_name=f'col_{ind}.npy')
+            if isinstance(name, np.generic):
+                name = name.item()
+            entry['name'] = name
+            column_entries.append(entry)
+
+        # index
+        index = table.index
+        if isinstance(index, pd.RangeIndex):
+            index_entry = {
+                'range': [index.start, index.stop, index.step]}
+        else:
+            index_entry = self._write_npy_column(
+                values=index, path=path, file_name=self.npy_index_file)
+        index_entry['name'] = index.name
+
+        # remove files that are not used anymore
+        current = set(entry['file'] for entry in column_entries)
+        if 'file' in index_entry:
+            current.add(index_entry['file'])
+        for file_name in os.listdir(path):
+            if (((file_name.startswith('col_') and file_name.endswith('.npy'))
+                 or (file_name == self.npy_index_file))
+                and (file_name not in current)):
+                os.remove(os.path.join(path, file_name))
+
+        # manifest written last, so that read fails if write was interrupted
+        manifest = {
+            'n_rows': table.shape[0], 'columns': column_entries,
+            'index': index_entry}
+        with open(os.path.join(path, self.npy_manifest), 'w') as fd:
+            json.dump(manifest, fd)
+
+    def _write_npy_column(self, values, path, file_name):
+        """Writes one column (or index) for write_npy().
+
+        Arguments:
+          - values: (pandas.Series or pandas.Index) column or index values
+          - path: directory path
+          - file_name: file name
+
+        Returns (dict) manifest entry for this column, contains file name,
+        kind of saved data ('npy', 'str', 'object' or 'extension') and dtype.
+        """
+
+        dtype = values.dtype
+        if isinstance(dtype, np.dtype) and (dtype.kind in 'biufcmM'):
+            kind = 'npy'
+            array = values.to_numpy()
+        elif (isinstance(dtype, np.dtype) and (dtype.kind == 'O')
+              and (len(values) > 0)
+              and (pd.api.types.infer_dtype(values, skipna=False)
+                   == 'string')):
+            kind = 'str'
+            array = values.to_numpy().astype(str)
+        elif isinstance(dtype, np.dtype):
+            kind = 'object'
+            array = np.empty(len(values), dtype=object)
+            array[:] = list(values)
+        else:
+            kind = 'extension'
+            array = np.empty((), dtype=object)
+            array[()] = values.array
+        np.save(os.path.join(path, file_name), array, allow_pickle=True)
+        entry = {'file': file_name, 'kind': kind, 'dtype': str(dtype)}
+
+        return entry
+
+    def read_npy(self, path, columns=None, filters=None):
+        """Reads table written in the columnar (npy) format.
+
+        Only the columns specified by arg columns are read. Numerical and
+        string columns are memory-mapped, so only the rows selected by 
+        arg filters are loaded. 
+
+        Filter columns are read first to determine the selected rows 
+        (see select() for filters), and the remaining columns are read
+        afterwards, thus filters on a column like tomo id are applied
+        before the bulk of the data is loaded.
+
+        Arguments:
+          - path: directory path
+          - columns: (list) columns to read, None for all columns 
+          - filters: (dict) row selection, column names are keys and 
+          allowed values of the columns (single value or a list) are values  
+
+        Returns (pandas.DataFrame) table
+        """
+
+        with open(os.path.join(path, self.npy_manifest), 'r') as fd:
+            manifest = json.load(fd)
+        entries = dict(
+            (entry['name'], entry) for entry in manifest['columns'])
+
+        # select rows
+        rows = None
+        if filters is not None:
+            mask = np.ones(manifest['n_rows'], dtype=bool)
+            for name, values in filters.items():
+                try:
+                    entry = entries[name]
+                except KeyError:
+                    raise KeyError(f"Filter column {name} does not exist")
+                values = self._get_filter_values(values)
+                if ((entry['kind'] == 'str')
+                    and all(isinstance(val, str) for val in values)):
+                    # faster than converting unicode to object array
+                    col_values = np.load(
+                        os.path.join(path, entry['file']), mmap_mode='r')
+                    mask &= np.isin(col_values, np.array(values, dtype=str))
+                else:
+                    col_values = self._read_npy_column(path=path, entry=entry)
+                    mask &= pd.Series(col_values).isin(values).to_numpy()
+            rows = np.flatnonzero(mask)
+
+        # read columns
+        if columns is None:
+            column_entries = manifest['columns']
+        else:
+            try:
+                column_entries = [entries[name] for name in columns]
+            except KeyError as err:
+                raise KeyError(f"Column {err} does not exist")
+        data = dict(
+            (ind, self._read_npy_column(path=path, entry=entry, rows=rows))
+            for ind, entry in enumerate(column_entries))
+
+        # index
+        index_entry = manifest['index']
+        if 'range' in index_entry:
+            index = pd.RangeIndex(*index_entry['range'])
+            if rows is not None:
+                index = index[rows]
+            index.name = index_entry['name']
+        else:
+            index = pd.Index(
+                self._read_npy_column(path=path, entry=index_entry, rows=rows),
+                name=index_entry['name'])
+
+        table = pd.DataFrame(data, index=index)
+        table.columns = pd.Index(
+            [entry['name'] for entry in column_entries], dtype=object)
+
+        return table
+
+    def _read_npy_column(self, path, entry, rows=None):
+        """Reads one column (or index) for read_npy().
+
+        Arguments:
+          - path: directory path
+          - entry: manifest entry of the column
+          - rows: indices of rows to read, None for all rows
+
+        Returns column values (ndarray or pandas array)
+        """
+
+        file_path = os.path.join(path, entry['file'])
+        if entry['kind'] == 'object':
+            values = np.load(file_path, allow_pickle=True)
+        elif entry['kind'] == 'extension':
+            values = np.load(file_path, allow_pickle=True)[()]
+        else:
+            values = np.load(file_path, mmap_mode='r')
+        if rows is not None:
+            values = values[rows]
+        elif entry['kind'] != 'extension':
+            values = np.array(values)
+        if entry['kind'] == 'str':
+            values = values.astype(object)
+
+        return values
+
+    def select(self, table, columns=None, filters=None):
+        """Selects columns and rows of a table.
+
+        Rows are selected by arg filters, a dictionary where keys are 
+        column names and values are the allowed values of the 
+        corresponding columns (a single value or a list). A row is selected
+        if values of all filter columns are among the allowed values.
+
+        Arguments:
+          - table: (pandas.DataFrame) table
+          - columns: (list) columns to read, None for all columns 
+          - filters: (dict) row selection
+
+        Returns (pandas.DataFrame) table, or arg table if both arg columns
+        and filters are None
+        """
+
+        if filters is not None:
+            mask = np.ones(table.shape[0], dtype=bool)
+            for name, values in filters.items():
+                mask &= table[name].isin(
+                    self._get_filter_values(values)).to_numpy()
+            table = table[mask]
+        if columns is not None:
+            table = table[list(columns)]
+
+        return table
+
+    @staticmethod
+    def _get_filter_values(values):
+        """Converts filter values to a list. 
+        """
+        if isinstance(values, str) or not np.iterable(values):
+            values = [values]
+        return list(values)
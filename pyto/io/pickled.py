@@ -11,9 +11,13 @@ from __future__ import absolute_import
 __version__ = "$Revision: 336 $"
 
 import sys
+import os
+import json
+import hashlib
 import pickle
 import warnings
 import logging
+from concurrent.futures import ProcessPoolExecutor
 import numpy
 
 import pyto.util.attributes
@@ -34,9 +38,37 @@ class Pickled(MultiData):
         obj. ...
       # final multi contains all data
       multi. ...
+
+    Property cache:
+
+    If cache_dir is set (either as an argument to the constructor, or 
+    globally as Pickled.cache_dir), values of properties extracted from 
+    pickles by propertiesData() (and consequently by readProperties()
+    and readPropertiesGen(objects=False)) are saved in a cache file, one
+    for each pickle. Each cache file contains properties 
+    extracted so far, saved as separate arrays in a npz file, together 
+    with the pickle path and modification time. Subsequent reads take 
+    property values from the cache, without unpickling. A cache file
+    becomes invalid when the pickle is modified, and it is then 
+    replaced.
+
+    Pickles are read in n_jobs processes. This is used only for pickles 
+    that do not have the requested properties in the cache.
+
+    Class attributes:
+      - cache_dir: directory where property cache files are saved, None
+      for no caching
+      - n_jobs: number of processes used to read pickles when cache 
+      is used
     """
 
-    def __init__(self, files):
+    # property cache directory, None for no caching
+    cache_dir = None
+
+    # number of processes used to read pickles in propertiesData()
+    n_jobs = 1
+
+    def __init__(self, files, cache_dir=None, n_jobs=None):
         """
         Initializes files attribute.
 
@@ -50,11 +82,18 @@ class Pickled(MultiData):
                  'group_b' : {'exp_5' : file_5,
                               ...             },
                  ...                           }
+
+        Arguments cache_dir and n_jobs, if specified, override the 
+        corresponding class attributes.
         """
         super(Pickled, self).__init__(files=files)
 
         # set attributes
         self.compact = False 
+        if cache_dir is not None:
+            self.cache_dir = cache_dir
+        if n_jobs is not None:
+            self.n_jobs = n_jobs
 
     def getSingle(self, category, identifier, encoding='latin1'):
         """
@@ -86,3 +125,223 @@ class Pickled(MultiData):
             obj = None
         return obj
 
+    def propertiesData(self, properties, category=None, identifier=None):
+        """
+        Generator that yields values of specified properties for specified 
+        category(ies), and/or specified identifier(s).
+
+        Like MultiData.propertiesData(), but if self.cache_dir is set, 
+        property values are read from the cache when possible. Pickles 
+        that are not in the cache, or whose cache does not contain all 
+        requested properties, are read in self.n_jobs processes and 
+        the properties are added to the cache.
+
+        Arguments:
+          - properties: list of property (attribute) names
+          - category: None for all categories, single category or a list of
+          categories
+          - identifier: None for all identifiers, single identifier, or a list
+          of identifiers
+
+        Yields values, category, identifier:
+          - values: (dict) property values where keys are property names, 
+          properties that were not found are omitted, or None if the
+          observation could not be read 
+          - category, identifier: observation category and identifier
+        """
+
+        # no cache
+        if self.cache_dir is None:
+            for values, categ, ident in super(Pickled, self).propertiesData(
+                    properties=properties, category=category, 
+                    identifier=identifier):
+                yield values, categ, ident
+            return
+
+        # read cache
+        observs = list(self.observations(
+            category=category, identifier=identifier))
+        paths = [self.files[categ][ident] for categ, ident in observs]
+        cached = [
+            self.readCache(
+                path=path, cache_path=self.getCachePath(path), 
+                properties=properties)
+            for path in paths]
+
+        # read pickles that are not cached
+        if self.n_jobs > 1:
+            executor = ProcessPoolExecutor(max_workers=self.n_jobs)
+            futures = [
+                executor.submit(
+                    self.readPickleProperties, path, self.getCachePath(path),
+                    properties) 
+                if values is None else None
+                for path, values in zip(paths, cached)]
+        else:
+            executor = None
+        try:
+            for ind, (categ, ident) in enumerate(observs):
+                values = cached[ind]
+                if values is None:
+                    if executor is not None:
+                        values = futures[ind].result()
+                    else:
+                        values = self.readPickleProperties(
+                            path=paths[ind], 
+                            cache_path=self.getCachePath(paths[ind]),
+                            properties=properties)
+                yield values, categ, ident
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+    def getCachePath(self, path):
+        """
+        Returns path of the property cache file that corresponds to the 
+        specified pickle file.
+
+        Argument:
+          - path: pickle file path
+        """
+        hashed = hashlib.sha1(os.path.abspath(path).encode('utf-8'))
+        return os.path.join(self.cache_dir, hashed.hexdigest() + '.npz')
+
+    @staticmethod
+    def readCache(path, cache_path, properties):
+        """
+        Reads property values from a property cache file.
+
+        Arguments:
+          - path: pickle file path
+          - cache_path: cache file path
+          - properties: list of property names
+
+        Returns (dict) property values where keys are property names 
+        (properties that do not exist are omitted), or None if the cache 
+        file does not exist, if it is not valid for the current pickle 
+        file, or if it does not contain all properties.
+        """
+
+        # check cache file
+        try:
+            cache = numpy.load(cache_path, allow_pickle=True)
+        except (IOError, ValueError):
+            return None
+        with cache:
+            meta = json.loads(str(cache['__meta__']))
+            if meta['path'] != os.path.abspath(path):
+                return None
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return None
+            if ((meta['mtime'] != stat.st_mtime_ns) 
+                    or (meta['size'] != stat.st_size)):
+                return None
+
+            # read properties
+            values = {}
+            for attr in properties:
+                if attr in meta['missing']:
+                    continue
+                elif attr in meta['keys']:
+                    value = cache[meta['keys'][attr]]
+                    if attr in meta['wrapped']:
+                        value = value[()]
+                    values[attr] = value
+                else:
+                    return None
+
+        return values
+
+    @staticmethod
+    def writeCache(path, cache_path, properties, values):
+        """
+        Writes property values to a property cache file.
+
+        Property values that are already in a valid cache file are 
+        retained. The cache file is replaced atomically.
+
+        Arguments:
+          - path: pickle file path
+          - cache_path: cache file path
+          - properties: list of property names that were extracted
+          - values: (dict) property values where keys are property names
+        """
+
+        # read properties already cached
+        stat = os.stat(path)
+        old_values = {}
+        missing = set()
+        try:
+            with numpy.load(cache_path, allow_pickle=True) as cache:
+                meta = json.loads(str(cache['__meta__']))
+                if ((meta['path'] == os.path.abspath(path))
+                        and (meta['mtime'] == stat.st_mtime_ns)
+                        and (meta['size'] == stat.st_size)):
+                    missing = set(meta['missing'])
+                    for attr, key in meta['keys'].items():
+                        value = cache[key]
+                        if attr in meta['wrapped']:
+                            value = value[()]
+                        old_values[attr] = value
+        except (IOError, ValueError):
+            pass
+
+        # combine with new values
+        old_values.update(values)
+        missing = missing.union(properties).difference(old_values)
+        arrays = {}
+        keys = {}
+        wrapped = []
+        for ind, (attr, value) in enumerate(old_values.items()):
+            key = 'prop_{}'.format(ind)
+            keys[attr] = key
+            if (type(value) is numpy.ndarray) and (value.dtype.kind != 'O'):
+                arrays[key] = value
+            else:
+                wrapped_value = numpy.empty((), dtype=object)
+                wrapped_value[()] = value
+                arrays[key] = wrapped_value
+                wrapped.append(attr)
+        meta = {
+            'path': os.path.abspath(path), 'mtime': stat.st_mtime_ns,
+            'size': stat.st_size, 'keys': keys, 'wrapped': wrapped,
+            'missing': sorted(missing)}
+        arrays['__meta__'] = numpy.array(json.dumps(meta))
+
+        # write
+        cache_dir = os.path.dirname(cache_path)
+        if cache_dir != '':
+            os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = '{}.{}.tmp.npz'.format(cache_path, os.getpid())
+        numpy.savez(tmp_path, **arrays)
+        os.replace(tmp_path, cache_path)
+
+    @staticmethod
+    def readPickleProperties(path, cache_path, properties, encoding='latin1'):
+        """
+        Reads a pickle, extracts the specified properties and saves them
+        in the property cache.
+
+        Arguments:
+          - path: pickle file path
+          - cache_path: cache file path
+          - properties: list of property names
+          - encoding: encoding for pickle.load()
+
+        Returns (dict) property values where keys are property names 
+        (properties that were not found are omitted), or None if the 
+        pickle could not be read.
+        """
+        try:
+            with open(path, 'rb') as file_:
+                obj = pickle.load(file_, encoding=encoding)
+        except IOError:
+            logging.warning("File " + path + " could not be read")
+            return None
+        values = MultiData.extractValues(obj=obj, properties=properties)
+        Pickled.writeCache(
+            path=path, cache_path=cache_path, properties=properties, 
+            values=values)
+        return values
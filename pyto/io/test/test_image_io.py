@@ -688,6 +688,60 @@ class TestImageIO(np_test.TestCase):
         file_in.read(file=os.path.join(self.dir, '_test.mrc'), arrayOrder='F')
         np_test.assert_equal(file_in.data, ar_int16_f)
 
+    def testWriteSlabs(self):
+        """
+        Tests writeSlabs(), and implicitly startWrite(), writeSlab() and 
+        finishWrite()
+        """
+
+        ar = numpy.arange(60, dtype='float32').reshape((3, 4, 5)) - 20
+
+        # mrc, slabs and a section
+        file_out = ImageIO()
+        file_out.writeSlabs(
+            file=os.path.join(self.dir, '_test.mrc'),
+            slabs=[ar[:, :, :2], ar[:, :, 2], ar[:, :, 3:]], shape=ar.shape,
+            dataType='float32', pixel=2.1)
+        file_in = ImageIO()
+        file_in.read(file=os.path.join(self.dir, '_test.mrc'))
+        np_test.assert_equal(file_in.dataType, 'float32')
+        np_test.assert_equal(file_in.shape, [3, 4, 5])
+        np_test.assert_equal(file_in.data, ar)
+        np_test.assert_almost_equal(file_in.pixel, 2.1)
+        np_test.assert_almost_equal(file_in.mrcHeader[19:22], [-20, 39, 9.5])
+        np_test.assert_almost_equal(file_in.mrcHeader[53], ar.std(), decimal=5)
+
+        # mrc, data type conversion, shape updated from written sections
+        file_out = ImageIO()
+        file_out.writeSlabs(
+            file=os.path.join(self.dir, '_test.mrc'),
+            slabs=(ar[:, :, ind] for ind in range(3)), shape=(3, 4, 10),
+            dataType='int16')
+        file_in = ImageIO()
+        file_in.read(file=os.path.join(self.dir, '_test.mrc'))
+        np_test.assert_equal(file_in.dataType, 'int16')
+        np_test.assert_equal(file_in.shape, [3, 4, 3])
+        np_test.assert_equal(file_in.data, ar[:, :, :3])
+
+        # em
+        file_out = ImageIO()
+        file_out.writeSlabs(
+            file=os.path.join(self.dir, '_test.em'),
+            slabs=[ar[:, :, :3], ar[:, :, 3:]], shape=ar.shape,
+            dataType='float32')
+        file_in = ImageIO()
+        file_in.read(file=os.path.join(self.dir, '_test.em'))
+        np_test.assert_equal(file_in.shape, [3, 4, 5])
+        np_test.assert_equal(file_in.data, ar)
+
+        # wrong slab shape
+        file_out = ImageIO()
+        np_test.assert_raises(
+            ValueError, file_out.writeSlabs,
+            file=os.path.join(self.dir, '_test.mrc'),
+            slabs=[ar[:2, :, :]], shape=ar.shape, dataType='float32')
+        np_test.assert_equal(file_out.file_.closed, True)
+
     def testPixelSize(self):
         """
         Tests pixel size in read and write
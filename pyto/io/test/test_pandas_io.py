@@ -119,6 +119,57 @@ class TestPandasIO(np_test.TestCase):
         np_test.assert_equal((table2.index.to_numpy() == 5).all(), True)
         np_test.assert_array_equal(table2.to_numpy(), table.to_numpy())
 
+    def test_write_read_npy(self):
+        """Tests write() and read() for npy (columnar) format
+        """
+
+        table = pd.DataFrame({
+            'tomo_id': ['alpha', 'bravo', 'alpha', 'charlie'],
+            'x': [1.5, 2.5, 3.5, 4.5],
+            'class': pd.Categorical(['c1', 'c2', 'c2', 'c1']),
+            'coords': [(1, 2), (3, 4), None, (5, 6)]},
+            index=[5, 3, 5, 1])
+        PandasIO.write(
+            table=table, base=self.base_1, calling_dir=self.current_dir,
+            file_formats=['pkl', 'npy'], verbose=False)
+        np_test.assert_equal(
+            os.path.isdir(os.path.join(
+                self.current_dir, 'dir_1/table_1_npy')), True)
+
+        # whole table
+        actual = PandasIO.read(
+            calling_dir=self.current_dir, base=self.base_1,
+            file_formats=['npy'], verbose=False)
+        np_test.assert_equal(table.equals(actual), True)
+
+        # columns and filters
+        for file_formats in [['npy'], ['pkl']]:
+            actual = PandasIO.read(
+                calling_dir=self.current_dir, base=self.base_1,
+                file_formats=file_formats, columns=['x', 'coords'],
+                filters={'tomo_id': ['alpha', 'charlie']}, verbose=False)
+            desired = table.iloc[[0, 2, 3]][['x', 'coords']]
+            np_test.assert_equal(desired.equals(actual), True)
+            actual = PandasIO.read(
+                calling_dir=self.current_dir, base=self.base_1,
+                file_formats=file_formats,
+                filters={'tomo_id': 'alpha', 'class': 'c2'}, verbose=False)
+            np_test.assert_equal(table.iloc[[2]].equals(actual), True)
+
+        # overwrite with fewer columns and a range index
+        table_11 = self.table_11.reset_index(drop=True)
+        PandasIO.write(
+            table=table_11, base=self.base_1, calling_dir=self.current_dir,
+            file_formats=['npy'], verbose=False)
+        actual = PandasIO.read(
+            calling_dir=self.current_dir, base=self.base_1,
+            file_formats=['npy'], verbose=False)
+        np_test.assert_equal(table_11.equals(actual), True)
+        np_test.assert_equal(
+            sorted(os.listdir(os.path.join(
+                self.current_dir, 'dir_1/table_1_npy'))),
+            ['col_0.npy', 'col_1.npy', 'manifest.json'])
+
     def test_get_pickle_path(self):
         """ Tests get_pickle_path()
         """
@@ -156,6 +207,15 @@ class TestPandasIO(np_test.TestCase):
         np_test.assert_equal(
             pio.get_pickle_path(base='/abs/x/y/z', json=True),
             ('/abs/x/y/z_json.pkl', '/abs/x/y/z_json.pkl'))
+
+        # npy
+        pio = PandasIO(calling_dir='call_dir')
+        np_test.assert_equal(
+            pio.get_npy_path(base='x/y/z.pkl'),
+            ('call_dir/x/y/z_npy', 'x/y/z_npy'))
+        np_test.assert_equal(
+            pio.get_npy_path(base='/abs/x/y/z_json.pkl'),
+            ('/abs/x/y/z_npy', '/abs/x/y/z_npy'))
         
     def tearDown(self, mode=None):
         """Remove tables
@@ -15,6 +15,8 @@ __version__ = "$Revision$"
 from copy import copy, deepcopy
 import pickle
 import os.path
+import shutil
+import tempfile
 import unittest
 
 import numpy
@@ -329,6 +331,63 @@ class TestPickled(np_test.TestCase):
             [scene_cmn.cleft_layers_density_mean+1,
                  scene_cmn.cleft_layers_density_mean])
 
+    def testPropertyCache(self):
+        """
+        Tests readPropertiesGen(objects=False) and readProperties() with
+        and without property cache.
+        """
+
+        properties = ['regions.ids', 'width', 'widthVector.thetaDeg', 
+                      'regionDensity.mean', 'regionDensity.volume', 
+                      'nonexisting']
+        indexed = ['regionDensity.mean', 'regionDensity.volume']
+        names = ['ids', 'width', 'thetaDeg', 'mean', 'volume', 'nonexisting']
+
+        # no cache
+        pickled = Pickled(files=self.files)
+        for desired, obj, categ, ident in pickled.readPropertiesGen(
+                properties=properties, index='regions.ids', indexed=indexed,
+                deep='last'):
+            pass
+
+        cache_dir = tempfile.mkdtemp()
+        try:
+            for n_jobs in [1, 2]:
+
+                # make and use cache
+                for repeat in range(2):
+                    pickled = Pickled(
+                        files=self.files, cache_dir=cache_dir, n_jobs=n_jobs)
+                    for actual, obj, categ, ident \
+                        in pickled.readPropertiesGen(
+                            properties=properties, index='regions.ids', 
+                            indexed=indexed, deep='last', objects=False):
+                        np_test.assert_equal(obj is None, True)
+                    np_test.assert_equal(
+                        actual.identifiers, desired.identifiers)
+                    for name in names:
+                        np_test.assert_equal(
+                            getattr(actual, name), getattr(desired, name))
+                    np_test.assert_equal(len(os.listdir(cache_dir)), 3)
+
+                # cache not used after a pickle is modified
+                path = self.files['first']['exp_2']
+                analysis_cmn.make_and_pickle(file_=path, data=2)
+                os.utime(path, ns=(0, 0))
+                multi = Pickled(
+                    files=self.files, cache_dir=cache_dir, 
+                    n_jobs=n_jobs).readProperties(
+                        properties=['regionDensity.mean', 'width'], 
+                        index='regions.ids', category='first',
+                        identifier='exp_2', deep='last', compactify=False)
+                np_test.assert_almost_equal(
+                    multi.mean[0][multi.ids[0]] - 2, 
+                    scene_cmn.cleft_layers_density_mean)
+                analysis_cmn.make_and_pickle(file_=path, data=1)
+
+        finally:
+            shutil.rmtree(cache_dir)
+
     def tearDown(self):
         """
         Remove temporary files
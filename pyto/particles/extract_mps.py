@@ -12,6 +12,8 @@ import pickle
 from copy import copy, deepcopy
 import re
 import itertools
+import collections
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 from numpy.random import default_rng
@@ -138,7 +140,7 @@ class ExtractMPS(ExtractMPSFilter):
             convert_path_common=None, convert_path_helper=None,
             
             write_particles=True, write_regions=False, morse_regions=False,
-            verbose=True, star_comment='Particles'
+            verbose=True, star_comment='Particles', n_jobs=None
             ):
         """Extracts particles from tomos.
 
@@ -151,6 +153,9 @@ class ExtractMPS(ExtractMPSFilter):
 
         Calculates particle centers (using normals) first in the thin 
         regions frame and then converts to the initial (full tomo size) frame
+
+        Particle images are written by n_jobs threads (arg n_jobs), see
+        write_particles().
  
 
         """
@@ -254,7 +259,7 @@ class ExtractMPS(ExtractMPSFilter):
             particle_path_col=mps.tomo_particle_col,
             convert_path_common=convert_path_common, 
             convert_path_helper=convert_path_helper,
-            update=True, write=write_particles)
+            update=True, write=write_particles, n_jobs=n_jobs)
 
         # extract segments
         if morse_regions:
@@ -848,12 +853,49 @@ class ExtractMPS(ExtractMPSFilter):
             mean=None, std=None, invert_contrast=False, fun=None, fun_kwargs={}, 
             image_path_mode='image', name_prefix='particle_', name_suffix='', 
             particle_path_col='particle', convert_path_common=None,
-            convert_path_helper=None, update=False, write=True):
+            convert_path_helper=None, update=False, write=True,
+            batch_size=100, slab_size=2**26, n_jobs=None,
+            stack_path=None, stack_index_col='stack_index'):
         """Writes particle or boundary subtomos.
 
         In 'pkl_segment' mode (arg image_path_mode), all other segments
         that may be present in a particle image are removed before
         applying functions specified by arg fun.
+
+        Particles of each tomo are sorted by their z coordinate and
+        processed in batches of at most (arg) batch_size particles, such
+        that the the box enclosing all particles of a batch (slab) has at 
+        most (arg) slab_size voxels. For each batch, only the slab is read
+        from the (memory mapped) tomo, particles are cut from the slab
+        and normalized together (args mean and std). Particles that 
+        do not fit inside the tomo are extracted separately (using
+        Image.useInset()), which requires arg expand to be True.
+
+        If arg n_jobs is > 1, particles are written in parallel by 
+        n_jobs threads. At most 2 * n_jobs particles wait to be written
+        at any time. Arg n_jobs is ignored when particles are written 
+        as a stack (arg stack_path), because the stack is written 
+        sequentially.
+
+        If arg stack_path is specified, instead of writing each particle 
+        in a separate file, all particles are written as one mrc stack,
+        where particles are stacked along z-axis. In this case, all
+        particles have to have the same shape. Particle path column 
+        (arg particle_path_col) is set to the stack path and the position
+        of particles in the stack (0-based) is saved in column
+        (arg) stack_index_col. The stack is written particle by particle, 
+        so it is not kept in memory (see start_stack()).
+
+        Arguments:
+          - batch_size: max number of particles in a batch
+          - slab_size: max number of voxels of a slab that is read for 
+          a batch
+          - n_jobs: number of threads used for writing particles, ignored
+          if stack_path is specified
+          - stack_path: path to the particle stack file, or None to write
+          each particle in a separate file
+          - stack_index_col: name of the column that contains positions 
+          of particles in the stack (used only if stack_path is specified)
         """
 
         # remove outside particles
@@ -869,98 +911,156 @@ class ExtractMPS(ExtractMPSFilter):
         #
         p_indices = []
         path_list = []
+        stack_shape = None
+        stack_io = None
+        if stack_path is not None:
+            stack_path = os.path.abspath(stack_path)
+        executor = None
+        if write and (stack_path is None) and (n_jobs is not None) and (
+                n_jobs > 1):
+            executor = ThreadPoolExecutor(max_workers=n_jobs)
+        futures = collections.deque()
 
-        # loop over tomos
-        part_by_tomos = parts_tab.groupby(mps.tomo_id_col)
-        for tomo_id, ind in part_by_tomos.groups.items():
-
-            # get tomo data
-            tomo_row = mps.tomos[mps.tomos[mps.tomo_id_col] == tomo_id]        
-            tomo_path = tomo_row[image_path_col].to_numpy()[0]
-
-            if image_path_mode == 'image':
-                image = pyto.core.Image.read(
-                    file=tomo_path, header=True, memmap=True)
-                pixelsize = image.pixelsize
-                header = image.header
-
-            elif ((image_path_mode == 'pkl_boundary')
-                  or (image_path_mode == 'pkl_segment')):
-                scene = pickle.load(open(tomo_path, 'rb'), encoding='latin1')
-                if image_path_mode == 'pkl_boundary':
-                    image = scene.boundary
-                else:
-                    image = scene.labels
-                pixelsize = tomo_row[mps.pixel_nm_col].to_numpy()[0]
-                header = None
-                #image.write(file=f"bound_{tomo_id}.mrc")
-
-            else:
-                raise ValueError(
-                    f"Argument image_path_mode {image_path_mode} was not "
-                    + "undrstood.")
-
-            # loop over particles
-            for p_ind, row in parts_tab.loc[ind].iterrows():
-
-                # make slice objects
-                l_corner = row[l_corner_cols].to_numpy()
-                r_corner = row[r_corner_cols].to_numpy()
-                slices = [
-                    slice(left, right) for left, right
-                    in zip(l_corner, r_corner)]
-
-                # get particle data
-                particle_data = image.useInset(
-                    inset=slices, mode=u'relative', expand=expand, update=False,
-                    returnCopy=True)
+        try:
 
-                # process particle
-                if std is not None:
-                    particle_data = std * particle_data / particle_data.std()
-                if mean is not None:
-                    particle_data = particle_data - particle_data.mean() + mean
-                if invert_contrast:
-                    particle_data = -particle_data
-                if keep_id_only:
-                    particle_id = row[mps.particle_id_col]
-                    particle_data[particle_data != particle_id] = 0
-                if fun is not None:
-                    if isinstance(fun, (tuple, list)):
-                        for fun_one, fun_kwargs_one in zip(fun, fun_kwargs):
-                            particle_data = fun_one(
-                                particle_data, **fun_kwargs_one)    
+            # loop over tomos
+            part_by_tomos = parts_tab.groupby(mps.tomo_id_col)
+            for tomo_id, ind in part_by_tomos.groups.items():
+
+                # get tomo data
+                tomo_row = mps.tomos[mps.tomos[mps.tomo_id_col] == tomo_id]
+                tomo_path = tomo_row[image_path_col].to_numpy()[0]
+
+                if image_path_mode == 'image':
+                    image = pyto.core.Image.read(
+                        file=tomo_path, header=True, memmap=True)
+                    pixelsize = image.pixelsize
+                    header = image.header
+
+                elif ((image_path_mode == 'pkl_boundary')
+                      or (image_path_mode == 'pkl_segment')):
+                    scene = pickle.load(
+                        open(tomo_path, 'rb'), encoding='latin1')
+                    if image_path_mode == 'pkl_boundary':
+                        image = scene.boundary
                     else:
-                        particle_data = fun(particle_data, **fun_kwargs)
-                        
-                # write particle
-                particle_id = row[mps.particle_id_col]
-                particle_path = os.path.abspath(os.path.join(
-                    dir_, tomo_id,
-                    f"{name_prefix}{particle_id}{name_suffix}.mrc"))
-                particle = pyto.core.Image(data=particle_data)    
-                try:
-                    if write:
-                        particle.write(
-                            file=particle_path, header=header, pixel=pixelsize)
-                    else:
-                        pass
-                        #print(f"As if writing {particle_path}")
-                except IOError:
-                    os.makedirs(os.path.dirname(particle_path))
-                    if write:
-                        particle.write(
-                            file=particle_path, header=header, pixel=pixelsize)
-                    else:
-                        print(f"As if writing {particle_path}")
+                        image = scene.labels
+                    pixelsize = tomo_row[mps.pixel_nm_col].to_numpy()[0]
+                    header = None
+                    #image.write(file=f"bound_{tomo_id}.mrc")
 
-                # add particle path to row
-                p_indices.append(p_ind)
-                path_list.append(particle_path)
+                else:
+                    raise ValueError(
+                        f"Argument image_path_mode {image_path_mode} was not "
+                        + "undrstood.")
+
+                # particle corners sorted by z
+                tomo_parts = parts_tab.loc[ind]
+                l_corners = tomo_parts[l_corner_cols].to_numpy().astype(int)
+                r_corners = tomo_parts[r_corner_cols].to_numpy().astype(int)
+                particle_ids = tomo_parts[mps.particle_id_col].to_numpy()
+                order = np.argsort(l_corners[:, -1], kind='stable')
+                if write and (stack_path is None):
+                    os.makedirs(
+                        os.path.abspath(os.path.join(dir_, tomo_id)),
+                        exist_ok=True)
+
+                # loop over particle batches
+                batches = cls.make_batches(
+                    l_corners=l_corners[order], r_corners=r_corners[order],
+                    batch_size=batch_size, slab_size=slab_size)
+                for batch in batches:
+                    batch = order[batch]
+                    batch_data = cls.cut_boxes(
+                        image=image, l_corners=l_corners[batch],
+                        r_corners=r_corners[batch], expand=expand)
+                    batch_data = cls.normalize_boxes(
+                        data=batch_data, mean=mean, std=std,
+                        invert_contrast=invert_contrast)
+
+                    # loop over particles
+                    for b_ind, particle_data in zip(batch, batch_data):
+
+                        # process particle
+                        particle_id = particle_ids[b_ind]
+                        if keep_id_only:
+                            particle_data[particle_data != particle_id] = 0
+                        if fun is not None:
+                            if isinstance(fun, (tuple, list)):
+                                for fun_one, fun_kwargs_one in zip(
+                                        fun, fun_kwargs):
+                                    particle_data = fun_one(
+                                        particle_data, **fun_kwargs_one)    
+                            else:
+                                particle_data = fun(particle_data, **fun_kwargs)
+
+                        # write particle
+                        if stack_path is None:
+                            particle_path = os.path.abspath(os.path.join(
+                                dir_, tomo_id,
+                                f"{name_prefix}{particle_id}{name_suffix}.mrc"))
+                            particle = pyto.core.Image(data=particle_data)
+                            if not write:
+                                pass
+                                #print(f"As if writing {particle_path}")
+                            elif executor is not None:
+                                futures.append(executor.submit(
+                                    particle.write, file=particle_path,
+                                    header=header, pixel=pixelsize))
+
+                                # limit the number of particles waiting to
+                                # be written (raises exceptions if any)
+                                if len(futures) > 2 * n_jobs:
+                                    futures.popleft().result()
+                            else:
+                                particle.write(
+                                    file=particle_path, header=header,
+                                    pixel=pixelsize)
+                        else:
+                            particle_path = stack_path
+                            if stack_shape is None:
+                                stack_shape = particle_data.shape
+                            elif particle_data.shape != stack_shape:
+                                raise ValueError(
+                                    "Particles could not be written as a "
+                                    + "stack because they have different "
+                                    + f"shapes ({stack_shape}, "
+                                    + f"{particle_data.shape}).")
+                            if write:
+                                if stack_io is None:
+                                    stack_io = cls.start_stack(
+                                        path=stack_path, 
+                                        n_particles=parts_tab.shape[0],
+                                        particle=particle_data, pixel=pixelsize)
+                                stack_io.writeSlab(data=particle_data)
+
+                        # add particle path to row
+                        p_indices.append(tomo_parts.index[b_ind])
+                        path_list.append(particle_path)
+
+            # wait for writes to finish (raises exceptions if any)
+            if executor is not None:
+                for fut in futures:
+                    fut.result()
+
+            # finish writing stack
+            if stack_io is not None:
+                stack_io.finishWrite()
+                stack_io = None
+
+        finally:
+
+            # release threads and close stack also when an exception occurs
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+            if stack_io is not None:
+                stack_io.file_.close()
 
         # add all particle paths to table
         particle_path = pd.DataFrame(
             {particle_path_col: path_list}, index=p_indices)
+        if stack_path is not None:
+            particle_path[stack_index_col] = np.arange(len(path_list))
         parts_tab = parts_tab.join(particle_path, how='left')
         set_path = SetPath(
             common=convert_path_common, helper_path=convert_path_helper)
@@ -977,6 +1077,177 @@ class ExtractMPS(ExtractMPSFilter):
         else:
             return parts_tab
 
+    @staticmethod
+    def start_stack(path, n_particles, particle, pixel):
+        """Starts writing particle stack for write_particles().
+
+        Particles are stacked along the z-axis. Float particles are
+        written as float32.
+
+        Arguments:
+          - path: stack file path
+          - n_particles: number of particles
+          - particle: (ndarray) one particle
+          - pixel: pixel size [nm]
+
+        Returns (pyto.io.ImageIO) object used to write the stack, particles
+        are written by its writeSlab() and the writing is completed by 
+        finishWrite().
+        """
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if np.issubdtype(particle.dtype, np.floating):
+            data_type = 'float32'
+        else:
+            data_type = particle.dtype.name
+        shape = particle.shape[:-1] + (n_particles * particle.shape[-1],)
+        stack_io = pyto.io.ImageIO()
+        stack_io.startWrite(
+            file=path, shape=shape, dataType=data_type, pixel=pixel)
+
+        return stack_io
+
+    @staticmethod
+    def make_batches(l_corners, r_corners, batch_size, slab_size):
+        """Splits particles in batches for write_particles().
+
+        Consecutive particles are put in the same batch as long as the 
+        number of particles in the batch is not larger than arg batch_size
+        and the box enclosing all particles of the batch has at most
+        arg slab_size voxels. Meant for particles sorted by z coordinate.
+
+        Arguments:
+          - l_corners, r_corners: (n_particles x n_dim ndarray) left and 
+          right particle box corners
+          - batch_size: max number of particles in a batch
+          - slab_size: max number of voxels of the enclosing box
+
+        Returns list of batches, where each batch is an ndarray of 
+        particle indices (of the particle corner arrays).
+        """
+
+        batches = []
+        start = 0
+        low = None
+        for ind, (l_corn, r_corn) in enumerate(zip(l_corners, r_corners)):
+            if low is not None:
+                new_low = np.minimum(low, l_corn)
+                new_high = np.maximum(high, r_corn)
+                if ((ind - start < batch_size)
+                    and (np.prod(new_high - new_low) <= slab_size)):
+                    low, high = new_low, new_high
+                    continue
+                batches.append(np.arange(start, ind))
+            start = ind
+            low, high = l_corn, r_corn
+        if len(l_corners) > start:
+            batches.append(np.arange(start, len(l_corners)))
+
+        return batches
+
+    @staticmethod
+    def cut_boxes(image, l_corners, r_corners, expand):
+        """Cuts particle boxes from an image.
+
+        Box corners are given relative to the current image inset (like 
+        in Image.useInset(mode='relative')). 
+
+        If all boxes are inside the image and have the same shape, only
+        the image slab that encloses all boxes is read and boxes are cut
+        from the slab using fancy indexing. Otherwise, boxes are cut 
+        one by one using Image.useInset().
+
+        Arguments:
+          - image: (core.Image) image, data can be memory mapped
+          - l_corners, r_corners: (n_particles x n_dim ndarray) left and 
+          right particle box corners
+          - expand: flag indicating whether boxes that are not 
+          inside the image are expanded (see Image.useInset())
+
+        Returns boxes as (n_particles x box_shape ndarray) if all boxes
+        are inside the image, or as a list of ndarrays otherwise.
+        """
+
+        shapes = r_corners - l_corners
+        inside = (
+            (l_corners >= 0).all() 
+            and (r_corners <= np.asarray(image.data.shape)).all())
+        if inside and (shapes == shapes[0]).all():
+
+            # read slab
+            low = l_corners.min(axis=0)
+            high = r_corners.max(axis=0)
+            slab = np.asarray(image.data[tuple(
+                slice(lo, hi) for lo, hi in zip(low, high))])
+
+            # cut boxes, fancy indexing of all box windows of the slab
+            windows = np.lib.stride_tricks.sliding_window_view(
+                slab, shapes[0])
+            boxes = windows[tuple((l_corners - low).transpose())]
+
+        else:
+            boxes = [
+                image.useInset(
+                    inset=[
+                        slice(left, right) for left, right 
+                        in zip(l_corn, r_corn)], 
+                    mode=u'relative', expand=expand, update=False,
+                    returnCopy=True)
+                for l_corn, r_corn in zip(l_corners, r_corners)]
+
+        return boxes
+
+    @staticmethod
+    def normalize_boxes(data, mean=None, std=None, invert_contrast=False):
+        """Normalizes particle boxes.
+
+        Each box is separately scaled to have the specified std and then
+        shifted to have the specified mean. Integer boxes are converted 
+        to floats if they are normalized (arg mean or std), but not if 
+        only the contrast is inverted. Boxes given as an ndarray are 
+        modified in place if they are not converted.
+
+        Arguments:
+          - data: (n_particles x box_shape ndarray, or a list of ndarrays)
+          boxes
+          - mean, std: mean and std of normalized boxes, None for no
+          normalization
+          - invert_contrast: flag indicating whether contrast is inverted
+
+        Returns normalized boxes, in the same form as arg data
+        """
+
+        if isinstance(data, np.ndarray):
+            if (mean is None) and (std is None):
+                if invert_contrast:
+                    data = np.negative(data, out=data)
+                return data
+
+            # combine all into data * scale + shift
+            axis = tuple(range(1, data.ndim))
+            if not np.issubdtype(data.dtype, np.inexact):
+                data = data.astype(float)
+            scale = np.ones((1,) * data.ndim, dtype=data.dtype)
+            shift = np.zeros((1,) * data.ndim, dtype=data.dtype)
+            if std is not None:
+                scale = std / data.std(axis=axis, keepdims=True)
+            if mean is not None:
+                shift = mean - scale * data.mean(axis=axis, keepdims=True)
+            if invert_contrast:
+                scale = -scale
+                shift = -shift
+            data = np.multiply(data, scale, out=data)
+            data = np.add(data, shift, out=data)
+
+        else:
+            data = [
+                ExtractMPS.normalize_boxes(
+                    data=part[np.newaxis], mean=mean, std=std,
+                    invert_contrast=invert_contrast)[0]
+                for part in data]
+
+        return data
+
     def make_star(
             self, mps, labels, star_path=None,
             comment="From MPS", verbose=False):
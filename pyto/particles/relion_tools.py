@@ -4,6 +4,7 @@ Tools for manipulation starfiles used by Relion and Xmipp
 
 Generic starfile functions:
   - get_array_data(): reads data from a star file
+  - read_table_columns(): reads columns of a star file table
   - array_data_generator(): yields data lines from a star file
   - array_data_head(): reads header
   - write_table(): writes a star table
@@ -74,6 +75,8 @@ import warnings
 #from copy import copy, deepcopy
 import re
 import collections
+import io
+import pickle
 
 import numpy as np
 import scipy as sp
@@ -337,7 +340,7 @@ def print_class_summary(
 
 def get_class(
         basename, iters, suffix='_data.star', tablename='data_images', 
-        cont=True, iter_format='_it%03d'):
+        cont=True, iter_format='_it%03d', cache=False):
     """
     Reads particle class membership from a particle star file for one or 
     more iterations, for each iteration separately. 
@@ -363,6 +366,8 @@ def get_class(
       - table_name: name of the table where particles are stored
       - cont: flag indication if continued executions are used
       - iter_format: format for iteration number in starfiles
+      - cache: flag indicating whether star file data is cached, see
+      get_array_data()
 
     Returns dictionary with iterations as keys and class membership
     as values, where the class mebership is a list of class ids in the 
@@ -371,11 +376,12 @@ def get_class(
 
     return get_data(
         basename=basename, iters=iters, label='rlnClassNumber', suffix=suffix,
-        tablename=tablename, type_=int, cont=cont, iter_format=iter_format)
+        tablename=tablename, type_=int, cont=cont, iter_format=iter_format,
+        cache=cache)
 
 def get_data(
         basename, iters, label, suffix='_data.star', tablename='data_', 
-        type_=int, cont=True, iter_format='_it%03d'):
+        type_=int, cont=True, iter_format='_it%03d', cache=False):
     """
     Reads particle data from one column in a particle star file for one or 
     more iterations, for each iteration separately. 
@@ -402,6 +408,8 @@ def get_data(
         such as int or float
       - cont: flag indication if continued executions are used
       - iter_format: format for iteration number in starfiles
+      - cache: flag indicating whether star file data is cached, see
+      get_array_data()
 
     Returns dictionary with iterations as keys and particle data arrays
     as values, where the class mebership is a list of class ids in the 
@@ -449,7 +457,7 @@ def get_data(
         #if os.path.exists(starfile):
         label_dict = get_array_data(
                 starfile=starfile, tablename=tablename, labels=[label], 
-                types=[type_])
+                types=[type_], cache=cache)
         class_dict[it] = label_dict[label]
         #else:
         #    break
@@ -532,7 +540,7 @@ def classify_array(data, mode, pattern, start=1):
 def get_n_particle_class_change(
         basename, iters, class_=None, mode='change', fraction=True, out='list', 
         suffix='_data.star', tablename='data_images', label='rlnClassNumber', 
-        cont=True, iter_format='_it%03d', warn=True):
+        cont=True, iter_format='_it%03d', warn=True, cache=False):
     """
     Calculates number of particles that changed class between all pairs of 
     consecutive iterations, where iterations are specified by arg iters.
@@ -594,6 +602,9 @@ def get_n_particle_class_change(
       - iter_format: format for iteration number in starfiles
       - warn: prints warning when starfile not found. Note that if iters is
       None and warn is True, there is always a warning after the last iteration
+      - cache: flag indicating whether star file data is cached, see
+      get_array_data(), useful when the same iterations are analyzed
+      repeatedly
 
     Return: dict (keys are iterations) or list (elements correspond to those
     in arg iters[1:]), where iterations are the final from each iteration pair
@@ -644,7 +655,7 @@ def get_n_particle_class_change(
         # find data in file
         classes_dict = get_array_data(
             starfile=starfile, tablename=tablename, labels=[label], 
-            types=[int])
+            types=[int], cache=cache)
  
         if first_iter:
 
@@ -733,7 +744,7 @@ def get_n_particle_class_change(
             "Can not understand argument out: " + out + "allowed values "
             + "are 'list' and 'dict'.") 
 
-def get_n_class_changes(basename, iters):
+def get_n_class_changes(basename, iters, cache=False):
     """
     Returns the number of times a particle has changed its class membership
     between the specified iterations.
@@ -741,13 +752,15 @@ def get_n_class_changes(basename, iters):
     Arguments:
       - basename: basename of the data file (everything until '_it')
       - iters: list of iterations
+      - cache: flag indicating whether star file data is cached, see
+      get_array_data()
 
     Returns: (ndarray) number of changes for each particle in the order 
     the particles are listed in the data file      
     """
 
     # get classes for all iterations
-    class_dict = get_class(basename=basename, iters=iters)
+    class_dict = get_class(basename=basename, iters=iters, cache=cache)
 
     # initialize
     previous_classes = np.asarray(class_dict[iters[0]])
@@ -1455,7 +1468,8 @@ def average_fixed(starfile, mean_file):
 # Lower level functions for processing star files
 #
 
-def get_array_data(starfile, tablename, labels=None, types=float):
+def get_array_data(
+        starfile, tablename, labels=None, types=float, cache=False):
     """
     Gets data (for all particles) for specified labels. 
 
@@ -1470,6 +1484,16 @@ def get_array_data(starfile, tablename, labels=None, types=float):
       - the order of data records is determined by indices written next to
       labels (relion) or by label order if no index is written next to labels
 
+    Only the columns corresponding to the specified labels are read and 
+    they are converted directly to arrays (see read_table_columns()).
+
+    If arg cache is True, the data of labels that have type int, float 
+    or str are saved in a cache file that is located in the same 
+    directory as the starfile (see star_cache_path()). Next time the data
+    is requested, it is read from the cache, as long as the starfile 
+    modification time and size did not change. This is useful when the 
+    same (large) star files are analyzed repeatedly.
+
     Arguments:
       - starfile: name of the starfile that contains data
       - tablename: name of the table that contains data
@@ -1478,6 +1502,7 @@ def get_array_data(starfile, tablename, labels=None, types=float):
       - types: list of functions (or a single function) that converts the data 
       into proper types (such as str, int, float), in the order of arg labels
       (default is float)
+      - cache: flag indicating whether the cache file is used
 
     Returns dictionary where keys are labels and values are data arrays 
     """
@@ -1486,33 +1511,310 @@ def get_array_data(starfile, tablename, labels=None, types=float):
     if labels is None:
         labels = array_data_head(
             starfile=starfile, tablename=tablename, top=False, labels=True)
+    if not isinstance(types, (list, tuple)):
+        types = [types] * len(labels)
 
-    # initialization
-    label_indices = {}
-    data_str = {}
-    for one_label in labels:
-        data_str[one_label] = []
+    # get data from cache
+    cache_keys = [
+        (tablename, one_label, one_type.__name__)
+        if one_type in (int, float, str) else None
+        for one_label, one_type in zip(labels, types)]
+    if cache:
+        cached = load_star_cache(starfile=starfile)
+    else:
+        cached = {}
+
+    # read data that are not cached
+    missing = [
+        (one_label, one_type)
+        for one_label, one_type, key in zip(labels, types, cache_keys)
+        if (key is None) or (key not in cached)]
+    if len(missing) > 0:
+        read = read_table_columns(
+            starfile=starfile, tablename=tablename,
+            labels=[lab for lab, _ in missing],
+            types=[typ for _, typ in missing])
+    else:
+        read = {}
 
-    # read file
-    line_gen = array_data_generator(starfile=starfile, tablename=tablename)
-    for line, label_indices in line_gen:
+    # combine
+    data = {}
+    new_cached = False
+    for one_label, key in zip(labels, cache_keys):
+        if (key is not None) and (key in cached):
+            data[one_label] = cached[key]
+        else:
+            data[one_label] = read[one_label]
+            if key is not None:
+                cached[key] = read[one_label]
+                new_cached = True
+
+    # save cache
+    if cache and new_cached:
+        save_star_cache(starfile=starfile, columns=cached)
+
+    return data
+
+def read_table_columns(starfile, tablename, labels, types=float):
+    """
+    Reads data columns of the specified labels from a star file table.
+
+    The same as get_array_data() (without cache), except that labels have 
+    to be specified.
+
+    Only the table header is parsed line by line. The table data is 
+    tokenized at once (see _split_columns()) and only the columns that 
+    correspond to arg labels are extracted. Columns of type int and 
+    float are converted directly to ndarrays (giving the same values as 
+    int() and float()), and the other ones are returned as lists.
+
+    Arguments:
+      - starfile: name of the starfile that contains data
+      - tablename: name of the table that contains data
+      - labels: list of lables (variables) without leading '_'
+      - types: list of functions (or a single function) that converts the data 
+      into proper types (such as str, int, float), in the order of arg labels
+      (default is float)
+
+    Returns dictionary where keys are labels and values are data arrays 
+    (lists for types other than int and float)
+    """
 
-        # read data
-        for one_label in labels:
-            index = label_indices[one_label]
-            data_str[one_label].append(line[index])
- 
-    # convert
     if not isinstance(types, (list, tuple)):
         types = [types] * len(labels)
+    label_indices, data_bytes = _find_table_data(
+        starfile=starfile, tablename=tablename)
+    data_bytes = data_bytes.rstrip()
+    if len(data_bytes) == 0:
+        columns = None
+    else:
+        indices = [label_indices[one_label] for one_label in labels]
+        columns = _split_columns(data_bytes=data_bytes, indices=indices)
+    data_lines = None
+
     data = {}
     for one_label, one_type in zip(labels, types):
-        data[one_label] = [one_type(x) for x in data_str[one_label]]
+
+        # no data
+        if len(data_bytes) == 0:
+            if (one_type == float) or (one_type == int):
+                data[one_label] = np.array([])
+            else:
+                data[one_label] = []
+            continue
+
+        # typed arrays straight from tokenized columns
+        index = label_indices[one_label]
+        if columns is not None:
+            if (one_type == float) or (one_type == int):
+                try:
+                    data[one_label] = columns[index].astype(
+                        np.float64 if one_type == float else np.int64)
+                    continue
+                except (ValueError, OverflowError):
+                    pass
+            column = columns[index].astype(str).tolist()
+        else:
+            if data_lines is None:
+                data_lines = [
+                    line.split() for line in data_bytes.decode().split('\n')]
+            column = [line[index] for line in data_lines]
+
+        # convert element by element
         if (one_type == float) or (one_type == int):
-            data[one_label] = np.array(data[one_label])
+            data[one_label] = np.array([one_type(x) for x in column])
+        elif one_type == str:
+            data[one_label] = column
+        else:
+            data[one_label] = [one_type(x) for x in column]
 
     return data
 
+def _split_columns(data_bytes, indices):
+    """
+    Tokenizes data lines and extracts the specified columns.
+
+    Data lines are split at whitespaces, like str.split() does. The 
+    tokenization is done on the whole data at once, on the byte level.
+    It is used only when arg data_bytes contains only ascii characters
+    and when all lines have the same number of fields. 
+
+    Arguments:
+      - data_bytes: (bytes) data lines, without trailing whitespace
+      - indices: column indices
+
+    Returns (dict) where keys are column indices and values are
+    the corresponding columns as bytes ndarrays, or None if the data
+    can not be tokenized in this way.
+    """
+
+    if not data_bytes.isascii():
+        return None
+    buffer = np.frombuffer(data_bytes, dtype=np.uint8)
+
+    # find beginnings and ends of tokens (whitespace as in str.split())
+    field = (
+        (buffer > 32) | ((buffer < 28) & ((buffer < 9) | (buffer > 13))))
+    starts = np.flatnonzero(field[1:] & ~field[:-1]) + 1
+    ends = np.flatnonzero(field[:-1] & ~field[1:]) + 1
+    if field[0]:
+        starts = np.concatenate(([0], starts))
+    if field[-1]:
+        ends = np.concatenate((ends, [buffer.shape[0]]))
+
+    # check all lines have the same number of fields
+    newlines = np.flatnonzero(buffer == ord('\n'))
+    n_fields_line = np.diff(
+        np.searchsorted(starts, newlines), prepend=0,
+        append=starts.shape[0])
+    n_fields = n_fields_line[0]
+    if (n_fields_line != n_fields).any() or (max(indices) >= n_fields):
+        return None
+
+    # extract columns as fixed length bytes
+    columns = {}
+    for index in set(indices):
+        col_starts = starts[index::n_fields]
+        col_ends = ends[index::n_fields]
+        width = (col_ends - col_starts).max()
+        positions = col_starts[:, np.newaxis] + np.arange(width)
+        chars = np.where(
+            positions < col_ends[:, np.newaxis],
+            buffer[np.minimum(positions, buffer.shape[0] - 1)], 0)
+        columns[index] = chars.astype(np.uint8).view(f'S{width}').reshape(-1)
+
+    return columns
+
+def _find_table_data(starfile, tablename):
+    """
+    Finds labels and data lines of a table.
+
+    File parsing is the same as in array_data_generator(). The file is
+    read as bytes, but newlines are translated like when reading text 
+    files.
+
+    Arguments:
+      - starfile: name of the starfile that contains data
+      - tablename: name of the table that contains data
+
+    Returns (label_indices, data_bytes):
+      - label_indices: dictionary where each item has a label (without 
+      leading '_') as a key and the position (index) of that label in 
+      data lines
+      - data_bytes: (bytes) all data lines
+    """
+
+    with open(starfile, 'rb') as fd:
+        content = fd.read()
+    if b'\r' in content:
+        content = content.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+
+    # parse header line by line
+    tablename = tablename.encode()
+    block_found = False
+    label_indices = {}
+    index = -1
+    pos = 0
+    n_chars = len(content)
+    while pos < n_chars:
+        end = content.find(b'\n', pos)
+        end = n_chars if end < 0 else end + 1
+        line = content[pos:end]
+        if not block_found:
+            if (not line.startswith(b'#')) and line.startswith(tablename):
+                block_found = True
+        elif (line.startswith(b'loop') or line.isspace()
+              or line.startswith(b'#')):
+            pass
+        elif line.strip().startswith(b'_'):
+            line_split = line.decode().split()
+            label = line_split[0][1:]
+            if len(line_split) >= 2:
+                index = int(line_split[1][1:]) - 1
+            else:
+                index = index + 1
+            label_indices[label] = index
+        else:
+            break
+        pos = end
+
+    # data ends at an empty or a label line, or at a whitespace line at the
+    # file end
+    data_end = _table_data_end.search(content, pos)
+    if data_end is not None:
+        data_bytes = content[pos:data_end.start()+1]
+    else:
+        data_bytes = content[pos:]
+    if ((b'\n#' in data_bytes) or (b'\nloop' in data_bytes)
+        or data_bytes.startswith(b'#') or data_bytes.startswith(b'loop')):
+        data_bytes = b''.join(
+            line for line in io.BytesIO(data_bytes)
+            if not (line.startswith(b'loop') or line.startswith(b'#')))
+        
+    return label_indices, data_bytes
+
+_table_data_end = re.compile(rb'\n[^\S\n]*(?:_|\n)')
+
+def star_cache_path(starfile):
+    """
+    Returns the path of the cache file for the specified star file.
+
+    The cache file is a hidden file in the star file directory.
+    """
+    dir_, base = os.path.split(starfile)
+    return os.path.join(dir_, '.' + base + '.pyto_cache.pkl')
+
+def load_star_cache(starfile):
+    """
+    Loads cached star file data (see get_array_data()).
+
+    The cached data is used only if the star file size and modification 
+    time are the same as when the cache was saved.
+
+    Argument:
+      - starfile: star file path
+
+    Returns (dict) cached data where keys are (tablename, label, type name)
+    and values data arrays, or an empty dict if the cache does not
+    exist or is out of date
+    """
+
+    stat = os.stat(starfile)
+    try:
+        with open(star_cache_path(starfile), 'rb') as fd:
+            cache = pickle.load(fd)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return {}
+    if ((cache.get('mtime_ns') != stat.st_mtime_ns)
+        or (cache.get('size') != stat.st_size)):
+        return {}
+    return cache['columns']
+
+def save_star_cache(starfile, columns):
+    """
+    Saves star file data in the cache file (see get_array_data()).
+
+    Does nothing if the cache file can not be written.
+
+    Arguments:
+      - starfile: star file path
+      - columns: (dict) data where keys are (tablename, label, type name)
+      and values data arrays 
+    """
+
+    stat = os.stat(starfile)
+    cache = {
+        'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size,
+        'columns': columns}
+    cache_path = star_cache_path(starfile)
+    tmp_path = cache_path + '.' + str(os.getpid())
+    try:
+        with open(tmp_path, 'wb') as fd:
+            pickle.dump(cache, fd, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        warnings.warn(f"Could not write star file cache {cache_path}.")
+
 def array_data_length(starfile, tablename):
     """
     Returns the number of entries in the specified table.
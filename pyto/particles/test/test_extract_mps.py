@@ -0,0 +1,326 @@
+"""
+
+Tests module extract_mps
+
+# Author: Vladan Lucic
+# $Id$
+"""
+
+__version__ = "$Revision$"
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import numpy.testing as np_test
+import pandas as pd
+
+import pyto
+from pyto.particles.extract_mps import ExtractMPS
+from pyto.spatial.multi_particle_sets import MultiParticleSets
+
+
+class TestExtractMPS(np_test.TestCase):
+    """
+    Tests ExtractMPS
+    """
+
+    def setUp(self):
+        """
+        Makes tomos and particles.
+        """
+
+        self.dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+
+        # tomos
+        self.tomo_data = {
+            'alpha': (100 * rng.random((20, 18, 30))).astype('float32'),
+            'beta': (100 * rng.random((16, 22, 25))).astype('float32')}
+        tomo_paths = []
+        for tomo_id, data in self.tomo_data.items():
+            path = os.path.join(self.dir, tomo_id + '.mrc')
+            pyto.core.Image(data).write(file=path, pixel=1.2)
+            tomo_paths.append(path)
+
+        # particles, some at the tomo borders and some sticking out
+        self.box = 6
+        centers = {
+            'alpha': [[10, 9, 3], [4, 4, 20], [15, 12, 8], [10, 9, 14],
+                      [2, 9, 25], [17, 15, 28], [8, 5, 3]],
+            'beta': [[8, 11, 12], [3, 3, 3], [12, 18, 20], [8, 8, 22]]}
+        rows = []
+        particle_id = 1
+        for tomo_id, cents in centers.items():
+            for cent in cents:
+                left = np.asarray(cent) - self.box // 2
+                rows.append(
+                    [tomo_id, particle_id] + list(left)
+                    + list(left + self.box))
+                particle_id += 1
+        self.l_corner_cols = ['l_x', 'l_y', 'l_z']
+        self.r_corner_cols = ['r_x', 'r_y', 'r_z']
+        mps = MultiParticleSets()
+        mps.tomos = pd.DataFrame(
+            {mps.tomo_id_col: list(centers.keys()), 'tomo_path': tomo_paths})
+        mps.particles = pd.DataFrame(
+            rows, columns=(
+                [mps.tomo_id_col, mps.particle_id_col]
+                + self.l_corner_cols + self.r_corner_cols))
+        self.mps = mps
+
+    def tearDown(self):
+        """
+        Removes written files
+        """
+        shutil.rmtree(self.dir)
+
+    def extract_one(
+            self, tomo_id, l_corner, r_corner, mean=None, std=None,
+            invert_contrast=False):
+        """
+        Extracts one particle using Image.useInset().
+        """
+        image = pyto.core.Image(self.tomo_data[tomo_id])
+        data = image.useInset(
+            inset=[slice(le, ri) for le, ri in zip(l_corner, r_corner)],
+            mode='relative', expand=True, update=False, returnCopy=True)
+        return self.normalize_one(
+            data=data, mean=mean, std=std, invert_contrast=invert_contrast)
+
+    @staticmethod
+    def normalize_one(data, mean=None, std=None, invert_contrast=False):
+        """
+        Normalizes one particle in the same way as it was done before 
+        particles were processed in batches.
+        """
+        if std is not None:
+            data = std * data / data.std()
+        if mean is not None:
+            data = data - data.mean() + mean
+        if invert_contrast:
+            data = -data
+        return data
+
+    def test_make_batches(self):
+        """
+        Tests make_batches()
+        """
+
+        l_corners = np.array(
+            [[0, 0, 0], [2, 0, 1], [0, 4, 3], [0, 0, 10], [1, 1, 11]])
+        r_corners = l_corners + 2
+
+        # limited by batch size
+        batches = ExtractMPS.make_batches(
+            l_corners=l_corners, r_corners=r_corners, batch_size=2,
+            slab_size=1000)
+        np_test.assert_equal(
+            [list(bat) for bat in batches], [[0, 1], [2, 3], [4]])
+
+        # limited by slab size
+        batches = ExtractMPS.make_batches(
+            l_corners=l_corners, r_corners=r_corners, batch_size=10,
+            slab_size=3*3*3)
+        np_test.assert_equal(
+            [list(bat) for bat in batches], [[0, 1], [2], [3, 4]])
+
+        # particles larger than slab size
+        batches = ExtractMPS.make_batches(
+            l_corners=l_corners, r_corners=r_corners, batch_size=10,
+            slab_size=1)
+        np_test.assert_equal(
+            [list(bat) for bat in batches], [[0], [1], [2], [3], [4]])
+
+        # no particles
+        batches = ExtractMPS.make_batches(
+            l_corners=np.zeros((0, 3), dtype=int),
+            r_corners=np.zeros((0, 3), dtype=int), batch_size=2,
+            slab_size=1000)
+        np_test.assert_equal(batches, [])
+
+    def test_cut_boxes(self):
+        """
+        Tests cut_boxes()
+        """
+
+        image = pyto.core.Image(self.tomo_data['alpha'])
+        tab = self.mps.particles
+        tab = tab[tab[self.mps.tomo_id_col] == 'alpha']
+        l_corners = tab[self.l_corner_cols].to_numpy()
+        r_corners = tab[self.r_corner_cols].to_numpy()
+
+        # all inside, touching the tomo border
+        inside = [0, 2, 3, 6]
+        boxes = ExtractMPS.cut_boxes(
+            image=image, l_corners=l_corners[inside],
+            r_corners=r_corners[inside], expand=True)
+        np_test.assert_equal(isinstance(boxes, np.ndarray), True)
+        np_test.assert_equal(boxes.shape, (4, 6, 6, 6))
+        for box, ind in zip(boxes, inside):
+            np_test.assert_equal(
+                box, self.extract_one(
+                    tomo_id='alpha', l_corner=l_corners[ind],
+                    r_corner=r_corners[ind]))
+        np_test.assert_equal(
+            boxes[3], self.tomo_data['alpha'][5:11, 2:8, 0:6])
+
+        # some outside
+        boxes = ExtractMPS.cut_boxes(
+            image=image, l_corners=l_corners, r_corners=r_corners,
+            expand=True)
+        np_test.assert_equal(isinstance(boxes, list), True)
+        for box, l_corn, r_corn in zip(boxes, l_corners, r_corners):
+            np_test.assert_equal(box.shape, (6, 6, 6))
+            np_test.assert_equal(
+                box, self.extract_one(
+                    tomo_id='alpha', l_corner=l_corn, r_corner=r_corn))
+        np_test.assert_equal(boxes[4][:1], 0)
+
+    def test_normalize_boxes(self):
+        """
+        Tests normalize_boxes()
+        """
+
+        tab = self.mps.particles
+        tab = tab[tab[self.mps.tomo_id_col] == 'alpha']
+        l_corners = tab[self.l_corner_cols].to_numpy()
+        r_corners = tab[self.r_corner_cols].to_numpy()
+        boxes = [
+            self.extract_one(tomo_id='alpha', l_corner=l_corn, r_corner=r_corn)
+            for l_corn, r_corn in zip(l_corners, r_corners)]
+
+        for mean, std, invert in [
+                (None, None, False), (None, None, True), (0, None, False),
+                (None, 2., False), (1., 3., True)]:
+            desired = [
+                self.extract_one(
+                    tomo_id='alpha', l_corner=l_corn, r_corner=r_corn,
+                    mean=mean, std=std, invert_contrast=invert)
+                for l_corn, r_corn in zip(l_corners, r_corners)]
+
+            # ndarray of float boxes
+            actual = ExtractMPS.normalize_boxes(
+                data=np.array(boxes), mean=mean, std=std,
+                invert_contrast=invert)
+            np_test.assert_almost_equal(
+                actual, np.array(desired), decimal=5)
+
+            # ndarray of int boxes
+            actual = ExtractMPS.normalize_boxes(
+                data=np.array(boxes).astype(int), mean=mean, std=std,
+                invert_contrast=invert)
+            int_desired = [
+                self.normalize_one(
+                    data=box.astype(int), mean=mean, std=std,
+                    invert_contrast=invert)
+                for box in boxes]
+            np_test.assert_almost_equal(
+                actual, np.array(int_desired), decimal=5)
+            np_test.assert_equal(actual.dtype, np.array(int_desired).dtype)
+            if (mean is None) and (std is None):
+                np_test.assert_equal(actual.dtype, np.dtype(int))
+
+            # list
+            actual = ExtractMPS.normalize_boxes(
+                data=list(np.array(boxes)), mean=mean, std=std,
+                invert_contrast=invert)
+            np_test.assert_equal(isinstance(actual, list), True)
+            for act, des in zip(actual, desired):
+                np_test.assert_almost_equal(act, des, decimal=5)
+
+    def test_write_particles(self):
+        """
+        Tests write_particles()
+        """
+
+        mps = self.mps
+        for n_jobs, batch_size, slab_size in [
+                (None, 100, 2**26), (None, 2, 1000), (3, 3, 2**26)]:
+            dir_ = os.path.join(self.dir, f'particles_{n_jobs}_{batch_size}')
+            parts = ExtractMPS.write_particles(
+                mps=mps, l_corner_cols=self.l_corner_cols,
+                r_corner_cols=self.r_corner_cols, image_path_col='tomo_path',
+                dir_=dir_, expand=True, mean=1., std=2.,
+                invert_contrast=True, batch_size=batch_size,
+                slab_size=slab_size, n_jobs=n_jobs)
+
+            np_test.assert_equal(
+                parts[mps.particle_id_col].to_numpy(),
+                mps.particles[mps.particle_id_col].to_numpy())
+            for _, row in parts.iterrows():
+                tomo_id = row[mps.tomo_id_col]
+                path = os.path.join(
+                    dir_, tomo_id, f"particle_{row[mps.particle_id_col]}.mrc")
+                np_test.assert_equal(row['particle'], os.path.abspath(path))
+                particle = pyto.core.Image.read(file=path, header=True)
+                desired = self.extract_one(
+                    tomo_id=tomo_id, l_corner=row[self.l_corner_cols],
+                    r_corner=row[self.r_corner_cols], mean=1., std=2.,
+                    invert_contrast=True)
+                np_test.assert_almost_equal(particle.data, desired, decimal=5)
+                np_test.assert_almost_equal(particle.pixelsize, 1.2)
+
+        # int tomos, only contrast inverted
+        int_mps = MultiParticleSets()
+        int_mps.tomos = mps.tomos.copy()
+        int_mps.particles = mps.particles
+        int_paths = []
+        for tomo_id, data in self.tomo_data.items():
+            path = os.path.join(self.dir, tomo_id + '_int.mrc')
+            pyto.core.Image(data.astype('int16')).write(file=path, pixel=1.2)
+            int_paths.append(path)
+        int_mps.tomos['tomo_path'] = int_paths
+        dir_ = os.path.join(self.dir, 'particles_int')
+        parts = ExtractMPS.write_particles(
+            mps=int_mps, l_corner_cols=self.l_corner_cols,
+            r_corner_cols=self.r_corner_cols, image_path_col='tomo_path',
+            dir_=dir_, expand=True, invert_contrast=True, n_jobs=2)
+        for _, row in parts.iterrows():
+            particle = pyto.core.Image.read(file=row['particle'], header=True)
+            np_test.assert_equal(particle.data.dtype, np.dtype('int16'))
+            image = pyto.core.Image(
+                self.tomo_data[row[mps.tomo_id_col]].astype('int16'))
+            desired = image.useInset(
+                inset=[
+                    slice(le, ri) for le, ri 
+                    in zip(row[self.l_corner_cols], row[self.r_corner_cols])],
+                mode='relative', expand=True, update=False, returnCopy=True)
+            np_test.assert_equal(particle.data, -desired)
+
+        # stack
+        stack_path = os.path.join(self.dir, 'stack', 'particles.mrc')
+        parts = ExtractMPS.write_particles(
+            mps=mps, l_corner_cols=self.l_corner_cols,
+            r_corner_cols=self.r_corner_cols, image_path_col='tomo_path',
+            dir_=self.dir, expand=True, mean=1., std=2., batch_size=2,
+            slab_size=1000, stack_path=stack_path)
+        stack = pyto.core.Image.read(file=stack_path, header=True)
+        np_test.assert_equal(
+            stack.data.shape, (6, 6, 6 * mps.particles.shape[0]))
+        np_test.assert_equal(
+            (parts['particle'] == os.path.abspath(stack_path)).all(), True)
+        np_test.assert_equal(
+            sorted(parts['stack_index']), np.arange(mps.particles.shape[0]))
+        for _, row in parts.iterrows():
+            index = row['stack_index']
+            desired = self.extract_one(
+                tomo_id=row[mps.tomo_id_col],
+                l_corner=row[self.l_corner_cols],
+                r_corner=row[self.r_corner_cols], mean=1., std=2.)
+            np_test.assert_almost_equal(
+                stack.data[..., 6*index:6*(index+1)], desired, decimal=5)
+
+        # stack of particles of different shapes
+        mps.particles.loc[3, 'r_z'] += 1
+        with np_test.assert_raises(ValueError):
+            ExtractMPS.write_particles(
+                mps=mps, l_corner_cols=self.l_corner_cols,
+                r_corner_cols=self.r_corner_cols, image_path_col='tomo_path',
+                dir_=self.dir, expand=True, stack_path=stack_path)
+
+if __name__ == '__main__':
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestExtractMPS)
+    unittest.TextTestRunner(verbosity=2).run(suite)
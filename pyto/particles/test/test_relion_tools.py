@@ -16,6 +16,8 @@ __version__ = "$Revision$"
 
 import os
 import unittest
+import tempfile
+import shutil
 
 import numpy as np
 import numpy.testing as np_test 
@@ -168,6 +170,102 @@ class TestRelionTools(np_test.TestCase):
             llcontrib[[1, 3, 10, 27]],
             [1.871939e+07, 1.871939e+07, 1.867890e+07, 1.869831e+07])
  
+    def test_get_array_data_cache(self):
+        """
+        Tests get_array_data() with cache.
+        """
+
+        # copy star file to a temp dir
+        labels = ['rlnMicrographName', 'rlnCoordinateY', 'rlnClassNumber']
+        types = [str, float, int]
+        orig_file = os.path.join(self.test_dir, '_it002_data.star')
+        tmp_dir = tempfile.mkdtemp()
+        starfile = os.path.join(tmp_dir, '_it002_data.star')
+        shutil.copy(orig_file, starfile)
+        desired = relion_tools.get_array_data(
+            starfile=orig_file, tablename='data', labels=labels, types=types)
+
+        # make cache
+        res = relion_tools.get_array_data(
+            starfile=starfile, tablename='data', labels=labels[:2],
+            types=types[:2], cache=True)
+        cache_path = relion_tools.star_cache_path(starfile)
+        np_test.assert_equal(os.path.exists(cache_path), True)
+        np_test.assert_equal(
+            set(relion_tools.load_star_cache(starfile).keys()),
+            set([('data', 'rlnMicrographName', 'str'),
+                 ('data', 'rlnCoordinateY', 'float')]))
+
+        # read from and add to cache
+        res = relion_tools.get_array_data(
+            starfile=starfile, tablename='data', labels=labels, types=types,
+            cache=True)
+        np_test.assert_equal(list(res.keys()), labels)
+        for lab in labels:
+            np_test.assert_equal(res[lab], desired[lab])
+        np_test.assert_equal(
+            len(relion_tools.load_star_cache(starfile)), 3)
+
+        # modified star file
+        with open(starfile, 'a') as fd:
+            fd.write('\n')
+        np_test.assert_equal(relion_tools.load_star_cache(starfile), {})
+        res = relion_tools.get_array_data(
+            starfile=starfile, tablename='data', labels=labels[2:],
+            types=types[2:], cache=True)
+        np_test.assert_equal(res[labels[2]], desired[labels[2]])
+        np_test.assert_equal(
+            len(relion_tools.load_star_cache(starfile)), 1)
+
+        shutil.rmtree(tmp_dir)
+
+    def test_read_table_columns(self):
+        """
+        Tests read_table_columns()
+        """
+
+        # the same as reading line by line
+        starfile = os.path.join(self.test_dir, '_it005_data.star')
+        labels = relion_tools.array_data_head(
+            starfile=starfile, tablename='data_', labels=True)
+        types = [str if lab.endswith('Name') or lab.endswith('Image')
+                 else float for lab in labels]
+        res = relion_tools.read_table_columns(
+            starfile=starfile, tablename='data_', labels=labels, types=types)
+        desired = dict((lab, []) for lab in labels)
+        for line, indices in relion_tools.array_data_generator(
+                starfile=starfile, tablename='data_'):
+            for lab, typ in zip(labels, types):
+                desired[lab].append(typ(line[indices[lab]]))
+        for lab in labels:
+            np_test.assert_equal(res[lab], desired[lab])
+
+        # irregular table, comments and loop lines
+        tmp_dir = tempfile.mkdtemp()
+        starfile = os.path.join(tmp_dir, 'irregular.star')
+        with open(starfile, 'w') as fd:
+            fd.write(
+                "data_optics\nloop_\n_rlnOpticsGroup #1\n1\n\n"
+                + "data_particles\n\nloop_\n_rlnB #2\n _rlnA #1\n_rlnC #3\n"
+                + "1.5 2 abc\n# comment\n-3e-5 7 x extra\nloop\n"
+                + "  0.30000000000000004 -4 y \n  \n_rlnD\n")
+        res = relion_tools.read_table_columns(
+            starfile=starfile, tablename='data_particles', 
+            labels=['rlnA', 'rlnB', 'rlnC'], types=[float, int, str])
+        np_test.assert_equal(res['rlnA'], [1.5, -3e-5, 0.30000000000000004])
+        np_test.assert_equal(res['rlnB'], [2, 7, -4])
+        np_test.assert_equal(res['rlnB'].dtype, np.dtype(int))
+        np_test.assert_equal(res['rlnC'], ['abc', 'x', 'y'])
+        res = relion_tools.read_table_columns(
+            starfile=starfile, tablename='data_optics', 
+            labels=['rlnOpticsGroup'], types=int)
+        np_test.assert_equal(res['rlnOpticsGroup'], [1])
+        res = relion_tools.read_table_columns(
+            starfile=starfile, tablename='data_none', 
+            labels=['rlnOpticsGroup'], types=int)
+        np_test.assert_equal(len(res['rlnOpticsGroup']), 0)
+        shutil.rmtree(tmp_dir)
+        
     def test_write_table(self):
         """
         Tests write_table()
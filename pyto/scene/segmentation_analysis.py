@@ -160,7 +160,7 @@ class SegmentationAnalysis(object):
     def tcSegmentAnalyze(self, thresh, order='>', image=None, boundary=None, 
                   count=False, doDensity=False, doMorphology=False, 
                   doLength=False, doTopology=False,  doDistanceTo=False, 
-                  doBoundDistance=False, doCleftContacts=False):
+                  doBoundDistance=False, doCleftContacts=False, sweep=False):
         """
         Segment using thresholding and connectivity and analyze segments.
 
@@ -219,6 +219,8 @@ class SegmentationAnalysis(object):
           - image: (Image) image
           - boundary: (Segment) boundaries
           - do*: flags indicating if particular analysis should be done
+          - sweep: flag indicating if segmentations at all thresholds are 
+          made in one sweep (see ThreshConn.makeLevelsGen())
 
         Yields at each level: new_inst, level, threshold
           - new_instance: new instance of this class containing:
@@ -265,7 +267,7 @@ class SegmentationAnalysis(object):
         # loop over thresholds
         for segments, level, curr_thresh \
                 in tc.makeLevelsGen(image=image, thresh=thresh, order=order,
-                                    count=count):
+                                    count=count, sweep=sweep):
 
             # analyze current segments 
             self.analyzeSegments(
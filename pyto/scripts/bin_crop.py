@@ -245,28 +245,26 @@ def main():
     print(f"Reading bin 2 tomo {tomo_path}", file=log_fd)
     tomo_bin2 = pyto.grey.Image.read(file=tomo_path, memmap=memmap)
 
-    # make and write bin 4x and 8x tomos
-    pixel_local = in_pixel
-    prev_tomo = tomo_bin2
+    # make and write bin 4x and 8x tomos in one pass over bin 2 tomo
+    bin_factors = [4, 8]
+    out_paths = [
+        os.path.join(
+            out_dir, tomo_name_format.format(base_root, bin_fact, extension))
+        for bin_fact in bin_factors]
+    if not (read_existing
+            and all(os.path.exists(out_path) for out_path in out_paths)):
+        print(f"Making bin {bin_factors} tomos", file=log_fd)
+        shapes = pyto.grey.Image.binPyramid(
+            image=tomo_bin2, paths=out_paths, factor=2, remain='correct')
+        if (np.array(tomo_bin2.data.shape) > 2 * np.array(shapes[0])).any():
+            print("\tTomo was cut to allow exact binning", file=log_fd)
+        for out_path in out_paths:
+            print(f"\tWrote tomo {out_path}", file=log_fd)
     tomos = []
-    for bin_fact in [4, 8]:
-
-        out_tomo_name = tomo_name_format.format(base_root, bin_fact, extension)
-        out_path = os.path.join(out_dir, out_tomo_name)
-        if read_existing and os.path.exists(out_path):
-            print(f"Reading bin {bin_fact} tomo {out_path}", file=log_fd)
-            curr_tomo = pyto.grey.Image.read(file=out_path, memmap=memmap)
-        else:    
-            print("Making bin {} tomo".format(bin_fact), file=log_fd)
-            curr_tomo = prev_tomo.bin(remain='correct', update=False)
-            if (np.array(prev_tomo.data.shape) 
-                > 2 * np.array(curr_tomo.data.shape)).any():
-                print("\tTomo was cut to allow exact binning", file=log_fd)
-            pixel_local = 2 * pixel_local
-            print(f"\tWriting tomo to {out_path}", file=log_fd)
-            tomo_io.write(file=out_path, data=curr_tomo.data, pixel=pixel_local)
+    for bin_fact, out_path in zip(bin_factors, out_paths):
+        print(f"Reading bin {bin_fact} tomo {out_path}", file=log_fd)
+        curr_tomo = pyto.grey.Image.read(file=out_path, memmap=memmap)
         tomos.append(curr_tomo)
-        prev_tomo = curr_tomo
     tomo_bin4, tomo_bin8 = tomos
  
     # determine crop type
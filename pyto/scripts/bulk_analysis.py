@@ -125,6 +125,24 @@ script_rules = {
 # flag indicating if scripts need to be run
 run_scripts = True
 
+# number of scripts executed in parallel, None for the number of cpus
+n_processes = None
+
+# manifest file where successfully executed scripts are recorded, so that
+# they are skipped when this script is run again (unless they or their
+# input files were modified in the meantime), None for no manifest
+manifest = 'bulk_manifest.json'
+
+# input files of the single dataset scripts, used only to decide whether
+# a script recorded in the manifest needs to be executed again. Keys are
+# script paths (after modification) and values lists of input file paths,
+# None if only scripts are checked
+script_inputs = None
+
+# flag indicating if log messages of each script are written to a separate
+# file (script path with extension .log)
+separate_logs = True
+
 ##############################################################
 #
 # Modifying catalogs
@@ -151,7 +169,7 @@ catalog_rules = {
     r'^cleft_layers =': {r'_cl': '_layers-thin'},
     r'^cleft_layers_4 =': {r'_cl': ''},
     r'^cleft_segmentation_hi_layers =': {r'^cleft': '#cleft'},
-    r'^cleft_segmentation_hi_layers_4 = : {r'_cl': ''}}
+    r'^cleft_segmentation_hi_layers_4 =': {r'_cl': ''}}
 
 
 ################################################################
@@ -162,7 +180,8 @@ catalog_rules = {
 
 def main():
 
-    # write and run scripts
+    # write scripts
+    new_paths = []
     for script_path in scripts:
 
         if modify_scripts:
@@ -180,11 +199,19 @@ def main():
 
             # use existing script
             new_path = script_path
-
-        # run script
-        if run_scripts:
-            logging.info("Runninging script " + new_path)
-            pyto.util.bulk.run_path(path=new_path)
+        new_paths.append(new_path)
+
+    # run scripts in parallel
+    if run_scripts:
+        logging.info("Running scripts " + str(new_paths))
+        results = pyto.util.bulk.run_parallel(
+            path=new_paths, n_processes=n_processes, manifest=manifest,
+            inputs=script_inputs, log=separate_logs)
+        for res in results:
+            logging.info(
+                "Script %s: %s, wall time %s s, peak memory %s MB"
+                % (res['path'], res['status'], res['wall_time'],
+                   res['peak_memory']))
 
     # add entries to catalogs
     if modify_catalogs:
@@ -152,6 +152,11 @@ do_segmentation_flag = True
 # threshold list (not needed if do_segmentation_flag is False)
 threshold = numpy.arange(500, 1450, 50)  
 
+# make segmentations at all thresholds in one sweep over the image, which is
+# faster than segmenting at each threshold separately (the results are
+# the same)
+threshold_sweep = True
+
 # Currently not implemented
 # in addition to threshold list thresholds are also chosen dynamically, so that
 # the number of new connectors at each level is limited to this number
@@ -561,7 +566,7 @@ def do_segmentation(image, bound, bound_ids, sa_file_name, inset):
         image=image, thresh=thresh, order='<', count=False, doDensity=True, 
         doMorphology=True, doLength=do_now['length'], 
         doTopology=do_now['topology'], doDistanceTo=do_now['distance_to'], 
-        doBoundDistance=do_now['boundary_distance'])
+        doBoundDistance=do_now['boundary_distance'], sweep=threshold_sweep)
     
     # segment and analysis
     thresh_lines = []
@@ -17,6 +17,8 @@ import logging
 import numpy
 import scipy
 import scipy.ndimage as ndimage
+import scipy.sparse
+import scipy.sparse.csgraph
 
 import pyto.util.numpy_plus as numpy_plus
 import pyto.util.nested as nested
@@ -140,47 +142,15 @@ class Connected(Segment):
         boundary_inset = boundary.inset
         image_inset = image.inset
         image_expanded = False
+        image_data = None
 
         # make segmentation (free) region if needed and bring image, boundary
         # and free to the same size
         if label:
 
-            # make segmentation (free) region
-            if boundaryIds is None:
-                flat_b_ids = None
-            else:
-                flat_b_ids = nested.flatten(boundaryIds)
-            free = boundary.makeFree(
-                ids=flat_b_ids, size=freeSize, mode=freeMode, mask=mask, 
-                update=False)
-            if isinstance(free, numpy.ndarray):
-                free = Segment(data=free, copy=False)
-
-            # reduce free.inset to intersection with image
-            free.useInset(inset=image.inset, mode='abs', intersect=True)
-
-            # expand free and boundary to union between them
-            large_inset = boundary.findEnclosingInset(inset=free.inset)
-            free.useInset(inset=large_inset, mode='abs', expand=True)
-            boundary.useInset(inset=large_inset, mode='abs', expand=True)
-
-            # check if new boundary inside image, if not expand image  
-            boundary_inside_image = image.isInside(inset=large_inset)
-            if boundary_inside_image:
-
-                # don't need to expand image data
-                image.useInset(
-                    inset=large_inset, mode='abs', expand=False) 
-
-            else:
-
-                # expand image to (new) boundary if needed and save data 
-                image_data = image.data.copy()
-                # value doesn't matter because segmentation limited by free
-                image.useInset(
-                    inset=large_inset, mode='abs', expand=True, 
-                    value=image.data.max())
-                image_expanded = True
+            free, image_expanded, image_data = cls._makeRegion(
+                image=image, boundary=boundary, boundaryIds=boundaryIds,
+                mask=mask, freeSize=freeSize, freeMode=freeMode)
 
         else:
 
@@ -232,13 +202,10 @@ class Connected(Segment):
                          count=True, saveLabels=saveContactLabels)
 
         # recover insets so that the arguments passed are not changed
-        boundary.useInset(inset=boundary_inset, mode='abs', useFull=True,
-                          expand=True)
-        if image_expanded:
-            image.data = image_data
-            image.setInset(inset=image_inset, mode='abs')
-        else:
-            image.useInset(inset=image_inset, mode='abs', useFull=True)
+        cls._recoverInsets(
+            image=image, boundary=boundary, imageInset=image_inset,
+            boundaryInset=boundary_inset, imageExpanded=image_expanded,
+            imageData=image_data)
 
         # conn: use inset from boundary and adjust fullInset/Data to inset/data
         conn.useInset(inset=boundary.inset, mode='abs', expand=True)
@@ -247,6 +214,298 @@ class Connected(Segment):
         # return
         return conn, contacts
 
+    @classmethod
+    def makeSweep(
+            cls, image, boundary, thresh, count=False, structElConn=1, 
+            contactStructElConn=1, countStructElConn=None, boundaryIds=None,
+            nBoundary=None, boundCount='exact', mask=0, freeSize=0, 
+            freeMode='add'):
+        """
+        Performs threshold and connectivity segmentation at all specified
+        thresholds in one sweep over image elements sorted by greyscale 
+        values.
+
+        Segments obtained at each threshold, as well as the corresponding 
+        contacts, are the same as those obtained by make() (for the same 
+        threshold and other arguments), but here the work that does not 
+        depend on threshold is done only once:
+          - the segmentation (free) region and insets are determined once
+          - each element of the free region is assigned the lowest threshold
+          at which it belongs to the foreground, so all thresholds are 
+          processed in one sort
+          - segments (connected components) are obtained by merging 
+          (union-find) the components of the previous threshold with the 
+          elements that are added at the current threshold, instead of 
+          labeling the whole free region at each threshold
+          - elements of the free region that contact boundaries are 
+          determined once, so contacts at each threshold are obtained from 
+          these elements only (instead of dilating each boundary at each 
+          threshold)
+
+        Segment ids at each threshold are assigned in the same way as in
+        make(), that is in the order of the first element of a segment
+        when elements are ordered as in a flattened array.
+
+        Thresholds are processed in the ascending order. If the labeling
+        structuring element (arg structElConn) has size larger than 3,
+        it falls back to executing make() for each threshold.
+
+        Data and inset of args boundary and image are not changed by this 
+        method (also between the iterations). 
+
+        Arguments: like in make(), except:
+          - thresh: list of thresholds
+
+        Yields at each threshold: (conn, contacts, threshold)
+          - conn: an instance of this class containing the segments found
+          - contacts: the corresponding Contacts instance 
+          - threshold: current threshold
+        """
+
+        # check image and thresholds
+        if isinstance(image, numpy.ndarray):
+            image = Grey(data=image)
+        thresh = sorted(thresh)
+        n_levels = len(thresh)
+
+        # fall back to make() for large structuring elements
+        struct_el = StructEl(rank=image.data.ndim, connectivity=structElConn)
+        if struct_el.size > 3:
+            for tr in thresh:
+                conn, contacts = cls.make(
+                    image=image, boundary=boundary, thresh=tr, count=count,
+                    structElConn=structElConn, 
+                    contactStructElConn=contactStructElConn, 
+                    countStructElConn=countStructElConn,
+                    boundaryIds=boundaryIds, nBoundary=nBoundary, 
+                    boundCount=boundCount, mask=mask, freeSize=freeSize, 
+                    freeMode=freeMode)
+                yield conn, contacts, tr
+            return
+
+        # bring image, boundary and free region to the same size and
+        # keep the data needed (arguments may be changed between yields) 
+        boundary_inset = boundary.inset
+        image_inset = image.inset
+        free, image_expanded, image_data = cls._makeRegion(
+            image=image, boundary=boundary, boundaryIds=boundaryIds,
+            mask=mask, freeSize=freeSize, freeMode=freeMode)
+        bound_data = boundary.data.copy()
+        levels = numpy.searchsorted(thresh, image.data, side='left')
+        cls._recoverInsets(
+            image=image, boundary=boundary, imageInset=image_inset,
+            boundaryInset=boundary_inset, imageExpanded=image_expanded,
+            imageData=image_data)
+        if boundaryIds is None:
+            flat_b_ids = boundary.ids
+        else:
+            flat_b_ids = nested.flatten(boundaryIds)
+        flat_b_ids = numpy.asarray(flat_b_ids, dtype=int)
+
+        # lowest level at which an element is in the foreground, 
+        # n_levels for elements never in foreground, padded so that
+        # neighbors of all elements of the free region exist 
+        levels[free.data <= 0] = n_levels
+        levels = numpy.pad(levels, pad_width=1, mode='constant', 
+                           constant_values=n_levels)
+        pad_shape = levels.shape
+        levels = levels.ravel()
+        bound_data = numpy.pad(bound_data, pad_width=1, mode='constant')
+        bound_data = bound_data.ravel()
+        unpad = tuple([slice(1, sha-1) for sha in pad_shape])
+
+        # all elements sorted by level 
+        order = numpy.argsort(levels, kind='stable')
+        level_starts = numpy.searchsorted(
+            levels[order], numpy.arange(n_levels + 1), side='left')
+
+        # flat index offsets of neighbors for labeling and contacts 
+        elem_strides = numpy.asarray(
+            numpy.cumprod((pad_shape + (1,))[:0:-1])[::-1])
+        label_offsets = (
+            (numpy.array(struct_el.generate().nonzero()).transpose() - 1) 
+            * elem_strides).sum(axis=1)
+        label_offsets = label_offsets[label_offsets != 0]
+        contact_se = ndimage.generate_binary_structure(
+            rank=len(pad_shape), connectivity=contactStructElConn)
+        contact_offsets = (
+            (numpy.array(contact_se.nonzero()).transpose() - 1) 
+            * elem_strides).sum(axis=1)
+
+        # find all (element, boundary) contact pairs of the free region 
+        free_elems = order[:level_starts[n_levels]]
+        pair_elems = []
+        pair_bounds = []
+        for off in contact_offsets:
+            curr_bounds = bound_data[free_elems + off]
+            in_contact = numpy.isin(curr_bounds, flat_b_ids)
+            pair_elems.append(free_elems[in_contact])
+            pair_bounds.append(curr_bounds[in_contact])
+        pair_elems = numpy.concatenate(pair_elems)
+        pair_bounds = numpy.concatenate(pair_bounds)
+        pair_order = numpy.argsort(levels[pair_elems], kind='stable')
+        pair_elems = pair_elems[pair_order]
+        pair_bounds = pair_bounds[pair_order]
+        pair_starts = numpy.searchsorted(
+            levels[pair_elems], numpy.arange(n_levels + 1), side='left')
+
+        # union-find data: component (root) of each element and root lookup
+        comp = numpy.zeros(levels.size, dtype=int) - 1
+        root = numpy.arange(levels.size)
+
+        for level, tr in enumerate(thresh):
+
+            # merge new elements with already existing components
+            new = order[level_starts[level]:level_starts[level+1]]
+            comp[new] = new
+            link_new = []
+            link_old = []
+            for off in label_offsets:
+                neighbors = new + off
+                linked = levels[neighbors] <= level
+                link_new.append(new[linked])
+                link_old.append(comp[neighbors[linked]])
+            link_new = numpy.concatenate(link_new)
+            link_old = numpy.concatenate(link_old)
+            if len(link_new) > 0:
+                nodes, node_inds = numpy.unique(
+                    numpy.concatenate([link_new, link_old]), 
+                    return_inverse=True)
+                graph = scipy.sparse.coo_matrix(
+                    (numpy.ones(len(link_new), dtype=int),
+                     (node_inds[:len(link_new)], node_inds[len(link_new):])),
+                    shape=(len(nodes), len(nodes)))
+                _, node_comps = scipy.sparse.csgraph.connected_components(
+                    graph, directed=False)
+
+                # root is the first element (nodes are sorted)
+                _, first = numpy.unique(node_comps, return_index=True)
+                root[nodes] = nodes[first][node_comps]
+
+            # update components of all foreground elements
+            foreground = order[:level_starts[level+1]]
+            comp[foreground] = root[comp[foreground]]
+
+            # make segments ordered like in scipy.ndimage.label
+            roots = numpy.unique(comp[foreground])
+            seg_data = numpy.zeros(levels.size, dtype=int)
+            seg_data[foreground] = (
+                numpy.searchsorted(roots, comp[foreground]) + 1)
+            seg_data = seg_data.reshape(pad_shape)[unpad]
+            conn = cls()
+            conn.setStructEl(rank=seg_data.ndim, connectivity=structElConn)
+            conn.contactStructElConn = contactStructElConn
+            conn.setData(
+                data=seg_data, copy=False, ids=numpy.arange(1, len(roots)+1))
+            conn.copyPositioning(free)
+
+            # contacts of all segments
+            curr_elems = pair_elems[:pair_starts[level+1]]
+            curr_bounds = pair_bounds[:pair_starts[level+1]]
+            contacts = Contact()
+            contacts.setSegment(segment=conn)
+            contacts.setBoundary(
+                boundary=bound_data.reshape(pad_shape)[unpad], ids=flat_b_ids)
+            contacts.setStructEls(
+                segment=seg_data, contactStructEl=conn.contactStructEl)
+            max_b_id = flat_b_ids.max() if len(flat_b_ids) > 0 else 0
+            contacts._enlargeData(shape=(max_b_id+1, len(roots)+1))
+            curr_segs = numpy.searchsorted(roots, comp[curr_elems]) + 1
+            contacts.addBoundaryPairs(
+                ids=flat_b_ids, boundaryIds=curr_bounds, segmentIds=curr_segs)
+
+            # impose constraints on contacts
+            contacts = conn.findSegments(
+                contacts, boundaryIds=boundaryIds, nBoundary=nBoundary, 
+                countMode=boundCount, update=True, reorder=True)
+
+            # count contacts
+            if count:
+                conn.countStructElConn = countStructElConn
+                contacts.findContacts(
+                    segment=conn, boundary=contacts.boundary,
+                    boundaryIds=flat_b_ids, 
+                    contactStructEl=conn.contactStructEl,
+                    countStructEl=conn.countStructEl, count=True)
+
+            # use inset from boundary
+            conn.useInset(inset=boundary_inset, mode='abs', expand=True)
+
+            yield conn, contacts, tr
+
+    @classmethod
+    def _makeRegion(cls, image, boundary, boundaryIds, mask, freeSize, 
+                    freeMode):
+        """
+        Makes segmentation (free) region and brings image, boundary and 
+        the free region to the same inset, that is just large enough
+        to contain the free region and the boundaries. 
+
+        Used by make() and makeSweep(). The insets of image and boundary 
+        can be recovered by _recoverInsets().
+
+        Returns (free, image_expanded, image_data):
+          - free: (Segment) segmentation region
+          - image_expanded: flag indicating whether image data was expanded
+          - image_data: image data before expansion, None if not expanded
+        """
+
+        # make segmentation (free) region
+        if boundaryIds is None:
+            flat_b_ids = None
+        else:
+            flat_b_ids = nested.flatten(boundaryIds)
+        free = boundary.makeFree(
+            ids=flat_b_ids, size=freeSize, mode=freeMode, mask=mask, 
+            update=False)
+        if isinstance(free, numpy.ndarray):
+            free = Segment(data=free, copy=False)
+
+        # reduce free.inset to intersection with image
+        free.useInset(inset=image.inset, mode='abs', intersect=True)
+
+        # expand free and boundary to union between them
+        large_inset = boundary.findEnclosingInset(inset=free.inset)
+        free.useInset(inset=large_inset, mode='abs', expand=True)
+        boundary.useInset(inset=large_inset, mode='abs', expand=True)
+
+        # check if new boundary inside image, if not expand image  
+        boundary_inside_image = image.isInside(inset=large_inset)
+        image_expanded = False
+        image_data = None
+        if boundary_inside_image:
+
+            # don't need to expand image data
+            image.useInset(
+                inset=large_inset, mode='abs', expand=False) 
+
+        else:
+
+            # expand image to (new) boundary if needed and save data 
+            image_data = image.data.copy()
+            # value doesn't matter because segmentation limited by free
+            image.useInset(
+                inset=large_inset, mode='abs', expand=True, 
+                value=image.data.max())
+            image_expanded = True
+
+        return free, image_expanded, image_data
+
+    @classmethod
+    def _recoverInsets(cls, image, boundary, imageInset, boundaryInset,
+                       imageExpanded, imageData):
+        """
+        Recovers insets of image and boundary that were changed by 
+        _makeRegion().
+        """
+        boundary.useInset(inset=boundaryInset, mode='abs', useFull=True,
+                          expand=True)
+        if imageExpanded:
+            image.data = imageData
+            image.setInset(inset=imageInset, mode='abs')
+        else:
+            image.useInset(inset=imageInset, mode='abs', useFull=True)
+
     def label(self, input, mask=None, structEl=None, update=False,
               relabel=False):
         """
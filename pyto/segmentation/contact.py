@@ -24,6 +24,8 @@ except ImportError:
 #import numpy.ma as ma
 import scipy
 import scipy.ndimage as ndimage
+import scipy.sparse
+import scipy.sparse.csgraph
 
 # not good here because it makes circular import
 #from segment import Segment
@@ -66,11 +68,22 @@ class Contact(object):
       conntacts between a given segment and a given region.
 
     Internal structures (should not be manipulated directly):
-      - _n: contact data structure currently implemented as a masked array
-      where _n[boundId, segId] is a number of contacts segment segId makes
-      with boundary boundId. Shape = (nBoundaries+1, nSegments+1), so that
-      boundary (segment) i as accessed as _n[i,:] (_n[;,i]). Data with
-      index 0 (any) are not used.
+      - contact data structure, conceptually an array of shape 
+      (nBoundaries+1, nSegments+1) where element [boundId, segId] is the 
+      number of contacts segment segId makes with boundary boundId. Data 
+      with index 0 (any) are not used. Because most segments contact only 
+      few boundaries, it is stored in a sparse form:
+      - _shape: shape of the data structure
+      - _rowMask, _colMask: (ndarray of bools, indexed by ids) masked 
+      boundaries and segments, respectively 
+      - _valueKeys, _values: (sorted) keys (see _getKeys()) of all 
+      (boundary, segment) pairs having non-zero number of contacts, and the
+      corresponding number of contacts
+      - _maskedKeys, _unmaskedKeys: keys of pairs that are masked even 
+      though neither their boundary nor segment is masked, and of pairs 
+      that are not masked even though their boundary or segment is masked 
+      - _n: (property) contact data structure as a (dense) masked array,
+      kept for backward compatibility
     """
 
     ##################################################################
@@ -109,6 +122,20 @@ class Contact(object):
         # perhaps not anymore (scipy 0.11)
         self.labelOutDtype = 'int64'
 
+    def __setstate__(self, state):
+        """
+        Sets attributes when unpickled. 
+
+        Converts objects pickled when the contact data structure was a 
+        (dense) masked array to the current (sparse) form.
+        """
+        self.__dict__.update(state)
+        if '_rowMask' not in state:
+            dense = self.__dict__.pop('_n', None)
+            self._initializeData()
+            if dense is not None:
+                self._n = dense
+
     @classmethod
     def recast(cls, obj):
         """
@@ -125,7 +152,8 @@ class Contact(object):
         new = cls()
 
         # set data
-        new._n = obj._n
+        for name in cls._storageNames:
+            setattr(new, name, getattr(obj, name))
 
         # set other attributes
         new.offset = obj.offset
@@ -143,6 +171,10 @@ class Contact(object):
      
         return new
 
+    # names of attributes that hold the contact data structure
+    _storageNames = ['_shape', '_rowMask', '_colMask', '_valueKeys', 
+                     '_values', '_maskedKeys', '_unmaskedKeys']
+
     def _initializeData(self, shape=(1,1), maskValue=True):
         """
         Initializes data structure that holds number of contacts between
@@ -154,15 +186,17 @@ class Contact(object):
         """
 
         # make the data structure
-        data = numpy.zeros(shape=shape, dtype=int)
-        if maskValue: maskValue = 1
-        else: maskValue = 0
-        self._n = ma.array(data=data, mask=maskValue,
-                           fill_value=self.fillValue)
+        self._shape = tuple(shape)
+        self._rowMask = numpy.zeros(shape[0], dtype=bool) | bool(maskValue)
+        self._colMask = numpy.zeros(shape[1], dtype=bool) | bool(maskValue)
+        self._valueKeys = numpy.array([], dtype='int64')
+        self._values = numpy.array([], dtype=int)
+        self._maskedKeys = numpy.array([], dtype='int64')
+        self._unmaskedKeys = numpy.array([], dtype='int64')
 
         # make sure mask is set for all elements with index 0
-        self._n._mask[0,:] = True
-        self._n._mask[:,0] = True
+        self._rowMask[0] = True
+        self._colMask[0] = True
 
     def _enlargeData(self, shape, maskValue=True):
         """
@@ -175,21 +209,347 @@ class Contact(object):
         """
         
         # find max size in each dimension
-        newShape = [max(old,new) for (old,new) in zip(self._n.shape, shape)]
+        old_shape = self._shape
+        new_shape = tuple(
+            max(old, new) for (old, new) in zip(self._shape, shape))
+        if new_shape == old_shape:
+            return
+
+        # enlarge masks
+        self._shape = new_shape
+        self._rowMask = numpy.append(
+            self._rowMask, 
+            numpy.zeros(new_shape[0] - old_shape[0], dtype=bool) 
+            | bool(maskValue))
+        self._colMask = numpy.append(
+            self._colMask, 
+            numpy.zeros(new_shape[1] - old_shape[1], dtype=bool) 
+            | bool(maskValue))
+        self._rowMask[0] = True
+        self._colMask[0] = True
+
+        # unmask new elements in old masked rows and columns
+        if not maskValue:
+            old_rows = self._rowMask[1:old_shape[0]].nonzero()[0] + 1
+            new_cols = numpy.arange(max(old_shape[1], 1), new_shape[1])
+            old_cols = self._colMask[1:old_shape[1]].nonzero()[0] + 1
+            new_rows = numpy.arange(max(old_shape[0], 1), new_shape[0])
+            rows = numpy.concatenate(
+                [numpy.repeat(old_rows, len(new_cols)), 
+                 numpy.tile(new_rows, len(old_cols))])
+            cols = numpy.concatenate(
+                [numpy.tile(new_cols, len(old_rows)), 
+                 numpy.repeat(old_cols, len(new_rows))])
+            self._unmask(boundaryIds=rows, segmentIds=cols)
+
+    def getDense(self):
+        """
+        Returns the contact data structure as a (dense) masked array, 
+        where element [boundary_id, segment_id] is the number of contacts 
+        between the boundary and the segment.
+        """
+        return self._getBlock(
+            boundaryIds=numpy.arange(self._shape[0]), 
+            segmentIds=numpy.arange(self._shape[1]))
+
+    def setDense(self, data):
+        """
+        Sets the contact data structure from a (dense) masked array, 
+        where element [boundary_id, segment_id] is the number of contacts 
+        between the boundary and the segment.
+        """
+        data = ma.asarray(data)
+        self._setBlock(
+            shape=data.shape, boundaryIds=numpy.arange(data.shape[0]), 
+            segmentIds=numpy.arange(data.shape[1]), data=data)
+
+    _n = property(
+        fget=getDense, fset=setDense, 
+        doc="Contact data structure as a (dense) masked array, kept for "
+        + "backward compatibility")
+
+    def _getBlock(self, boundaryIds, segmentIds):
+        """
+        Returns (masked array) part of the contact data structure 
+        formed by the specified boundaries (rows) and segments (columns).
 
-        # make new data structure
-        oldData = self._n._data
-        oldMask = self._n._mask
-        self._initializeData(shape=newShape, maskValue=maskValue)
+        Arguments:
+          - boundaryIds: (ndarray) boundary ids
+          - segmentIds: (ndarray) segment ids
+        """
 
-        # make sure mask is set for all elements with index 0
-        self._n._mask[0,:] = True
-        self._n._mask[:,0] = True
+        # values
+        rows, cols = self._getPairs(self._valueKeys)
+        values = self._asSparse(rows=rows, cols=cols, values=self._values)
+        data = values[boundaryIds][:, segmentIds].toarray()
+
+        # mask
+        mask = (self._rowMask[boundaryIds][:, numpy.newaxis] 
+                | self._colMask[segmentIds][numpy.newaxis, :])
+        rows, cols = self._getPairs(self._unmaskedKeys)
+        unmasked = self._asSparse(rows=rows, cols=cols)
+        mask &= ~(unmasked[boundaryIds][:, segmentIds].toarray() > 0)
+        rows, cols = self._getPairs(self._maskedKeys)
+        masked = self._asSparse(rows=rows, cols=cols)
+        mask |= masked[boundaryIds][:, segmentIds].toarray() > 0
+
+        return ma.array(data=data, mask=mask, fill_value=self.fillValue)
+
+    def _setBlock(self, shape, boundaryIds, segmentIds, data):
+        """
+        Sets the contact data structure of the specified shape from 
+        (masked array) arg data that contains the part of the structure 
+        formed by the specified boundaries (rows) and segments (columns).
+        Elements outside this part are masked.
 
-        # copy the old data and mask separately (preserves data values that
-        # are masked in numpy 1.0.1) 
-        self._n._data[0:oldData.shape[0], 0:oldData.shape[1]] = oldData[:,:]
-        self._n._mask[0:oldData.shape[0], 0:oldData.shape[1]] = oldMask[:,:]
+        Arguments:
+          - shape: shape of the contact data structure
+          - boundaryIds: (ndarray) unique boundary ids, rows of data 
+          - segmentIds: (ndarray) unique segment ids, columns of data 
+          - data: (masked array) number of contacts 
+        """
+
+        # masked elements, disregarding index 0
+        self._initializeData(shape=shape)
+        boundaryIds = numpy.asarray(boundaryIds, dtype=int)
+        segmentIds = numpy.asarray(segmentIds, dtype=int)
+        mask = ma.getmaskarray(data).copy()
+        mask[boundaryIds == 0, :] = True
+        mask[:, segmentIds == 0] = True
+
+        # masked rows and columns, the rest of mask as exceptions
+        self._rowMask[boundaryIds] = mask.all(axis=1)
+        self._colMask[segmentIds] = mask.all(axis=0)
+        self._rowMask[0] = True
+        self._colMask[0] = True
+        exceptions = (
+            mask & ~self._rowMask[boundaryIds][:, numpy.newaxis]
+            & ~self._colMask[segmentIds][numpy.newaxis, :])
+        ex_rows, ex_cols = exceptions.nonzero()
+        self._maskedKeys = numpy.unique(self._getKeys(
+            boundaryIds[ex_rows], segmentIds[ex_cols]))
+
+        # values, including masked ones
+        val_rows, val_cols = (ma.getdata(data) != 0).nonzero()
+        self._setValues(
+            boundaryIds=boundaryIds[val_rows], segmentIds=segmentIds[val_cols],
+            values=ma.getdata(data)[val_rows, val_cols])
+
+    def _asSparse(self, rows, cols, values=None):
+        """
+        Returns scipy.sparse.csr_matrix having the shape of the contact
+        data structure, with values at the specified (row, col) positions.
+        If values is None, 1 is used.
+        """
+        if values is None:
+            values = numpy.ones(len(rows), dtype=int)
+        return scipy.sparse.csr_matrix(
+            (values, (rows, cols)), shape=self._shape)
+
+    @staticmethod
+    def _getKeys(boundaryIds, segmentIds):
+        """
+        Returns (ndarray) keys of (boundary, segment) pairs. Keys do not
+        depend on the shape of the data structure.
+        """
+        return (numpy.asarray(boundaryIds, dtype='int64') * 2**32
+                + numpy.asarray(segmentIds, dtype='int64'))
+
+    @staticmethod
+    def _getPairs(keys):
+        """
+        Returns (boundary_ids, segment_ids) from keys (see _getKeys()).
+        """
+        return (numpy.asarray(keys // 2**32, dtype=int), 
+                numpy.asarray(keys % 2**32, dtype=int))
+
+    def _setValues(self, boundaryIds, segmentIds, values):
+        """
+        Sets number of contacts for the specified (boundary, segment) pairs.
+        Only non-zero values of pairs that do not have index 0 are stored. 
+        Does not change the mask.
+        """
+
+        # remove values of the pairs
+        keys = self._getKeys(boundaryIds, segmentIds)
+        keep = ~numpy.isin(self._valueKeys, keys)
+        old_keys = self._valueKeys[keep]
+        old_values = self._values[keep]
+
+        # add new non-zero values, if a pair repeats the last value is used
+        values = numpy.broadcast_to(
+            numpy.asarray(values, dtype=int), keys.shape)
+        keys, last = numpy.unique(keys[::-1], return_index=True)
+        values = values[::-1][last]
+        boundaryIds, segmentIds = self._getPairs(keys)
+        nonzero = (values != 0) & (boundaryIds > 0) & (segmentIds > 0)
+        all_keys = numpy.concatenate([old_keys, keys[nonzero]])
+        all_values = numpy.concatenate([old_values, values[nonzero]])
+        sort_ind = all_keys.argsort(kind='stable')
+        self._valueKeys = all_keys[sort_ind]
+        self._values = all_values[sort_ind]
+
+    def _isUnmasked(self, boundaryIds, segmentIds):
+        """
+        Returns (ndarray of bools) flags showing whether the specified 
+        (boundary, segment) pairs are not masked.
+        """
+        keys = self._getKeys(boundaryIds, segmentIds)
+        unmasked = ~self._rowMask[boundaryIds] & ~self._colMask[segmentIds]
+        unmasked |= numpy.isin(keys, self._unmaskedKeys)
+        unmasked &= ~numpy.isin(keys, self._maskedKeys)
+        return unmasked
+
+    def _mask(self, boundaryIds, segmentIds):
+        """
+        Masks (boundary, segment) pairs.
+        """
+        keys = self._getKeys(boundaryIds, segmentIds)
+        self._unmaskedKeys = numpy.setdiff1d(self._unmaskedKeys, keys)
+        base = (~self._rowMask[numpy.asarray(boundaryIds, dtype=int)]
+                & ~self._colMask[numpy.asarray(segmentIds, dtype=int)])
+        self._maskedKeys = numpy.union1d(self._maskedKeys, keys[base])
+
+    def _unmask(self, boundaryIds, segmentIds):
+        """
+        Unmasks (boundary, segment) pairs, except those having index 0.
+        """
+        boundaryIds = numpy.asarray(boundaryIds, dtype=int)
+        segmentIds = numpy.asarray(segmentIds, dtype=int)
+        good = (boundaryIds > 0) & (segmentIds > 0)
+        boundaryIds = boundaryIds[good]
+        segmentIds = segmentIds[good]
+        keys = self._getKeys(boundaryIds, segmentIds)
+        self._maskedKeys = numpy.setdiff1d(self._maskedKeys, keys)
+        base = ~self._rowMask[boundaryIds] & ~self._colMask[segmentIds]
+        self._unmaskedKeys = numpy.union1d(self._unmaskedKeys, keys[~base])
+
+    def _maskLines(self, ids, axis):
+        """
+        Masks all elements of boundaries (axis 0) or segments (axis 1) 
+        specified by arg ids. 
+        """
+        ids = numpy.asarray(ids, dtype=int)
+        if axis == 0:
+            self._rowMask[ids] = True
+        else:
+            self._colMask[ids] = True
+        for name in ['_maskedKeys', '_unmaskedKeys']:
+            keys = getattr(self, name)
+            remove = numpy.isin(self._getPairs(keys)[axis], ids)
+            setattr(self, name, keys[~remove])
+
+    def _unmaskLines(self, ids, axis):
+        """
+        Unmasks all elements (except those having index 0) of boundaries 
+        (axis 0) or segments (axis 1) specified by arg ids. 
+
+        Masked lines along the other axis are either unmasked (and the 
+        elements of other boundaries / segments are masked individually), 
+        or the elements of the specified ids are unmasked individually, 
+        whichever requires fewer individually (un)masked elements.
+        """
+
+        # masks and keys arranged so that arg ids are rows 
+        ids = numpy.unique(numpy.asarray(ids, dtype=int))
+        ids = ids[ids > 0]
+        if axis == 0:
+            line_mask = self._rowMask
+            other_mask = self._colMask
+            to_keys = lambda lines, others: self._getKeys(lines, others)
+        else:
+            line_mask = self._colMask
+            other_mask = self._rowMask
+            to_keys = lambda lines, others: self._getKeys(others, lines)
+
+        # remove individually (un)masked elements of ids
+        for name in ['_maskedKeys', '_unmaskedKeys']:
+            keys = getattr(self, name)
+            remove = numpy.isin(self._getPairs(keys)[axis], ids)
+            setattr(self, name, keys[~remove])
+        line_mask[ids] = False
+
+        # unmask masked lines along the other axis
+        others = other_mask.nonzero()[0]
+        others = others[others > 0]
+        if len(others) == 0:
+            return
+        other_lines = (~line_mask).nonzero()[0]
+        other_lines = other_lines[
+            (other_lines > 0) & ~numpy.isin(other_lines, ids)]
+        if len(other_lines) <= len(ids):
+
+            # unmask other lines, mask elements of other ids individually
+            keep_masked = to_keys(
+                numpy.repeat(other_lines, len(others)), 
+                numpy.tile(others, len(other_lines)))
+            unmasked = numpy.isin(keep_masked, self._unmaskedKeys)
+            self._unmaskedKeys = numpy.setdiff1d(
+                self._unmaskedKeys, keep_masked)
+            self._maskedKeys = numpy.union1d(
+                self._maskedKeys, keep_masked[~unmasked])
+            other_mask[others] = False
+
+        else:
+
+            # unmask elements individually
+            self._unmaskedKeys = numpy.union1d(
+                self._unmaskedKeys, 
+                to_keys(numpy.repeat(ids, len(others)), 
+                        numpy.tile(others, len(ids))))
+
+    def _reduce(self, indices, axis):
+        """
+        Reduces the contact data structure along axis.
+
+        Arguments:
+          - indices: boundary (axis 0) or segment (axis 1) ids that are
+          taken into account, an id given multiple times is counted 
+          multiple times
+          - axis: 0 or 1
+
+        Returns (n_positive, n_unmasked), both indexed by segment (axis 0) 
+        or boundary (axis 1) ids:
+          - n_positive: number of unmasked positive elements
+          - n_unmasked: number of unmasked elements
+        """
+
+        # arrange so that the reduction is along rows 
+        if axis == 0:
+            line_mask = self._rowMask
+            other_mask = self._colMask
+        else:
+            line_mask = self._colMask
+            other_mask = self._rowMask
+        mult = numpy.bincount(
+            numpy.asarray(indices, dtype=int), minlength=len(line_mask))
+
+        # unmasked lines and columns
+        n_unmasked = numpy.where(
+            other_mask, 0, (mult * ~line_mask)[1:].sum())
+
+        # individually masked and unmasked elements
+        for name, sign in [('_maskedKeys', -1), ('_unmaskedKeys', 1)]:
+            pairs = self._getPairs(getattr(self, name))
+            lines = pairs[axis]
+            others = pairs[1 - axis]
+            base = ~line_mask[lines] & ~other_mask[others]
+            if sign < 0:
+                change = base
+            else:
+                change = ~base
+            numpy.add.at(
+                n_unmasked, others[change], sign * mult[lines[change]])
+
+        # positive unmasked elements
+        pairs = self._getPairs(self._valueKeys)
+        positive = (self._values > 0) & self._isUnmasked(*pairs)
+        n_positive = numpy.bincount(
+            pairs[1 - axis][positive], 
+            weights=mult[pairs[axis][positive]],
+            minlength=len(other_mask)).astype(int)
+
+        return n_positive, n_unmasked
 
 
     ##################################################################
@@ -206,11 +566,9 @@ class Contact(object):
         Note: perhaps this should be changed to return ids of segments that 
         contact at lease one boundary.
         """
-        # make a mask
-        shifted = ~numpy.bitwise_and.reduce(self._n._mask[1:,1:], 0)
-
-        # convert to segment ids
-        return numpy.nonzero(shifted)[0] + 1
+        _, n_unmasked = self._reduce(
+            indices=numpy.arange(self._shape[0]), axis=0)
+        return numpy.nonzero(n_unmasked[1:] > 0)[0] + 1
 
     segments = property(fget=getSegments, doc="Ids of all segments")
         
@@ -222,11 +580,9 @@ class Contact(object):
         Note: perhaps this should be changed to return ids of boundaries that 
         contact at lease one segment.
         """
-        # make a mask
-        shifted = ~numpy.bitwise_and.reduce(self._n._mask[1:,1:], 1)
-
-        # convert to segment ids
-        return numpy.nonzero(shifted)[0] + 1
+        _, n_unmasked = self._reduce(
+            indices=numpy.arange(self._shape[1]), axis=1)
+        return numpy.nonzero(n_unmasked[1:] > 0)[0] + 1
         
     boundaries = property(fget=getBoundaries, doc="Ids of all boundaries")
         
@@ -234,7 +590,7 @@ class Contact(object):
         """
         Returns the highest segment id.
         """
-        return self._n.shape[1]-1
+        return self._shape[1]-1
 
     maxSegment = property(fget=getMaxSegment, doc='Max segment id')
 
@@ -242,7 +598,7 @@ class Contact(object):
         """
         Returns the highest boundary id.
         """
-        return self._n.shape[0]-1
+        return self._shape[0]-1
 
     maxBoundary = property(fget=getMaxBoundary, doc='Max boundary id')
 
@@ -264,13 +620,46 @@ class Contact(object):
         max_seg = max(self.maxSegment, contacts.maxSegment)
         max_bound = max(self.maxBoundary, contacts.maxBoundary)
         self._enlargeData(shape=(max_bound+1, max_seg+1))
+        contacts._enlargeData(shape=(max_bound+1, max_seg+1))
 
         # add shifted contacts
         new_seg_ids = contacts.segments
         if len(numpy.intersect1d(self.segments, new_seg_ids)) > 0:
             logging.warning("Ids of the segments that are added collide with"\
                            + " with the current segments.")
-        self._n[:, new_seg_ids] = contacts._n[:, new_seg_ids]
+
+        # values of the new segments
+        pairs = self._getPairs(self._valueKeys)
+        keep = ~numpy.isin(pairs[1], new_seg_ids)
+        self._valueKeys = self._valueKeys[keep]
+        self._values = self._values[keep]
+        pairs = contacts._getPairs(contacts._valueKeys)
+        new = numpy.isin(pairs[1], new_seg_ids)
+        self._setValues(
+            boundaryIds=pairs[0][new], segmentIds=pairs[1][new], 
+            values=contacts._values[new])
+
+        # mask of the new segments
+        self._colMask[new_seg_ids] = contacts._colMask[new_seg_ids]
+        for name in ['_maskedKeys', '_unmaskedKeys']:
+            keys = getattr(self, name)
+            keep = ~numpy.isin(self._getPairs(keys)[1], new_seg_ids)
+            new_keys = getattr(contacts, name)
+            new = numpy.isin(self._getPairs(new_keys)[1], new_seg_ids)
+            setattr(self, name, numpy.union1d(keys[keep], new_keys[new]))
+
+        # correct mask for boundaries that are masked differently
+        diff_rows = (self._rowMask != contacts._rowMask).nonzero()[0]
+        if len(diff_rows) > 0:
+            rows = numpy.repeat(diff_rows, len(new_seg_ids))
+            cols = numpy.tile(new_seg_ids, len(diff_rows))
+            self._maskedKeys = numpy.setdiff1d(
+                self._maskedKeys, self._getKeys(rows, cols))
+            self._unmaskedKeys = numpy.setdiff1d(
+                self._unmaskedKeys, self._getKeys(rows, cols))
+            unmasked = contacts._isUnmasked(rows, cols)
+            self._unmask(boundaryIds=rows[unmasked], segmentIds=cols[unmasked])
+            self._mask(boundaryIds=rows[~unmasked], segmentIds=cols[~unmasked])
 
     def addBoundary(self, id, nContacts):
         """
@@ -291,22 +680,73 @@ class Contact(object):
           segment (indexed by segmentIds)
         """
 
-        # add nContacts
-        try: 
-            self._n[id, 0:len(nContacts)] = nContacts
+        # enlarge if needed
+        self._enlargeData(shape=(id+1, len(nContacts)))
 
-        except (IndexError, ValueError):
+        # set values, pad the remainder with 0's
+        n_contacts = numpy.zeros(self._shape[1], dtype=int)
+        n_contacts[:len(nContacts)] = ma.getdata(nContacts)
+        self._setValues(
+            boundaryIds=numpy.zeros(self._shape[1], dtype=int) + id,
+            segmentIds=numpy.arange(self._shape[1]), values=n_contacts)
 
-            # enlarge _n 
-            newShape = (id+1, len(nContacts)) 
-            self._enlargeData(shape=newShape)
+        # unmask
+        self._unmaskLines(ids=[id], axis=0)
 
-            # put data
-            self._n[id, 0:len(nContacts)] = nContacts
+    def addBoundaryPairs(self, ids, boundaryIds, segmentIds, nContacts=None):
+        """
+        Adds contact data for boundaries given by arg ids, where contacts
+        are specified as (boundary, segment) pairs. 
+
+        The result is the same as if addBoundary() was called for each
+        boundary of arg ids (in that order), with nContacts arrays made from 
+        the pairs of that boundary, but the data structure is set for all 
+        boundaries at once. Boundaries of arg ids that have no pairs get
+        0 contacts with all segments. 
+
+        Arguments:
+          - ids: ids of boundaries whose contacts are added
+          - boundaryIds: (ndarray) boundary ids of (boundary, segment) pairs
+          - segmentIds: (ndarray) segment ids of (boundary, segment) pairs
+          - nContacts: (ndarray) number of contacts for each pair, if None
+          1 is used for each pair
+        """
 
-        # set mask at 0 and pad the remainer with 0's
-        self._n._mask[id, 0] = True
-        self._n[id, len(nContacts):] = 0
+        # parse arguments
+        ids = numpy.asarray(ids, dtype=int)
+        if len(ids) == 0:
+            return
+        boundaryIds = numpy.asarray(boundaryIds, dtype=int)
+        segmentIds = numpy.asarray(segmentIds, dtype=int)
+        if nContacts is None:
+            nContacts = numpy.ones(len(boundaryIds), dtype=int)
+
+        # max segment id for each boundary, then cumulative as if
+        # boundaries were added one by one
+        max_segs = numpy.zeros(ids.max() + 1, dtype=int)
+        numpy.maximum.at(max_segs, boundaryIds, segmentIds)
+        n_segs = numpy.maximum.accumulate(
+            numpy.maximum(max_segs[ids] + 1, self.getMaxSegment() + 1))
+
+        # enlarge data structure and set data
+        self._enlargeData(shape=(ids.max() + 1, n_segs[-1]))
+        pairs = self._getPairs(self._valueKeys)
+        keep = ~numpy.isin(pairs[0], ids)
+        self._valueKeys = self._valueKeys[keep]
+        self._values = self._values[keep]
+        self._setValues(
+            boundaryIds=boundaryIds, segmentIds=segmentIds, values=nContacts)
+
+        # unmask, except segments added after a boundary
+        self._unmaskLines(ids=ids, axis=0)
+        short = n_segs < n_segs[-1]
+        if short.any():
+            rows = numpy.concatenate(
+                [[id_] * (n_segs[-1] - n_seg) 
+                 for id_, n_seg in zip(ids[short], n_segs[short])])
+            cols = numpy.concatenate(
+                [numpy.arange(n_seg, n_segs[-1]) for n_seg in n_segs[short]])
+            self._mask(boundaryIds=rows, segmentIds=cols)
 
     def addSegment(self, id, nContacts):
         """
@@ -327,22 +767,19 @@ class Contact(object):
           boundary (indexed by boundaryIds)
         """
 
-        # add nContacts
-        try: 
-            self._n[0:len(nContacts), id] = nContacts
+        # enlarge if needed
+        self._enlargeData(shape=(len(nContacts), id+1))
 
-        except (IndexError, ValueError):
+        # set values, pad the remainder with 0's
+        n_contacts = numpy.zeros(self._shape[0], dtype=int)
+        n_contacts[:len(nContacts)] = ma.getdata(nContacts)
+        self._setValues(
+            boundaryIds=numpy.arange(self._shape[0]), 
+            segmentIds=numpy.zeros(self._shape[0], dtype=int) + id, 
+            values=n_contacts)
 
-            # enlarge _n if needed
-            newShape = (len(nContacts), id+1)
-            self._enlargeData(shape=newShape)
-
-            # put data
-            self._n[0:len(nContacts), id] = nContacts
-
-        # set mask at 0 and pad the remainer with 0's
-        self._n._mask[0, id] = True
-        self._n[len(nContacts):, id] = 0
+        # unmask
+        self._unmaskLines(ids=[id], axis=1)
 
     def setN(self, boundaryId=None, segmentId=None, nContacts=None):
         """
@@ -357,16 +794,14 @@ class Contact(object):
           - nContacts: number of contacts between the boundary and the segment
         """
 
-        try:
-            self._n[boundaryId, segmentId] = nContacts
+        # enlarge data structure if needed
+        self._enlargeData(shape=(boundaryId + 1, segmentId + 1))
 
-        except IndexError:
-
-            # enlarge data structure first
-            newShape = (max(boundaryId, self.getMaxBoundary()) + 1,
-                        max(segmentId, self.getMaxSegment()) + 1)
-            self._enlargeData(shape=newShape)
-            self._n[boundaryId, segmentId] = nContacts
+        # set
+        self._setValues(
+            boundaryIds=[boundaryId], segmentIds=[segmentId], 
+            values=[nContacts])
+        self._unmask(boundaryIds=[boundaryId], segmentIds=[segmentId])
             
     def getN(self, boundaryId=None, segmentId=None):
         """
@@ -391,8 +826,23 @@ class Contact(object):
             if boundaryId not in self.getBoundaries():
                 return []
             segmentId = slice(0,None)
+
+        # get the requested part
+        bound_ids = numpy.arange(self._shape[0])[boundaryId]
+        seg_ids = numpy.arange(self._shape[1])[segmentId]
+        block = self._getBlock(
+            boundaryIds=numpy.atleast_1d(bound_ids), 
+            segmentIds=numpy.atleast_1d(seg_ids))
+
+        # shape the same as arguments
+        if numpy.ndim(bound_ids) == 0:
+            block = block[0]
+            if numpy.ndim(seg_ids) == 0:
+                block = block[0]
+        elif numpy.ndim(seg_ids) == 0:
+            block = block[:, 0]
         
-        return self._n[boundaryId, segmentId]
+        return block
 
     def removeBoundaries(self, ids):
         """
@@ -404,7 +854,7 @@ class Contact(object):
         if (not isinstance(ids, list)) and (not isinstance(ids, tuple)) \
                and (not isinstance(ids, numpy.ndarray)):
             ids = [ids]
-        for id in ids: self._n._mask[id, 1:] = True
+        self._maskLines(ids=ids, axis=0)
 
     def keepBoundaries(self, ids):
         """
@@ -427,17 +877,12 @@ class Contact(object):
         removed), so they can be recovered if needed.
 
         Note: if it's needed to reduce the size of the contact data structure
-        (self._n) use reorderSegments().
+        use reorderSegments().
         """
-
-        # Note: Removing the segments completely from self._n array does
-        # not make much sense because the size of self._n is determined
-        # by highest id (and not by the number of segements)
-
         if (not isinstance(ids, list)) and (not isinstance(ids, tuple)) \
                and (not isinstance(ids, numpy.ndarray)):
             ids = [ids]
-        for id in ids: self._n._mask[1:, id] = True
+        self._maskLines(ids=ids, axis=1)
 
     def keepSegments(self, ids):
         """
@@ -459,29 +904,29 @@ class Contact(object):
         The contact is only masked (the contact data is not removed), so
         it can be recovered if needed.
         """
-        self._n._mask[boundaryId, segmentId] = True
+        self._mask(boundaryIds=[boundaryId], segmentIds=[segmentId])
 
     def _recoverBoundary(self, boundaryId):
         """
         Recovers previously removed boundary.
         """
-        self._n._mask[boundaryId, 1:] = False
+        self._unmaskLines(ids=[boundaryId], axis=0)
     
     def _recoverSegment(self, segmentId):
         """
         Recovers previously removed segment.
         """
-        self._n._mask[1:, segmentId] = False
+        self._unmaskLines(ids=[segmentId], axis=1)
     
     def _recoverContact(self, segmentId, boundaryId):
         """
         Recoveres previously removed contact between boundaryId and segmentID.
         """
-        self._n._mask[boundaryId, segmentId] = False
+        self._unmask(boundaryIds=[boundaryId], segmentIds=[segmentId])
 
     def reorderSegments(self, order):
         """
-        Reorders segments in both contact data structure (self._n) and contact
+        Reorders segments in both contact data structure and contact
         labels (self.labels) according to the order dictionary.
 
         Only the elements corresponding to the new ids (and 0) are set. Elements
@@ -491,18 +936,41 @@ class Contact(object):
           - order: dictionary where keys are old ids and values are new ids.
         """
 
-        # make new array
+        # old - new ids lookup table
         if len(order) > 0:
-            new_shape = (self.getMaxBoundary()+1, max(order.values())+1)
+            n_new = max(order.values()) + 1
         else:
-            new_shape = (self.getMaxBoundary()+1, 1)
-        new_data = numpy.zeros(shape=new_shape, dtype=int)
-        new = ma.array(data=new_data, mask=True, fill_value=self.fillValue)
-
-        # reorder contact data structure (self._n)
-        for old in order:
-            new[:,order[old]] = self._n[:,old]
-        self._n = new
+            n_new = 1
+        old_ids = numpy.array(list(order.keys()), dtype=int)
+        new_ids = numpy.array(list(order.values()), dtype=int)
+        lookup = numpy.zeros(max(self._shape[1], old_ids.max() + 1 
+                                 if len(old_ids) > 0 else 0), dtype=int) - 1
+        lookup[old_ids] = new_ids
+
+        # reorder masks
+        col_mask = numpy.ones(n_new, dtype=bool)
+        existing = old_ids < self._shape[1]
+        col_mask[new_ids[existing]] = self._colMask[old_ids[existing]]
+        col_mask[0] = True
+        self._colMask = col_mask
+        self._shape = (self._shape[0], n_new)
+
+        # reorder values and individually (un)masked elements 
+        pairs = self._getPairs(self._valueKeys)
+        new_cols = lookup[pairs[1]]
+        keep = new_cols > 0
+        values = self._values[keep]
+        self._valueKeys = numpy.array([], dtype='int64')
+        self._values = numpy.array([], dtype=int)
+        self._setValues(
+            boundaryIds=pairs[0][keep], segmentIds=new_cols[keep], 
+            values=values)
+        for name in ['_maskedKeys', '_unmaskedKeys']:
+            pairs = self._getPairs(getattr(self, name))
+            new_cols = lookup[pairs[1]]
+            keep = new_cols > 0
+            setattr(self, name, numpy.unique(
+                self._getKeys(pairs[0][keep], new_cols[keep])))
 
         # reorder contact array if it exists
         try:
@@ -579,7 +1047,7 @@ class Contact(object):
 
         else:
 
-            # reorder segments in self._n
+            # reorder segments in the contact data structure
             new_order = dict(list(zip(s_ids[sort_list], s_ids)))
             self.reorderSegments(new_order)            
             return new_order
@@ -593,58 +1061,49 @@ class Contact(object):
 
     def compactify(self):
         """
-        Saves data structure in a compact form. This is only useful for storing
-        an object, because all methods that require access to the data 
-        structure need the data in the expanded form. The data can be
-        expanded by self.expand().
+        Marks data structure as compact. This used to be useful for storing
+        an object, but the contact data structure is now always kept in 
+        a compact (sparse) form, so it is retained for backward compatibility.
 
         Sets:
           - self.compactified: flag indicating if data is in the compact form
-          - self._boundaries: boundary ids (as given by self.boundaries)
-          - self._segments: boundary ids (as given by self.segments)
-          - self._n: (expanded data) set to None
-          - self._compact: data in the compact form
         """
-
-        # asign values
-        self._boundaries = self.boundaries
-        self._segments = self.segments
-        self._compact = self._n[numpy.ix_(self._boundaries, self._segments)]
-
-        # finish and clean up
         self.compactified = True
-        self._n = None
 
     def expand(self):
         """
-        Expands data structure form the compact (using self.compactify()) to 
-        the normal (expanded) form. If self.compactified is False, or if it 
-        doesn't exist, this method doesn't do anything. 
+        Expands data structure form the compact form. If self.compactified 
+        is False, or if it doesn't exist, this method doesn't do anything. 
+
+        Also converts data of objects compactified (and pickled) when the
+        compact form was stored separately (self._compact, self._boundaries
+        and self._segments) into the current data structure.
 
         Sets:
           - self.compactified: flag indicating if data is in the compact form
           - self._boundaries: to None
           - self._segments: to None
-          - self._n: expanded data
           - self._compact: (data in the compact form) to None
         """
         
         # check if compactified exists and if it's True
         if getattr(self, 'compactified', False):
 
-            # create new self._n
-            if (self._boundaries is not None) and (len(self._boundaries) > 0):
-                bound_max = self._boundaries.max()
-            else:
-                bound_max = 0
-            if (self._segments is not None) and (len(self._segments) > 0):
-                seg_max = self._segments.max()
-            else:
-                seg_max = 0
-            self._initializeData(shape=(bound_max + 1, seg_max + 1))
-            
-            # assign values
-            self._n[numpy.ix_(self._boundaries, self._segments)] = self._compact
+            # convert data compactified in the old form
+            compact = getattr(self, '_compact', None)
+            if compact is not None:
+                if len(self._boundaries) > 0:
+                    bound_max = self._boundaries.max()
+                else:
+                    bound_max = 0
+                if len(self._segments) > 0:
+                    seg_max = self._segments.max()
+                else:
+                    seg_max = 0
+                self._setBlock(
+                    shape=(bound_max + 1, seg_max + 1), 
+                    boundaryIds=self._boundaries, segmentIds=self._segments, 
+                    data=compact)
 
             # finish and clean up
             self.compactified = False
@@ -730,7 +1189,7 @@ class Contact(object):
         else:
             max_boundary_id = max(self.boundaryIds)
 
-        # make sure that self._n has proper shape (even if one does not exist)
+        # make sure that the contact data structure has proper shape
         newShape = (max_boundary_id+1, max_segment_id+1)
         self._enlargeData(shape=newShape, maskValue=True)
 
@@ -741,69 +1200,173 @@ class Contact(object):
         self.setStructEls(segment=self.segment, contactStructEl=contactStructEl,
                           countStructEl=countStructEl)
 
-        # find contacts
-        # Note: it's not good to use grey_dilation (and avoid this for loop)
-        # because dilated boundaries overlap if they are close (distance = 2)
-        if saveLabels:
-            contacts = numpy.zeros_like(self.segment)
-        for bound in self.boundaryIds:
-        
-            # dilate the current boundary and intersect with all segments
-            dilated_bound = ndimage.binary_dilation(
-                self.boundary==bound, structure=self.contactStructEl)
-            curr_contacts = numpy.where(dilated_bound, self.segment, 0)
-
-            # put contacts into array
-            # Note: labeling by boundary id is wrong for close boundaries 
-            if saveLabels:
-                contacts += curr_contacts 
- 
-            # find segments with contacts
-            segs = numpy.unique(curr_contacts)
-
-            # need to make sure conts have sufficient length, because
-            # curr_contacts takes all segments into account, so it may have
-            # segment ids higher than those in arg segmentIds
-            if len(segs > 0):
-                segs_max = segs.max()
-            else:
-                segs_max = 0
-            shape_seg = numpy.max([self.getMaxSegment(), segs_max]) + 1
-            conts = numpy.zeros(shape_seg, dtype=numpy.int_)
-            
-            # count or just find contacts
-            if count:
-
-                # count number of contacts between current boundary and each 
-                # segment
-                if curr_contacts.max() > 0:
-                    insets = ndimage.find_objects(curr_contacts)
-                    for seg_id in segs:
-                        seg_inset = insets[seg_id-1]
-                        tmp, n_contacts = ndimage.label(
-                            curr_contacts[seg_inset]==seg_id,
-                            structure=self.countStructEl)
-                        conts[seg_id] = n_contacts
+        # find contact elements for all boundaries
+        # Note: it's not good to use grey_dilation because dilated boundaries
+        # overlap if they are close (distance = 2)
+        bound_ids, elements, seg_ids = self._findContactElements()
 
-            else:
-
-                # don't count, just put 1
-                conts[segs] = 1
+        # count or just find contacts
+        if count:
+            pair_bounds, pair_segs, pair_n = self._countContactElements(
+                boundaryIds=bound_ids, elements=elements, segmentIds=seg_ids)
+        else:
+            pair_bounds = bound_ids
+            pair_segs = seg_ids
+            pair_n = None
 
-            # add contacts to the contacts data structure 
-            self.addBoundary(id=bound, nContacts=conts)
+        # add contacts to the contacts data structure 
+        self.addBoundaryPairs(
+            ids=self.boundaryIds, boundaryIds=pair_bounds, 
+            segmentIds=pair_segs, nContacts=pair_n)
 
         # contacts found but not counted
         #self.counted = False
 
         # make Connected instance from contacts
+        # Note: labeling by boundary id is wrong for close boundaries 
         if saveLabels:
+            contacts = numpy.zeros_like(self.segment)
+            numpy.add.at(
+                contacts, numpy.unravel_index(elements, contacts.shape), 
+                seg_ids)
             from .connected import Connected
             labels = Connected(data=contacts, copy=False)
             labels.copyPositioning(image=segment, saveFull=True)
             #labels.makeInset()  problem if no contacts
             self.labels = labels
 
+    def _findContactElements(self):
+        """
+        Finds segment elements that contact boundaries, for all boundaries
+        at once.
+
+        An element of a segment contacts a boundary if it belongs to the 
+        boundary dilated by self.contactStructEl. Instead of dilating each
+        boundary separately, neighbors of all boundary elements are 
+        determined in one pass over the offsets of the contact 
+        structuring element.
+
+        Uses self.segment, self.boundary, self.boundaryIds and 
+        self.contactStructEl.
+
+        Returns (boundary_ids, elements, segment_ids), where each is an 
+        ndarray containing one element for each (boundary, contact element) 
+        pair:
+          - boundary_ids: boundary ids
+          - elements: flat indices (in self.segment) of contact elements
+          - segment_ids: segment ids of the contact elements
+        The pairs are unique and sorted by boundary id and then by element.
+        """
+
+        # boundary elements
+        shape = self.segment.shape
+        bound_ids = numpy.asarray(self.boundaryIds)
+        bound_coords = numpy.nonzero(numpy.isin(self.boundary, bound_ids))
+        bound_values = self.boundary[bound_coords]
+
+        # neighbors of boundary elements that belong to segments
+        struct_el = numpy.asarray(self.contactStructEl)
+        offsets = (numpy.transpose(struct_el.nonzero()) 
+                   - numpy.asarray(struct_el.shape) // 2)
+        all_keys = []
+        size = self.segment.size
+        for off in offsets:
+            coords = [b_coord + o for b_coord, o in zip(bound_coords, off)]
+            inside = numpy.logical_and.reduce(
+                [(coord >= 0) & (coord < sha) 
+                 for coord, sha in zip(coords, shape)])
+            coords = tuple(coord[inside] for coord in coords)
+            on_segment = self.segment[coords] > 0
+            coords = tuple(coord[on_segment] for coord in coords)
+            elements = numpy.ravel_multi_index(coords, shape)
+            all_keys.append(
+                bound_values[inside][on_segment].astype('int64') * size 
+                + elements)
+
+        # unique (boundary, element) pairs
+        keys = numpy.unique(numpy.concatenate(all_keys).astype('int64'))
+        bound_ids = keys // size
+        elements = keys % size
+        seg_ids = self.segment[numpy.unravel_index(elements, shape)]
+
+        return bound_ids, elements, seg_ids
+
+    def _countContactElements(self, boundaryIds, elements, segmentIds):
+        """
+        Counts contacts between segments and boundaries.
+
+        Contact elements of a segment and a boundary (as returned by 
+        _findContactElements()) that are connected in the 
+        self.countStructEl sense form one contact. Contact elements of all
+        boundaries and segments are connected in one go (using 
+        scipy.sparse.csgraph) instead of labeling each (boundary, segment) 
+        pair separately.
+
+        Arguments (all have the same length, as returned by 
+        _findContactElements()):
+          - boundaryIds: boundary ids
+          - elements: flat indices of contact elements
+          - segmentIds: segment ids of contact elements
+
+        Returns (boundary_ids, segment_ids, n_contacts) where each is an
+        ndarray containing one element for each contacting (boundary, 
+        segment) pair.
+        """
+
+        # no contacts
+        if len(elements) == 0:
+            return boundaryIds, segmentIds, numpy.array([], dtype=int)
+
+        # keys of contact elements, sorted because of _findContactElements()
+        shape = self.segment.shape
+        size = self.segment.size
+        keys = boundaryIds.astype('int64') * size + elements
+        coords = numpy.unravel_index(elements, shape)
+
+        # find neighboring contact elements of the same boundary and segment
+        struct_el = numpy.asarray(self.countStructEl)
+        offsets = (numpy.transpose(struct_el.nonzero()) 
+                   - numpy.asarray(struct_el.shape) // 2)
+        link_from = []
+        link_to = []
+        for off in offsets:
+            if (off == 0).all():
+                continue
+            neighbors = [coord + o for coord, o in zip(coords, off)]
+            inside = numpy.logical_and.reduce(
+                [(neigh >= 0) & (neigh < sha) 
+                 for neigh, sha in zip(neighbors, shape)])
+            from_ind = inside.nonzero()[0]
+            neigh_keys = (
+                boundaryIds[inside].astype('int64') * size 
+                + numpy.ravel_multi_index(
+                    tuple(neigh[inside] for neigh in neighbors), shape))
+            to_ind = numpy.searchsorted(keys, neigh_keys)
+            to_ind[to_ind >= len(keys)] = 0
+            linked = ((keys[to_ind] == neigh_keys) 
+                      & (segmentIds[to_ind] == segmentIds[from_ind]))
+            link_from.append(from_ind[linked])
+            link_to.append(to_ind[linked])
+        link_from = numpy.concatenate(link_from)
+        link_to = numpy.concatenate(link_to)
+
+        # connected contact elements
+        graph = scipy.sparse.coo_matrix(
+            (numpy.ones(len(link_from), dtype=int), (link_from, link_to)),
+            shape=(len(keys), len(keys)))
+        _, elem_comps = scipy.sparse.csgraph.connected_components(
+            graph, directed=False)
+
+        # count components for each (boundary, segment) pair
+        _, first = numpy.unique(elem_comps, return_index=True)
+        comp_pairs = (boundaryIds[first].astype('int64') 
+                      * (segmentIds.max() + 1) + segmentIds[first])
+        pairs, n_contacts = numpy.unique(comp_pairs, return_counts=True)
+        bound_ids = pairs // (segmentIds.max() + 1)
+        seg_ids = pairs % (segmentIds.max() + 1)
+
+        return bound_ids, seg_ids, n_contacts
+
     def countContacts(self, labels=None, contactStructEl=None):
         """
         Work in progress.
@@ -1152,6 +1715,41 @@ class Contact(object):
 
         return good
 
+    def findContactedBoundaries(self, segmentIds):
+        """
+        Finds boundaries contacted by each of the specified segments.
+
+        For each segment, the boundaries found are the same as those returned
+        by findBoundaries(segmentIds=segment_id, nSegment=1), but here the 
+        boundaries are found for all segments in one pass.
+
+        Arguments:
+          - segmentIds: (list or ndarray) segment ids
+
+        Returns: (dict) ndarrays of sorted ids of contacted boundaries 
+        indexed by segment ids
+        """
+
+        # unmasked positive elements sorted by segments and boundaries
+        boundary_ids, segment_ids = self._getPairs(self._valueKeys)
+        positive = (
+            (self._values > 0) & self._isUnmasked(boundary_ids, segment_ids))
+        boundary_ids = boundary_ids[positive]
+        segment_ids = segment_ids[positive]
+        order = numpy.lexsort((boundary_ids, segment_ids))
+        boundary_ids = boundary_ids[order]
+        segment_ids = segment_ids[order]
+
+        # split by segments
+        segmentIds = numpy.asarray(segmentIds, dtype=int)
+        starts = numpy.searchsorted(segment_ids, segmentIds, side='left')
+        ends = numpy.searchsorted(segment_ids, segmentIds, side='right')
+        res = dict(
+            (seg_id, boundary_ids[start:end]) 
+            for seg_id, start, end in zip(segmentIds.tolist(), starts, ends))
+
+        return res
+
     def countContactedBoundaries(self, ids=None):
         """
         Calculates and returns the number of boundaries, among those specified
@@ -1221,10 +1819,11 @@ class Contact(object):
 
     def _countContacted(self, indices, axis, nested=False):
         """
-        Counts number of positive elements of self._n._data along axis.
+        Counts number of positive elements of the contact data structure 
+        along axis.
 
-        Only the elements that are not masked by self._n._mask and have indices
-        along axis are counted. 
+        Only the elements that are not masked and have indices along axis 
+        are counted. 
 
         Elements of indices can be lists, in which case they are considered
         to form one boundary/segment. 
@@ -1273,23 +1872,9 @@ class Contact(object):
             nested_indices = indices
             indices = util_nested.flatten(nested_indices)
 
-        # Note: need to check if multiple comactify / expend occur, or
-        # if this should be in other functions
-        # expand if compactified
-        #was_compact = False
-        #if self.compactified:
-        #    was_compact = True
-        #    self.expand()
-
-        # keep only specified indices along axis
-        try:
-            reduced_n = self._n.take(indices=indices, axis=axis)
-        except(IndexError, ValueError):
-            raise
-
-        # Note: see above
-        # compactify if it was compactified
-        #if was_compact: self.compactify()
+        # count positive and unmasked elements along axis, only for 
+        # specified indices
+        n_positive, n_unmasked = self._reduce(indices=indices, axis=axis)
 
         # calculate by how much the count should be decreased  
         if nested:
@@ -1303,17 +1888,10 @@ class Contact(object):
                     except NameError:
                         overcount = line_n - line_1
 
-        # find number of positives along axis; return all masked if no indices 
-        if len(indices) > 0:
-            # reduced_n is 2-dim because in take() arg indices is a list (above) 
-            res = numpy.sum(reduced_n > 0, axis=axis)
-        else:
-            if axis == 0:
-                max_other_ind = self.getMaxSegment()
-            elif axis == 1:
-                max_other_ind = self.getMaxBoundary()
-            res = ma.zeros(max_other_ind+1, fill_value=self.fillValue)
-            res.mask = True
+        # number of positives along axis, masked if no element is unmasked 
+        # (all masked if no indices) 
+        res = ma.array(
+            n_positive, mask=(n_unmasked == 0), fill_value=self.fillValue)
 
         # reduce by overcount
         if nested:
@@ -27,6 +27,7 @@ import scipy.ndimage as ndimage
 from pyto.grey.image import Image
 #from density import Density
 from .statistics import Statistics
+import pyto.util.labeled_reduction as labeled_reduction
 #from segment import Segment
 #from morphology import Morphology
 
@@ -470,6 +471,10 @@ class Grey(Image):
         If arg regions is None, or no region ids are specified statistics on 
         whole segments is calculated.
 
+        Neighborhoods are determined by 
+        Neighborhood.find_neighborhood_elements() and the statistics for all
+        segments and regions are calculated in one labeled reduction.
+
         All values for segments that are not specifed in ids, regions that are 
         not specifed in regionIds or are more than maxDistance away from segments 
         are set to -1.
@@ -529,40 +534,119 @@ class Grey(Image):
         density.max = numpy.zeros(shape=(max_id+1, max_region_id+1)) - 1
         density.volume = numpy.zeros(shape=(max_id+1, max_region_id+1)) - 1
 
-        # calculate density stats and volume for all region neighborhoods
-        reg_ids = []
-        for reg_id, hood, all_hoods in \
-                segments.generateNeighborhoods(ids=ids, regions=regions, 
-                      regionIds=region_ids, size=size, maxDistance=maxDistance, 
-                      distanceMode=distanceMode, removeOverlap=removeOverlap):
-        
-            # add region id
-            reg_ids.append(reg_id)
-
-            # calculate density statistics and volume for the current region
-            simple = self.getSegmentDensitySimple(segments=hood, ids=ids)
-            
-            # put results in the Density object
-            density.mean[:,reg_id] = simple.mean 
-            density.std[:,reg_id] = simple.std
-            density.min[:,reg_id] = simple.min
-            density.max[:,reg_id] = simple.max
-            density.volume[:,reg_id] = simple.volume
+        # find neighborhood elements of all regions
+        from .segment import Segment
+        from .neighborhood import Neighborhood
+        nbgd = Neighborhood(segments=segments, ids=ids)
+        frame, elements = nbgd.find_neighborhood_elements(
+            regions=regions, ids=ids, region_ids=region_ids, size=size, 
+            max_distance=maxDistance, distance_mode=distanceMode, 
+            remove_overlap=removeOverlap)
+        reg_ids = [reg_id for reg_id, _, _ in elements]
+
+        # greyscale values of neighborhood elements
+        if (size is None) and (len(elements) > 0):
+            # all neighborhoods are the same
+            elements = elements[:1]
+        values = [
+            self._getFrameValues(frame=frame, flat=flat) 
+            for _, flat, _ in elements]
+
+        # calculate density stats and volume for all region neighborhoods 
+        # and all segments in one labeled reduction
+        n_all = max_id + 1
+        if len(elements) > 0:
+            all_values = numpy.concatenate(values)
+            all_labels = numpy.concatenate(
+                [labels.astype(int) + ind * n_all 
+                 for ind, (_, _, labels) in enumerate(elements)])
+        else:
+            all_values = numpy.array([])
+            all_labels = numpy.array([], dtype=int)
+        hood_ids = (
+            numpy.arange(len(elements))[:, numpy.newaxis] * n_all
+            + ids[numpy.newaxis, :])
+        count, mean, std, min_, max_ = labeled_reduction.reduce(
+            values=all_values, labels=all_labels, ids=hood_ids, 
+            modes=['count', 'mean', 'std', 'min', 'max'])
+        count = count.reshape(hood_ids.shape)
+        mean = mean.reshape(hood_ids.shape)
+        std = std.reshape(hood_ids.shape)
+        min_ = numpy.where(numpy.isnan(min_), 0, min_).reshape(hood_ids.shape)
+        max_ = numpy.where(numpy.isnan(max_), 0, max_).reshape(hood_ids.shape)
+
+        # put results in the Density object, segment ids that are not in ids
+        # are set to 0 and all segments together to 0 index
+        for ind, reg_id in enumerate(reg_ids):
+            if size is None:
+                ind = 0
+            for attr, res in [
+                    ('mean', mean), ('std', std), ('min', min_), 
+                    ('max', max_), ('volume', count)]:
+                column = numpy.zeros(max_id+1)
+                column[ids] = res[ind]
+                getattr(density, attr)[:,reg_id] = column
+            density.volume[0,reg_id] = count[ind].sum()
+            hood_values = values[ind]
+            if len(hood_values) > 0:
+                density.mean[0,reg_id] = hood_values.mean()
+                density.std[0,reg_id] = hood_values.std()
+                density.min[0,reg_id] = hood_values.min()
+                density.max[0,reg_id] = hood_values.max()
+
+        # make all neighborhoods together, inset the same as for segments
+        all_hoods = Segment(data=frame.data, ids=ids, copy=False, clean=False)
+        all_hoods.inset = frame.inset
+        hoods_inset = all_hoods.findInset(ids=ids, mode='abs')
+        all_data = numpy.zeros_like(frame.data)
+        for _, flat, labels in elements:
+            all_data.flat[flat] = labels
+        all_hoods.data = all_data
+        if hoods_inset is None:
+            hoods_inset = [slice(0, 0)] * all_hoods.ndim
+        all_hoods.useInset(inset=hoods_inset, mode='abs')
 
         # calculate stats and volume for all regions together on each segment
-        simple = self.getSegmentDensitySimple(segments=all_hoods, ids=ids)
-
-        # put results in data arrays
-        density.mean[:,0] = simple.mean
-        density.std[:,0] = simple.std
-        density.min[:,0] = simple.min
-        density.max[:,0] = simple.max
-        density.volume[:,0] = simple.volume
+        if len(reg_ids) > 0:
+            simple = self.getSegmentDensitySimple(segments=all_hoods, ids=ids)
+
+            # put results in data arrays
+            density.mean[:,0] = simple.mean
+            density.std[:,0] = simple.std
+            density.min[:,0] = simple.min
+            density.max[:,0] = simple.max
+            density.volume[:,0] = simple.volume
         density.ids = copy(segments.ids)
         density.regionIds = numpy.asarray(reg_ids)
 
         return density, all_hoods
 
+    def _getFrameValues(self, frame, flat):
+        """
+        Returns values of this image at elements specified by flat indices 
+        of another image (arg frame).
+
+        Respects insets of frame and self.
+
+        Arguments:
+          - frame: (Image) image that defines flat indices
+          - flat: (ndarray) flat indices in frame.data
+
+        Returns (ndarray) values, ordered as arg flat
+        """
+
+        coords = numpy.array(numpy.unravel_index(flat, frame.data.shape))
+        offset = (
+            numpy.array([sl.start for sl in frame.inset]) 
+            - numpy.array([sl.start for sl in self.inset]))
+        coords = coords + offset[:, numpy.newaxis]
+        if ((coords < 0).any() 
+            or (coords >= numpy.array(self.data.shape)[:, numpy.newaxis]).any()):
+            raise ValueError(
+                "Some of the specified elements are outside of the image.")
+
+        return self.data[tuple(coords)]
+
 
     ##################################################################
     #
@@ -75,6 +75,12 @@ class Hierarchy(Labels):
       eg: {2:[], 3:[], 5:[], 12:[2], 16:[4,5,6], 19:[], 22:[12,16], ...}
       - self.data: ndarray of all segments
 
+    Each element of self.data is labeled by the id of the lowest segment 
+    that contains it. A single level (or any contiguous range of levels) 
+    is obtained from self.data by one lookup table remap, where the lookup 
+    table is made from the compact parent-pointer array over ids (see 
+    getParentIds(), makeLevelLut() and applyLut()).
+
     There might be a number of level-defined properties, whose names are given
     in self.properties. 
 
@@ -649,6 +655,122 @@ class Hierarchy(Labels):
             return top
     topLevel = property(fget=getTopLevel, doc='Position of the top level')
 
+    def getParentIds(self):
+        """
+        Returns compact parent-pointer array over ids, made from 
+        self._higherIds.
+
+        Element i of the returned array is the id directly above id i, or 0 
+        if id i has no higher id or it is not one of self.ids.
+
+        Returns (ndarray) parent ids, length max id + 1 
+        """
+
+        if len(self.ids) > 0:
+            size = max(int(numpy.max(self.ids)), 0) + 1
+        else:
+            size = 1
+        parents = numpy.zeros(size, dtype=int)
+        for l_id, h_id in self._higherIds.items():
+            if (h_id is not None) and (h_id > 0) and (0 < l_id < size):
+                parents[l_id] = h_id
+
+        return parents
+
+    def makeLevelLut(self, level, lower=True, higher=True):
+        """
+        Makes lookup table that converts self.data to data that contains 
+        only the specified level, the specified level together with 
+        all higher levels (arg higher False), or together with all lower 
+        levels (arg lower False). 
+
+        In the lookup table (lut), each id at the specified level is
+        mapped to itself, while other values are mapped as follows:
+          - ids below level, if arg lower is True: to the id of the segment 
+          at level that contains the lower segment, or 0 if there is no 
+          such segment
+          - ids above level, if arg higher is True: 0
+          - other ids and values (including those that are not in self.ids): 
+          to itself
+
+        Arguments:
+          - level: level
+          - lower: flag indicating whether levels below level are removed
+          - higher: flag indicating whether levels above level are removed
+
+        Returns (ndarray) lookup table, to be used by applyLut()
+        """
+
+        parents = self.getParentIds()
+        lut = numpy.arange(len(parents))
+        top_level = self.topLevel
+        if top_level is None:
+            return lut
+
+        # replace lower ids by their ancestors at level
+        if lower and (level > 0):
+            ancestors = numpy.zeros(len(parents), dtype=int)
+            if level <= top_level:
+                level_ids = numpy.asarray(self.getIds(level), dtype=int)
+                ancestors[level_ids] = level_ids
+            for l_level in range(min(level, top_level + 1) - 1, -1, -1):
+                l_ids = numpy.asarray(self.getIds(l_level), dtype=int)
+                ancestors[l_ids] = ancestors[parents[l_ids]]
+                lut[l_ids] = ancestors[l_ids]
+
+        # remove higher ids
+        if higher:
+            for h_level in range(max(level + 1, 0), top_level + 1):
+                h_ids = numpy.asarray(self.getIds(h_level), dtype=int)
+                lut[h_ids] = 0
+
+        return lut
+
+    def applyLut(self, lut, data=None):
+        """
+        Remaps data according to the lookup table (arg lut), in one pass.
+
+        Data values that are outside of the lookup table are not changed.
+        The returned array has the same dtype as data.
+
+        Arguments:
+          - lut: (ndarray) lookup table, as returned by makeLevelLut()
+          - data: (ndarray) data, if None self.data is used
+
+        Returns remapped data (new array)
+        """
+
+        if data is None:
+            data = self.data
+        if data is None:
+            return None
+        if data.size == 0:
+            return data.copy()
+
+        # extend lut if needed
+        max_value = data.max()
+        if max_value >= len(lut):
+            lut = numpy.append(lut, numpy.arange(len(lut), max_value + 1))
+        lut = lut.astype(data.dtype)
+
+        # remap
+        if (data.dtype.kind == 'u') or (data.min() >= 0):
+            new_data = lut[data]
+        else:
+            new_data = numpy.where(data >= 0, lut[numpy.maximum(data, 0)], data)
+
+        return new_data
+
+    def copyWithoutData(self):
+        """
+        Returns a deepcopy of this instance, except that the data array
+        (self.data) is not copied and it is set to None in the copy.
+        """
+        memo = {id(self.data): None}
+        inst = deepcopy(self, memo)
+        inst.data = None
+        return inst
+
     def removeData(self, ids=None, level=None):
         """
         Remove segments labeled by ids from data. Elements of each removed 
@@ -1265,55 +1387,34 @@ class Hierarchy(Labels):
 
         # make a copy if needed
         if new:
-            inst = deepcopy(self)
-            # workaround for bug #906 in numpy 1.1.1
-            if numpy.__version__ == '1.1.1':
-                try:
-                    inst.contacts._n._mask = deepcopy(self.contacts._n._mask)
-                except AttributeError:
-                    pass
+            inst = self.copyWithoutData()
+            inst.data = self.data
         else:
             inst = self
 
-        # replace lower level ids by the appropriate level id
-        # (faster, 18.09.08)
-        if inst.topLevel > 0:
-            rm_ids = []
-            slices = ndimage.find_objects(inst.data)
-            for h_id in inst.getIds(level=level):
-                l_ids = inst.getLowerIds(id_=h_id, mode='all')
-                inst.data = inst._remove(data=inst.data, remove=l_ids, 
-                                         all=inst.ids, mode='remove', 
-                                         value=h_id, slices=slices)
-
-        # remove all other lower level ids
-        rm_ids = []
-        for l_level in range(level):
-            rm_ids.extend(inst.getIds(level=l_level))
-        inst.data = inst._remove(data=inst.data, remove=rm_ids, all=inst.ids)
-
-        # slower, before 18.09.08
-        # find all ids to be removed
-        # rm_levels = range(level)
-        #rm_ids = []
-        #for curr_level in rm_levels:
-        #    rm_ids.extend(inst.getIds(level=curr_level))
-            
-        # find higher ids of rm_ids on level
-        #higher_ids = inst.findHigherIds(ids=rm_ids, level=level, mode='single')
-
-        # remove levels in data
-        #rm_order = dict(zip(rm_ids, higher_ids))
-        #inst.data = inst.reorder(order=rm_order, data=inst.data)
+        # replace lower level ids by the appropriate level id and remove
+        # all other lower level ids (one pass over data)
+        lut = inst.makeLevelLut(level=level, lower=True, higher=False)
+        inst.data = inst.applyLut(lut=lut, data=inst.data)
 
         # remove properties and ids
-        rm_levels = list(range(level))
-        inst.removeProperties(level=rm_levels)
-        inst.removeIds(level=rm_levels)
+        inst._removeLowerLevelIds(level=level)
 
         # return if new
         if new: return inst
 
+    def _removeLowerLevelIds(self, level):
+        """
+        Removes ids and properties of levels below (arg) level, but does not 
+        change data.
+
+        Argument:
+          - level: levels below this one are removed
+        """
+        rm_levels = list(range(level))
+        self.removeProperties(level=rm_levels)
+        self.removeIds(level=rm_levels)
+
     def removeHigherLevels(self, level, new=False):
         """
         Removes segments that are above (argument) level. Segments, ids and
@@ -1334,40 +1435,36 @@ class Hierarchy(Labels):
         
         # make a copy if needed
         if new:
-            inst = deepcopy(self)
-            # workaround for bug #906 in numpy 1.1.1
-            if numpy.__version__ == '1.1.1':
-                try:
-                    inst.contacts._n._mask = deepcopy(self.contacts._n._mask)
-                except AttributeError:
-                    pass
+            inst = self.copyWithoutData()
+            inst.data = self.data
         else:
             inst = self
 
-        # remove levels from top down
-        rm_levels = list(range(level+1, self.topLevel+1))
-        rm_levels.reverse()
+        # remove segments from data (one pass over data)
+        lut = inst.makeLevelLut(level=level, lower=False, higher=True)
+        inst.data = inst.applyLut(lut=lut, data=inst.data)
 
-        # remove segments from data
-        #rm_ids = []
-        for cur_level in rm_levels:
-            rm_ids = inst.getIds(level=cur_level)
-            inst.data = self._remove(data=inst.data, remove=rm_ids,
-                                     all=self.ids, mode='remove')
+        # remove properties and ids
+        inst._removeHigherLevelIds(level=level)
 
-            # same as above but slower (16.09.08, r130)
-            #rm_order = dict(zip(rm_ids, [0]*len(rm_ids)))
-            #inst.data = inst.reorder(order=rm_order, data=inst.data)
+        # return if new
+        if new: return inst
 
-            # remove properties
-            #for cur_level in rm_levels:
-            inst.removeProperties(cur_level)
+    def _removeHigherLevelIds(self, level):
+        """
+        Removes ids and properties of levels above (arg) level, but does not 
+        change data.
 
-            # remove ids
-            inst.removeIds(level=cur_level)
+        Argument:
+          - level: levels above this one are removed
+        """
 
-        # return if new
-        if new: return inst
+        # remove levels from top down
+        rm_levels = list(range(level+1, self.topLevel+1))
+        rm_levels.reverse()
+        for cur_level in rm_levels:
+            self.removeProperties(cur_level)
+            self.removeIds(level=cur_level)
 
     def extractLevel(self, level, new=False):
         """
@@ -1393,19 +1490,16 @@ class Hierarchy(Labels):
         """
         # make a copy if needed
         if new:
-            inst = deepcopy(self)
-            # workaround for bug #906 in numpy 1.1.1
-            if numpy.__version__ == '1.1.1':
-                try:
-                    inst.contacts._n._mask = deepcopy(self.contacts._n._mask)
-                except AttributeError:
-                    pass
+            inst = self.copyWithoutData()
+            inst.data = self.data
         else:
             inst = self
 
-        # remove levels above and below this level
-        inst.removeHigherLevels(level=level)
-        inst.removeLowerLevels(level=level)
+        # remove levels above and below this level (one pass over data)
+        lut = inst.makeLevelLut(level=level, lower=True, higher=True)
+        inst.data = inst.applyLut(lut=lut, data=inst.data)
+        inst._removeHigherLevelIds(level=level)
+        inst._removeLowerLevelIds(level=level)
 
         # return if new
         if new: return inst
@@ -1718,11 +1812,14 @@ class Hierarchy(Labels):
         mor = Morphology(segments=self.data, ids=self.ids)
         vol = mor.getVolume()
 
-        # for each segment add voulmes of all segments directly below the segment
-        for level in range(1, self.topLevel+1):
-            for id_ in self.getIds(level):
-                for l_id in self.getLowerIds(id_):
-                    vol[id_] += vol[l_id]
+        # for each segment add voulmes of all segments directly below the 
+        # segment, going up along the id tree 
+        parents = self.getParentIds()
+        for level in range(self.topLevel):
+            l_ids = numpy.asarray(self.getIds(level), dtype=int)
+            h_ids = parents[l_ids]
+            has_higher = (h_ids > 0)
+            numpy.add.at(vol, h_ids[has_higher], vol[l_ids[has_higher]])
 
         # return
         if ids is None:
@@ -20,10 +20,12 @@ import sys
 import logging
 import inspect
 from copy import copy
+import concurrent.futures
 
 import numpy
 import scipy
 import scipy.ndimage as ndimage
+import scipy.spatial
 
 from .features import Features
 from .statistics import Statistics
@@ -748,7 +750,8 @@ class Morphology(Features):
 
     def getLength(
             self, segments, boundaries, contacts, ids=None, distance='b2b', 
-            structElConn=1, line='straight', mode='min', position=False):
+            structElConn=1, line='straight', mode='min', position=False,
+            nJobs=1):
         """
         Calculates lengts of segments specified by (args) segments and ids. The
         segments can contact exactly one or two boundaries. 
@@ -823,6 +826,8 @@ class Morphology(Features):
           - position: flag indicating if the positions of the contact points
           used for the length measurment are calculated and returned, 
           used only for mode='min'
+          - nJobs: number of processes used to calculate straight line 
+          lengths, 1 to calculate them in the current process
           
         Return:
           - length: if pos is False
@@ -854,57 +859,74 @@ class Morphology(Features):
                 + "Defined values are 'b2b', 'boundary', 'c2c', 'contact', "
                 + "'b2c' and 'c2c', 'b-max' and 'c-max'.")
 
+        # find boundaries
+        b_ids = contacts.findContactedBoundaries(segmentIds=ids)
+        ids = [seg_id for seg_id in ids if len(b_ids[seg_id]) == n_bound]
+
+        # straight lines for all segments at once
+        if (n_bound == 1) or ((line == 'straight') and (mode == 'min')):
+            if line != 'straight':
+                logging.warning(
+                    'Sorry, the only implemented line mode for segment '
+                    + "length calculation is 'straight'. Continuing "
+                    + "using line mode 'straight'.")
+            res = self._getStraightLengths(
+                segments=segments, boundaries=boundaries, ids=ids, 
+                boundaryIds=b_ids, distance=distance, structEl=struct_el, 
+                position=position, nJobs=nJobs)
+            if position:
+                length, position_1, position_2 = res
+            else:
+                length = res
+            ids = []
+        else:
+            length = numpy.zeros(self.maxId+1) - 1
+            if position:
+                position_1 = numpy.zeros(
+                    (self.maxId+1, self.ndim), dtype='int') - 1
+                position_2 = numpy.zeros(
+                    (self.maxId+1, self.ndim), dtype='int') - 1
+
         # save original insets
         seg_data, seg_inset = segments.getDataInset()
         seg_inset = copy(seg_inset)
         bound_data, bound_inset = boundaries.getDataInset()
         bound_inset = copy(bound_inset)
 
-        # find length for each segment
-        length = numpy.zeros(self.maxId+1) - 1
-        if position:
-            position_1 = numpy.zeros((self.maxId+1, self.ndim), dtype='int') - 1
-            position_2 = numpy.zeros((self.maxId+1, self.ndim), dtype='int') - 1
+        # find length for each remaining segment
         for seg_id in ids:
 
-            # find boundaries
-            b_ids = contacts.findBoundaries(segmentIds=seg_id, nSegment=1)
-
-            # use appropriate method to get the length of this segment
-            if len(b_ids) == n_bound:
-
-                # use smaller arrays for calculations
-                
-                segments.makeInset(ids=[seg_id], extend=1, expand=True)
-                boundaries.useInset(
-                    inset=segments.inset, mode='abs', expand=True)
-
-                # calculate 
-                if n_bound == 1:
-                    res = self._getSingleLength1Bound(
-                        segments=segments, boundaries=boundaries, 
-                        boundaryIds=b_ids, id_=seg_id, distance=distance, 
-                        structEl=struct_el, line=line, position=position)
-                elif n_bound == 2:
-                    res = self._getSingleLength2Bound(
-                        segments=segments, boundaries=boundaries, 
-                        boundaryIds=b_ids, id_=seg_id, distance=distance, 
-                        structEl=struct_el, line=line, mode=mode,
-                        position=position)
-                    
-                # parse result
-                if position:
-                    length[seg_id] = res[0]
-                    position_1[seg_id] = [pos + ins.start for pos, ins \
-                                              in zip(res[1], segments.inset)]
-                    position_2[seg_id] = [pos + ins.start for pos, ins \
-                                              in zip(res[2], segments.inset)]
-                else:
-                    length[seg_id] = res
+            # use smaller arrays for calculations
+            segments.makeInset(ids=[seg_id], extend=1, expand=True)
+            boundaries.useInset(
+                inset=segments.inset, mode='abs', expand=True)
+
+            # calculate 
+            if n_bound == 1:
+                res = self._getSingleLength1Bound(
+                    segments=segments, boundaries=boundaries, 
+                    boundaryIds=b_ids[seg_id], id_=seg_id, distance=distance, 
+                    structEl=struct_el, line=line, position=position)
+            elif n_bound == 2:
+                res = self._getSingleLength2Bound(
+                    segments=segments, boundaries=boundaries, 
+                    boundaryIds=b_ids[seg_id], id_=seg_id, distance=distance, 
+                    structEl=struct_el, line=line, mode=mode,
+                    position=position)
+
+            # parse result
+            if position:
+                length[seg_id] = res[0]
+                position_1[seg_id] = [pos + ins.start for pos, ins \
+                                          in zip(res[1], segments.inset)]
+                position_2[seg_id] = [pos + ins.start for pos, ins \
+                                          in zip(res[2], segments.inset)]
+            else:
+                length[seg_id] = res
 
-                # recover full data
-                segments.setDataInset(data=seg_data, inset=seg_inset)
-                boundaries.setDataInset(data=bound_data, inset=bound_inset)
+            # recover full data
+            segments.setDataInset(data=seg_data, inset=seg_inset)
+            boundaries.setDataInset(data=bound_data, inset=bound_inset)
 
         # assign attributes
         self.length = length
@@ -920,6 +942,249 @@ class Morphology(Features):
         else:
             return length
 
+    def _getStraightLengths(
+            self, segments, boundaries, ids, boundaryIds, distance, 
+            structEl, position=False, nJobs=1):
+        """
+        Calculates straight line lengths of all specified segments.
+
+        The length of a segment that contacts one boundary is the max 
+        distance between segment elements and the contact region. The length
+        of a segment that contacts two boundaries is the min distance between
+        the two contact regions.
+
+        Contact elements of all segments are found in one pass over the 
+        neighboring segment and boundary elements. Distances are calculated 
+        between contact (and segment) element coordinates for each segment 
+        separately (see _getStraightLength()), in (arg) nJobs processes. The
+        results (including the positions) are the same as those obtained by
+        _getSingleLength1Bound() and _getSingleLength2Bound().
+
+        Arguments:
+          - segments, boundaries, distance, position: see getLength()
+          - ids: ids of segments that contact the number of boundaries 
+          required by arg distance
+          - boundaryIds: (dict) ids of boundaries contacted by each segment
+          - structEl: structuring element used to detect contacts
+          - nJobs: number of processes
+
+        Returns: length or (length, position_1, position_2) in the same
+        form as getLength()
+        """
+
+        # initialize results
+        length = numpy.zeros(self.maxId+1) - 1
+        position_1 = numpy.zeros((self.maxId+1, self.ndim), dtype='int') - 1
+        position_2 = numpy.zeros((self.maxId+1, self.ndim), dtype='int') - 1
+
+        # contact types
+        if distance in ['b-max', 'b2b', 'boundary']:
+            types = ['b', 'b']
+        elif distance in ['c-max', 'c2c', 'contact']:
+            types = ['c', 'c']
+        elif distance == 'b2c':
+            types = ['b', 'c']
+        elif distance == 'c2b':
+            types = ['c', 'b']
+        one_bound = (distance == 'b-max') or (distance == 'c-max')
+        if one_bound:
+            types = types[:1]
+
+        if len(ids) > 0:
+
+            # use an inset containing all segments and their neighbors
+            seg_data, seg_inset = segments.getDataInset()
+            seg_inset = copy(seg_inset)
+            bound_data, bound_inset = boundaries.getDataInset()
+            bound_inset = copy(bound_inset)
+            segments.makeInset(ids=ids, extend=1, expand=True)
+            boundaries.useInset(inset=segments.inset, mode='abs', expand=True)
+            shape = segments.data.shape
+            offset = numpy.array([ins.start for ins in segments.inset])
+
+            # neighboring segment and boundary elements (flat indices)
+            seg_flat, bound_flat = self._getContactPairs(
+                segments=segments.data, boundaries=boundaries.data, 
+                structEl=structEl)
+            seg_labels = segments.data.ravel()[seg_flat]
+            good = numpy.isin(seg_labels, ids)
+            seg_flat = seg_flat[good]
+            bound_flat = bound_flat[good]
+            seg_labels = seg_labels[good]
+            bound_labels = boundaries.data.ravel()[bound_flat]
+            seg_all = numpy.nonzero(
+                numpy.isin(segments.data.ravel(), ids))[0]
+            seg_all_labels = segments.data.ravel()[seg_all]
+
+            # recover full data
+            segments.setDataInset(data=seg_data, inset=seg_inset)
+            boundaries.setDataInset(data=bound_data, inset=bound_inset)
+
+            # contact elements of each segment
+            elements = []
+            for index, type_ in enumerate(types):
+                contacted = numpy.zeros(self.maxId+1, dtype=int) - 1
+                contacted[ids] = [boundaryIds[seg_id][index] 
+                                  for seg_id in ids]
+                good = contacted[seg_labels] == bound_labels
+                if type_ == 'b':
+                    flat = bound_flat[good]
+                elif type_ == 'c':
+                    flat = seg_flat[good]
+                elements.append(self._groupElements(
+                    labels=seg_labels[good], flat=flat, ids=ids, shape=shape))
+            if one_bound:
+                elements.append(self._groupElements(
+                    labels=seg_all_labels, flat=seg_all, ids=ids, shape=shape))
+
+            # lengths
+            args = [(points_1, points_2, one_bound, position) 
+                    for points_1, points_2 in zip(*elements)]
+            if nJobs > 1:
+                with concurrent.futures.ProcessPoolExecutor(
+                        max_workers=nJobs) as executor:
+                    results = list(executor.map(
+                        self._getStraightLength, *zip(*args),
+                        chunksize=max(1, len(args) // (4 * nJobs))))
+            else:
+                results = [self._getStraightLength(*arg) for arg in args]
+
+            # parse results
+            for seg_id, res in zip(ids, results):
+                if position:
+                    length[seg_id] = res[0]
+                    position_1[seg_id] = res[1] + offset
+                    position_2[seg_id] = res[2] + offset
+                else:
+                    length[seg_id] = res
+
+        if position:
+            return length, position_1, position_2
+        else:
+            return length
+
+    @staticmethod
+    def _getContactPairs(segments, boundaries, structEl):
+        """
+        Finds all pairs of neighboring segment and boundary elements.
+
+        Arguments:
+          - segments, boundaries: (ndarrays of the same shape) segments and
+          boundaries data
+          - structEl: structuring element that defines neighbors
+
+        Returns (segment_flat, boundary_flat): flat indices of segment and
+        boundary elements of all pairs
+        """
+
+        shape = numpy.array(segments.shape)
+        strides = numpy.array(
+            [numpy.prod(shape[axis+1:], dtype=int) 
+             for axis in range(len(shape))])
+        center = numpy.array(structEl.shape) // 2
+        seg_flat = []
+        bound_flat = []
+        for shift in numpy.transpose(numpy.nonzero(structEl)) - center:
+            if not shift.any():
+                continue
+
+            # segment elements with boundary neighbors at the current shift
+            seg_slice = tuple(
+                slice(max(-sh, 0), sh_len - max(sh, 0)) 
+                for sh, sh_len in zip(shift, shape))
+            bound_slice = tuple(
+                slice(max(sh, 0), sh_len - max(-sh, 0)) 
+                for sh, sh_len in zip(shift, shape))
+            pairs = numpy.nonzero(
+                (segments[seg_slice] > 0) & (boundaries[bound_slice] > 0))
+            flat = numpy.ravel_multi_index(
+                [pos + sl.start for pos, sl in zip(pairs, seg_slice)], 
+                segments.shape)
+            seg_flat.append(flat)
+            bound_flat.append(flat + numpy.dot(shift, strides))
+
+        if len(seg_flat) == 0:
+            return numpy.array([], dtype=int), numpy.array([], dtype=int)
+        return numpy.concatenate(seg_flat), numpy.concatenate(bound_flat)
+
+    @staticmethod
+    def _groupElements(labels, flat, ids, shape):
+        """
+        Groups elements by labels.
+
+        Arguments:
+          - labels: labels of elements
+          - flat: flat indices of elements (array of shape arg shape), 
+          the same element can be given more than once
+          - ids: ids of labels 
+          - shape: array shape
+
+        Returns: list where each element contains coordinates of all 
+        elements having the corresponding label (ndarray n_elements x ndim),
+        ordered by flat indices.
+        """
+
+        # remove repeated and sort by labels and flat indices 
+        size = numpy.prod(shape, dtype=int)
+        keys = numpy.unique(numpy.asarray(labels, dtype=int) * size + flat)
+        sorted_labels = keys // size
+        coords = numpy.transpose(numpy.unravel_index(keys % size, shape))
+
+        # split by labels
+        starts = numpy.searchsorted(sorted_labels, ids, side='left')
+        ends = numpy.searchsorted(sorted_labels, ids, side='right')
+        groups = [coords[start:end] for start, end in zip(starts, ends)]
+
+        return groups
+
+    @staticmethod
+    def _getStraightLength(points_1, points_2, oneBound, position=False):
+        """
+        Calculates straight line length of one segment.
+
+        If arg oneBound is True, the length is the max distance between 
+        segment elements (arg points_2) and their closest contact element 
+        (arg points_1). Otherwise it is the min distance between contact
+        elements points_1 and points_2. 
+
+        Ties are resolved in the same way as in _getSingleLength1Bound() and 
+        _getSingleLength2Bound(), that is by the lowest flat index.
+
+        Arguments:
+          - points_1, points_2: (ndarrays n_points x ndim) coordinates,
+          ordered by flat indices
+          - oneBound: flag indicating one boundary 
+          - position: flag indicating if positions are returned
+
+        Returns: length, or (length, position_1, position_2) if arg position
+        is True
+        """
+
+        if (len(points_1) == 0) or (len(points_2) == 0):
+            raise ValueError("Can't calculate distance_function ",
+                             "(no background)")
+
+        # distances to the closest points_1
+        dist, _ = scipy.spatial.cKDTree(points_1).query(points_2)
+        if oneBound:
+            index_2 = dist.argmax()
+        else:
+            index_2 = dist.argmin()
+        length = dist[index_2]
+        if not position:
+            return length
+
+        # positions
+        pos_2 = points_2[index_2]
+        if oneBound:
+            sq_dist = ((points_2 - pos_2)**2).sum(axis=1)
+            pos_1 = points_2[sq_dist.argmax()]
+        else:
+            sq_dist = ((points_1 - pos_2)**2).sum(axis=1)
+            pos_1 = points_1[sq_dist.argmin()]
+
+        return length, pos_1, pos_2
+
     def _getSingleLength1Bound(
             self, segments, id_, boundaries, boundaryIds, distance, 
             structEl, line='straight', position=False):
@@ -990,6 +1255,10 @@ class Morphology(Features):
             # position of the contact max point
             pos_1 = ndimage.maximum_position(input=dist, labels=local_seg.data)
 
+            # positions in respect to segments inset
+            pos_1, pos_2 = [
+                [pos + ins.start for pos, ins in zip(pos_, inset)]
+                for pos_ in (pos_1, pos_2)]
             return length, pos_1, pos_2
 
         return length
@@ -1097,6 +1366,9 @@ class Morphology(Features):
                     dist_2 = ndimage.distance_transform_edt(input=~point_2)
                 pos_1 = ndimage.minimum_position(input=dist_2, labels=contact_1)
 
+                pos_1, pos_2 = [
+                    [pos + ins.start for pos, ins in zip(pos_, inset)]
+                    for pos_ in (pos_1, pos_2)]
                 return length, pos_1, pos_2
 
             return length
@@ -1153,6 +1425,9 @@ class Morphology(Features):
                 pos_2 = ndimage.minimum_position(input=mid_dist, 
                                                  labels=contact_2)
 
+                pos_1, pos_2 = [
+                    [pos + ins.start for pos, ins in zip(pos_, inset)]
+                    for pos_ in (pos_1, pos_2)]
                 return length, pos_1, pos_2
 
             return length
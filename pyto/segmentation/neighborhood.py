@@ -13,6 +13,7 @@ import numpy as np
 import scipy as sp
 import scipy.ndimage as ndimage
 
+import pyto.util.labeled_reduction as labeled_reduction
 from .segment import Segment
 from .features import Features
 from .morphology import Morphology
@@ -197,7 +198,7 @@ class Neighborhood(Features):
 
         If multiple elements of segment are at the minimal distance to the
         region, only one of them is selected as the closest element
-        (according to the output of scipy.ndimage.extrema()).
+        (the first one in the array order, like scipy.ndimage.extrema()).
 
         The distance between a region and segments is calculated according to 
         the arg distance_mode. First the (min) distance between segments and 
@@ -212,6 +213,9 @@ class Neighborhood(Features):
         positioning (before using insets) has to be the same in both self.data
         and regions.data arrays.
 
+        The neighborhoods are determined by find_neighborhood_elements(),
+        this method only converts them to images.
+
         Arguments:
           - ids: segment ids
           - regions: (Segment) regions
@@ -229,6 +233,84 @@ class Neighborhood(Features):
           - all neighborhoods: (Segment) all neighborhoods together
         """
 
+        # parse arguments
+        if ids is None:
+            ids = self.ids
+        ids = np.asarray(ids)
+
+        # find neighborhoods
+        seg, elements = self.find_neighborhood_elements(
+            regions=regions, ids=ids, region_ids=region_ids, size=size,
+            max_distance=max_distance, distance_mode=distance_mode,
+            remove_overlap=remove_overlap)
+
+        # make Segment to hold all neighborhoods
+        all_hoods = Segment(data=seg.data, ids=ids, copy=False, clean=False)
+        all_hoods.inset = seg.inset
+        all_hoods.makeInset(ids=ids)
+        all_hoods.data = np.zeros_like(all_hoods.data)
+
+        # make neighborhoods for each region id
+        for reg_id, flat, labels in elements:
+
+            # make hood data
+            if size is not None:
+                hood_data = np.zeros_like(seg.data)
+                hood_data.flat[flat] = labels
+            else:
+                hood_data = seg.data
+
+            # make hood instance
+            hood = Segment(data=hood_data, ids=ids, copy=(size is None))
+            hood.inset = seg.inset
+
+            # add the current hood to all hoods
+            hood.useInset(inset=all_hoods.inset, mode='abs')
+            all_hoods.data = np.where(hood.data>0, 
+                                         hood.data, all_hoods.data)
+
+            # yield
+            yield reg_id, hood, all_hoods
+
+    def find_neighborhood_elements(
+        self, regions, ids=None, region_ids=None, size=None, 
+        max_distance=None, distance_mode='min', remove_overlap=False):
+        """
+        Finds elements of neighborhoods of each specified region on each of 
+        the segments.
+
+        Neighborhoods are defined in the same way as in 
+        generate_neighborhoods() (see the doc there for the arguments), but
+        instead of making a neighborhood image for each region, only the 
+        neighborhood elements are returned. This is meant for calculations
+        that are done on all neighborhoods together.
+
+        Distances to a region are calculated by one distance transform for 
+        each region. If max_distance is specified, the distance transform 
+        is limited to the region inset extended by max_distance. The 
+        closest elements of all segments are then found in one labeled 
+        reduction and a neighborhood is made from the elements of a
+        segment that are within size/2 of the closest element (no distance 
+        transform needed).
+
+        If size is None, neighborhoods comprise whole segments, as in
+        generate_neighborhoods(). In this case the same flat and labels
+        arrays are used for all regions.
+
+        Respects inset in both self and regions, without changing them.
+
+        Arguments: the same as in generate_neighborhoods()
+
+        Returns (segments, elements):
+          - segments: (Segment) segments specified by ids, with the inset 
+          that contains these segments and all regions specified by 
+          region_ids, used as the frame for the neighborhood elements
+          - elements: list containing (region_id, flat, labels) for each 
+          region that is not further than max_distance from segments, where 
+          flat are flat indices (in segments.data, ordered) and labels the 
+          segment ids of the neighborhood elements
+        """
+
         # parse arguments
         if ids is None:
             ids = self.ids
@@ -241,10 +323,11 @@ class Neighborhood(Features):
         self_inset = self.segments.inset
         self_data = self.segments.data
         reg_inset = regions.inset
-        reg_data = regions.data.copy()
+        reg_data = regions.data
 
         # make a working copy of an inset of this instance and clean it
-        self.segments.makeInset(ids=ids, additional=regions, additionalIds=region_ids)
+        self.segments.makeInset(
+            ids=ids, additional=regions, additionalIds=region_ids)
         seg = Segment(data=self.segments.data, ids=ids, copy=True, clean=True)
         seg.inset = self.segments.inset
 
@@ -252,11 +335,6 @@ class Neighborhood(Features):
         self.segments.inset = self_inset
         self.segments.data = self_data
 
-        # save current seg
-        # not needed anymore because seg.data is not changed
-        #seg_inset = seg.inset
-        #seg_data = seg.data
-
         # find regions that are not further than max_distance to segments
         if max_distance is not None:
 
@@ -272,96 +350,96 @@ class Neighborhood(Features):
             region_ids = ((dist <= max_distance) & (dist >= 0)).nonzero()[0]
             region_ids = region_ids.compress(region_ids>0)
 
-        # make Segment to hold all neighborhoods
-        all_hoods = Segment(data=seg.data, ids=ids, copy=False, clean=False)
-        all_hoods.inset = seg.inset
-        all_hoods.makeInset(ids=ids)
-        all_hoods.data = np.zeros_like(all_hoods.data)
+        # whole segments
+        if size is None:
+            flat = np.flatnonzero(seg.data)
+            labels = seg.data.flat[flat]
+            elements = [(reg_id, flat, labels) for reg_id in region_ids]
+            return seg, elements
+
+        # regions in the segments frame and region insets
+        # Note: not copying, so reg_frame should not be modified
+        reg_frame = regions.useInset(
+            inset=seg.inset, mode='abs', expand=True, value=0,
+            update=False, returnCopy=False)
+        reg_slices = ndimage.find_objects(reg_frame)
 
-        # make neighborhoods for each region id
+        # make a neighbourhood of each region on each segment
+        elements = []
         for reg_id in region_ids:
 
-            # make insets that contain segments and the current region id
-            inset_curr = seg.findInset(
-                ids=ids, mode='abs', additional=regions, additionalIds=[reg_id])
-            seg_curr = seg.makeInset(
-                ids=ids, additional=regions, additionalIds=[reg_id],
-                update=False, returnCopy=True)
-            regions.useInset(inset=inset_curr, mode='abs')
+            # find region inset (relative to the frame)
+            try:
+                reg_sl = reg_slices[reg_id-1]
+            except IndexError:
+                reg_sl = None
+            if reg_sl is None:
+                continue
+            if max_distance is not None:
+                ext = int(np.floor(max_distance))
+                box = tuple(
+                    slice(max(sl.start - ext, 0), min(sl.stop + ext, dim))
+                    for sl, dim in zip(reg_sl, seg.data.shape))
+            else:
+                box = tuple(slice(0, dim) for dim in seg.data.shape)
+            box_start = np.array([sl.start for sl in box])
 
             # distances to the current region
-            reg_dist_in = np.where(regions.data==reg_id, 0, 1)
-            if (reg_dist_in > 0).all():  # workaround for scipy bug 1089
+            reg_box = (reg_frame[box] == reg_id)
+            if reg_box.all():  # workaround for scipy bug 1089
                 raise ValueError("Can't calculate distance_function ",
                                  "(no background)")
             else:
-                reg_dist = ndimage.distance_transform_edt(reg_dist_in)
+                reg_dist = ndimage.distance_transform_edt(~reg_box)
 
+            # segments close to the current region
+            seg_curr = seg.data[box]
             if max_distance is not None:
-                seg_curr[reg_dist > max_distance] = 0
-                
+                seg_curr = np.where(reg_dist > max_distance, 0, seg_curr)
+
             # if a region overlaps with a segment remove the overlap and warn
-            if remove_overlap and \
-                   ((seg_curr > 0) & (regions.data == reg_id)).any():
-                seg_curr = np.where(regions.data==reg_id, 0, seg_curr)
+            if remove_overlap and ((seg_curr > 0) & reg_box).any():
+                seg_curr = np.where(reg_box, 0, seg_curr)
                 logging.warning(
                     "Density.calculateNeighbourhood: region " 
                     + str(reg_id) + " overlap with segments." 
                     + "Removed the overlap from segments." )
 
-            # make a neighbourhood of current region on each segment
-            if size is not None:
-
-                hood_data = np.zeros_like(seg_curr)
-                for seg_id in ids:
-
-                    # find the closest point on the current segment
-                    min_, _, min_pos, max_pos = \
-                        ndimage.extrema(input=reg_dist, labels=seg_curr,
-                                        index=seg_id)
-
-                    # find inset that contains only the current segment 
-                    fine_inset = ndimage.find_objects(seg_curr==seg_id)
-                    try:
-                        fine_inset = fine_inset[0]
-                    except IndexError:
-                        continue
-
-                    # prepare input distance array for hood 
-                    hood_in = np.ones(shape=seg_curr.shape)
-                    hood_in[min_pos] = 0
-
-                    # make hood for this region and segment
-                    if (hood_in[fine_inset] > 0).all():  # workaround for
-                                                         # scipy bug 1089
-                        raise ValueError("Can't calculate distance_function ",
-                                         "(no background)")
-                    else:
-                        hood_dist = ndimage.distance_transform_edt(
-                            hood_in[fine_inset])
-                    fine_hood_data = hood_data[fine_inset]
-                    fine_seg = seg_curr[fine_inset]
-                    fine_hood_data[
-                        (fine_seg == seg_id) & (hood_dist <= size/2.)] = seg_id
-
+            # find the closest point on each segment
+            count, closest = labeled_reduction.reduce(
+                values=reg_dist, labels=seg_curr, ids=ids, 
+                modes=['count', 'argmin'])
+            closest = np.array(
+                np.unravel_index(closest[count > 0], seg_curr.shape)).T
+            seg_slices = ndimage.find_objects(seg_curr)
+
+            # make hood for each segment 
+            hood_flat = []
+            hood_labels = []
+            for seg_id, min_pos in zip(ids[count > 0], closest):
+                fine_inset = seg_slices[seg_id-1]
+                fine_coords = np.ogrid[fine_inset]
+                sq_dist = sum(
+                    (coord - pos)**2 for coord, pos 
+                    in zip(fine_coords, min_pos))
+                fine_hood = (
+                    (seg_curr[fine_inset] == seg_id)
+                    & (np.sqrt(sq_dist) <= size/2.))
+                coords = [
+                    nz + sl.start + start for nz, sl, start 
+                    in zip(fine_hood.nonzero(), fine_inset, box_start)]
+                hood_flat.append(
+                    np.ravel_multi_index(coords, seg.data.shape))
+                hood_labels.append(np.zeros(len(coords[0]), dtype=int) + seg_id)
+
+            # put elements in the frame order
+            if len(hood_flat) > 0:
+                hood_flat = np.concatenate(hood_flat)
+                hood_labels = np.concatenate(hood_labels)
             else:
-                hood_data = seg.data
-
-            # make hood instance
-            hood = Segment(data=hood_data, ids=ids, copy=True)
-            hood.inset = seg.inset
-
-            # add the current hood to all hoods
-            hood.useInset(inset=all_hoods.inset, mode='abs')
-            all_hoods.data = np.where(hood.data>0, 
-                                         hood.data, all_hoods.data)
-                
-            # revert to initial insets and data
-            #seg.inset = seg_inset
-            #seg.data = seg_data
-            regions.inset = reg_inset
-            regions.data = reg_data
-
-            # yield
-            yield reg_id, hood, all_hoods
+                hood_flat = np.array([], dtype=int)
+                hood_labels = np.array([], dtype=int)
+            order = np.argsort(hood_flat, kind='stable')
+            elements.append((reg_id, hood_flat[order], hood_labels[order]))
 
+        return seg, elements
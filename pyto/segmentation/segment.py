@@ -24,9 +24,13 @@ import itertools
 import numpy
 import scipy
 import scipy.ndimage as ndimage
+import scipy.sparse
+import scipy.sparse.csgraph
+import scipy.spatial
 
 from .struct_el import StructEl
 import pyto.util.numpy_plus as numpy_plus
+import pyto.util.labeled_reduction as labeled_reduction
 import pyto.util.nested as nested
 from .labels import Labels
 
@@ -1680,41 +1684,11 @@ class Segment(Labels):
             for id_ in ids:
                 distances[id_] = dist_array[tuple(centers[id_])]
 
-        elif mode == 'min':
+        elif mode in ['min', 'max', 'mean', 'median']:
 
-            # min distance to segments
-            for id_ in ids:
-                try:
-                    distances[id_] = (dist_array[seg_data==id_]).min()
-                except ValueError:
-                    if (seg_data==id_).sum() == 0:
-                        distances[id_] = numpy.nan
-                    else:
-                        raise
-
-        elif mode == 'max':
-
-            # max distance to segments
-            for id_ in ids:
-                try:
-                    distances[id_] = (dist_array[seg_data==id_]).max()
-                except ValueError:
-                    if (seg_data==id_).sum() == 0:
-                        distances[id_] = numpy.nan
-                    else:
-                        raise
-
-        elif mode == 'mean':
-
-            # mean distance to segments
-            for id_ in ids:
-                distances[id_] = (dist_array[seg_data==id_]).mean()
-
-        elif mode == 'median':
-
-            # mean distance to segments
-            for id_ in ids:
-                distances[id_] = numpy.median(dist_array[seg_data==id_])
+            # min / max / mean / median distance to segments, all at once
+            distances[ids] = labeled_reduction.reduce(
+                values=dist_array, labels=seg_data, ids=ids, modes=mode)
 
         else:
             raise ValueError("Sorry, mode: " + mode + " is not recognized. " \
@@ -1728,6 +1702,18 @@ class Segment(Labels):
         """
         Calculate pairwise distances between segments with ids.
 
+        Distances are calculated between boundary elements of segments 
+        (see getBoundaryElements()) because the closest elements of two 
+        segments always lie on their boundaries. For each pair of segments, 
+        the nearest neighbor search (kd-tree) is done only for the 
+        elements of the smaller segment that are not further from the 
+        bounding box of the other segment than an already found distance
+        between the two segments. 
+
+        The distances are the same as the (min) distances calculated
+        by distanceToRegion(), but there is no need for a distance 
+        transform for each segment.
+
         Arguments:
           - ids: (list or ndarray) segment ids (default self.ids)
           - mode: currently only 'min' implemented
@@ -1736,7 +1722,8 @@ class Segment(Labels):
           - ndarray (length n*(n-1)/2, where n = len(ids)) of distances, where 
           the first n-1 elements are distances between ids[0] and each of 
           ids[1:], the next n-2 elements are distances between ids[1] and each
-          of ids[2:], and so on.
+          of ids[2:], and so on. Distances involving segments that do not
+          exist are numpy.nan.
           - None if ids is None or contain no elements
         """
 
@@ -1748,38 +1735,127 @@ class Segment(Labels):
         ids = numpy.array(ids)
         if (ids is None) or (len(ids) == 0):
             return None
+        if (len(ids) > 1) and (mode != 'min'):
+            raise ValueError("Currently only 'min' mode is implemented.")
 
-        # reduce and copy data (not using makeInset to avoid copying whole 
+        # reduce data (not using makeInset to avoid copying whole 
         # segments.data)
         inset = ndimage.find_objects(self.data>0)[0]
-        seg = Segment(data=self.data[inset], ids=ids, copy=True, clean=True)
+
+        # boundary elements and kd-trees for each segment 
+        coords, labels = self.getBoundaryElements(
+            ids=ids, data=self.data[inset])
+        sort_ind = numpy.argsort(labels, kind='stable')
+        coords = coords[sort_ind]
+        labels = labels[sort_ind]
+        uniq_ids, starts, counts = numpy.unique(
+            labels, return_index=True, return_counts=True)
+        elements = {}
+        for id_, start, count in zip(uniq_ids, starts, counts):
+            id_coords = coords[start:start+count]
+            elements[id_] = (
+                id_coords, id_coords.min(axis=0), id_coords.max(axis=0),
+                scipy.spatial.cKDTree(id_coords))
 
         # find distances
-        distance = numpy.array([])
-        while(len(ids) > 1):
+        n_ids = len(ids)
+        distance = numpy.zeros(n_ids * (n_ids - 1) // 2) + numpy.nan
+        dist_ind = 0
+        for main_ind, main_id in enumerate(ids[:-1]):
+            for id_ in ids[main_ind+1:]:
+                try:
+                    distance[dist_ind] = self._findPairDistance(
+                        elements[main_id], elements[id_])
+                except KeyError:
+                    pass
+                dist_ind += 1
 
-            # set ids and main_id 
-            main_id = seg.ids[0]
-            ids = seg.ids[1:]
+        return distance
 
-            # find distances for current main_id
-            if mode == 'min':
-                dist = seg.distanceToRegion(ids=ids, regionId=main_id, 
-                                            mode=mode)
-            else:
-                raise ValueError("Currently only 'min' mode is implemented.")
+    @staticmethod
+    def _findPairDistance(elements_1, elements_2):
+        """
+        Finds min distance between two segments specified by their 
+        elements.
 
-            # append current distances
-            try:
-                distance = numpy.append(distance, dist[ids])
-            except NameError:
-                distance = dist[ids]
+        Arguments:
+          - elements_1, elements_2: (coords, low, high, kd-tree) 
+          elements of segments, where coords are element coordinates,
+          low and high bounding box corners and kd-tree is made from coords
+
+        Returns (float) min distance
+        """
 
-            # remove main_id and adjust inset
-            seg.remove(ids=main_id, all=seg.ids, mode='remove')
-            seg.makeInset()
+        # query elements of the smaller segment
+        if len(elements_1[0]) > len(elements_2[0]):
+            elements_1, elements_2 = elements_2, elements_1
+        coords, _, _, _ = elements_1
+        _, low, high, tree = elements_2
 
-        return distance
+        # distances from elements to the other bounding box 
+        to_box = numpy.sqrt(
+            ((coords - numpy.clip(coords, low, high))**2).sum(axis=1))
+
+        # upper bound from the element closest to the bounding box 
+        closest_ind = to_box.argmin()
+        upper, _ = tree.query(coords[closest_ind])
+
+        # search only elements that may be closer than upper
+        candidates = coords[to_box <= upper]
+        dist, _ = tree.query(
+            candidates, distance_upper_bound=numpy.nextafter(upper, numpy.inf))
+        min_dist = min(upper, dist.min())
+
+        return min_dist
+
+    def getBoundaryElements(self, ids=None, data=None):
+        """
+        Finds boundary elements of segments.
+
+        Boundary elements are segment elements that have at least one 
+        neighbor (direct, sharing a face) that does not belong to the same
+        segment, or that lie on the data array edge. Contrary to 
+        makeSurfaces(), elements that neighbor other segments are 
+        boundary elements.
+
+        Arguments:
+          - ids: segment ids (default self.ids)
+          - data: segments array (default self.data)
+
+        Returns (coords, labels):
+          - coords: (ndarray n_elements x n_dim) coordinates of boundary 
+          elements, in respect to the data array
+          - labels: (ndarray n_elements) segment ids of boundary elements
+        """
+
+        # parse arguments
+        if data is None:
+            data = self.data
+        if ids is None:
+            ids = self.ids
+        labels = numpy.where(numpy.isin(data, ids), data, 0)
+
+        # elements that differ from a neighbor, or are on the array edges
+        boundary = numpy.zeros(labels.shape, dtype=bool)
+        for axis in range(labels.ndim):
+            low = [slice(None)] * labels.ndim
+            high = [slice(None)] * labels.ndim
+            low[axis] = slice(None, -1)
+            high[axis] = slice(1, None)
+            differ = (labels[tuple(low)] != labels[tuple(high)])
+            boundary[tuple(low)] |= differ
+            boundary[tuple(high)] |= differ
+            low[axis] = 0
+            high[axis] = -1
+            boundary[tuple(low)] = True
+            boundary[tuple(high)] = True
+        boundary &= (labels > 0)
+
+        # coordinates and labels
+        coords = numpy.argwhere(boundary)
+        labels = labels[boundary]
+
+        return coords, labels
 
     def generateNeighborhoods(
         self, regions, ids=None, regionIds=None, size=None, 
@@ -1908,8 +1984,10 @@ class Segment(Labels):
         (specified by arg ids) to a given region (arg region). 
 
         If args structure and footprint are specified, they are used directly
-        to calculate distances. The calculations are based on 
-        scipy.ndimage.grey_dilation().
+        to calculate distances. The distances are the same as those obtained
+        by repeated scipy.ndimage.grey_dilation() within each segment, but 
+        they are calculated for all segments together by a shortest path
+        algorithm (see self._geodesicDistance()).
 
         If arg connectivity is an int, the standard geodesic distance for the 
         specified connectivity is calculated. Specifically, the structuring 
@@ -1953,53 +2031,18 @@ class Segment(Labels):
             raise ValueError("Either both structure and footprint arguments "
                              + "have to be specified, or just connectivity.") 
 
-        # initialize distances
-        # there might be a better way 'cause numpy.infty makes float array
-        dist = numpy.zeros(shape=self.data.shape, 
-                           dtype=structure.dtype) - numpy.infty
-        dist[region] = 0
-
-        # calculate distances for each id
-        for id_ in ids:
-
-            # initialize distances for this segment
-            dist_id = numpy.zeros(shape=self.data.shape, 
-                                  dtype=structure.dtype) - numpy.infty
-            dist_id[region] = 0
-
-            # make a mask for the current segment 
-            seg = numpy.zeros(shape=self.data.shape, dtype=bool)
-            seg[self.data == id_] = True
-
-            # dilate as many times as needed
-            for index in range(dist.size):
-
-                # dilate but keep only the current segment
-                dil = scipy.ndimage.grey_dilation(
-                    dist_id, structure=-structure, footprint=footprint, 
-                    mode='constant', cval=-numpy.infty)
-                dist_new = numpy.where(seg, dil, dist_id)
-
-                # finish if not changed
-                if (dist_new == dist_id).all():
-                    break
-                else:
-                    dist_id = dist_new
-
-            else:
-                raise RuntimeError("Dilations don't stop")
-
-            # add to the main dist
-            dist[seg] = dist_id[seg]
+        # elements of region and of all segments
+        if region.dtype != bool:
+            region = region > 0
+        all_seg = numpy.isin(self.data, ids)
 
-        # make distance positive and set elements outside segments
-        dist = -dist
-        dist[dist==numpy.infty] = noDistance
+        # shortest paths from region for all segments together
+        dist = self._geodesicDistance(
+            segments=all_seg, region=region, structure=structure, 
+            footprint=footprint)
 
-        # set distances at region
-        all_seg = numpy.zeros(shape=self.data.shape, dtype=bool)
-        for id_ in ids:
-            all_seg[self.data == id_] = True
+        # set elements outside segments and at region
+        dist[~all_seg | (dist == numpy.inf)] = noDistance
         dist[region & ~all_seg] = noDistance
         dist[region & all_seg] = 0
 
@@ -2009,6 +2052,84 @@ class Segment(Labels):
 
         return dist
         
+    def _geodesicDistance(self, segments, region, structure, footprint):
+        """
+        Calculates geodesic distance from region for each element of 
+        segments.
+
+        The distance is calculated along paths that start at region and
+        continue within a single segment (segments are given by self.data
+        ids at elements of arg segments). Neighbors and the distance between 
+        them are given by footprint and structure, respectively. That is, 
+        two elements separated by vector o are neighbors if o is an element 
+        of footprint (in respect to its center), and the distance between 
+        them is the value of structure at o. This is the same as repeating 
+        scipy.ndimage.grey_dilation() of -distance (with structure=-structure
+        and footprint) within each segment separately until the distances 
+        do not change.
+
+        All segments are processed together, using a multi-source shortest
+        path (Dijkstra) algorithm on the graph formed by segment elements 
+        and region elements that neighbor them.
+
+        Arguments:
+          - segments: (ndarray of bools) elements of segments
+          - region: (ndarray of bools) region
+          - structure: (ndarray) structuring element, non-negative
+          - footprint: (ndarray of bools) footprint
+
+        Returns: (ndarray of floats, shape the same as self.data) distances,
+        numpy.inf where not calculated.
+        """
+
+        # segment elements that are not in region (graph edges lead to them)
+        shape = self.data.shape
+        labels = self.data.ravel()
+        loc_region = region.ravel()
+        seg_flat = numpy.flatnonzero(segments & ~region)
+        seg_coords = numpy.array(numpy.unravel_index(seg_flat, shape)).T
+        seg_labels = labels[seg_flat]
+
+        # edges from neighbors that are in region or in the same segment 
+        center = numpy.array(footprint.shape) // 2
+        from_flat = [numpy.array([], dtype=int)]
+        to_flat = [numpy.array([], dtype=int)]
+        weights = [numpy.array([])]
+        for position in zip(*footprint.nonzero()):
+            offset = numpy.array(position) - center
+            if not offset.any():
+                continue
+            neighbors = seg_coords - offset
+            inside = ((neighbors >= 0) & (neighbors < shape)).all(axis=1)
+            neighbor_flat = numpy.ravel_multi_index(neighbors[inside].T, shape)
+            connected = (loc_region[neighbor_flat] 
+                         | (labels[neighbor_flat] == seg_labels[inside]))
+            from_flat.append(neighbor_flat[connected])
+            to_flat.append(seg_flat[inside][connected])
+            weights.append(
+                numpy.zeros(connected.sum()) + structure[tuple(position)])
+
+        # graph nodes 
+        dist = numpy.zeros(shape=shape) + numpy.inf
+        nodes = numpy.union1d(
+            numpy.flatnonzero(segments & region), 
+            numpy.concatenate([seg_flat] + from_flat))
+        sources = numpy.flatnonzero(loc_region[nodes])
+        if len(sources) == 0:
+            return dist
+
+        # shortest paths from region
+        graph = scipy.sparse.csr_matrix(
+            (numpy.concatenate(weights), 
+             (numpy.searchsorted(nodes, numpy.concatenate(from_flat)),
+              numpy.searchsorted(nodes, numpy.concatenate(to_flat)))), 
+            shape=(len(nodes), len(nodes)))
+        node_dist = scipy.sparse.csgraph.dijkstra(
+            graph, directed=True, indices=sources, min_only=True)
+        dist.ravel()[nodes] = node_dist
+
+        return dist
+
     def getStructureFootprint(self, connectivity):
         """
         Returns special (non-flat) forms of structuring element and footprint.
@@ -18,6 +18,8 @@ import scipy
 import scipy.ndimage as ndimage
 import numpy
 
+import pyto.util.labeled_reduction as labeled_reduction
+
 
 class Statistics(object):
     """
@@ -309,20 +311,22 @@ class Statistics(object):
           - axis: axis defining the direction of the ndim-1 dimensional planes
         """
 
-        # initialize
-        slicedLabels = numpy.zeros(self.labels.shape, dtype=self.labels.dtype)
-        sliceObj = [slice(None)] * self.labels.ndim
-
-        # slice each segment (label) separately
-        for id in self._ids:
+        # slice coordinate (along axis) for each id, -1 for other labels
+        ids = numpy.asarray(self._ids, dtype=int)
+        max_label = max(self.labels.max(), ids.max(initial=0))
+        slice_pos = numpy.zeros(max_label+1, dtype=int) - 1
+        slice_pos[ids] = numpy.asarray(sliceCoord)[ids, axis]
+        slice_pos[0] = -1
 
-            # make a mask defining the slice
-            sliceObj[axis] = slice(sliceCoord[id,axis], sliceCoord[id,axis]+1) 
-            mask = numpy.zeros(self.labels.shape, dtype=bool)
-            mask[tuple(sliceObj)] = True
+        # coordinates along axis
+        coord_shape = [1] * self.labels.ndim
+        coord_shape[axis] = self.labels.shape[axis]
+        coord = numpy.arange(self.labels.shape[axis]).reshape(coord_shape)
 
-            # intersect the mask with (this id) labels and add to sliceLabels
-            slicedLabels += (mask & (self.labels == id)) * id
+        # keep labels that lie on their slices, all labels at once
+        on_slice = (slice_pos[numpy.maximum(self.labels, 0)] == coord)
+        slicedLabels = numpy.where(
+            on_slice, self.labels, 0).astype(self.labels.dtype)
 
         # set self.labels
         self.labels = slicedLabels
@@ -410,12 +414,10 @@ class Statistics(object):
             dtypes=(float, float, float, float, int, int))
 
         # do calculations for each segment separately
-        self.mean[self._ids] = ndimage.mean(
-            input=self.data, labels=self.labels, index=self._ids)
-        self.std[self._ids] = ndimage.standard_deviation(
-            input=self.data, labels=self.labels, index=self._ids)
-        extr = ndimage.extrema(input=self.data, labels=self.labels, 
-                               index=self._ids)
+        (self.mean[self._ids], self.std[self._ids], self.min[self._ids], 
+         self.max[self._ids], self.minPos[self._ids], 
+         self.maxPos[self._ids]) = self._reduce(labels=self.labels, 
+                                                ids=self._ids)
 
         # figure out if 0 is the only id
         zero_id = False
@@ -426,41 +428,66 @@ class Statistics(object):
 
         # do calculations for all segments together
         if not zero_id:
-            from .segment import Segment
-            seg = Segment()
-            locLabels = seg.keep(ids=self._ids, data=self.labels.copy())
-            self.mean[0] = ndimage.mean(input=self.data, labels=locLabels,
-                                        index=None)
-            self.std[0] = ndimage.standard_deviation(
-                input=self.data, labels=locLabels, index=None)
-            extr0 = ndimage.extrema(input=self.data, labels=locLabels, 
-                                    index=None)
-
-        # put extrema for individual labels in data arrays
-        (self.min[self._ids], self.max[self._ids]) = (extr[0], extr[1])
-        #self.max[self._ids] = -numpy.array(extr_bug[0])
-        if (self._ids.size == 1) and not isinstance(extr[2], list):
-            self.minPos[self._ids] = [extr[2]]
-            self.maxPos[self._ids] = [extr[3]]
-            #self.maxPos[self._ids] = [extr_bug[2]]
-        else:
-            self.minPos[self._ids] = extr[2]
-            self.maxPos[self._ids] = extr[3]
-            #self.maxPos[self._ids] = extr_bug[3]
+            all_flat = numpy.flatnonzero(numpy.isin(self.labels, self._ids))
+            all_values = self.data.ravel()[all_flat]
+            if len(all_values) > 0:
+                self.mean[0] = all_values.mean()
+                self.std[0] = all_values.std()
+                self.min[0] = all_values.min()
+                self.max[0] = all_values.max()
+                min_pos = numpy.unravel_index(
+                    all_flat[all_values.argmin()], self.data.shape)
+                max_pos = numpy.unravel_index(
+                    all_flat[all_values.argmax()], self.data.shape)
+                if self.ndim == 1:
+                    self.minPos[0] = min_pos[0]
+                    self.maxPos[0] = max_pos[0]
+                else:
+                    self.minPos[0] = min_pos
+                    self.maxPos[0] = max_pos
+
+    def _reduce(self, labels, ids):
+        """
+        Calculates mean, std, min, max, min position and max position of 
+        self.data for all segments (labels) specified by ids in one pass 
+        (see pyto.util.labeled_reduction).
 
-        # put total extrema in data arrays at index 0  
-        if not zero_id:
-            (self.min[0], self.max[0]) = (extr0[0], extr0[1])
-            #self.max[0] = -extr0_bug[0]
-            if self.ndim == 1:
-                self.minPos[0] = extr0[2][0]
-                self.maxPos[0] = extr0[3][0]
-                #self.maxPos[0] = extr0_bug[2][0]
-            else:
-                self.minPos[0] = extr0[2]
-                self.maxPos[0] = extr0[3]
-                #self.maxPos[0] = extr0_bug[2]
+        The results are the same as those obtained by the corresponding
+        scipy.ndimage functions. Min and max of segments that do not 
+        exist are 0, while mean and std are nan. If there are more than one
+        min (max) positions, the first one is returned.
+
+        Arguments:
+          - labels: (ndarray) labels
+          - ids: segment ids
+
+        Returns: mean, std, min, max, min_pos, max_pos, where each is an
+        ndarray indexed like arg ids, and positions are given as indices 
+        along axis 1 (squeezed for 1d data)
+        """
         
+        # reduce
+        mean, std, min_, max_, min_pos, max_pos = labeled_reduction.reduce(
+            values=self.data, labels=labels, ids=ids, 
+            modes=['mean', 'std', 'min', 'max', 'argmin', 'argmax'])
+
+        # non-existing segments
+        min_ = numpy.where(numpy.isnan(min_), 0, min_)
+        max_ = numpy.where(numpy.isnan(max_), 0, max_)
+        min_pos = numpy.where(min_pos < 0, 0, min_pos)
+        max_pos = numpy.where(max_pos < 0, 0, max_pos)
+        
+        # positions
+        min_pos = numpy.array(
+            numpy.unravel_index(min_pos, self.data.shape)).transpose()
+        max_pos = numpy.array(
+            numpy.unravel_index(max_pos, self.data.shape)).transpose()
+        if self.ndim == 1:
+            min_pos = min_pos[:, 0]
+            max_pos = max_pos[:, 0]
+
+        return mean, std, min_, max_, min_pos, max_pos
+
     def _calculateSingleId(self):
         """
         Calculates statistics (see method calculate) when ids is a single 
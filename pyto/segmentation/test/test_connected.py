@@ -230,6 +230,63 @@ class TestConnected(np_test.TestCase):
         common.bound_1in.useInset(
             inset=[slice(1, 7), slice(1, 9)], mode='abs', expand=True)
 
+    def testMakeSweep(self):
+        """
+        Tests makeSweep()
+        """
+
+        # compare with make()
+        thresh = [3, 1, 5, 7, 6, 2, 0, 4]
+        for count in [False, True]:
+            for b_count in ['at_least', 'exact']:
+                image_data = common.image_1.data.copy()
+                bound_data = common.bound_1.data.copy()
+                tr_res = []
+                for conn, contacts, tr in Connected.makeSweep(
+                        image=common.image_1, boundary=common.bound_1, 
+                        thresh=thresh, boundaryIds=[3, 4], mask=5, 
+                        nBoundary=1, boundCount=b_count, count=count):
+                    desired_conn, desired_contacts = Connected.make(
+                        image=common.image_1, boundary=common.bound_1, 
+                        thresh=tr, boundaryIds=[3, 4], mask=5, nBoundary=1,
+                        boundCount=b_count, count=count)
+                    np_test.assert_equal(conn.ids, desired_conn.ids)
+                    np_test.assert_equal(conn.data, desired_conn.data)
+                    np_test.assert_equal(conn.inset, desired_conn.inset)
+                    np_test.assert_equal(
+                        contacts._n.filled(), desired_contacts._n.filled())
+                    tr_res.append(tr)
+                np_test.assert_equal(tr_res, list(range(8)))
+                np_test.assert_equal(image_data, common.image_1.data)
+                np_test.assert_equal(bound_data, common.bound_1.data)
+
+        # boundary inset, mask Segment smaller inset (inside boundaries)
+        mask = Segment(data=numpy.where(common.bound_1in.data==5, 1, 0))
+        mask.setInset(inset=[slice(1,7), slice(1,9)], mode='abs')
+        mask.useInset([slice(2,6), slice(2,9)], mode='abs')
+        image_inset = copy(common.image_1.inset)
+        bound_inset = copy(common.bound_1in.inset)
+        for conn, contacts, tr in Connected.makeSweep(
+                image=common.image_1, boundary=common.bound_1in, 
+                thresh=[1, 2, 4], boundaryIds=[3, 4], mask=mask, nBoundary=1,
+                boundCount='at_least'):
+            np_test.assert_equal(image_inset, common.image_1.inset)
+            np_test.assert_equal(bound_inset, common.bound_1in.inset)
+            if tr == 2:
+                np_test.assert_equal(conn.ids, [1,2])
+                np_test.assert_equal(conn.data.shape, (6,8))
+                np_test.assert_equal(conn.inset, [slice(1,7), slice(1,9)])
+                desired = numpy.zeros((6,8), dtype=int)
+                desired[1:5, 1:8] = numpy.array(
+                    [[1, 0, 0, 0, 2, 2, 0],
+                     [1, 0, 0, 0, 0, 2, 0],
+                     [0, 0, 0, 0, 0, 2, 0],
+                     [0, 0, 0, 0, 0, 2, 0]])
+                np_test.assert_equal(conn.data, desired)
+                np_test.assert_equal(
+                    contacts.findSegments(boundaryIds=[3, 4], nBoundary=1),
+                    [1, 2])
+
 
     def id_correspondence(self, actual, desired):
         """
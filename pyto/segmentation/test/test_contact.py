@@ -68,13 +68,13 @@ class TestContact(np_test.TestCase):
         """
 
         contacts = Contact()
+        mask = numpy.zeros(shape=(4,5), dtype=bool)
+        mask[0:1,0:1] = True
         contacts._n = numpy.ma.array(
             [[0, 0, 0, 0, 0],
              [0, 0, 1, 1, 0], 
              [0, 0, 0, 0, 0],
-             [0, 0, 1, 0, 1]])
-        contacts._n._mask = numpy.zeros(shape=(4,5), dtype=bool)
-        contacts._n._mask[0:1,0:1] = True
+             [0, 0, 1, 0, 1]], mask=mask)
         np_test.assert_equal(contacts.segments, [1, 2, 3, 4])
         np_test.assert_equal(contacts.boundaries, [1, 2, 3])
         # prehaps this should be the correct behavior
@@ -111,6 +111,93 @@ class TestContact(np_test.TestCase):
         np_test.assert_equal(contacts.getN(boundaryId=4), [-99, 11, 0, 33, 44])
         np_test.assert_equal(contacts.getN(segmentId=3), [-99, 0, 3, 0, 33])
 
+    def testAddBoundaryPairs(self):
+        """
+        Tests addBoundaryPairs()
+        """
+
+        # compare with addBoundary()
+        desired = Contact()
+        desired.addBoundary(id=2, nContacts=[0, 1, 0, 3])
+        desired.addBoundary(id=4, nContacts=[0, 11, 0, 33, 44])
+        desired.addBoundary(id=1, nContacts=[0, 7, 0, 0, 0])
+        contacts = Contact()
+        contacts.addBoundaryPairs(
+            ids=[2, 4, 1], boundaryIds=[2, 2, 4, 4, 4, 1], 
+            segmentIds=[1, 3, 1, 3, 4, 1], nContacts=[1, 3, 11, 33, 44, 7])
+        np_test.assert_equal(contacts.maxBoundary, 4)
+        np_test.assert_equal(contacts.maxSegment, 4)
+        np_test.assert_equal(contacts._n.mask, desired._n.mask)
+        np_test.assert_equal(contacts._n.filled(), desired._n.filled())
+
+        # no contacts
+        contacts = Contact()
+        contacts.addBoundaryPairs(ids=[3], boundaryIds=[], segmentIds=[])
+        np_test.assert_equal(contacts._n.shape, [4, 1])
+        np_test.assert_equal(contacts.boundaries, [])
+        contacts.addBoundaryPairs(ids=[1, 2], boundaryIds=[1], segmentIds=[2])
+        np_test.assert_equal(contacts.getN(boundaryId=1), [-99, 0, 1])
+        np_test.assert_equal(contacts.getN(boundaryId=2), [-99, 0, 0])
+
+    def testStorage(self):
+        """
+        Tests the sparse contact data structure and its conversion from and 
+        to the dense (masked array) form.
+        """
+
+        # only non-zero values stored
+        contacts = Contact()
+        contacts.addBoundary(id=2, nContacts=[-1, 1, 0, 3])
+        contacts.addBoundary(id=4, nContacts=[-1, 11, 0, 33, 44])
+        np_test.assert_equal(len(contacts._values), 5)
+        np_test.assert_equal(contacts.getN(boundaryId=4, segmentId=[1, 3]), 
+                             [11, 33])
+
+        # masked values are kept 
+        contacts.removeBoundaries(ids=[4])
+        contacts.removeContact(boundaryId=2, segmentId=3)
+        np_test.assert_equal(contacts.boundaries, [2])
+        np_test.assert_equal(
+            contacts.getN(boundaryId=2).mask, [True, False, False, True, True])
+        contacts._recoverBoundary(boundaryId=4)
+        contacts._recoverContact(boundaryId=2, segmentId=3)
+        np_test.assert_equal(contacts.getN(boundaryId=4), [-99, 11, 0, 33, 44])
+        np_test.assert_equal(contacts.getN(boundaryId=2), [-99, 1, 0, 3, -99])
+        
+        # dense form
+        dense = numpy.ma.array(
+            [[0, 0, 0, 0],
+             [0, 2, 0, 1], 
+             [0, 0, 5, 0]],
+            mask=[[1, 1, 1, 1],
+                  [1, 0, 0, 1],
+                  [1, 1, 1, 1]])
+        contacts = Contact()
+        contacts._n = dense
+        np_test.assert_equal(contacts._n.mask, dense.mask)
+        np_test.assert_equal(contacts._n.data, dense.data)
+        np_test.assert_equal(contacts.boundaries, [1])
+        np_test.assert_equal(contacts.segments, [1, 2])
+
+        # old (dense) pickled form
+        state = {'_n':dense, 'compactified':False, 'fillValue':-1}
+        contacts = Contact.__new__(Contact)
+        contacts.__setstate__(state)
+        np_test.assert_equal(contacts._n.mask, dense.mask)
+        np_test.assert_equal(contacts._n.data, dense.data)
+
+        # old compactified pickled form
+        state = {
+            '_n':None, 'compactified':True, 'fillValue':-1, 
+            '_boundaries':numpy.array([1]), '_segments':numpy.array([1, 2]),
+            '_compact':numpy.ma.array([[2, 0]])}
+        contacts = Contact.__new__(Contact)
+        contacts.__setstate__(state)
+        contacts.expand()
+        np_test.assert_equal(contacts.compactified, False)
+        np_test.assert_equal(contacts._n.mask, dense.mask[:2, :3])
+        np_test.assert_equal(contacts.getN(boundaryId=1), [-99, 2, 0])
+
     def testCountContacted(self):
         """
         Tests contContactedBoundaries() and countCountedSegments()
@@ -177,6 +264,27 @@ class TestContact(np_test.TestCase):
             contacts.countContactedBoundaries(ids=[[2,4], 2]), 
             [-99, 2, 0, 2, 1])
 
+    def testFindContactedBoundaries(self):
+        """
+        Tests findContactedBoundaries()
+        """
+
+        contacts = Contact()
+        contacts.addBoundary(id=2, nContacts=[-1, 1, 0, 3, 2])
+        contacts.addBoundary(id=4, nContacts=[-1, 0, 0, 2, 1])
+        contacts.addBoundary(id=1, nContacts=[-1, 0, 0, 1, 0])
+        contacts.removeContact(segmentId=4, boundaryId=4)
+        res = contacts.findContactedBoundaries(segmentIds=[1, 2, 3, 4, 7])
+        np_test.assert_equal(res[1], [2])
+        np_test.assert_equal(res[2], [])
+        np_test.assert_equal(res[3], [1, 2, 4])
+        np_test.assert_equal(res[4], [2])
+        np_test.assert_equal(res[7], [])
+        for seg_id in [1, 2, 3, 4]:
+            np_test.assert_equal(
+                res[seg_id],
+                contacts.findBoundaries(segmentIds=seg_id, nSegment=1))
+
     def testFindContacts(self):
         """
         Tests findContacts()
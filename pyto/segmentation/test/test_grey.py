@@ -64,6 +64,54 @@ class TestGrey(np_test.TestCase):
         np_test.assert_equal(actual.volume[self.shapes.ids],
                              [ 9, 21, 13,  7])
         
+    def testNeighbourhoodDensity(self):
+        """
+        Tests getNeighbourhoodDensity()
+        """
+
+        # setup
+        bound_data = numpy.zeros((10, 10), dtype=int)
+        bound_data[3, 1:9] = 2
+        bound_data[8, 1:9] = 3
+        bound = Segment(data=bound_data)
+        seg_data = numpy.zeros((10, 10), dtype=int)
+        seg_data[4:8, 2] = 1
+        seg_data[4:6, 4:7] = 4
+        seg = Segment(data=seg_data)
+        grey = Grey(numpy.arange(100, dtype=float).reshape((10, 10)))
+
+        # size
+        density, hood = grey.getNeighbourhoodDensity(
+            segments=seg, regions=bound, size=2)
+        np_test.assert_equal(density.regionIds, [2, 3])
+        np_test.assert_almost_equal(density.mean[[1, 4], 2], [47, 143/3.])
+        np_test.assert_almost_equal(density.mean[[1, 4], 3], [67, 51])
+        np_test.assert_almost_equal(density.std[1, 2], 5)
+        np_test.assert_almost_equal(density.min[[1, 4], 3], [62, 44])
+        np_test.assert_almost_equal(density.max[[1, 4], 3], [72, 55])
+        np_test.assert_equal(density.volume[[0, 1, 4], 2], [5, 2, 3])
+        np_test.assert_equal(density.volume[[0, 1, 4], 3], [5, 2, 3])
+        np_test.assert_almost_equal(density.mean[0, 2], 47.4)
+        np_test.assert_equal(density.volume[[1, 4], 0], [4, 4])
+        np_test.assert_equal(density.mean[2:4, 2], [0, 0])
+        np_test.assert_equal(density.mean[:, 1], -1)
+
+        # max distance
+        density, hood = grey.getNeighbourhoodDensity(
+            segments=seg, regions=bound, size=2, maxDistance=2)
+        np_test.assert_equal(density.regionIds, [2, 3])
+        np_test.assert_equal(density.volume[[0, 1, 4], 3], [2, 2, 0])
+        np_test.assert_equal(numpy.isnan(density.mean[4, 3]), True)
+        np_test.assert_almost_equal(density.mean[0, 3], 67)
+
+        # whole segments
+        density, hood = grey.getNeighbourhoodDensity(
+            segments=seg, regions=bound, size=None)
+        simple = grey.getSegmentDensitySimple(segments=seg)
+        for reg_id in [0, 2, 3]:
+            np_test.assert_almost_equal(density.mean[:, reg_id], simple.mean)
+            np_test.assert_equal(density.volume[:, reg_id], simple.volume)
+
     def testLabelByBins(self):
         """
         Tests labelByBins()
@@ -210,6 +210,76 @@ class TestHierarchy(np_test.TestCase):
             else:
                 np_test.assert_equal(tc.levelIds, [])
 
+    def testMakeLevelLut(self):
+        """
+        Tests getParentIds(), makeLevelLut() and applyLut()
+        """
+
+        tc = self.instantiateTC1()
+
+        # parent ids
+        parents = tc.getParentIds()
+        for l_id in tc.ids:
+            h_id = tc.getHigherId(l_id)
+            if h_id is None:
+                h_id = 0
+            np_test.assert_equal(parents[l_id], h_id)
+
+        # each level alone, compare with hard-coded data
+        for level in range(tc.topLevel + 1):
+            lut = tc.makeLevelLut(level=level)
+            data = tc.applyLut(lut=lut)
+            np_test.assert_equal(data[2:6, 1:9], common.data_1[level])
+            outside = numpy.ones(data.shape, dtype=bool)
+            outside[2:6, 1:9] = False
+            np_test.assert_equal(data[outside], 0)
+            np_test.assert_equal(tc.data is data, False)
+
+        # desired data made id by id
+        def relabel(level, lower, higher):
+            desired = tc.data.copy()
+            level_ids = tc.getIds(level)
+            for id_ in tc.ids:
+                id_level = tc.getIdLevels(id_)
+                if higher and (id_level > level):
+                    desired[tc.data == id_] = 0
+                elif lower and (id_level < level):
+                    new_id = id_
+                    while (new_id > 0) and (new_id not in level_ids):
+                        new_id = tc.getHigherId(new_id)
+                    desired[tc.data == id_] = new_id
+            return desired
+
+        # keep lower levels
+        level = 3
+        lut = tc.makeLevelLut(level=level, lower=False, higher=True)
+        data = tc.applyLut(lut=lut)
+        np_test.assert_equal(
+            data, relabel(level=level, lower=False, higher=True))
+        removed = tc.removeHigherLevels(level=level, new=True)
+        np_test.assert_equal(data, removed.data)
+
+        # keep higher levels
+        lut = tc.makeLevelLut(level=level, lower=True, higher=False)
+        data = tc.applyLut(lut=lut)
+        np_test.assert_equal(
+            data, relabel(level=level, lower=True, higher=False))
+        removed = tc.removeLowerLevels(level=level, new=True)
+        np_test.assert_equal(data, removed.data)
+
+        # level alone, made id by id
+        for level in range(tc.topLevel + 1):
+            lut = tc.makeLevelLut(level=level)
+            np_test.assert_equal(
+                tc.applyLut(lut=lut), 
+                relabel(level=level, lower=True, higher=True))
+
+        # values outside of lut
+        lut = numpy.array([0, 2, 2])
+        np_test.assert_equal(
+            tc.applyLut(lut=lut, data=numpy.array([[0, 1, 2, 5]])),
+            [[0, 2, 2, 5]])
+
     def testRemove(self):
         """
         Tests remove (implicitly tests removeData and removeIds).
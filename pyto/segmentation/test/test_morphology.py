@@ -423,7 +423,49 @@ class TestMorphology(TestCase):
         mor.getLength(segments=seg, boundaries=bound, contacts=con, 
                       distance='c2c', line='straight', position=False)
         assert_almost_equal(mor.length[seg.ids], [0])
-        
+
+        # positions when boundaries do not span the segment inset
+        bound_data = numpy.array(
+            [[0, 0, 2, 0, 0],
+             [0, 0, 0, 0, 0],
+             [0, 0, 0, 0, 0],
+             [0, 0, 0, 0, 0],
+             [0, 0, 0, 4, 0]])
+        seg_data = numpy.array(
+            [[0, 0, 0, 0, 0],
+             [0, 1, 1, 0, 0],
+             [0, 0, 1, 0, 0],
+             [0, 0, 1, 1, 0],
+             [0, 0, 0, 0, 0]])
+        seg = Segment(data=seg_data)
+        bound = Segment(data=bound_data)
+        con = Contact()
+        con.findContacts(segment=seg, boundary=bound)
+        for n_jobs in [1, 2]:
+            mor = Morphology()
+            mor.getLength(segments=seg, boundaries=bound, contacts=con,
+                          distance='b2b', line='straight', position=True,
+                          nJobs=n_jobs)
+            assert_almost_equal(mor.length[1], numpy.sqrt(17))
+            assert_equal(mor.end1[1], [0, 2])
+            assert_equal(mor.end2[1], [4, 3])
+        mor = Morphology()
+        mor.getLength(segments=seg, boundaries=bound, contacts=con,
+                      distance='b2b', line='mid', position=True)
+        assert_equal(mor.end1[1], [0, 2])
+        assert_equal(mor.end2[1], [4, 3])
+
+        # one boundary
+        bound = Segment(data=numpy.where(bound_data == 2, 2, 0))
+        con = Contact()
+        con.findContacts(segment=seg, boundary=bound)
+        mor = Morphology()
+        mor.getLength(segments=seg, boundaries=bound, contacts=con,
+                      distance='c-max', position=True)
+        assert_almost_equal(mor.length[1], numpy.sqrt(5))
+        assert_equal(mor.end1[1], [1, 1])
+        assert_equal(mor.end2[1], [3, 3])
+
     def test_getLabelsDistance(self):
         """
         Tests getLabelsDistance()
@@ -330,8 +330,71 @@ class TestNeighborhood(np_test.TestCase):
                 
             else:
                 np_test.assert_equal(True, False)
-       
-       
+
+    def test_find_neighborhood_elements(self):
+        """Tests find_neighborhood_elements() and generate_neighborhoods() 
+        with size for more than one region
+        """
+
+        # setup
+        bound_data = np.zeros((10, 10), dtype=int)
+        bound_data[3, 1:9] = 2
+        bound_data[8, 1:9] = 3
+        bound = Segment(data=bound_data)
+        seg_data = np.zeros((10, 10), dtype=int)
+        seg_data[4:8, 2] = 1
+        seg_data[4:6, 4:7] = 4
+        seg = Segment(data=seg_data)
+
+        # size, no max_distance
+        nbgd = Neighborhood(segments=seg, ids=[1, 4])
+        frame, elements = nbgd.find_neighborhood_elements(
+            regions=bound, region_ids=[2, 3], size=2, max_distance=None)
+        np_test.assert_equal([el[0] for el in elements], [2, 3])
+        offset = np.array([sl.start for sl in frame.inset])
+        desired = {
+            2: [[4, 2, 1], [4, 4, 4], [4, 5, 4], [5, 2, 1], [5, 4, 4]],
+            3: [[4, 4, 4], [5, 4, 4], [5, 5, 4], [6, 2, 1], [7, 2, 1]]}
+        for reg_id, flat, labels in elements:
+            coords = (
+                np.array(np.unravel_index(flat, frame.data.shape)).T + offset)
+            np_test.assert_equal(
+                np.hstack([coords, labels[:, np.newaxis]]), desired[reg_id])
+
+        # the same in generate_neighborhoods()
+        for reg_id, hood, all_hoods in nbgd.generate_neighborhoods(
+                regions=bound, region_ids=[2, 3], size=2, max_distance=None):
+            desired_data = np.zeros((10, 10), dtype=int)
+            for x, y, label in desired[reg_id]:
+                desired_data[x, y] = label
+            np_test.assert_equal(hood.inset, [slice(4, 8), slice(2, 7)])
+            np_test.assert_equal(hood.data, desired_data[4:8, 2:7])
+        np_test.assert_equal(
+            all_hoods.data, 
+            [[1, 0, 4, 4, 0],
+             [1, 0, 4, 4, 0],
+             [1, 0, 0, 0, 0],
+             [1, 0, 0, 0, 0]])
+
+        # size and max_distance
+        frame, elements = nbgd.find_neighborhood_elements(
+            regions=bound, region_ids=[2, 3], size=2, max_distance=2)
+        offset = np.array([sl.start for sl in frame.inset])
+        desired = {
+            2: [[4, 2, 1], [4, 4, 4], [4, 5, 4], [5, 2, 1], [5, 4, 4]],
+            3: [[6, 2, 1], [7, 2, 1]]}
+        for reg_id, flat, labels in elements:
+            coords = (
+                np.array(np.unravel_index(flat, frame.data.shape)).T + offset)
+            np_test.assert_equal(
+                np.hstack([coords, labels[:, np.newaxis]]), desired[reg_id])
+
+        # no size
+        frame, elements = nbgd.find_neighborhood_elements(
+            regions=bound, region_ids=[2, 3], size=None)
+        for reg_id, flat, labels in elements:
+            np_test.assert_equal(len(flat), 10)
+            np_test.assert_equal(np.sort(np.unique(labels)), [1, 4])
             
 if __name__ == '__main__':
     suite = \
@@ -868,6 +868,25 @@ class TestSegment(np_test.TestCase):
              [-1, -1,  -1,       1,       -1,  -1]])
         np_test.assert_almost_equal(dist, desired)
 
+        # structure and footprint, paths do not cross other segments
+        seg = Segment(data=numpy.array(
+            [[0, 1, 2, 1, 1],
+             [0, 1, 2, 2, 3]]))
+        structure, footprint = seg.getStructureFootprint(connectivity=1)
+        dist = seg.elementGeodesicDistanceToRegion(
+            ids=[1, 3], region=(seg.data==0), structure=2*structure, 
+            footprint=footprint, noDistance=-5)
+        desired = numpy.array(
+            [[-5, 2, -5, -5, -5],
+             [-5, 2, -5, -5, -5]])
+        np_test.assert_equal(dist, desired)
+        dist = seg.elementGeodesicDistanceToRegion(
+            ids=[2, 3], region=(seg.data==1), connectivity=1)
+        desired = numpy.array(
+            [[-1, -1, 1, -1, -1],
+             [-1, -1, 1, 1, 1]])
+        np_test.assert_equal(dist, desired)
+
     def testMakeFree(self):
         """
         Tests makeFree()
@@ -996,6 +1015,50 @@ class TestSegment(np_test.TestCase):
             segmentId=2, directionId=6, fromLayer=3, toLayer=1)
         np_test.assert_almost_equal(vector.phi, -numpy.pi/4)
 
+    def testPairwiseDistance(self):
+        """
+        Tests pairwiseDistance() and getBoundaryElements()
+        """
+
+        data = numpy.zeros((20, 20), dtype=int)
+        data[2:4, 2:4] = 5
+        data[10:12, 3:5] = 2
+        data[15, 15] = 7
+        data[5, 12:15] = 3
+        data[5:10, 15] = 8
+        seg = Segment(data)
+
+        # compare with distanceToRegion()
+        ids = [2, 3, 5, 7, 8]
+        desired = []
+        for ind, main_id in enumerate(ids[:-1]):
+            dist = seg.distanceToRegion(
+                ids=ids[ind+1:], regionId=main_id, mode='min')
+            desired.extend(dist[ids[ind+1:]])
+        np_test.assert_almost_equal(
+            seg.pairwiseDistance(ids=ids), desired)
+        np_test.assert_almost_equal(
+            seg.pairwiseDistance(ids=[7, 2, 5]), 
+            [numpy.sqrt(11**2 + 4**2), numpy.sqrt(2 * 12**2), 7])
+        np_test.assert_almost_equal(seg.pairwiseDistance(ids=[3, 8]), [1])
+
+        # non-existing segments and single segment
+        np_test.assert_almost_equal(
+            seg.pairwiseDistance(ids=[2, 9, 5]), [numpy.nan, 7, numpy.nan])
+        np_test.assert_equal(len(seg.pairwiseDistance(ids=[2])), 0)
+        np_test.assert_equal(seg.pairwiseDistance(ids=[]) is None, True)
+
+        # boundary elements
+        data = numpy.zeros((6, 6), dtype=int)
+        data[1:5, 1:5] = 1
+        data[0, 0:3] = 2
+        coords, labels = Segment(data).getBoundaryElements(ids=[1, 2])
+        boundary = numpy.zeros_like(data)
+        boundary[tuple(coords.transpose())] = labels
+        desired = data.copy()
+        desired[2:4, 2:4] = 0
+        np_test.assert_equal(boundary, desired)
+
     def testGenerateNeighborhoods(self):
         """Tests generateNeighborhood()
         """
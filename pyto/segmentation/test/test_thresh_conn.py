@@ -77,6 +77,37 @@ class TestThreshConn(np_test.TestCase):
             tc_a.contacts.findSegments(boundaryIds=[3,4], nBoundary=1)) 
 
 
+        ################################################
+        #
+        # sweep compare with old
+        #
+        for order in [None, 'ascend']:
+            tc_s = ThreshConn()
+            tc_s.setConnParam(boundary=common.bound_1, boundaryIds=[3, 4], 
+                              nBoundary=1, boundCount='at_least', mask=5)
+            for vars in tc_s.makeLevelsGen(
+                    image=common.image_1, thresh=thresh, order=order, 
+                    sweep=True):
+                pass
+            tc_o = ThreshConn()
+            tc_o.setConnParam(boundary=common.bound_1, boundaryIds=[3, 4], 
+                              nBoundary=1, boundCount='at_least', mask=5)
+            for vars in tc_o.makeLevelsGen(
+                    image=common.image_1, thresh=thresh, order=order):
+                pass
+            np_test.assert_equal(tc_s.levelIds, tc_o.levelIds)
+            np_test.assert_equal(tc_s.data, tc_o.data)
+            np_test.assert_equal(tc_s.thresh, tc_o.thresh)
+            np_test.assert_equal(
+                tc_s.contacts.findSegments(boundaryIds=[3,4], nBoundary=1), 
+                tc_o.contacts.findSegments(boundaryIds=[3,4], nBoundary=1)) 
+        tc_s = ThreshConn()
+        tc_s.setConnParam(boundary=common.bound_1, boundaryIds=[3, 4], 
+                          nBoundary=1, boundCount='at_least', mask=5)
+        tc_s.makeLevels(image=common.image_1, thresh=thresh, sweep=True)
+        np_test.assert_equal(tc_s.levelIds, tc_a.levelIds)
+        np_test.assert_equal(tc_s.data, tc_a.data)
+
         ################################################
         #
         # generator ascend with count
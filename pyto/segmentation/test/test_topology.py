@@ -207,6 +207,24 @@ class TestTopology(np_test.TestCase):
         np_test.assert_equal(topo_1.euler, [0, 0, 0, 0, 0])
         np_test.assert_equal(topo_1.nFaces, numpy.zeros(shape=(5,4), dtype=int))
  
+    def testCountFaces(self):
+        """
+        Tests countFaces() for touching segments
+        """
+
+        # a square of 1s touching 2s and 3s, the lower right 2x2 square 
+        # has sum 4 * 2 but it is not a face of 2
+        seg_data = numpy.array(
+            [[0, 0, 0, 0, 0],
+             [0, 1, 1, 2, 0],
+             [0, 1, 1, 3, 0],
+             [0, 2, 2, 2, 0]])
+        topo = Topology(segments=seg_data, ids=[1, 2, 3, 5])
+        np_test.assert_equal(topo.countFaces(dim=0), [9, 4, 4, 1, 0, 0])
+        np_test.assert_equal(topo.countFaces(dim=1), [6, 4, 2, 0, 0, 0])
+        np_test.assert_equal(topo.countFaces(dim=2), [1, 1, 0, 0, 0, 0])
+        np_test.assert_equal(topo.countFaces()[:,2], [1, 1, 0, 0, 0, 0])
+
     def testRestrict(self):
         """
         Tests restrict and setTotal methods
@@ -153,7 +153,7 @@ class ThreshConn(Hierarchy):
         self.setStructEl(rank=boundary.data.ndim, connectivity=structElConn)
 
     def makeLevels(self, image, thresh=None, label=True, props={},
-                   check=False, shift=None):
+                   check=False, shift=None, sweep=False):
         """
         Performs threshold and connectivity segmentation at specified thresholds
         and puts the resulting segments into this hierarchy. Each level of
@@ -191,6 +191,9 @@ class ThreshConn(Hierarchy):
           - check: if True checks if levels fit correctly in the existing
           hierarchy
           - shift: segment ids shift
+          - sweep: if True, segmentations at all thresholds are made in one 
+          sweep (see Connected.makeSweep()), otherwise separately for each
+          threshold (see Connected.make())
 
         Returns level if single threshold is given 
 
@@ -212,10 +215,8 @@ class ThreshConn(Hierarchy):
         # threshold and segment
         all_levels = []
         image_full_inset = image.inset
-        for tr in thresh:
-
-            # segment
-            seg, con = Connected.make(image=image, thresh=tr, **self.connParam)
+        for seg, con, tr in self._makeSegmentsGen(
+                image=image, thresh=thresh, count=False, sweep=sweep):
         
             # figure out level
             try:
@@ -258,7 +259,7 @@ class ThreshConn(Hierarchy):
             return all_levels[0]
 
     def makeLevelsGen(self, image, thresh=None, order='>', props={},
-                      count=False, check=False, shift=None):
+                      count=False, check=False, shift=None, sweep=False):
         """
         Performs threshold and connectivity segmentation at specified thresholds
         and puts the resulting segments into this hierarchy. Each level of
@@ -301,6 +302,11 @@ class ThreshConn(Hierarchy):
           - check: if True checks if levels fit correctly in the existing
           hierarchy
           - shift: segment ids shift
+          - sweep: if True, segmentations at all thresholds are made in one 
+          sweep (see Connected.makeSweep()), otherwise separately for each
+          threshold (see Connected.make()). Thresholds are swept in the 
+          ascending order, so for other orders segmentations at all 
+          thresholds are kept in memory until they are yielded
 
         Sets:
           - self.data: data, has the same positioning as boundaries
@@ -349,11 +355,8 @@ class ThreshConn(Hierarchy):
                              " and None.")
 
         # loop over thresholds
-        for tr in thresh:
-
-            # segment
-            seg, con = Connected.make(image=image, thresh=tr, count=count,
-                                      **self.connParam)
+        for seg, con, tr in self._makeSegmentsGen(
+                image=image, thresh=thresh, count=count, sweep=sweep):
                     
             # figure out level
             try:
@@ -397,6 +400,46 @@ class ThreshConn(Hierarchy):
         # set positioning
         #self.copyPositioning(seg)
 
+    def _makeSegmentsGen(self, image, thresh, count=False, sweep=False):
+        """
+        Makes threshold and connectivity segmentation for each of the 
+        specified thresholds, using parameters set by setConnParam().
+
+        If arg sweep is True, all segmentations are made by 
+        Connected.makeSweep(). Otherwise, Connected.make() is executed for
+        each threshold.
+
+        Arguments:
+          - image: (grayscale) image to be segmented (ndarray or Image object)
+          - thresh: list of thresholds
+          - count: flag indicating if contacts are counted
+          - sweep: flag indicating if segmentations are made in one sweep
+
+        Yields at each threshold, in the order of arg thresh: 
+        (segment, contacts, threshold)
+        """
+
+        if not sweep:
+            for tr in thresh:
+                seg, con = Connected.make(image=image, thresh=tr, count=count,
+                                          **self.connParam)
+                yield seg, con, tr
+
+        else:
+            sweep_gen = Connected.makeSweep(
+                image=image, thresh=thresh, count=count, **self.connParam)
+            if list(thresh) == sorted(thresh):
+                for seg, con, tr in sweep_gen:
+                    yield seg, con, tr
+            else:
+
+                # sweep is in ascending order, so keep all segmentations
+                all_segs = list(sweep_gen)
+                ranks = numpy.argsort(
+                    numpy.argsort(thresh, kind='stable'), kind='stable')
+                for rank in ranks:
+                    yield all_segs[rank]
+
     def makeByNNew(self, image, thresh, maxNew, minStep=None,
                    between=0.5, check=False):
         """
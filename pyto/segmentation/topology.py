@@ -345,9 +345,9 @@ class Topology(Features):
 
                 # 0-simplex
                 n_faces = numpy.zeros(shape=max_id+1, dtype='int')
-                n_faces_ids = ndimage.sum(input=1*(self.segments>0),  
-                                          labels=self.segments, index=ids)
-                n_faces[ids] = numpy.asarray(n_faces_ids).round().astype(int)
+                n_faces_all = self._countLabels(
+                    labels=self.segments, maxId=max_id)
+                n_faces[ids] = n_faces_all[ids]
                 n_faces[0] = sum(n_faces[id_] for id_ in ids)
 
             else:
@@ -355,16 +355,9 @@ class Topology(Features):
                 # loop over all dim>0 simplexes
                 n_faces = numpy.zeros(shape=max_id+1, dtype='int')
                 for simplex in self.generateBasicSimplexes(dim=dim):
-
-                    # correlate
-                    cc = ndimage.correlate(input=self.segments, 
-                                           weights=simplex, mode='constant')
-
-                    # extract number of faces
-                    simp_size = simplex.size
-                    n_faces[ids] += \
-                        [((self.segments==id_) & (cc==id_*simp_size)).sum() \
-                             for id_ in ids]
+                    n_faces_all = self._countSimplexes(
+                        simplex=simplex, maxId=max_id)
+                    n_faces[ids] += n_faces_all[ids]
                 n_faces[0] = sum(n_faces[id_] for id_ in ids)
 
         else:
@@ -373,6 +366,55 @@ class Topology(Features):
 
         return n_faces
 
+    def _countSimplexes(self, simplex, maxId=0):
+        """
+        Counts simplexes of the given shape that are fully contained in 
+        segments, for all segments at once.
+
+        A simplex positioned at element p of self.segments comprises 
+        elements p - delta, where delta is any element of simplex (delta[i] 
+        is 0 or 1 along each axis). It is counted for segment id_ if all its 
+        elements belong to that segment. This is the same as what is obtained
+        by correlating self.segments with simplex (with mode 'constant') and
+        comparing it with id_ * simplex.size.
+
+        Arguments:
+          - simplex: (ndarray) simplex, as generated by 
+          generateBasicSimplexes()
+          - maxId: the returned array is long enough to be indexed by
+          this id 
+
+        Returns (ndarray) number of simplexes indexed by segment ids.
+        """
+
+        # elements that can be the last element of a simplex
+        segments = self.segments
+        last = tuple(slice(size-1, None) for size in simplex.shape)
+        data = segments[last]
+        contained = (data > 0)
+
+        # check all other elements of simplex
+        for delta in numpy.ndindex(*simplex.shape):
+            if sum(delta) == 0: 
+                continue
+            other = tuple(
+                slice(size-1-del_, seg_size-del_) 
+                for size, del_, seg_size 
+                in zip(simplex.shape, delta, segments.shape))
+            contained &= (segments[other] == data)
+
+        return self._countLabels(labels=data[contained], maxId=maxId)
+
+    def _countLabels(self, labels, maxId=0):
+        """
+        Returns number of occurences of each positive label in (arg) labels,
+        indexed by labels. The returned array is long enough to be indexed 
+        by arg maxId.
+        """
+        labels = numpy.asarray(labels).ravel()
+        labels = labels[labels > 0]
+        return numpy.bincount(labels, minlength=maxId+1)
+
     def generateBasicSimplexes(self, dim):
         """
         Generates basic simplexes of the specified dimension and yields them 
@@ -483,12 +525,8 @@ class Topology(Features):
                 # find holes 
                 h_rank = numpy.zeros(shape=(max_id+1), dtype='int')
                 for id_ in ids:
-                    data_inset = self.segments[objects[id_-1]]
-                    filled = ndimage.binary_fill_holes(
-                        data_inset==id_, structure=self.invStructEl)
-                    inter = (filled==True) & (data_inset==0) 
-                    h_rank[id_] = (
-                        ndimage.label(input=inter, structure=self.structEl))[1]
+                    h_rank[id_] = self._countHoles(
+                        data=self.segments[objects[id_-1]], id_=id_)
                 h_rank[0] = sum(h_rank[id_] for id_ in ids)
             
             elif dim == self.ndim:
@@ -501,6 +539,44 @@ class Topology(Features):
             raise NotImplementedError("Sorry, dealing with Hierarchy objects",
                                       " hasn't been implemented yet.")
 
+    def _countHoles(self, data, id_):
+        """
+        Counts holes of segment id_ in (arg) data. 
+
+        Holes are connected (by self.structEl) background (0) elements that 
+        are enclosed by the segment, that is they belong to a connected
+        (by self.invStructEl) component of non-segment elements that does 
+        not touch the border of data. This is the same as filling holes by 
+        ndimage.binary_fill_holes(), but enclosed components are obtained 
+        by one labeling instead of an iterative dilation.
+
+        Arguments:
+          - data: (ndarray) segments, typically an inset containing segment
+          id_ (its bounding box)
+          - id_: segment id
+
+        Returns: number of holes
+        """
+
+        # label non-segment elements and find those touching the border
+        if data.size == 0:
+            return 0
+        outside, n_outside = ndimage.label(
+            input=(data != id_), structure=self.invStructEl)
+        if n_outside == 0:
+            return 0
+        border = numpy.zeros(n_outside+1, dtype=bool)
+        for axis in range(data.ndim):
+            border[outside.take(indices=[0, -1], axis=axis)] = True
+
+        # background in enclosed components
+        enclosed = ~border[outside] & (data == 0)
+        if not enclosed.any():
+            return 0
+        n_holes = ndimage.label(input=enclosed, structure=self.structEl)[1]
+
+        return n_holes
+
     ######################################################
     #
     # Basic data manipulation 
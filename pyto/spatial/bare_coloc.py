@@ -9,6 +9,8 @@ __version__ = "$Revision$"
 
 import numpy as np
 import scipy as sp
+import scipy.sparse
+from scipy.spatial import cKDTree
 from scipy.spatial.distance import cdist, pdist, squareform
 
 
@@ -35,7 +37,10 @@ class BareColoc():
     Methods:
       - calculate_distances(): given N point patterns, calculates distances 
       between points of the main pattern (pattern 0) and points off all 
-      other patterns, resultig in N-pattern-1 distance matrices
+      other patterns, resultig in N-pattern-1 distance matrices. If the 
+      max colocalization distance is given, only the distances up to
+      that distance are calculated (using KD-trees) and stored as sparse
+      matrices
       - calculate_coloc(): finds the N-colocalization and 2-colocalizations
       between the main and all other patterns
 
@@ -48,7 +53,11 @@ class BareColoc():
       - self.dist_nm_full: (list of length n_patterns, where elements
       are 2d ndarrays) Distances between points, where 
       self.dist_nm_full[k][p, q] is the distance between points p and q
-      of pattern k 
+      of pattern k, None if distances are stored in the sparse form
+      - self.dist_nm_sparse: (list of length n_patterns, where elements
+      are scipy.sparse.coo_matrix) Distances between points that are not 
+      larger than the max colocalization distance, in the same form as 
+      self.dist_nm_full, None if distances are stored in the dense form
 
     3-colocalization attributes (do not depend on colocalization distance):
       - self.coloc3: (bool 1d ndarray, length len(pattern_0)) Shows
@@ -89,6 +98,9 @@ class BareColoc():
 
     """
 
+    # Minkowski p-norms of metrics that can be calculated using KD-trees
+    tree_metrics = {'euclidean': 2, 'cityblock': 1, 'chebyshev': np.inf}
+
     def __init__(self, mode='less', pixel_nm=1, metric='euclidean', ):
         """Sets attributes from arguments
         """
@@ -96,6 +108,8 @@ class BareColoc():
         self.mode = mode
         self.pixel_nm = pixel_nm
         self.metric = metric
+        self.dist_nm_full = None
+        self.dist_nm_sparse = None
 
     @property
     def coloc3_indices(self):
@@ -164,7 +178,7 @@ class BareColoc():
         """
         return [[x.sum() for x in other] for other in self.particles2]
          
-    def calculate_distances(self, patterns):
+    def calculate_distances(self, patterns, max_distance=None):
         """Calculates distances between point patterns.
 
         Calculates distances between points of pattern 0 (arg patterns[0])
@@ -173,6 +187,15 @@ class BareColoc():
         self.pixel_nm to convert distances to nm. Uses   
         sp.spatial.distance.cdist for actual distance calculations.
 
+        If arg max_distance is specified and self.metric is one of the
+        metrics listed in self.tree_metrics, only the distances that are
+        not larger than max_distance are calculated, using 
+        scipy.spatial.cKDTree. These are saved as sparse matrices in
+        self.dist_nm_sparse and self.dist_nm_full is set to None. This 
+        requires much less memory for large patterns and gives the same
+        colocalization results (see calculate_coloc()) for all distances 
+        up to max_distance.
+
         Sets self.dist_nm_full: 
           (list of length n_patterns - 1) where element
           k contains distances between pattern 0 and pattern k+1 in nm 
@@ -191,6 +214,8 @@ class BareColoc():
           defines one pattern and is specified as ndarray of shape 
           (n_poins, n_dim) Empty sets can be specified as None or 
           nm.array([]).
+          - max_distance: max colocalization distance in nm, or None to
+          calculate all distances
         """
 
         n_patterns = len(patterns)
@@ -203,6 +228,16 @@ class BareColoc():
             else:
                 patterns_len.append(patterns[pat_ind].shape[0])
 
+        # distances up to max distance
+        if ((max_distance is not None) 
+            and (self.metric in self.tree_metrics)):
+            self.dist_nm_full = None
+            self.dist_nm_sparse = self.calculate_distances_sparse(
+                patterns=patterns, patterns_len=patterns_len,
+                max_distance=max_distance)
+            return
+        self.dist_nm_sparse = None
+
         # deal with pattern[0] containing no points  
         if patterns_len[0] == 0:
             self.dist_nm_full = [
@@ -224,12 +259,56 @@ class BareColoc():
 
         return
 
+    def calculate_distances_sparse(self, patterns, patterns_len, max_distance):
+        """Calculates distances between point patterns up to max distance.
+
+        Distances between points of pattern 0 and each of the patterns
+        are calculated in the same way as in calculate_distances(), but
+        using KD-trees and only for the pairs of points that are 
+        not further apart than arg max_distance.
+
+        Arguments:
+          - patterns: (list of length 2+) coordinates of multiple point 
+          patterns in pixels, see calculate_distances()
+          - patterns_len: (list) number of points in each pattern
+          - max_distance: max distance in nm
+
+        Returns (list of length n_patterns) distances in nm as
+        scipy.sparse.coo_matrix of shape (len(patterns[0]), len(patterns[k]))
+        """
+
+        # slightly larger max distance in pixels, so that rounding 
+        # does not exclude points at max_distance
+        max_pix = (max_distance / self.pixel_nm) * (1 + 1e-9)
+        p_norm = self.tree_metrics[self.metric]
+
+        dist_nm_sparse = []
+        if patterns_len[0] > 0:
+            tree_0 = cKDTree(patterns[0])
+        for pat_ind, pat_len in enumerate(patterns_len):
+            shape = (patterns_len[0], pat_len)
+            if (patterns_len[0] == 0) or (pat_len == 0):
+                dist_nm_sparse.append(sp.sparse.coo_matrix(shape))
+                continue
+            pairs = tree_0.sparse_distance_matrix(
+                cKDTree(patterns[pat_ind]), max_distance=max_pix, p=p_norm,
+                output_type='ndarray')
+            dist_nm_sparse.append(sp.sparse.coo_matrix(
+                (self.pixel_nm * pairs['v'], (pairs['i'], pairs['j'])),
+                shape=shape))
+
+        return dist_nm_sparse
+
     def calculate_coloc(self, distance):
         """Calculates colocalization data for one colocalization distance.
         
         Uses the precalculated distances between points points of pattern 0
-        and all other patterns (arg dist_full). Calculated using
-        scipy.spatial.distance.cdist.
+        and all other patterns (self.dist_nm_full or self.dist_nm_sparse,
+        see calculate_distances()). 
+
+        Each call sets new colocalization attributes (the existing 
+        attribute values are not modified), so shallow copies of this
+        instance made after each call keep the corresponding results.
 
         3- and 2-colocalizations are distinguished by the number of elements
         of self.dist_nm_full (2 and 1, respectively). More generally, n-1 
@@ -268,6 +347,10 @@ class BareColoc():
 
         """
 
+        if self.dist_nm_full is None:
+            self.calculate_coloc_sparse(distance=distance)
+            return
+
         # find elements that satisfy distance condition
         if self.mode == 'less':
             dist_conditions = [dist < distance for dist in self.dist_nm_full]
@@ -308,4 +391,53 @@ class BareColoc():
 
         
 
+    def calculate_coloc_sparse(self, distance):
+        """Calculates colocalization data for one colocalization distance.
+
+        Like calculate_coloc(), except that it uses distances stored in the
+        sparse form (self.dist_nm_sparse). Sets the same attributes.
+
+        Arguments:
+          - distance: single colocalization distance in nm
+        """
+
+        # find point pairs that satisfy distance condition
+        if self.mode == 'less':
+            close = [dist.data < distance for dist in self.dist_nm_sparse]
+        elif self.mode == 'less_eq':
+            close = [dist.data <= distance for dist in self.dist_nm_sparse]
+        else:
+            raise ValueError(
+                f"Argument mode: {self.mode} can be 'less' or 'less_eq'.") 
+        pairs = [
+            (dist.row[cl], dist.col[cl], dist.shape)
+            for dist, cl in zip(self.dist_nm_sparse, close)]
 
+        # 2-colocalizations
+        self.coloc2 = [
+            self._make_flags(indices=rows, size=shape[0])
+            for rows, _, shape in pairs[1:]]
+
+        # paricles in 2-colocalizations
+        self.particles2 = [
+            [c2.copy(), self._make_flags(indices=cols, size=shape[1])]
+            for c2, (_, cols, shape) in zip(self.coloc2, pairs[1:])]
+
+        if len(self.dist_nm_sparse) == 2:
+            return 
+
+        # main points in 3 (or higher)-colocalizations
+        self.coloc3 = np.logical_and.reduce(np.asarray(self.coloc2), axis=0)
+
+        # other points in 3 (or higher)-colocalizations
+        self.particles3 = [
+            self._make_flags(indices=cols[self.coloc3[rows]], size=shape[1])
+            for rows, cols, shape in pairs]
+
+    @staticmethod
+    def _make_flags(indices, size):
+        """Returns bool ndarray of length size that is True at indices.
+        """
+        flags = np.zeros(size, dtype=bool)
+        flags[indices] = True
+        return flags
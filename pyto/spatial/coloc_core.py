@@ -28,10 +28,16 @@ class ColocCore:
 
     """
 
+    # approximate cost of distance transform per element, relative to
+    # the cost of updating one element when columns are made around
+    # individual points (used in get_column_size_multi())
+    edt_cost = 20
+
     def __init__(
             self, full_coloc=True, keep_dist=False, mode='less', pixel_nm=1, 
             metric='euclidean', columns=True, column_factor=2,
-            prefix='pattern', suffix='data', n_columns_mode='dist'):
+            prefix='pattern', suffix='data', n_columns_mode='dist',
+            sparse_dist=True, keep_bare=True):
         """Saves arguments.
 
         If arg n_columns_mode is 'dist' or 'disjoint', columns are defined 
@@ -42,10 +48,22 @@ class ColocCore:
         that touch each other. In this case, arg column_factor is ignored
         (it is effectively set to 2).
 
+        If arg sparse_dist is True, only distances between points up to 
+        the largest colocalization distance are calculated and stored 
+        (see BareColoc.calculate_distances()). This does not affect the 
+        colocalization results, but it is much more memory efficient for
+        large patterns. Ignored if arg keep_dist is True, because in this
+        case all distances are kept.
+
         Arguments:
           - mode: coloclization mode, 'less' or 'less_eq'
 
           - suffix: suffix added to the coloclization data attribute names
+          - sparse_dist: flag indicating whether only distances up to the
+          colocalization distance are calculated
+          - keep_bare: flag indicating whether colocalization results
+          for individual colocalization distances are kept (attribute 
+          bare_multid)
 
         """
 
@@ -60,6 +78,8 @@ class ColocCore:
         self.prefix = prefix
         self.suffix = suffix
         self.n_columns_mode = n_columns_mode
+        self.sparse_dist = sparse_dist
+        self.keep_bare = keep_bare
 
         #self.data_names = set()
         self.data_names = []
@@ -104,6 +124,10 @@ class ColocCore:
           the above example) and all other patterns (patternY and patternZ).
           The ndarrays have shape n_points_in_the_first_pattern, 
           n_points_in_the_other_pattern. 
+          - self.bare_multid: (dict) colocalization results (BareColoc
+          objects, values) for each colocalization distance (keys). These
+          objects share the distances between points. Empty if 
+          self.keep_bare is False.
         """
 
         if suffix is None:
@@ -142,7 +166,11 @@ class ColocCore:
         # calculate distances in nm (takes care of None or empty patterns)
         bare = BareColoc(
             mode=self.mode, pixel_nm=self.pixel_nm, metric=self.metric)
-        bare.calculate_distances(patterns=patterns)
+        if self.sparse_dist and not self.keep_dist and (len(distance) > 0):
+            max_distance = max(distance)
+        else:
+            max_distance = None
+        bare.calculate_distances(patterns=patterns, max_distance=max_distance)
         if self.keep_dist:
             self.dist_nm = bare.dist_nm_full
 
@@ -151,8 +179,10 @@ class ColocCore:
         for ind, di in enumerate(distance):
             bare.calculate_coloc(distance=di)
 
-            # to save
-            self.bare_multid[di] = deepcopy(bare)
+            # to save, coloc results are new objects for each distance
+            # so distances can be shared
+            if self.keep_bare:
+                self.bare_multid[di] = copy(bare)
             
             # parse coloc results
             if n_patterns > 2:
@@ -167,17 +197,36 @@ class ColocCore:
                 coloc2_n[ind] = bare.coloc2_n[0]
                 particles2_n[ind] = bare.particles2_n[0]
 
-            # find columns
-            if self.columns:
+        # find columns, column sizes for all distances together
+        if self.columns:
+            if self.get_n_points(patterns[0]) == 0:
+                # no columns, sizes not needed
+                col_size_3 = di_len * [None]
+                col_size_2 = di_len * [None]
+            elif n_patterns > 2:
+                col_size_3 = self.get_column_size_multi(
+                    pattern=patterns[0], distance=distance, region=region,
+                    coloc=coloc3)
+                col_size_2 = [
+                    self.get_column_size_multi(
+                        pattern=patterns[0], distance=distance, region=region,
+                        coloc=coloc2[:, pat_ind])
+                    for pat_ind in range(n_patterns-1)]
+                col_size_2 = [list(cs) for cs in zip(*col_size_2)]
+            else:
+                col_size_2 = self.get_column_size_multi(
+                    pattern=patterns[0], distance=distance, region=region,
+                    coloc=coloc2)
+            for ind, di in enumerate(distance):
                 if n_patterns > 2:
                     n_columns_3[ind], column_size_3[ind] = self.find_columns(
                         pattern=patterns[0], coloc=coloc3[ind],
                         distance=di, col_distance=self.column_factor*di,
-                        region=region)
+                        region=region, column_size=col_size_3[ind])
                 n_columns_2[ind], column_size_2[ind] = self.find_columns(
                     pattern=patterns[0], coloc=coloc2[ind],
                     distance=di, col_distance=self.column_factor*di,
-                    region=region)
+                    region=region, column_size=col_size_2[ind])
 
                 #find points in columns
 
@@ -322,9 +371,14 @@ class ColocCore:
 
         return coloc3, coloc3_n1, coloc2, coloc2_n1
 
-    def find_columns(self, pattern, coloc, distance, col_distance, region=None):
+    def find_columns(
+            self, pattern, coloc, distance, col_distance, region=None,
+            column_size=None):
         """Finds number of columns
 
+        Column sizes are calculated using get_column_size(), unless they
+        are specified (arg column_size).
+
         Arguments:
           - pattern: (ndarray n_points x n_dim) point coordinates of the pattern
           that defines columns
@@ -333,6 +387,8 @@ class ColocCore:
           points that define subcolumns
           - distance: single colocalization distance [nm]
           - col_distance: column separation distance [nm]
+          - column_size: column size as returned by get_column_size(), 
+          or a list of these if arg coloc is 2d, or None to calculate it here
 
         Return (n_columns, column_size):
           - n_columns: number of columns
@@ -366,6 +422,8 @@ class ColocCore:
         if len(coloc.shape) == 1:
             coloc = coloc[np.newaxis, :]
             single_coloc = True
+            if column_size is not None:
+                column_size = [column_size]
         for ind in range(coloc.shape[0]):
         
             # get distances between subcolumns
@@ -383,8 +441,11 @@ class ColocCore:
                 n_col = self.get_n_columns_one(subcols=subcols, dist=dist_cond)
                 
             # column size
-            cs = self.get_column_size(
-                pattern=subcols, distance=distance, region=region)
+            if column_size is None:
+                cs = self.get_column_size(
+                    pattern=subcols, distance=distance, region=region)
+            else:
+                cs = column_size[ind]
             if self.n_columns_mode == 'image':
                 size, n_col = cs
             else:
@@ -465,33 +526,150 @@ class ColocCore:
             else:
                 return 0
 
-        # put subcolumn positions in image
-        columns = np.ones_like(region, dtype=float)
-        for point in pattern:
-            columns[tuple(point)] = 0.
+        # calculate for this distance only
+        result = self.get_column_size_multi(
+            pattern=pattern, distance=[distance], region=region)[0]
+
+        return result
+
+    def get_column_size_multi(self, pattern, distance, region=None, coloc=None):
+        """Calculates total column size for multiple colocalization distances.
 
-        # get all points closer than distance
-        dist = distance_transform_edt(columns)
-        distance_pixel = distance / self.pixel_nm
+        Gives the same results as get_column_size() called separately for 
+        each of the distances (arg distance), where for distance i the 
+        subcolumns are defined by pattern[coloc[i]], or by all points of 
+        arg pattern if arg coloc is None.
+
+        Because subcolumns found for larger colocalization distances 
+        normally include those for smaller distances, each point of 
+        arg pattern is assigned the (sorted) distance index from which on it 
+        is a subcolumn. These are used to determine the smallest distance
+        index at which each region element is inside a column. Column sizes
+        for all distances are obtained from the cumulative histogram of
+        these indices over the region.
+
+        The smallest distance indices are obtained from distances around
+        each point up to the largest colocalization distance (calculated
+        only once), or by one distance transform for each group of points
+        that become subcolumns at the same distance (a single one if arg
+        coloc is None), whichever is expected to be faster (see
+        self.edt_cost).
+
+        If subcolumns for larger distances do not include those for smaller 
+        distances, get_column_size() is called for each distance.
+
+        In 'image' mode (self.n_columns_mode), columns are labeled for each
+        distance separately, but without calculating distance transforms.
+
+        Arguments:
+          - pattern: (ndarray n_points x n_dim) coordinates of points that 
+          define colocalizations (subcolumns)  
+          - distance: (list or 1d ndarray) colocalization distances [nm]
+          - region (ndarray): Label image where elements >0 or True designate
+          the region and 0 or False background.
+          - coloc: (bool ndarray, n_distances x n_points) flags showing 
+          points that define subcolumns for each distance, None for all 
+          points and all distances 
+
+        Returns list (length n_distances) where elements are the same as 
+        the value returned by get_column_size() for the corresponding 
+        distance.
+        """
+
+        # sanity checks
+        distance = np.asarray(distance)
+        n_dist = len(distance)
+        if (region is None) and (self.n_columns_mode == 'image'):
+            raise ValueError(
+                "When argument region is None, self.n_columns_mode should "
+                + "not be 'image'.")
+        elif region is None:
+            return n_dist * [None]
+        if (pattern is None) or (pattern.size == 0):
+            pattern = np.array([], dtype=int).reshape(0, region.ndim)
+        if coloc is None:
+            coloc = np.ones((n_dist, pattern.shape[0]), dtype=bool)
+        coloc = np.asarray(coloc, dtype=bool).reshape(n_dist, pattern.shape[0])
+
+        # sort distances and check that subcolumns only get added
+        order = np.argsort(distance, kind='stable')
+        coloc_sorted = coloc[order]
+        if (coloc_sorted[:-1] & ~coloc_sorted[1:]).any():
+            return [
+                self.get_column_size(
+                    pattern=pattern[col], distance=dist, region=region)
+                for col, dist in zip(coloc, distance)]
+
+        # sorted distance index from which each point is a subcolumn  
+        active = coloc_sorted.any(axis=0)
+        activation = np.argmax(coloc_sorted, axis=0)[active]
+        points = pattern[active]
+        
+        # smallest sorted distance index at which elements are in columns
+        distance_pixel = distance[order] / self.pixel_nm
         if self.mode == 'less':
-            dist_condition = (dist < distance_pixel)
+            side = 'right'
         elif self.mode == 'less_eq':
-            dist_condition = (dist <= distance_pixel)
+            side = 'left'
+        col_index = np.zeros(region.shape, dtype=int) + n_dist
+        act_groups = np.unique(activation)
+        radius = int(np.floor(distance_pixel[-1])) if n_dist > 0 else 0
+        template_size = (2 * radius + 1)**region.ndim
+        if (len(points) * template_size 
+            < self.edt_cost * len(act_groups) * region.size):
+
+            # distance indices around a point, beyond radius all are n_dist
+            offsets = np.ogrid[
+                tuple(slice(-radius, radius+1) for _ in range(region.ndim))]
+            template = np.searchsorted(
+                distance_pixel, np.sqrt(sum(off**2 for off in offsets)),
+                side=side)
+
+            # put templates at points
+            for point, act in zip(points, activation):
+                low = point - radius
+                high = point + radius + 1
+                image_sl = tuple(
+                    slice(max(lo, 0), min(hi, dim)) 
+                    for lo, hi, dim in zip(low, high, region.shape))
+                template_sl = tuple(
+                    slice(im_sl.start - lo, im_sl.stop - lo) 
+                    for im_sl, lo in zip(image_sl, low))
+                col_index[image_sl] = np.minimum(
+                    col_index[image_sl], 
+                    np.maximum(template[template_sl], act))
+
+        else:
 
-        # get size
-        dist_condition = ((region > 0) & dist_condition)    
-        size = dist_condition.sum()
+            # one distance transform for each group of activated points
+            for act in act_groups:
+                columns = np.ones_like(region, dtype=float)
+                columns[tuple(points[activation <= act].T)] = 0.
+                dist = distance_transform_edt(columns)
+                dist_index = np.searchsorted(distance_pixel, dist, side=side)
+                col_index = np.minimum(col_index, np.maximum(dist_index, act))
+
+        # get sizes from cumulative histogram over the region
+        region_mask = (region > 0)
+        hist = np.bincount(col_index[region_mask], minlength=n_dist+1)
+        size_sorted = np.cumsum(hist)[:n_dist]
+        size = np.zeros(n_dist, dtype=size_sorted.dtype)
+        size[order] = size_sorted
 
-        # find points of all patterns inside (sub) columns
-        # or save dist_conditon to be used from make()
-        
         # calculate n_columns if image mode
         if self.n_columns_mode == 'image':
             # Not the same as other methods
-            _, n_columns = sp.ndimage.label(dist_condition)
-            return size, n_columns
+            result = n_dist * [None]
+            for ind, sorted_ind in enumerate(order):
+                if size[sorted_ind] == 0:
+                    n_columns = 0
+                else:
+                    _, n_columns = sp.ndimage.label(
+                        region_mask & (col_index <= ind))
+                result[sorted_ind] = (size[sorted_ind], n_columns)
+            return result
         else:
-            return size
+            return list(size)
 
     @staticmethod
     def get_n_points(pattern):
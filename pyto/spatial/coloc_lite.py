@@ -8,6 +8,7 @@ Streamlined version of calculating colocalization and analyzing results
 __version__ = "$Revision$"
 
 import os
+import concurrent.futures
 
 import numpy as np
 from numpy.random import default_rng
@@ -71,7 +72,8 @@ class ColocLite(ColocAnalysis):
 
         # random
         if rng is None:
-            self.rng = default_rng(seed=seed)
+            rng = default_rng(seed=seed)
+        self.rng = rng
         self.seed = seed
         self.n_factor = n_factor
         self.max_iter_rand = max_iter_rand
@@ -223,7 +225,7 @@ class ColocLite(ColocAnalysis):
             self, particles, distance, n_simul,
             coloc_name=None, coloc_case=None, 
             exclusion=None, hull=False, hull_expand=0, set_names=None,
-            log=None):
+            log=None, n_jobs=None):
         """Calculates real and simulated colocalizations for multiple tomos.
 
         Used for the case when particle sets are available as a pyto object
@@ -325,6 +327,12 @@ class ColocLite(ColocAnalysis):
           results, if None the names are derived from arg coloc_name
           - hull, hull_expand: not implemented
           - log: path to a log file or an open file
+          - n_jobs: None for sequential simulations, otherwise simulations 
+          of all tomos are split in n_jobs chunks per tomo and executed 
+          on a common process pool of n_jobs processes (if n_jobs > 1), so 
+          that tomos and simulations are processed together. For a given 
+          seed, the results do not depend on n_jobs (as long as it is 
+          not None), see ColocOne.start_one()
         """
 
         # check args:
@@ -443,76 +451,97 @@ class ColocLite(ColocAnalysis):
         self.coloc2_df = (n_sets - 1) * [None]
         self.particles2_df = (n_sets - 1) * [None]
         print("\n", file=self.log)
-        for tomo in particles.tomos:
-            print(f"Processing tomo {tomo} ...", file=self.log)
-
-            # setup
-            pixel_nm = particles.get_pixel_nm(tomo=tomo)
-            co = ColocOne(
-                full_coloc=self.full_coloc, keep_dist=self.keep_dist,
-                mode=self.coloc_mode, pixel_nm=pixel_nm,
-                metric=self.metric, columns=self.columns,
-                column_factor=self.column_factor,
-                n_columns_mode=self.n_columns_mode,
-                p_func=self.p_func, dist_mode=self.dist_mode,
-                rng=self.rng, max_iter=self.max_iter_rand,
-                n_factor=self.n_factor, all_random=self.all_random)
-
-            # run colocalization
-            patterns = [
-                particles.get_coords(tomo=tomo, set_name=nam, catch=True)
-                for nam in set_names]
-            regions = [
-                particles.get_region(tomo=tomo, set_name=nam)
-                for nam in set_names]
-            co.make_one(
-                patterns=patterns, regions=regions, distance=distance,
-                tomo_id=tomo, names=set_names, n_simul=n_simul, exclusion=None,
-                exclusion_simul=exclusion)
-
-            # add (all tables of) current tomo data to all tomos data 
-            data_names = [
-                nam for nam in co.data_names if nam.endswith(co.suffix)]
-            for data_nam in data_names:
-                local_data = getattr(co, data_nam)
-                local_data['pixel_nm'] = pixel_nm
-                current_data_name = (
-                    data_nam.removesuffix(co.suffix) + self.individual_suffix)
-                try:
-                    current_data = getattr(self, current_data_name)
-                except (AttributeError, NameError):
-                    current_data = local_data
-                    if current_data_name not in self.data_names:
-                        self.data_names.append(current_data_name)
-                else:
-                    current_data = pd.concat(
-                        [current_data, local_data], ignore_index=True)
-                setattr(self, current_data_name, current_data)
-
-            # make dataframe of colocalization coords and particles 
-            coloc_coords = self.make_coord_tabs_multid(
-                bare_multid=co.bare_multid, particles=particles,
-                set_names=set_names, tomo=tomo)
-
-            # add to existing
-            if len(set_names) > 2:
-                if coloc_coords['coloc3'] is not None:
-                    self.coloc3_df = pd.concat(
-                        [self.coloc3_df, coloc_coords['coloc3']],
-                        ignore_index=False)
-                    self.particles3_df = pd.concat(
-                        [self.particles3_df, coloc_coords['particles3']],
-                        ignore_index=False)
-            for other_ind in range(n_sets - 1):
-                if coloc_coords['coloc2'][other_ind] is not None:
-                    self.coloc2_df[other_ind] = pd.concat(
-                        [self.coloc2_df[other_ind],
-                         coloc_coords['coloc2'][other_ind]],
-                        ignore_index=False)
-                    self.particles2_df[other_ind] = pd.concat(
-                        [self.particles2_df[other_ind],
-                         coloc_coords['particles2'][other_ind]],
-                        ignore_index=False)
+        if (n_jobs is not None) and (n_jobs > 1):
+            executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=n_jobs)
+        else:
+            executor = None
+        started = []
+        try:
+            for tomo in particles.tomos:
+                print(f"Processing tomo {tomo} ...", file=self.log)
+
+                # setup
+                pixel_nm = particles.get_pixel_nm(tomo=tomo)
+                co = ColocOne(
+                    full_coloc=self.full_coloc, keep_dist=self.keep_dist,
+                    mode=self.coloc_mode, pixel_nm=pixel_nm,
+                    metric=self.metric, columns=self.columns,
+                    column_factor=self.column_factor,
+                    n_columns_mode=self.n_columns_mode,
+                    p_func=self.p_func, dist_mode=self.dist_mode,
+                    rng=self.rng, max_iter=self.max_iter_rand,
+                    n_factor=self.n_factor, all_random=self.all_random)
+
+                # real colocalization and start simulations
+                patterns = [
+                    particles.get_coords(tomo=tomo, set_name=nam, catch=True)
+                    for nam in set_names]
+                regions = [
+                    particles.get_region(tomo=tomo, set_name=nam)
+                    for nam in set_names]
+                co.start_one(
+                    patterns=patterns, regions=regions, distance=distance,
+                    tomo_id=tomo, names=set_names, n_simul=n_simul, 
+                    exclusion=None, exclusion_simul=exclusion, n_jobs=n_jobs,
+                    executor=executor)
+                started.append((tomo, pixel_nm, co))
+
+            for tomo, pixel_nm, co in started:
+
+                # collect simulations
+                co.finish_one()
+
+                # add (all tables of) current tomo data to all tomos data 
+                data_names = [
+                    nam for nam in co.data_names if nam.endswith(co.suffix)]
+                for data_nam in data_names:
+                    local_data = getattr(co, data_nam)
+                    local_data['pixel_nm'] = pixel_nm
+                    current_data_name = (
+                        data_nam.removesuffix(co.suffix) 
+                        + self.individual_suffix)
+                    try:
+                        current_data = getattr(self, current_data_name)
+                    except (AttributeError, NameError):
+                        current_data = local_data
+                        if current_data_name not in self.data_names:
+                            self.data_names.append(current_data_name)
+                    else:
+                        current_data = pd.concat(
+                            [current_data, local_data], ignore_index=True)
+                    setattr(self, current_data_name, current_data)
+
+                # make dataframe of colocalization coords and particles 
+                coloc_coords = self.make_coord_tabs_multid(
+                    bare_multid=co.bare_multid, particles=particles,
+                    set_names=set_names, tomo=tomo)
+
+                # add to existing
+                if len(set_names) > 2:
+                    if coloc_coords['coloc3'] is not None:
+                        self.coloc3_df = pd.concat(
+                            [self.coloc3_df, coloc_coords['coloc3']],
+                            ignore_index=False)
+                        self.particles3_df = pd.concat(
+                            [self.particles3_df, coloc_coords['particles3']],
+                            ignore_index=False)
+                for other_ind in range(n_sets - 1):
+                    if coloc_coords['coloc2'][other_ind] is not None:
+                        self.coloc2_df[other_ind] = pd.concat(
+                            [self.coloc2_df[other_ind],
+                             coloc_coords['coloc2'][other_ind]],
+                            ignore_index=False)
+                        self.particles2_df[other_ind] = pd.concat(
+                            [self.particles2_df[other_ind],
+                             coloc_coords['particles2'][other_ind]],
+                            ignore_index=False)
+
+        finally:
+
+            # stop worker processes also when an exception occurs
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
 
         # make joint tomo data
         print("Making joint tomo tables", file=self.log)
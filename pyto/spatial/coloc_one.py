@@ -9,6 +9,9 @@ Contains class ColocOne.
 
 __version__ = "$Revision$"
 
+import itertools
+import concurrent.futures
+
 import numpy as np
 from numpy.random import default_rng
 import scipy as sp
@@ -36,19 +39,21 @@ class ColocOne(ColocCore):
             name_mode='_', prefix='pattern', suffix='data',
             n_columns_mode='dist', p_func=np.greater,
             dist_mode='fine', seed=None, rng=None, max_iter=100, n_factor=2,
-            all_random=False):
+            all_random=False, sparse_dist=True, keep_bare=True):
         """
         Sets attributes
 
         Arguments:
           - columns: Flag 
+          - sparse_dist, keep_bare: see ColocCore.__init__()
         """
 
         super().__init__(
             full_coloc=full_coloc, keep_dist=keep_dist, mode=mode,
             pixel_nm=pixel_nm, metric=metric, columns=columns,
             column_factor=column_factor, prefix=prefix, suffix=suffix,
-            n_columns_mode=n_columns_mode)
+            n_columns_mode=n_columns_mode, sparse_dist=sparse_dist,
+            keep_bare=keep_bare)
 
         # set from arguments
         #self.simul_suffix = simul_suffix
@@ -108,7 +113,8 @@ class ColocOne(ColocCore):
         
     def make_one(
             self, patterns, regions, distance, n_simul, tomo_id='tomo',
-            names=None, exclusion=None, exclusion_simul=None):
+            names=None, exclusion=None, exclusion_simul=None, n_jobs=None,
+            executor=None):
         """Colocalization for real and simulated particles for one tomo.
 
         Calculates colocalizations between the real point patterns 
@@ -151,8 +157,55 @@ class ColocOne(ColocCore):
           [self.prefix+'0', self.prefix+'1', self.prefix+'2']  
           - exclusion: exclusion distance for real patterns in nm
           - exclusion_simul: exclusion distance for simulated patterns in nm
+          - n_jobs: None for the sequential simulations that all use 
+          self.rng, otherwise the number of simulation chunks (and
+          processes) used, see start_one()
+          - executor: (concurrent.futures.Executor) if specified, 
+          simulations are executed on it, see start_one()
+        """
+
+        if (n_jobs is not None) and (n_jobs > 1) and (executor is None):
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=n_jobs) as executor:
+                self.start_one(
+                    patterns=patterns, regions=regions, distance=distance,
+                    n_simul=n_simul, tomo_id=tomo_id, names=names,
+                    exclusion=exclusion, exclusion_simul=exclusion_simul,
+                    n_jobs=n_jobs, executor=executor)
+                self.finish_one()
+        else:
+            self.start_one(
+                patterns=patterns, regions=regions, distance=distance,
+                n_simul=n_simul, tomo_id=tomo_id, names=names,
+                exclusion=exclusion, exclusion_simul=exclusion_simul,
+                n_jobs=n_jobs, executor=executor)
+            self.finish_one()
+
+    def start_one(
+            self, patterns, regions, distance, n_simul, tomo_id='tomo',
+            names=None, exclusion=None, exclusion_simul=None, n_jobs=None,
+            executor=None):
+        """Real colocalization and (start of) simulations for one tomo.
+
+        First part of make_one(), has to be followed by finish_one(). 
+        The two are separated so that simulations of multiple tomos can
+        be executed on the same executor (see ColocLite.colocalize()).
+
+        If n_jobs is None, simulations are executed here sequentially and
+        all of them use self.rng, like in the earlier versions. 
+
+        Otherwise, self.rng is used only to generate the entropy of a 
+        np.random.SeedSequence, which is spawned to obtain one random 
+        generator for each simulation. Simulations are split in (at most)
+        n_jobs contiguous chunks, each chunk is executed on a separate 
+        instance and the results are combined in finish_one() in the 
+        simulation order. Consequently, for a given seed the results do 
+        not depend on n_jobs, or on whether executor is used. 
+
+        If executor is None, the chunks are executed here, otherwise they
+        are submitted to the executor.
 
-        Region
+        Arguments: see make_one()
         """
         
         n_patterns = len(patterns)
@@ -190,24 +243,104 @@ class ColocOne(ColocCore):
         for ind in range(len(regions)):
             self.rng.shuffle(region_coords[ind])
 
-        # make instances for normal and other random simulations
-        simul_normal = self.__class__(
-            full_coloc=self.full_coloc, keep_dist=False, mode=self.mode,
-            pixel_nm=self.pixel_nm, metric=self.metric, columns=False,
-            column_factor=self.column_factor, prefix=self.prefix,
-            n_columns_mode=self.n_columns_mode, all_random=self.all_random) 
-        simul_other = self.__class__(
-            full_coloc=self.full_coloc, keep_dist=False, mode=self.mode,
-            pixel_nm=self.pixel_nm, metric=self.metric, columns=False,
-            column_factor=self.column_factor, prefix=self.prefix,
-            n_columns_mode=self.n_columns_mode, all_random=self.all_random)
-
         # simulate
         if exclusion_simul is not None:
             exclusion_simul_pix = exclusion_simul / self.pixel_nm
         else:
             exclusion_simul_pix = None
-        for sim_ind in range(n_simul):
+        self._names = names
+        self._simulations = []
+        simul_args = dict(
+            patterns_clean=patterns_clean, n_points=n_points,
+            region_coords=region_coords, region=regions[0],
+            distance=distance, tomo_id=tomo_id, names=names,
+            exclusion_simul_pix=exclusion_simul_pix)
+        if n_jobs is None:
+            self._simulate(
+                sim_inds=range(n_simul), rngs=itertools.repeat(self.rng),
+                **simul_args)
+            return
+
+        # one random generator per simulation
+        entropy = self.rng.integers(2**63)
+        seeds = np.random.SeedSequence(entropy).spawn(n_simul)
+        for sim_inds in np.array_split(
+                np.arange(n_simul), min(max(n_jobs, 1), max(n_simul, 1))):
+            if len(sim_inds) == 0:
+                continue
+            sim_inds = sim_inds.tolist()
+            rngs = [default_rng(seeds[ind]) for ind in sim_inds]
+            simul = self._make_simul_instance()
+            if executor is None:
+                simul._simulate(sim_inds=sim_inds, rngs=rngs, **simul_args)
+                self._simulations.append(simul)
+            else:
+                self._simulations.append(executor.submit(
+                    simul._simulate, sim_inds=sim_inds, rngs=rngs,
+                    **simul_args))
+
+    def finish_one(self):
+        """Combines simulations with the real colocalization for one tomo.
+
+        Second part of make_one(), has to be preceded by start_one(). 
+        Collects the simulations started in start_one(), combines them
+        with the real colocalization and calculates p-values.
+        """
+
+        # add simulations in the order of simulation indices
+        for simul in self._simulations:
+            if isinstance(simul, concurrent.futures.Future):
+                simul = simul.result()
+            self.add_coloc(coloc=simul)
+        self._simulations = []
+
+        # combine simulation data with real
+        self.combine_simulations()
+        #print(self.X_Y_Z_data.shape)
+        #print(self.X_Y_Z_data.columns)
+
+        # p-values
+        if self.full_coloc:
+            coloc_names = col_func.make_full_coloc_names(
+                names=self._names, suffix=self.suffix)
+        else:
+            coloc_names = [
+                col_func.make_name(names=self._names, suffix=self.suffix)]
+        for nam in coloc_names:
+            data = getattr(self, nam)
+            data_p = col_func.get_fraction_random(
+                data=data, p_func=self.p_func, random_suff=self.random_suffixes,
+                p_suff=self.p_suffixes)
+            setattr(self, nam, data_p)
+            
+    def _simulate(
+            self, sim_inds, rngs, patterns_clean, n_points, region_coords,
+            region, distance, tomo_id, names, exclusion_simul_pix):
+        """Makes the specified random simulations.
+
+        Simulated colocalization data are added to this instance (see 
+        add_coloc()).
+
+        Arguments:
+          - sim_inds: simulation indices
+          - rngs: random generators, one for each simulation index
+          - patterns_clean: real point patterns after exclusion
+          - n_points: number of points in each pattern
+          - region_coords: (list) shuffled region coordinates for each
+          pattern
+          - region: region image
+          - distance, tomo_id, names: see make_one()
+          - exclusion_simul_pix: exclusion distance for simulated patterns
+          in pixels
+
+        Returns this instance
+        """
+
+        # make instances for normal and other random simulations
+        simul_normal = self._make_simul_instance()
+        simul_other = self._make_simul_instance()
+
+        for sim_ind, rng in zip(sim_inds, rngs):
 
             if not self.all_random:
             
@@ -216,14 +349,14 @@ class ColocOne(ColocCore):
                     point_pattern.random_region(
                         N=n_pnt, region_coords=reg_coords,
                         exclusion=exclusion_simul_pix, metric=self.metric,
-                        mode=self.dist_mode, shuffle=False, rng=self.rng,
+                        mode=self.dist_mode, shuffle=False, rng=rng,
                         max_iter=self.max_iter, n_factor=self.n_factor)
                     for n_pnt, reg_coords
                     in zip(n_points[1:], region_coords[1:])]
                 patterns_normal = [patterns_clean[0]] + simul_coords_normal 
                 simul_normal.make(
                     patterns=patterns_normal, distance=distance,
-                    tomo_id=tomo_id, names=names, region=regions[0],
+                    tomo_id=tomo_id, names=names, region=region,
                     suffix=self.simul_suffixes[0])
                 self.add_coloc(
                     coloc=simul_normal, extra={self.simul_index_col: sim_ind})  
@@ -233,12 +366,12 @@ class ColocOne(ColocCore):
                     N=n_points[0], region_coords=region_coords[0],
                     exclusion=exclusion_simul_pix,
                     metric=self.metric, mode=self.dist_mode, shuffle=False,
-                    rng=self.rng, max_iter=self.max_iter,
+                    rng=rng, max_iter=self.max_iter,
                     n_factor=self.n_factor)
                 patterns_other = [simul_coords_other] + patterns_clean[1:]
                 simul_other.make(
                     patterns=patterns_other, distance=distance,
-                    tomo_id=tomo_id, names=names, region=regions[0],
+                    tomo_id=tomo_id, names=names, region=region,
                     suffix=self.simul_suffixes[1])
                 self.add_coloc(
                     coloc=simul_other, extra={self.simul_index_col: sim_ind})  
@@ -250,36 +383,41 @@ class ColocOne(ColocCore):
                     point_pattern.random_region(
                         N=n_pnt, region_coords=reg_coords,
                         exclusion=exclusion_simul_pix, metric=self.metric,
-                        mode=self.dist_mode, shuffle=False, rng=self.rng,
+                        mode=self.dist_mode, shuffle=False, rng=rng,
                         max_iter=self.max_iter, n_factor=self.n_factor)
                     for n_pnt, reg_coords
                     in zip(n_points, region_coords)]
                 patterns_normal = simul_coords_all_rand
                 simul_normal.make(
                     patterns=patterns_normal, distance=distance,
-                    tomo_id=tomo_id, names=names, region=regions[0],
+                    tomo_id=tomo_id, names=names, region=region,
                     suffix=self.simul_suffixes[0])
                 self.add_coloc(
                     coloc=simul_normal, extra={self.simul_index_col: sim_ind})  
                 
-        # combine simulation data with real
-        self.combine_simulations()
-        #print(self.X_Y_Z_data.shape)
-        #print(self.X_Y_Z_data.columns)
+        return self
+
+    def _make_simul_instance(self, keep_bare=False):
+        """Makes an instance of this class that is used for simulations.
+
+        The instance has the same colocalization and simulation parameters
+        as this instance, but it does not keep distances, or calculate 
+        columns.
+
+        Argument:
+          - keep_bare: flag indicating whether the bare colocalization
+          object is kept
+        """
+        simul = self.__class__(
+            full_coloc=self.full_coloc, keep_dist=False, mode=self.mode,
+            pixel_nm=self.pixel_nm, metric=self.metric, columns=False,
+            column_factor=self.column_factor, prefix=self.prefix,
+            n_columns_mode=self.n_columns_mode, dist_mode=self.dist_mode,
+            max_iter=self.max_iter, n_factor=self.n_factor,
+            all_random=self.all_random, sparse_dist=self.sparse_dist,
+            keep_bare=keep_bare)
+        return simul
 
-        # p-values
-        if self.full_coloc:
-            coloc_names = col_func.make_full_coloc_names(
-                names=names, suffix=self.suffix)
-        else:
-            coloc_names = [col_func.make_name(names=names, suffix=self.suffix)]
-        for nam in coloc_names:
-            data = getattr(self, nam)
-            data_p = col_func.get_fraction_random(
-                data=data, p_func=self.p_func, random_suff=self.random_suffixes,
-                p_suff=self.p_suffixes)
-            setattr(self, nam, data_p)
-            
     def add_coloc(self, coloc, extra={}):
         """Add specified colocalization data to the current.
         
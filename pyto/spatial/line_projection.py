@@ -13,6 +13,7 @@ import itertools
 import numpy as np
 import scipy as sp
 from scipy.spatial.distance import cdist
+from scipy.spatial import cKDTree
 import pandas as pd
 
 import pyto
@@ -53,6 +54,13 @@ class LineProjection:
  
     For >1 pixel thick regions without holes grid_mode='nearest' will
     be more efficient.
+
+    3) Project multiple points at once (much faster than calling project()
+    for each point):
+
+      projected_points = lp.project_multi(
+              points=origin_points, angles=angles_for_each_point,
+              distance=range(min_distance, max_distance))
     """
 
     @classmethod
@@ -85,7 +93,7 @@ class LineProjection:
             # project
             part_one = mps.particles[mps.particles[
                 mps.tomo_id_col]==tomo_id].copy()
-            cls.project_mps_one(
+            cls.project_mps_one_to_rm(
                 particles=part_one, region=region_path, region_id=region_id,
                 coord_cols=coord_cols, angle_cols=angle_cols, out_cols=out_cols,
                 distance=distance, reverse=reverse, grid_mode=grid_mode,
@@ -106,42 +114,19 @@ class LineProjection:
         if isinstance(region, str):
             region = pyto.segmentation.Labels.read(
                 file=region, memmap=True)
-            region_coords = get_region_coords(
-                region=region, region_id=region_id, shuffle=False)
+        region_coords = get_region_coords(
+            region=region, region_id=region_id, shuffle=False)
 
-        # find projections
-        points = particles[coord_cols].to_numpy()
-        angles = particles[angle_cols].to_numpy()
-        #n_points = points.shape[0]
-        n_points = particles.shape[0]
+        # find projections for all particles together
         lp = cls(
             region_coords=region_coords, relion=True, reverse=reverse,
             grid_mode=grid_mode, intersect_mode='first', not_found=not_found)
-        particles[out_cols] = particles.apply(
-            lambda x: lp.project(
-                point=x[coord_cols].to_numpy(),
-                angles=x[angle_cols].to_numpy(), distance=distance),
-            axis=1, result_type='expand')
-        
-        #if n_points > 0:
-            
-            
-        #    projected = -np.ones(shape=(n_points, 3), dtype=int)
-        #    for point_ind in range(n_points):
-        #        poi = points[point_ind, :]
-        #        ang = angles[point_ind, :]
-        #        proj = lp.project(
-        #            angles=ang, point=poi, distance=distance)
-                #try:
-        #        projected[point_ind, :] = proj            
-                #except TypeError:
-                #    projected[point_ind, :] = not_found
-                   
-        #else:
-        #    projected = np.array([]).reshape(0, 3)
+        projected = lp.project_multi(
+            points=particles[coord_cols].to_numpy(),
+            angles=particles[angle_cols].to_numpy(), distance=distance)
 
         # add to particles
-        #particles[out_cols] = projected
+        particles[out_cols] = projected
         if particles[out_cols].isna().any(axis=None):
             particles[out_cols] = particles[out_cols].astype('Int64')
        
@@ -280,6 +265,111 @@ class LineProjection:
 
         return intersection
         
+    def project_multi(self, points, angles, distance):
+        """Projects multiple points along lines onto a region.
+
+        Gives the same results as calling project() for each point 
+        separately (see project() docs), but all points are projected 
+        together.
+
+        Requires the same attributes as project().
+
+        Arguments:
+          - points: (n_points x 3 ndarray) coordinates of points from which
+          the line projections are made
+          - angles: (n_points x n_angles ndarray) Euler angles if 
+          spherical=False, otherwise spherical angles (phi, theta), for
+          each point
+          - distance: (single number or an array) projection distance(s) 
+          [pixel], the same for all points
+
+        Returns:
+          - if self.intersection_mode is 'first': (n_points x 3 ndarray)
+          coordinates of the projected points, where rows of points that 
+          do not have a projection are set to self.not_found, or to NaN if
+          self.not_found is None
+          - if self.intersection_mode is 'all': (list of length n_points)
+          projected points for each point, in the same form as returned
+          by project()
+        """
+
+        # line points for all points, n_points x n_distances x n_dim
+        points = np.asarray(points)
+        angles = np.asarray(angles)
+        distance = np.asarray(distance, dtype=float).reshape(-1)
+        n_points = angles.shape[0]
+        n_dim = 3
+        points = points.reshape(n_points, n_dim)
+        directions = np.zeros((n_points, n_dim))
+        for ind, ang in enumerate(angles):
+            if self.spherical:
+                phi, theta = ang
+            else:
+                theta, phi = self.find_spherical(angles=ang)
+            directions[ind] = self.get_line_rotation(theta=theta, phi=phi)[
+                :, 2]
+        line_points = (
+            distance[np.newaxis, :, np.newaxis]
+            * directions[:, np.newaxis, :] + points[:, np.newaxis, :])
+
+        # find intersecting points, ordered by lines
+        if isinstance(self.grid_mode, str) and (self.grid_mode == 'nearest'):
+            line_ids, grid_points = self._unique_per_line(
+                line_points.round().astype(int))
+            flags = self.in_region(points=grid_points)
+            line_ids = line_ids[flags]
+            found = grid_points[flags]
+
+        elif isinstance(self.grid_mode, str) and (self.grid_mode == 'unit'):
+            line_ids, floor_points = self._unique_per_line(
+                np.floor(line_points).astype(int))
+            grid_points = (
+                floor_points[:, np.newaxis, :]
+                + self._unit_offsets(n_dim=n_dim)[np.newaxis, :, :])
+            flags = self.in_region(points=grid_points)
+            block_flags = flags.any(axis=1)
+            first_corner = flags.argmax(axis=1)
+            line_ids = line_ids[block_flags]
+            found = grid_points[
+                block_flags.nonzero()[0], first_corner[block_flags]]
+
+        elif isinstance(self.grid_mode, (int, float)):
+            line_ids = np.repeat(np.arange(n_points), distance.shape[0])
+            flags, closest = self._find_close_region_points(
+                line_points=line_points.reshape(-1, n_dim))
+            line_ids = line_ids[flags]
+            found = self._get_region_coords()[closest[flags]]
+
+        else:
+            raise ValueError(
+                f"Sorry, grid mode {self.grid_mode} was not understood.")
+
+        # make results
+        if self.intersect_mode == 'first':
+            if self.not_found is None:
+                result = np.full((n_points, n_dim), np.nan)
+            else:
+                not_found = np.asarray(self.not_found)
+                result = np.empty(
+                    (n_points, n_dim),
+                    dtype=np.result_type(not_found, found))
+                result[:] = not_found
+            lines_found, first_inds = np.unique(line_ids, return_index=True)
+            result[lines_found] = found[first_inds]
+
+        elif self.intersect_mode == 'all':
+            bounds = np.searchsorted(line_ids, np.arange(n_points + 1))
+            result = [
+                found[begin:end] if end > begin else np.asarray([])
+                for begin, end in zip(bounds[:-1], bounds[1:])]
+
+        else:
+            raise ValueError(
+                f"Sorry, intersection mode {self.intersect_mode} was "
+                + "not understood.")
+
+        return result
+
     def find_spherical(self, angles):
         """Finds line direction from Euler angles
 
@@ -368,12 +458,7 @@ class LineProjection:
         """
 
         # get rotation matrix
-        angles = np.zeros(3)
-        angles[1:] = [theta, phi]
-        if self.degree:
-            angles = np.pi * angles / 180
-        euler_mode = 'zyz_ex_active'  # not needed in args
-        q = Rigid3D.make_r_euler(angles=angles, mode=euler_mode)
+        q = self.get_line_rotation(theta=theta, phi=phi)
 
         # transform
         unit_z = np.array([0, 0, 1.]) 
@@ -389,6 +474,24 @@ class LineProjection:
 
         return displace
 
+    def get_line_rotation(self, theta, phi):
+        """Returns rotation matrix that rotates z-axis to the line direction.
+
+        Arguments:
+          - theta, psi: spherical angles that determine the line direction
+          (in rad or degrees, depending on self.degree)
+
+        Returns (3x3 ndarray) rotation matrix, its last column is the 
+        line direction vector
+        """
+        angles = np.zeros(3)
+        angles[1:] = [theta, phi]
+        if self.degree:
+            angles = np.pi * angles / 180
+        euler_mode = 'zyz_ex_active'  # not needed in args
+        q = Rigid3D.make_r_euler(angles=angles, mode=euler_mode)
+        return q
+
     def get_grid_points(self, line_points):
         """Converts points on a line to coordinate on Cartesion grid.
 
@@ -482,80 +585,206 @@ class LineProjection:
         intersect mode is 'all'.
         """
 
-        # figure out region
-        if self.region_coords is None:
-            region_coords = get_region_coords(
-                region=self.region, region_id=self.region_id, shuffle=False)
-        else:
-            region_coords = self.region_coords
- 
-        # intersect
-        if self.intersect_mode == 'first':
+        grid_points = np.asarray(grid_points)
+        if self.intersect_mode not in ['first', 'all']:
+            raise ValueError(
+                f"Sorry, intersection mode {self.intersect_mode} was "
+                + "not understood.")
+
+        # find intersecting points, in the order of grid_points
+        if isinstance(self.grid_mode, str) and (self.grid_mode == 'nearest'):
+            found = grid_points[self.in_region(points=grid_points)]
             
-            if (isinstance(self.grid_mode, str)
-                and (self.grid_mode == 'nearest')):
-                for one_point in grid_points:
-                    intersect = np.logical_and.reduce(
-                        one_point == region_coords, axis=1)
-                    if intersect.any():
-                        result = one_point
-                        break
-                else:
-                    result = self.not_found
- 
-            elif (isinstance(self.grid_mode, str)
-                  and (self.grid_mode == 'unit')):
-                for point_ind, grid_ind in itertools.product(
-                        range(grid_points.shape[0]),
-                        range(grid_points.shape[1])):
-                    one_point = grid_points[point_ind, grid_ind, :]
-                    intersect = np.logical_and.reduce(
-                        one_point == region_coords, axis=1)
-                    if intersect.any():
-                        result = one_point
-                        break
-                else:
-                    result = self.not_found
-
-            elif isinstance(self.grid_mode, (int, float)):
-                dist = cdist(grid_points, region_coords)
-                dist_cond = dist <= self.grid_mode
-                hood_points = np.logical_or.reduce(dist_cond, axis=1)
-                try:
-                    first_ind = hood_points.nonzero()[0].min()
-                except ValueError:
-                    result = self.not_found
-                else:
-                    closest_reg_index = dist[first_ind, :].argmin()
-                    result = region_coords[closest_reg_index, :]
-                
-        elif self.intersect_mode == 'all':
+        elif isinstance(self.grid_mode, str) and (self.grid_mode == 'unit'):
+            flags = self.in_region(points=grid_points)
+            block_flags = flags.any(axis=1)
+            first_corner = flags.argmax(axis=1)
+            found = grid_points[
+                block_flags.nonzero()[0], first_corner[block_flags]]
 
-            if self.grid_mode == 'nearest':
-                intersect_flags = []
-                for one_point in grid_points:
-                     intersect = np.logical_and.reduce(
-                        one_point == region_coords, axis=1)
-                     intersect_flags.append(intersect.any())
-                result = grid_points[intersect_flags]
-                if result.shape[0] == 0:
-                    result = np.asarray([])
-                
-            elif self.grid_mode == 'unit':
-                result = []
-                for point_ind in range(grid_points.shape[0]):
-                    for grid_ind in range(grid_points.shape[1]):
-                        one_point = grid_points[point_ind, grid_ind, :]
-                        intersect = np.logical_and.reduce(
-                            one_point == region_coords, axis=1)
-                        if intersect.any():
-                            result.append(one_point)
-                            break
-                result = np.asarray(result)
+        elif isinstance(self.grid_mode, (int, float)):
+            flags, closest = self._find_close_region_points(
+                line_points=grid_points)
+            found = self._get_region_coords()[closest[flags]]
 
         else:
             raise ValueError(
-                f"Sorry, intersection mode {self.intersect_mode} was "
-                + "not understood.")
+                f"Sorry, grid mode {self.grid_mode} was not understood.")
+
+        # make result
+        if self.intersect_mode == 'first':
+            if found.shape[0] > 0:
+                result = found[0]
+            else:
+                result = self.not_found
+        else:
+            if found.shape[0] > 0:
+                result = found
+            else:
+                result = np.asarray([])
             
         return result
+
+    def _get_region_coords(self):
+        """Returns region coordinates.
+
+        Region coordinates are self.region_coords if specified, or they are
+        determined from self.region and self.region_id. In the latter case
+        the coordinates are saved, so they are calculated only once. 
+        """
+
+        if self.region_coords is not None:
+            return self.region_coords
+        cached = getattr(self, '_region_coords_cache', None)
+        if (cached is None) or (cached[0] is not self.region):
+            region_coords = get_region_coords(
+                region=self.region, region_id=self.region_id, shuffle=False)
+            self._region_coords_cache = (self.region, region_coords)
+        return self._region_coords_cache[1]
+
+    def _get_region_lookup(self):
+        """Returns data used to determine whether points belong to the region.
+
+        Region coordinates are converted to (flat) indices of the smallest
+        box that contains the region. 
+
+        The lookup is calculated only once for given region coordinates
+        (see _get_region_coords()).
+
+        Returns (offset, shape, keys) where offset and shape define
+        the box, and keys are sorted flat indices of region points in
+        the box. 
+        """
+
+        region_coords = self._get_region_coords()
+        cached = getattr(self, '_region_lookup_cache', None)
+        if (cached is not None) and (cached[0] is region_coords):
+            return cached[1]
+
+        region_coords = np.asarray(region_coords).astype(int)
+        if region_coords.shape[0] > 0:
+            offset = region_coords.min(axis=0)
+            shape = region_coords.max(axis=0) - offset + 1
+            keys = np.unique(np.ravel_multi_index(
+                (region_coords - offset).transpose(), dims=shape))
+        else:
+            offset = np.zeros(region_coords.shape[1], dtype=int)
+            shape = np.ones(region_coords.shape[1], dtype=int)
+            keys = np.array([], dtype=int)
+        lookup = (offset, shape, keys)
+        self._region_lookup_cache = (self._get_region_coords(), lookup)
+
+        return lookup
+        
+    def in_region(self, points):
+        """Determines whether (grid) points belong to the region.
+
+        Points are looked up in the (hashed) region coordinates (see
+        _get_region_lookup()), so the time does not depend on the 
+        region size.
+
+        Argument:
+          - points: (ndarray, ... x n_dim, int) coordinates of grid points,
+          the last axis holds the coordinates
+
+        Returns (bool ndarray of shape points.shape[:-1]) flags showing 
+        whether the points belong to the region
+        """
+
+        offset, shape, keys = self._get_region_lookup()
+        points = np.asarray(points)
+        flat = points.reshape(-1, points.shape[-1]) - offset
+        inside = np.logical_and.reduce((flat >= 0) & (flat < shape), axis=1)
+        flags = np.zeros(flat.shape[0], dtype=bool)
+        if (keys.shape[0] > 0) and inside.any():
+            point_keys = np.ravel_multi_index(
+                flat[inside].transpose(), dims=shape)
+            pos = np.searchsorted(keys, point_keys)
+            pos[pos == keys.shape[0]] = 0
+            flags[inside] = (keys[pos] == point_keys)
+
+        return flags.reshape(points.shape[:-1])
+
+    def _find_close_region_points(self, line_points):
+        """Finds region points close to line points for numerical grid mode.
+
+        For each line point, determines whether there are region points
+        at distance <= self.grid_mode and finds the closest region point
+        (the one having the lowest index in region coordinates in case of
+        ties). 
+
+        Argument:
+          - line_points: (n_points x n_dim ndarray) line coordinates
+
+        Returns (flags, closest_ind):
+          - flags: (bool ndarray n_points) flags showing whether there are 
+          region points close to line points
+          - closest_ind: (int ndarray n_points) index of the closest region 
+          point (in region coordinates), -1 if no close region points
+        """
+
+        region_coords = self._get_region_coords()
+        line_points = np.asarray(line_points, dtype=float)
+        n_points = line_points.shape[0]
+        flags = np.zeros(n_points, dtype=bool)
+        closest_ind = -np.ones(n_points, dtype=int)
+        if (n_points == 0) or (region_coords.shape[0] == 0):
+            return flags, closest_ind
+
+        # candidates from a kd-tree, slightly enlarged radius
+        tree = cKDTree(region_coords)
+        eps = 1e-9
+        dist, _ = tree.query(
+            line_points, k=1, distance_upper_bound=self.grid_mode*(1+eps)+eps)
+        cand_inds = np.isfinite(dist).nonzero()[0]
+        candidates = tree.query_ball_point(
+            line_points[cand_inds], r=dist[cand_inds]*(1+eps)+eps)
+
+        # exact distances as cdist would calculate
+        for line_ind, reg_inds in zip(cand_inds, candidates):
+            reg_inds = np.sort(reg_inds)
+            exact = cdist(
+                line_points[line_ind:line_ind+1],
+                region_coords[reg_inds])[0]
+            min_ind = exact.argmin()
+            if exact[min_ind] <= self.grid_mode:
+                flags[line_ind] = True
+                closest_ind[line_ind] = reg_inds[min_ind]
+
+        return flags, closest_ind
+
+    @staticmethod
+    def _unique_per_line(grid_points):
+        """Unique grid points for each line, as in get_grid_points().
+
+        Argument:
+          - grid_points: (n_lines x n_line_points x n_dim ndarray) grid 
+          points of all lines
+
+        Returns (line_ids, unique_points) where unique_points are unique
+        grid points of each line, sorted the same way as in 
+        get_grid_points(), and line_ids are the corresponding line 
+        indices (sorted)  
+        """
+
+        n_lines, n_line_points, n_dim = grid_points.shape
+        flat = grid_points.reshape(-1, n_dim)
+        line_ids = np.repeat(np.arange(n_lines), n_line_points)
+        sort_keys = (
+            tuple(flat[:, ax] for ax in range(n_dim-1, -1, -1)) + (line_ids,))
+        order = np.lexsort(sort_keys)
+        flat = flat[order]
+        line_ids = line_ids[order]
+        keep = np.ones(flat.shape[0], dtype=bool)
+        keep[1:] = (
+            (line_ids[1:] != line_ids[:-1])
+            | (flat[1:] != flat[:-1]).any(axis=1))
+
+        return line_ids[keep], flat[keep]
+
+    @staticmethod
+    def _unit_offsets(n_dim=3):
+        """Offsets of unit cube corners, in the order used in 'unit' grid mode.
+        """
+        zeros = np.zeros(n_dim, dtype=int)
+        return np.asarray(list(itertools.product(*zip(zeros, zeros+1))))
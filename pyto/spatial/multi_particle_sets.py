@@ -157,7 +157,9 @@ class MultiParticleSets(MPSConversion, MPSInterconversion, MPSAnalysis):
         """
         self.__dict__.update(state)
         
-    def write(self, path, verbose=True, info_fd=None):
+    def write(
+            self, path, file_formats=['pkl', 'json'], verbose=True,
+            info_fd=None):
         """Writes this instance in the form that can be read by read().
 
         Pickles this instance without self.tomos and self.particles dataframes. 
@@ -168,8 +170,14 @@ class MultiParticleSets(MPSConversion, MPSInterconversion, MPSAnalysis):
         respectively, to arg path (see ..io.pandas_io.write() docs for more
         info about the write formats.
 
+        For large particle tables, adding 'npy' (columnar format) to 
+        arg file_formats allows reading selected columns and tomos 
+        without loading the entire table (see read()).
+
         Arguments:
           - path: common part of the file path
+          - file_formats: formats in which tomos and particles tables are
+          written, default ['pkl', 'json'], see ..io.pandas_io.write()
           - verbose: flag indicating if a statement is printed for every
           file that is written
         """
@@ -178,20 +186,22 @@ class MultiParticleSets(MPSConversion, MPSInterconversion, MPSAnalysis):
         tomos_path = (
             f"{split_path[0]}{self.pickle_tomos_suffix}.{split_path[1]}")
         PandasIO.write(
-            table=self.tomos, base=tomos_path, file_formats=['pkl', 'json'],
+            table=self.tomos, base=tomos_path, file_formats=file_formats,
             verbose=verbose, info_fd=info_fd)
         parts_path = (
             f"{split_path[0]}{self.pickle_particles_suffix}.{split_path[1]}")
         PandasIO.write(
             table=self.particles, base=parts_path,
-            file_formats=['pkl', 'json'], info_fd=info_fd)
+            file_formats=file_formats, info_fd=info_fd)
 
         # pickle the rest (see __getstate__)
         with open(path, 'wb') as fd:
             pickle.dump(self, fd)
 
     @classmethod
-    def read(cls, path, verbose=True, info_fd=None):
+    def read(
+            cls, path, file_formats=['pkl', 'json'], columns=None,
+            tomo_ids=None, verbose=True, info_fd=None):
         """Reads instance of this class from files created by write().
 
         Reads pickled instance of this class that does not contain self.tomos
@@ -199,8 +209,18 @@ class MultiParticleSets(MPSConversion, MPSInterconversion, MPSAnalysis):
         dataframes from (three) separate files. Uses these to make an 
         instance of this class.
 
+        If arg tomo_ids is specified, only tomos and particles of the 
+        specified tomos are read. If arg columns is specified, only these
+        columns of the particles table are read. When 'npy' format 
+        is used, the selection is made before the data is loaded, 
+        otherwise after the entire tables are read.
+
         Arguments:
           - path: common part of the file path
+          - file_formats: formats that are attempted to be read in the
+          given order, default ['pkl', 'json'], see ..io.pandas_io.read()
+          - columns: particle table columns to read, None for all columns
+          - tomo_ids: (single or a list) tomo ids to read, None for all tomos
           - verbose: flag indicating if a statement is printed for ever
           file that is read
         Returns instance of this class.
@@ -211,17 +231,21 @@ class MultiParticleSets(MPSConversion, MPSInterconversion, MPSAnalysis):
             inst = pickle.load(fd)
 
         # read tomos and particles
+        if tomo_ids is not None:
+            filters = {inst.tomo_id_col: tomo_ids}
+        else:
+            filters = None
         split_path = path.rsplit('.', maxsplit=1)
         tomos_path = (
             f"{split_path[0]}{inst.pickle_tomos_suffix}.{split_path[1]}")
         inst.tomos = PandasIO.read(
-            base=tomos_path, file_formats=['pkl', 'json'], verbose=verbose,
-            info_fd=info_fd)
+            base=tomos_path, file_formats=file_formats, filters=filters,
+            verbose=verbose, info_fd=info_fd)
         parts_path = (
             f"{split_path[0]}{inst.pickle_particles_suffix}.{split_path[1]}")
         inst.particles = PandasIO.read(
-            base=parts_path, file_formats=['pkl', 'json'], verbose=verbose,
-            info_fd=info_fd)
+            base=parts_path, file_formats=file_formats, columns=columns,
+            filters=filters, verbose=verbose, info_fd=info_fd)
         
         return inst
 
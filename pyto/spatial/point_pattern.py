@@ -36,6 +36,7 @@ from functools import partial
 import numpy as np
 from numpy.random import default_rng
 import scipy as sp
+from scipy.spatial import cKDTree, minkowski_distance
 from scipy.spatial.distance import cdist, pdist, squareform
 try:
     from sympy import Interval, Union, Intersection
@@ -47,6 +48,9 @@ except ModuleNotFoundError:
     
 import pyto
 
+# Minkowski p-norms of metrics for which exclusion is calculated using KD-trees
+TREE_METRICS = {'euclidean': 2, 'cityblock': 1, 'chebyshev': np.inf}
+
 
 def random_rectangle(
         N, rectangle=None, exclusion=None, metric='euclidean', other=None,
@@ -292,6 +296,7 @@ def pattern_exclusion(
         clean_other = None
         if other is not None:
             clean_other = other
+        tree_other = None
         
         # generate random as long as it is needed to reach the specified N
         for _ in range(max_iter):
@@ -299,9 +304,11 @@ def pattern_exclusion(
             # make random, exclude with respect to clean, exclude among
             values = pattern_fun(N=N_over, rng=rng)
             if clean_other is not None:
+                if (tree_other is None) and (metric in TREE_METRICS):
+                    tree_other = cKDTree(clean_other)
                 clean_loc = exclude(
                     points=values, exclusion=exclusion, other=clean_other,
-                    mode=mode, metric=metric)
+                    mode=mode, metric=metric, other_tree=tree_other)
             else:
                 clean_loc = values
             clean_loc = exclude(
@@ -309,18 +316,20 @@ def pattern_exclusion(
             if len(clean_loc) == 0:
                 continue
 
-            # add to previous and count
+            # add to previous and count, the tree of previous points is
+            # made again only when new points are added
             if clean is not None:
                 clean = np.concatenate((clean, clean_loc), axis=0)
             else:
                 clean = clean_loc
+            n_curr = clean.shape[0]
+            if n_curr >= N:
+                break
             if other is not None:
                 clean_other = np.concatenate((clean, other), axis=0)
             else:
                 clean_other = clean
-            n_curr = clean.shape[0]
-            if n_curr >= N:
-                break
+            tree_other = None
                 
         else:
             raise ValueError(
@@ -339,7 +348,9 @@ def pattern_exclusion(
         vals = pattern_fun(rng=rng, N=N)
         return vals
      
-def exclude(points, exclusion, other=None, metric='euclidean', mode='fine'):
+def exclude(
+        points, exclusion, other=None, metric='euclidean', mode='fine',
+        other_tree=None):
     """Exclude points by Euclidean distance.
 
     If arg other is None, excludes elements of arg points that are closer to 
@@ -356,6 +367,11 @@ def exclude(points, exclusion, other=None, metric='euclidean', mode='fine'):
     faster, it may remove particles that could be kept. For details, see 
     pattern_exclusion() doc.
 
+    For metrics listed in TREE_METRICS, only the pairs of points closer than 
+    arg exclusion are determined (using scipy.spatial.cKDTree), so the 
+    memory and time requirements grow roughly linearly with the number of
+    points. Distances between all points are calculated for other metrics.
+
     Arguments:
       - points: (ndarray n_points x n_dim) Coordinates of points in pixels
       (thus int)
@@ -364,6 +380,8 @@ def exclude(points, exclusion, other=None, metric='euclidean', mode='fine'):
       pattern (in pixels, thus int)
       - metric: distance calculation metric
       - mode: method to calculate exclusion, 'rough' or 'fine'
+      - other_tree: (scipy.spatial.cKDTree) KD-tree made from arg other,
+      used only for metrics listed in TREE_METRICS, if None it is made here
     
     Returnes cleaned points (ndarray, n_cleanedPoints x n_dim). If there are
     no points (arg points is None or []), np.array([]) is returned.
@@ -374,41 +392,90 @@ def exclude(points, exclusion, other=None, metric='euclidean', mode='fine'):
     points = np.asarray(points)
     
     if other is None:
-        
-        # exclude points close to each other in the rough way
-        dists_cond = (pdist(points, metric=metric) < exclusion)
-        dists_square = squareform(dists_cond)
-        dists_square_tri = np.triu(dists_square, k=0)
-        no_go = np.logical_or.reduce(dists_square_tri, axis=0)
-        clean = points[np.logical_not(no_go)]
-
-        # do not exclude points that are excluded based on already excluded
-        if mode == 'fine':
-            dists_square_tri[no_go.nonzero()] = False 
-            no_go_fine = np.logical_or.reduce(dists_square_tri, axis=0)
-            clean_fine = points[np.logical_not(no_go_fine)]
-
-            possible_go = no_go & np.logical_not(no_go_fine)
-            if possible_go.any():
-                possible = points[possible_go]
-                clean_plus = exclude(
-                    points=possible, exclusion=exclusion, other=None,
-                    mode='fine', metric=metric)
-                clean = np.concatenate((clean, clean_plus), axis=0)
-
-        elif mode != 'rough':
+
+        if (mode != 'rough') and (mode != 'fine'):
             raise ValueError(f"Argument mode: {mode} can be 'rough' or 'fine'") 
+
+        # pairs of points closer than exclusion
+        first, second = get_close_pairs(
+            points=points, distance=exclusion, metric=metric)
+
+        # exclude points close to preceeding points in the rough way and,
+        # if mode is fine, repeat on points that were excluded only
+        # because of already excluded points
+        n_points = points.shape[0]
+        active = np.ones(n_points, dtype=bool)
+        clean_inds = []
+        while True:
+            within = active[first] & active[second]
+            first = first[within]
+            second = second[within]
+            no_go = np.zeros(n_points, dtype=bool)
+            no_go[second] = True
+            clean_loc = active & ~no_go
+            clean_inds.append(clean_loc.nonzero()[0])
+            if mode == 'rough':
+                break
+            no_go_fine = np.zeros(n_points, dtype=bool)
+            no_go_fine[second[clean_loc[first]]] = True
+            active = no_go & ~no_go_fine
+            if not active.any():
+                break
+        clean = points[np.concatenate(clean_inds)]
             
     else:
         
         # exclude points close to other
         other = np.asarray(other)
-        dists = (cdist(other, points, metric=metric) < exclusion)
-        no_go_other = np.logical_or.reduce(dists, axis=0)
+        if len(other) == 0:
+            return points
+        if metric in TREE_METRICS:
+            if other_tree is None:
+                other_tree = cKDTree(other)
+            dist, _ = other_tree.query(
+                points, k=1, p=TREE_METRICS[metric],
+                distance_upper_bound=exclusion)
+            no_go_other = (dist < exclusion)
+        else:
+            dists = (cdist(other, points, metric=metric) < exclusion)
+            no_go_other = np.logical_or.reduce(dists, axis=0)
         clean = points[np.logical_not(no_go_other)]
     
     return clean
 
+def get_close_pairs(points, distance, metric='euclidean'):
+    """Finds pairs of points that are closer than the specified distance.
+
+    Uses scipy.spatial.cKDTree for metrics listed in TREE_METRICS. For 
+    other metrics, distances between all points are calculated.
+
+    Arguments:
+      - points: (ndarray n_points x n_dim) point coordinates
+      - distance: distance
+      - metric: distance calculation metric
+
+    Returns (first, second): (int ndarrays) indices of points that form
+    pairs, where first < second
+    """
+
+    if metric in TREE_METRICS:
+        p_norm = TREE_METRICS[metric]
+        pairs = cKDTree(points).query_pairs(
+            r=distance, p=p_norm, output_type='ndarray')
+        first, second = pairs[:, 0], pairs[:, 1]
+        close = (minkowski_distance(
+            points[first], points[second], p=p_norm) < distance)
+        first = first[close]
+        second = second[close]
+
+    else:
+        dists_cond = (pdist(points, metric=metric) < distance)
+        first, second = np.triu_indices(points.shape[0], k=1)
+        first = first[dists_cond]
+        second = second[dists_cond]
+
+    return first, second
+
 def cocluster_region(
         clusters, N, p_cluster, region=None, region_id=None,
         region_coords=None, max_dist=None, exclusion=None,
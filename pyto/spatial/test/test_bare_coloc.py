@@ -389,6 +389,72 @@ class TestBareColoc(np_test.TestCase):
         np_test.assert_equal(bc.particles2_indices, [[[], []], [[], []]])
         np_test.assert_equal(bc.particles2_n, [[0, 0], [0, 0]])
 
+    def test_calculate_coloc_sparse(self):
+        """Tests calculate_distances() with max distance and
+        calculate_coloc_sparse()
+        """
+
+        # distances
+        patterns = [common.pattern_0, common.pattern_1, common.pattern_2]
+        bc = BareColoc()
+        bc.calculate_distances(patterns=patterns, max_distance=6)
+        np_test.assert_equal(bc.dist_nm_full is None, True)
+        np_test.assert_equal(len(bc.dist_nm_sparse), 3)
+        for dist_sparse, dist in zip(
+                bc.dist_nm_sparse,
+                [common.dist_0_0, common.dist_0_1, common.dist_0_2]):
+            np_test.assert_equal(dist_sparse.shape, dist.shape)
+            np_test.assert_almost_equal(
+                dist_sparse.data, dist[dist_sparse.row, dist_sparse.col])
+            np_test.assert_equal(dist_sparse.nnz, (dist <= 6).sum())
+
+        # colocalizations
+        for di, mode, suffix in [
+                (2, 'less', 'd2'), (2, 'less_eq', 'd2_le'), (4, 'less', 'd4'),
+                (6, 'less', 'd6')]:
+            bc.mode = mode
+            bc.calculate_coloc(distance=di)
+            np_test.assert_equal(
+                bc.coloc3, getattr(common, f'coloc3_{suffix}'))
+            np_test.assert_equal(
+                bc.particles3, getattr(common, f'particles3_{suffix}'))
+            np_test.assert_equal(
+                bc.coloc2, getattr(common, f'coloc2_{suffix}'))
+            np_test.assert_equal(
+                bc.particles2, getattr(common, f'particles2_{suffix}'))
+
+        # 2-coloc, pixel size
+        bc = BareColoc(pixel_nm=2)
+        bc.calculate_distances(
+            patterns=[common.pattern_0, common.pattern_1], max_distance=8)
+        bc.calculate_coloc(distance=8)
+        np_test.assert_equal(bc.coloc2, [common.coloc2_d4[0]])
+        np_test.assert_equal(bc.particles2, [common.particles2_d4[0]])
+
+        # 3-coloc, zero points in pattern 1
+        p0_len = common.dist_0_0.shape[0]
+        p2_len = common.dist_0_2.shape[1]
+        bc = BareColoc()
+        bc.calculate_distances(
+            patterns=[common.pattern_0, None, common.pattern_2],
+            max_distance=6)
+        bc.calculate_coloc(distance=6)
+        np_test.assert_equal(bc.coloc3, p0_len * [False])
+        np_test.assert_equal(
+            bc.particles3, [p0_len * [False], [], p2_len * [False]])
+        np_test.assert_equal(bc.coloc2, [p0_len * [False], common.coloc2_d6[1]])
+        np_test.assert_equal(
+            bc.particles2, [[p0_len * [False], []], common.particles2_d6[1]])
+
+        # zero points in pattern 0
+        bc = BareColoc()
+        bc.calculate_distances(
+            patterns=[np.array([]), common.pattern_1], max_distance=6)
+        bc.calculate_coloc(distance=6)
+        np_test.assert_equal(bc.coloc2, [[]])
+        np_test.assert_equal(
+            bc.particles2, [[[], len(common.pattern_1) * [False]]])
+
 if __name__ == '__main__':
     suite = unittest.TestLoader().loadTestsFromTestCase(TestBareColoc)
     unittest.TextTestRunner(verbosity=2).run(suite)
@@ -9,6 +9,8 @@ __version__ = "$Revision$"
 import unittest
 
 import numpy as np
+import scipy as sp
+from scipy.ndimage import distance_transform_edt
 from scipy.spatial.distance import cdist, pdist, squareform
 import numpy.testing as np_test
 import pandas as pd
@@ -385,8 +387,37 @@ class TestColocCore(np_test.TestCase):
             np.zeros((len(distance), len(zero_columns))))
         np_test.assert_array_equal(
             cc.setX_setZ_data['size_region'].values,
-            np.zeros_like(distance, dtype=int) + common.size_region)       
-                        
+            np.zeros_like(distance, dtype=int) + common.size_region)
+
+        # sparse and full distances
+        distance = [2, 4, 6, 8]
+        patterns = [common.pattern_0, common.pattern_1, common.pattern_2]
+        names = ['setX', 'setY', 'setZ']
+        cc_full = ColocCore(sparse_dist=False)
+        cc_full.make(
+            patterns=patterns, names=names, distance=distance,
+            region=common.region)
+        cc = ColocCore()
+        cc.make(
+            patterns=patterns, names=names, distance=distance,
+            region=common.region)
+        for nam in cc_full.data_names:
+            assert_frame_equal(getattr(cc, nam), getattr(cc_full, nam))
+        np_test.assert_equal(cc.bare_multid[2].coloc3, common.coloc3_d2)
+        np_test.assert_equal(cc.bare_multid[8].coloc3, common.coloc3_d8)
+        np_test.assert_equal(
+            cc.bare_multid[2].dist_nm_sparse is cc.bare_multid[8].dist_nm_sparse,
+            True)
+
+        # don't keep bare
+        cc = ColocCore(keep_bare=False)
+        cc.make(
+            patterns=patterns, names=names, distance=distance,
+            region=common.region)
+        np_test.assert_equal(cc.bare_multid, {})
+        for nam in cc_full.data_names:
+            assert_frame_equal(getattr(cc, nam), getattr(cc_full, nam))
+
     def test_find_columns(self):
         """Tests find_columns
         """
@@ -795,6 +826,101 @@ class TestColocCore(np_test.TestCase):
             region=common.region)
         np_test.assert_equal(col_size, 2*45-5)
 
+    def column_size(
+            self, pattern, distance, region, pixel_nm, mode, n_columns_mode):
+        """Calculates column size for one distance directly from the
+        distance transform, like get_column_size() did before all 
+        distances were calculated together.
+        """
+        if pattern.shape[0] == 0:
+            if n_columns_mode == 'image':
+                return 0, 0
+            else:
+                return 0
+        columns = np.ones_like(region, dtype=float)
+        columns[tuple(pattern.transpose())] = 0
+        dist = distance_transform_edt(columns)
+        if mode == 'less':
+            dist_condition = (dist < distance / pixel_nm)
+        else:
+            dist_condition = (dist <= distance / pixel_nm)
+        dist_condition = (region > 0) & dist_condition
+        size = dist_condition.sum()
+        if n_columns_mode == 'image':
+            _, n_columns = sp.ndimage.label(dist_condition)
+            return size, n_columns
+        else:
+            return size
+
+    def test_get_column_size_multi(self):
+        """Tests get_column_size_multi()
+        """
+
+        # same points for all distances
+        pattern = np.array([[10, 10], [20, 20], [10, 12]])
+        distance = [4, 2, 6]
+        for edt_cost in [0, 1000]:
+            cc = ColocCore(pixel_nm=1, mode='less')
+            cc.edt_cost = edt_cost
+            col_size = cc.get_column_size_multi(
+                pattern=pattern, distance=distance, region=common.region)
+            desired = [
+                self.column_size(
+                    pattern=pattern, distance=di, region=common.region,
+                    pixel_nm=1, mode='less', n_columns_mode='dist')
+                for di in distance]
+            np_test.assert_equal(col_size, desired)
+            np_test.assert_equal(col_size, [104, 24, 240])
+
+        # subcolumns added with distance, less_eq and image mode
+        coloc = np.array(
+            [[True, False, False], [False, False, False], [True, True, True]])
+        for edt_cost in [0, 1000]:
+            for mode in ['less', 'less_eq']:
+                for n_columns_mode in ['dist', 'image']:
+                    cc = ColocCore(
+                        pixel_nm=1.5, mode=mode, n_columns_mode=n_columns_mode)
+                    cc.edt_cost = edt_cost
+                    col_size = cc.get_column_size_multi(
+                        pattern=pattern, distance=distance, 
+                        region=common.region, coloc=coloc)
+                    desired = [
+                        self.column_size(
+                            pattern=pattern[col], distance=di, 
+                            region=common.region, pixel_nm=1.5, mode=mode,
+                            n_columns_mode=n_columns_mode)
+                        for col, di in zip(coloc, distance)]
+                    np_test.assert_equal(col_size, desired)
+                    if (mode == 'less_eq') and (n_columns_mode == 'image'):
+                        np_test.assert_equal(
+                            col_size, [(21, 1), (0, 0), (114, 2)])
+                    if (mode == 'less') and (n_columns_mode == 'dist'):
+                        np_test.assert_equal(col_size, [21, 0, 104])
+
+        # subcolumns not added with distance
+        coloc = np.array(
+            [[True, False, False], [False, True, False], [True, True, True]])
+        cc = ColocCore(pixel_nm=1)
+        col_size = cc.get_column_size_multi(
+            pattern=pattern, distance=distance, region=common.region, 
+            coloc=coloc)
+        desired = [
+            self.column_size(
+                pattern=pattern[col], distance=di, region=common.region,
+                pixel_nm=1, mode='less', n_columns_mode='dist')
+            for col, di in zip(coloc, distance)]
+        np_test.assert_equal(col_size, desired)
+        np_test.assert_equal(col_size[:2], [45, 9])
+
+        # no region, no points
+        cc = ColocCore()
+        np_test.assert_equal(
+            cc.get_column_size_multi(pattern=pattern, distance=[2, 4]),
+            [None, None])
+        np_test.assert_equal(
+            cc.get_column_size_multi(
+                pattern=np.array([]), distance=[2, 4], region=common.region),
+            [0, 0])
 
 if __name__ == '__main__':
     suite = unittest.TestLoader().loadTestsFromTestCase(TestColocCore)
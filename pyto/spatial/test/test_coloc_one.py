@@ -8,6 +8,7 @@ __version__ = "$Revision$"
 
 from copy import copy, deepcopy
 import unittest
+import concurrent.futures
 
 import numpy as np
 from scipy.spatial.distance import cdist, pdist, squareform
@@ -478,6 +479,58 @@ class TestColocOne(np_test.TestCase):
             co.X_Y_Z_data['n_subcol_random_combined_std'].values,
             np.zeros(shape=len(distance), dtype=int))
 
+    def test_make_one_parallel(self):
+        """Tests make_one() with parallel simulations
+        """
+
+        distance = [2, 4, 6, 8]
+        n_simul = 10
+        patterns = [common.pattern_0, common.pattern_1, common.pattern_2]
+
+        # results do not depend on n_jobs
+        co_1 = ColocOne(keep_dist=False, seed=12)
+        co_1.make_one(
+            patterns=patterns, distance=distance, regions=common.region,
+            n_simul=n_simul, names=['X', 'Y', 'Z'], n_jobs=1)
+        for n_jobs in [3, 20]:
+            co = ColocOne(keep_dist=False, seed=12)
+            co.make_one(
+                patterns=patterns, distance=distance, regions=common.region,
+                n_simul=n_simul, names=['X', 'Y', 'Z'], n_jobs=n_jobs)
+            np_test.assert_equal(co.data_names, co_1.data_names)
+            for nam in co_1.data_names:
+                assert_frame_equal(
+                    getattr(co, nam), getattr(co_1, nam))
+        np_test.assert_equal(
+            co_1.X_Y_Z_simul_normal['simul_id'].unique(), np.arange(n_simul))
+        np_test.assert_equal(
+            co_1.X_Y_Z_data[['n_subcol_random_all']].applymap(
+                lambda x: x.shape[0] == n_simul).values.all(), True)
+
+        # real colocalization the same as in sequential simulations
+        co_seq = ColocOne(keep_dist=False, seed=12)
+        co_seq.make_one(
+            patterns=patterns, distance=distance, regions=common.region,
+            n_simul=n_simul, names=['X', 'Y', 'Z'])
+        np_test.assert_equal(
+            co_1.X_Y_Z_data['n_subcol'].values,
+            co_seq.X_Y_Z_data['n_subcol'].values)
+        
+        # all random, external executor
+        co_1 = ColocOne(keep_dist=False, seed=3, all_random=True)
+        co_1.make_one(
+            patterns=patterns, distance=distance, regions=common.region,
+            n_simul=n_simul, names=['X', 'Y', 'Z'], n_jobs=1)
+        co = ColocOne(keep_dist=False, seed=3, all_random=True)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            co.make_one(
+                patterns=patterns, distance=distance, regions=common.region,
+                n_simul=n_simul, names=['X', 'Y', 'Z'], n_jobs=4,
+                executor=executor)
+        for nam in co_1.data_names:
+            assert_frame_equal(
+                getattr(co, nam), getattr(co_1, nam))
+
     def test_add_coloc(self):
         """Tests add_coloc()
         """
@@ -8,6 +8,7 @@ __version__ = "$Revision$"
 
 import os
 import unittest
+import itertools
 
 import numpy as np
 import numpy.testing as np_test
@@ -319,6 +320,82 @@ class TestLineProjection(np_test.TestCase):
             angles=[-90, -45], distance=np.linspace(1, 5, 9), point=[0, 0, 2])
         np_test.assert_array_equal(actual, [2, 3, 2])
 
+
+    def test_in_region(self):
+        """Tests in_region()
+        """
+
+        lp = LineProjection(
+            region=self.y_region_data, region_id=self.y_region_id)
+        points = np.array(
+            [[1, 4, 3], [1, 3, 3], [9, 6, 3], [10, 6, 3], [-1, 5, 3],
+             [0, 5, 4]])
+        np_test.assert_array_equal(
+            lp.in_region(points=points),
+            [True, False, True, False, False, False])
+        np_test.assert_array_equal(
+            lp.in_region(points=points.reshape(3, 2, 3)),
+            [[True, False], [True, False], [False, False]])
+
+        # empty region
+        lp = LineProjection(region_coords=np.zeros((0, 3), dtype=int))
+        np_test.assert_array_equal(
+            lp.in_region(points=points), np.zeros(6, dtype=bool))
+
+    def test_project_multi(self):
+        """Tests project_multi()
+        """
+
+        points = np.array([[1, 0, 3], [0, 0, 2], [5, 5, 1], [3, 8, 3]])
+        angles = np.array([[-90, -90], [-90, -45], [0, 0], [90, 90]])
+        distance = np.linspace(1, 5, 9)
+        region_coords = get_region_coords(
+            region=self.y_region_data, region_id=self.y_region_id,
+            shuffle=False)
+
+        # compare with project()
+        for grid_mode, intersect_mode, not_found in itertools.product(
+                ['nearest', 'unit', 1], ['first', 'all'],
+                [None, [-1, -1, -1]]):
+            if (intersect_mode == 'all') and (grid_mode == 1):
+                continue
+            lp = LineProjection(
+                region_coords=region_coords, relion=True, 
+                grid_mode=grid_mode, intersect_mode=intersect_mode,
+                not_found=not_found)
+            actual = lp.project_multi(
+                points=points, angles=angles, distance=distance)
+            for poi, ang, act in zip(points, angles, actual):
+                desired = lp.project(point=poi, angles=ang, distance=distance)
+                if desired is None:
+                    np_test.assert_equal(np.isnan(act).all(), True)
+                else:
+                    np_test.assert_array_equal(act, desired)
+
+        # first, nearest
+        lp = LineProjection(
+            region=self.y_region, region_id=self.y_region_id, 
+            relion=True, grid_mode='nearest', intersect_mode='first',
+            not_found=[-1, -1, -1])
+        actual = lp.project_multi(
+            points=points, angles=angles, distance=distance)
+        np_test.assert_array_equal(
+            actual, [[1, 4, 3], [-1, -1, -1], [5, 5, 3], [-1, -1, -1]])
+
+        # all, unit
+        lp = LineProjection(
+            region=self.diag_region_data, region_id=self.diag_region_id, 
+            relion=True, grid_mode='unit', intersect_mode='all')
+        actual = lp.project_multi(
+            points=points[:2], angles=angles[:2], distance=distance)
+        np_test.assert_array_equal(actual[0], [])
+        np_test.assert_array_equal(actual[1], [[2, 3, 2]])
+
+        # no points
+        actual = lp.project_multi(
+            points=np.zeros((0, 3)), angles=np.zeros((0, 2)),
+            distance=distance)
+        np_test.assert_equal(len(actual), 0)
         
       
 if __name__ == '__main__':
@@ -7,6 +7,8 @@ Tests module multi_particle_sets
 __version__ = "$Revision$"
 
 import os
+import tempfile
+import shutil
 import unittest
 
 import numpy as np
@@ -218,6 +220,47 @@ class TestMultiParticleSets(np_test.TestCase):
         np_test.assert_array_equal(
             mps.tomos[mps.region_bin_col].to_numpy(), self.region_bins)
         
+    def test_write_read(self):
+        """Tests write() and read()
+        """
+
+        mps = MultiParticleSets()
+        mps.tomos = self.tomos
+        mps.particles = self.particle_final
+        mps.region_col = 'regionnnn'
+        dir_ = tempfile.mkdtemp()
+        try:
+            path = os.path.join(dir_, 'mps.pkl')
+
+            # all formats
+            mps.write(
+                path=path, file_formats=['pkl', 'json', 'npy'], verbose=False)
+            for formats in [['pkl'], ['json'], ['npy']]:
+                mps_read = MultiParticleSets.read(
+                    path=path, file_formats=formats, verbose=False)
+                np_test.assert_equal(mps_read.region_col, 'regionnnn')
+                assert_frame_equal(
+                    mps_read.tomos, mps.tomos, check_dtype=False)
+                assert_frame_equal(
+                    mps_read.particles, mps.particles, check_dtype=False)
+
+            # select tomos and columns
+            tomo_ids = ['alpha', 'charlie']
+            columns = [mps.tomo_id_col, mps.class_name_col]
+            for formats in [['pkl'], ['npy']]:
+                mps_read = MultiParticleSets.read(
+                    path=path, file_formats=formats, tomo_ids=tomo_ids,
+                    columns=columns, verbose=False)
+                assert_frame_equal(
+                    mps_read.tomos,
+                    mps.tomos[mps.tomos[mps.tomo_id_col].isin(tomo_ids)])
+                assert_frame_equal(
+                    mps_read.particles,
+                    mps.particles[mps.particles[mps.tomo_id_col].isin(
+                        tomo_ids)][columns])
+        finally:
+            shutil.rmtree(dir_)
+        
     def test_read_star_tomo(self):
         """
         Tests read_star(mode='tomo')
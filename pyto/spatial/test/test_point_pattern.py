@@ -219,6 +219,48 @@ class TestPointPattern(np_test.TestCase):
         actual = pattern.exclude(points=p1, other=p2, exclusion=1.5)
         np_test.assert_equal(actual, desired)
 
+        # metric not calculated by KD-tree
+        desired = np.array(
+            [[2, 2], [4, 4], [7, 8], [6, 9], [6, 6], [4, 6], [4, 8]])
+        actual = pattern.exclude(
+            points=p1, exclusion=1.1, metric='sqeuclidean', mode='fine')
+        np_test.assert_equal(actual, desired)
+        desired = np.array(
+            [[2, 2], [4, 4], [4, 8], [6, 6], [2, 1], [7, 7], [7, 7]])
+        actual = pattern.exclude(
+            points=p1, other=p2, exclusion=2.1, metric='sqeuclidean')
+        np_test.assert_equal(actual, desired)
+
+        # exclusion distance not included
+        actual = pattern.exclude(points=p1, exclusion=1, mode='rough')
+        np_test.assert_equal(actual, p1[:-1])
+        actual = pattern.exclude(points=p1, other=p2, exclusion=1)
+        np_test.assert_equal(actual, np.delete(p1, 3, axis=0))
+
+    def test_get_close_pairs(self):
+        """Tests get_close_pairs()
+        """
+
+        points = np.array([[2, 2], [4, 4], [4, 5], [5, 5], [2, 3]])
+        first, second = pattern.get_close_pairs(
+            points=points, distance=1.5, metric='euclidean')
+        np_test.assert_equal(
+            sorted(zip(first.tolist(), second.tolist())),
+            [[0, 4], [1, 2], [1, 3], [2, 3]])
+        first, second = pattern.get_close_pairs(
+            points=points, distance=2.5, metric='sqeuclidean')
+        np_test.assert_equal(
+            sorted(zip(first.tolist(), second.tolist())),
+            [[0, 4], [1, 2], [1, 3], [2, 3]])
+        first, second = pattern.get_close_pairs(
+            points=points, distance=1.5, metric='cityblock')
+        np_test.assert_equal(
+            sorted(zip(first.tolist(), second.tolist())),
+            [[0, 4], [1, 2], [2, 3]])
+        first, second = pattern.get_close_pairs(
+            points=points, distance=1, metric='euclidean')
+        np_test.assert_equal(len(first), 0)
+
     def test_cocluster_region(self):
         """Test cocluster_region()
         """
@@ -21,7 +21,18 @@ import runpy
 import warnings
 import logging
 import re
+import json
+import hashlib
+import time
+import traceback
+import multiprocessing
+import multiprocessing.connection
 from copy import copy, deepcopy
+try:
+    import resource
+except ImportError:
+    # resource is not available on Windows, peak memory is not reported
+    resource = None
 
 
 def replace(old, rules, new=None, repeat=None):
@@ -188,3 +199,267 @@ def run_path(path, package=''):
             os.chdir(this_dir)
 
 
+
+def run_parallel(
+        path, n_processes=None, manifest=None, inputs=None, log=True,
+        package=''):
+    """
+    Runs python files (modules) in parallel, each in a separate process.
+
+    Each module is executed in a new process (the same way as in 
+    run_path(), that is from the directory where it resides), so that
+    module variables, current directory and logging of different runs
+    do not interfere. If arg log is True, all log records of a run are
+    written to file <module_name>.log in the module directory. 
+
+    Processes are started by the 'spawn' method, so the script that calls
+    this function has to execute its main code only if 
+    __name__ == '__main__'. 
+
+    If arg manifest is specified, the modules that were successfully 
+    executed are recorded in the manifest (json) file, together with 
+    a hash of the module and of its input files (arg inputs). The manifest
+    is updated after each run, so if the execution is interrupted, the 
+    subsequent call skips the modules that were already executed and whose
+    module and input files have not been changed since. Modules that 
+    failed are not recorded in the manifest, so they are executed again.
+
+    Exceptions raised by a module are logged and returned (as traceback)
+    in the results, they do not stop the execution of other modules. 
+    The same holds for modules whose process dies (for example when it 
+    is killed because it runs out of memory).
+
+    Arguments:
+      - path: (str or iterable) module path(s)
+      - n_processes: max number of modules executed at the same time, 
+      None for the number of cpus
+      - manifest: manifest file path, or None for no manifest
+      - inputs: (dict) input file paths of modules, where keys are module
+      paths (as given in arg path) and values are lists of input file 
+      paths, or None if only modules are hashed 
+      - log: flag indicating whether log records of each run are written
+      to a separate file
+      - package: name of the package within which the module(s) is/are 
+      placed (see run_path())
+
+    Returns list of results (dict), one for each module in the same order 
+    as modules (arg path), having the following keys:
+      - 'path': module path
+      - 'status': 'done', 'failed' or 'skipped' (already in the manifest)
+      - 'wall_time': wall time of the run [s]
+      - 'peak_memory': peak resident memory of the process that executed
+      the module, which includes the python interpreter and the imported
+      packages (such as pyto and numpy), but not the memory of the calling
+      process [MB], None if not available
+      - 'error': traceback in case the module failed
+    """
+
+    if isinstance(path, basestring):
+        all_paths = [path]
+    else:
+        all_paths = list(path)
+    if inputs is None:
+        inputs = {}
+
+    # read manifest and find modules that need to be run
+    completed = read_manifest(manifest)
+    hashes = [hash_files([path_] + list(inputs.get(path_, [])))
+              for path_ in all_paths]
+    results = [None] * len(all_paths)
+    tasks = []
+    for index, (script_path, hash_) in enumerate(zip(all_paths, hashes)):
+        entry = completed.get(os.path.abspath(script_path))
+        if (entry is not None) and (entry.get('hash') == hash_):
+            logging.info("Skipping already executed script " + script_path)
+            results[index] = {
+                'path': script_path, 'status': 'skipped',
+                'wall_time': entry.get('wall_time'),
+                'peak_memory': entry.get('peak_memory'), 'error': None}
+        else:
+            tasks.append((index, script_path, package, log))
+    if len(tasks) == 0:
+        return results
+
+    # run modules, each in a new process
+    if n_processes is None:
+        n_processes = os.cpu_count()
+    context = multiprocessing.get_context('spawn')
+    pending = list(tasks)
+    running = {}
+    try:
+        while (len(pending) > 0) or (len(running) > 0):
+
+            # start processes
+            while (len(pending) > 0) and (len(running) < n_processes):
+                task = pending.pop(0)
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(
+                    target=_run_process, args=(task, sender))
+                process.start()
+                sender.close()
+                running[receiver] = (task, process, time.time())
+
+            # get results, end of file if a process died without result
+            for receiver in multiprocessing.connection.wait(list(running)):
+                task, process, start = running.pop(receiver)
+                try:
+                    index, res = receiver.recv()
+                except EOFError:
+                    index, res = None, None
+                receiver.close()
+                process.join()
+                if res is None:
+                    index = task[0]
+                    res = {
+                        'path': task[1], 'status': 'failed',
+                        'wall_time': time.time() - start, 
+                        'peak_memory': None,
+                        'error': (
+                            "Process running the script exited with code "
+                            + f"{process.exitcode}")}
+                results[index] = res
+
+                # log and record in manifest
+                if res['status'] == 'done':
+                    logging.info(
+                        "Executed script %s in %.1f s, peak memory %s MB"
+                        % (res['path'], res['wall_time'], res['peak_memory']))
+                    if manifest is not None:
+                        completed[os.path.abspath(res['path'])] = {
+                            'hash': hashes[index], 
+                            'wall_time': res['wall_time'],
+                            'peak_memory': res['peak_memory']}
+                        write_manifest(completed, manifest)
+                else:
+                    logging.error(
+                        "Script %s failed:%s%s" 
+                        % (res['path'], os.linesep, res['error']))
+
+    finally:
+
+        # stop scripts that are still running (if interrupted)
+        for receiver, (task, process, start) in running.items():
+            process.terminate()
+            process.join()
+            receiver.close()
+
+    return results
+
+def _run_process(task, connection):
+    """
+    Runs one module and sends the result through arg connection, used
+    as the target of processes started by run_parallel().
+
+    Arguments:
+      - task: (index, module path, package, log)
+      - connection: (multiprocessing.connection.Connection) sending end
+      of a pipe
+    """
+    connection.send(_run_one(task))
+    connection.close()
+
+def _run_one(task):
+    """
+    Runs one module in the current process, used by run_parallel().
+
+    Argument:
+      - task: (index, module path, package, log)
+
+    Returns (index, result), see run_parallel() for the result format.
+    """
+
+    index, script_path, package, log = task
+
+    # redirect log records of this run to a separate file
+    if log:
+        root_logger = logging.getLogger()
+        for handler in list(root_logger.handlers):
+            root_logger.removeHandler(handler)
+        base = os.path.splitext(os.path.abspath(script_path))[0]
+        handler = logging.FileHandler(base + '.log', mode='w')
+        handler.setFormatter(logging.Formatter(
+            '%(asctime)s %(levelname)s %(module)s.%(funcName)s():'
+            + '%(lineno)d %(message)s', datefmt='%d %b %Y %H:%M:%S'))
+        root_logger.addHandler(handler)
+        if ((root_logger.level == logging.NOTSET) 
+            or (root_logger.level > logging.INFO)):
+            root_logger.setLevel(logging.INFO)
+
+    # run
+    start = time.time()
+    try:
+        run_path(path=os.path.abspath(script_path), package=package)
+        status = 'done'
+        error = None
+    except BaseException:
+        status = 'failed'
+        error = traceback.format_exc()
+        logging.error(error)
+    wall_time = time.time() - start
+    if log:
+        handler.close()
+
+    # peak memory of this (spawned) process in MB, ru_maxrss is in kB on 
+    # Linux and in bytes on MacOS
+    peak_memory = None
+    if resource is not None:
+        peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == 'darwin':
+            peak_memory = peak_memory / 1024.
+        peak_memory = peak_memory / 1024.
+
+    result = {
+        'path': script_path, 'status': status, 'wall_time': wall_time,
+        'peak_memory': peak_memory, 'error': error}
+    return index, result
+
+def hash_files(paths):
+    """
+    Returns sha256 hash (hex digest) of the content of the specified files.
+
+    Files that do not exist are taken into account by their path, so that
+    their creation changes the hash.
+
+    Argument:
+      - paths: list of file paths
+    """
+
+    hash_ = hashlib.sha256()
+    for path in paths:
+        hash_.update(os.path.abspath(path).encode('utf-8'))
+        try:
+            with open(path, 'rb') as fd:
+                for chunk in iter(lambda: fd.read(2**20), b''):
+                    hash_.update(chunk)
+        except (IOError, OSError):
+            hash_.update(b'missing')
+    return hash_.hexdigest()
+
+def read_manifest(manifest):
+    """
+    Reads manifest file written by run_parallel().
+
+    Returns (dict) where keys are absolute module paths, or {} if manifest 
+    is None or the file does not exist.
+
+    Argument:
+      - manifest: manifest file path
+    """
+    if (manifest is None) or not os.path.exists(manifest):
+        return {}
+    with open(manifest) as fd:
+        return json.load(fd)
+
+def write_manifest(completed, manifest):
+    """
+    Writes manifest file. The file is first written under a temporary name
+    and then renamed, so that an interruption does not corrupt it.
+
+    Arguments:
+      - completed: (dict) manifest entries
+      - manifest: manifest file path
+    """
+    tmp_path = manifest + '.tmp'
+    with open(tmp_path, 'w') as fd:
+        json.dump(completed, fd, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest)
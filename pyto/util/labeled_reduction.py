@@ -0,0 +1,184 @@
+"""
+Reductions (statistics) of array values over labels, done for all labels
+at once.
+
+Values of all elements that belong to the specified labels are sorted
+(grouped) by labels only once, so that the cost does not depend on the
+number of labels. The results are the same as those obtained by
+reducing values[labels==id_] for each id separately, or by the
+corresponding scipy.ndimage measurement functions.
+
+Basic usage:
+
+  min_, max_, median = reduce(
+      values=image, labels=segments, ids=[2,4,5],
+      modes=['min', 'max', 'median'])
+
+# Author: Vladan Lucic, Max Planck Institute for Biochemistry
+# $Id$
+"""
+from __future__ import unicode_literals
+from __future__ import division
+
+__version__ = "$Revision$"
+
+
+import numpy
+
+# modes that require values sorted within labels
+SORT_MODES = ['min', 'max', 'median', 'argmin', 'argmax']
+
+# all modes
+MODES = ['count', 'sum', 'mean', 'std'] + SORT_MODES
+
+def reduce(values, labels, ids, modes, empty=numpy.nan):
+    """
+    Calculates statistics of values for each of the specified labels.
+
+    Modes (one or more can be specified):
+      - 'count': number of elements
+      - 'sum', 'mean', 'std' (population standard deviation), 'min', 'max',
+      'median': statistics of values
+      - 'argmin', 'argmax': flat index (in arrays values and labels) of
+      min / max value. If there are more than one min (max), the first 
+      one is returned, like in numpy.argmin() (numpy.argmax())
+
+    Arguments:
+      - values: (ndarray) values
+      - labels: (ndarray of ints, same shape as values) labels
+      - ids: (list or ndarray) label ids
+      - modes: (str or list of strs) reduction mode(s)
+      - empty: value assigned to all modes except 'count', 'sum', 'argmin'
+      and 'argmax' for labels that do not have any element (-1 is assigned
+      to 'argmin' and 'argmax', 0 to 'count' and 'sum')
+
+    Returns (ndarray or list of ndarrays, depending on arg modes) results
+    indexed in the same way as arg ids.
+    """
+
+    # parse arguments
+    single_mode = not isinstance(modes, (list, tuple))
+    if single_mode:
+        modes = [modes]
+    for mode in modes:
+        if mode not in MODES:
+            raise ValueError(
+                "Mode " + str(mode) + " was not understood. Defined modes "
+                + "are: " + str(MODES))
+    values = numpy.asarray(values).ravel()
+    labels = numpy.asarray(labels).ravel()
+    if not numpy.issubdtype(labels.dtype, numpy.integer):
+        labels = labels.astype(int)
+    ids = numpy.asarray(ids, dtype=int).ravel()
+
+    # unique ids
+    uniq_ids, id_inverse = numpy.unique(ids, return_inverse=True)
+    n_ids = len(uniq_ids)
+
+    # keep only elements of ids, label them by positions in uniq_ids
+    positions, flat = _positions(labels=labels, ids=uniq_ids)
+    values = values[flat]
+    count = numpy.bincount(positions, minlength=n_ids)
+    non_empty = count > 0
+
+    # modes not requiring sort
+    results = {'count': count}
+    if len(set(['sum', 'mean', 'std']).intersection(modes)) > 0:
+        sum_ = numpy.bincount(positions, weights=values, minlength=n_ids)
+        results['sum'] = sum_
+        mean = numpy.zeros(n_ids) + empty
+        mean[non_empty] = sum_[non_empty] / count[non_empty]
+        results['mean'] = mean
+        if 'std' in modes:
+            sq_dev = (values - mean[positions])**2
+            sq_dev_sum = numpy.bincount(
+                positions, weights=sq_dev, minlength=n_ids)
+            std = numpy.zeros(n_ids) + empty
+            std[non_empty] = numpy.sqrt(
+                sq_dev_sum[non_empty] / count[non_empty])
+            results['std'] = std
+
+    # modes requiring values sorted within each label
+    if len(set(SORT_MODES).intersection(modes)) > 0:
+
+        # sort by label and value, lexsort is stable so equal values
+        # remain in the flat index order
+        order = numpy.lexsort((values, positions))
+        sorted_values = values[order]
+        sorted_flat = flat[order]
+        starts = (numpy.cumsum(count) - count)[non_empty]
+        ends = starts + count[non_empty] - 1
+
+        # first element of the run of max values
+        if 'argmax' in modes:
+            sorted_pos = positions[order]
+            run_start = numpy.ones(len(order), dtype=bool)
+            run_start[1:] = (
+                (sorted_values[1:] != sorted_values[:-1]) 
+                | (sorted_pos[1:] != sorted_pos[:-1]))
+            run_start = numpy.maximum.accumulate(
+                numpy.where(run_start, numpy.arange(len(order)), 0))
+            max_starts = run_start[ends]
+        else:
+            max_starts = None
+
+        # extrema
+        for mode, pos, source, fill in [
+                ('min', starts, sorted_values, empty),
+                ('max', ends, sorted_values, empty),
+                ('argmin', starts, sorted_flat, -1),
+                ('argmax', max_starts, sorted_flat, -1)]:
+            if mode in modes:
+                res = numpy.zeros(n_ids, dtype=numpy.result_type(
+                    source.dtype, numpy.asarray(fill).dtype)) + fill
+                res[non_empty] = source[pos]
+                results[mode] = res
+
+        # median
+        if 'median' in modes:
+            median = numpy.zeros(n_ids) + empty
+            low = starts + (count[non_empty] - 1) // 2
+            high = starts + count[non_empty] // 2
+            median[non_empty] = (
+                sorted_values[low] + sorted_values[high]) / 2.
+            results['median'] = median
+
+    # order as ids
+    results = [results[mode][id_inverse] for mode in modes]
+    if single_mode:
+        results = results[0]
+
+    return results
+
+def _positions(labels, ids):
+    """
+    Finds elements of (arg) labels that belong to one of (arg) ids.
+
+    Arguments:
+      - labels: (1d ndarray) labels
+      - ids: (1d ndarray) sorted unique ids
+
+    Returns (positions, flat):
+      - positions: (ndarray) positions of labels of the found elements in
+      (arg) ids
+      - flat: (ndarray) flat indices of the found elements
+    """
+
+    if (len(ids) == 0) or (labels.size == 0):
+        return numpy.array([], dtype=int), numpy.array([], dtype=int)
+
+    # lookup table if labels are not too large, search otherwise
+    min_label = min(labels.min(), ids.min())
+    max_label = max(labels.max(), ids.max())
+    if (min_label >= 0) and (max_label <= 2 * labels.size):
+        lookup = numpy.zeros(max_label + 1, dtype=int) - 1
+        lookup[ids] = numpy.arange(len(ids))
+        positions = lookup[labels]
+    else:
+        positions = numpy.searchsorted(ids, labels)
+        positions[positions == len(ids)] = 0
+        positions = numpy.where(ids[positions] == labels, positions, -1)
+    flat = numpy.nonzero(positions >= 0)[0]
+    positions = positions[flat]
+
+    return positions, flat
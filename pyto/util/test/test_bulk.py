@@ -13,6 +13,9 @@ __version__ = "$Revision$"
 
 import os
 import sys
+import json
+import shutil
+import tempfile
 import unittest
 
 import numpy
@@ -55,6 +58,96 @@ class TestBulk(np_test.TestCase):
             #else:
             #    print "something's funny"
 
+    def testRunParallel(self):
+        """
+        Tests run_parallel
+        """
+
+        # make scripts that write current dir and input to output files
+        tmp_dir = tempfile.mkdtemp()
+        script = (
+            "import os" + os.linesep
+            + "import logging" + os.linesep
+            + "def main():" + os.linesep
+            + "    logging.info('running')" + os.linesep
+            + "    inp = open('input.txt').read()" + os.linesep
+            + "    with open('out.txt', 'a') as fd:" + os.linesep
+            + "        fd.write(os.getcwd() + ' ' + inp + os.linesep)" 
+            + os.linesep)
+        paths = []
+        inputs = {}
+        for dir_ in ['ds_1', 'ds_2', 'ds_3']:
+            os.mkdir(os.path.join(tmp_dir, dir_))
+            path = os.path.join(tmp_dir, dir_, 'script.py')
+            with open(path, 'w') as fd:
+                fd.write(script)
+            with open(os.path.join(tmp_dir, dir_, 'input.txt'), 'w') as fd:
+                fd.write(dir_)
+            paths.append(path)
+            inputs[path] = [os.path.join(tmp_dir, dir_, 'input.txt')]
+        manifest = os.path.join(tmp_dir, 'manifest.json')
+
+        try:
+
+            # run all
+            res = pyto.util.bulk.run_parallel(
+                path=paths, n_processes=3, manifest=manifest, inputs=inputs)
+            np_test.assert_equal([r['path'] for r in res], paths)
+            np_test.assert_equal(
+                [r['status'] for r in res], ['done', 'done', 'done'])
+            for r, dir_ in zip(res, ['ds_1', 'ds_2', 'ds_3']):
+                np_test.assert_equal(r['wall_time'] >= 0, True)
+                out = open(os.path.join(tmp_dir, dir_, 'out.txt')).read()
+                np_test.assert_equal(
+                    out.split(), 
+                    [os.path.realpath(os.path.join(tmp_dir, dir_)), dir_])
+                log = open(os.path.join(tmp_dir, dir_, 'script.log')).read()
+                np_test.assert_equal('running' in log, True)
+            completed = json.load(open(manifest))
+            np_test.assert_equal(
+                sorted(completed.keys()), 
+                sorted(os.path.abspath(pa) for pa in paths))
+
+            # script that raises an exception and script that kills 
+            # its process
+            os.mkdir(os.path.join(tmp_dir, 'dir_1'))
+            fail_path = os.path.join(tmp_dir, 'dir_1', 'script.py')
+            shutil.copy(
+                os.path.join(self.this_dir, 'dir_1', 'script.py'), fail_path)
+            os.mkdir(os.path.join(tmp_dir, 'killed'))
+            kill_path = os.path.join(tmp_dir, 'killed', 'script.py')
+            with open(kill_path, 'w') as fd:
+                fd.write(
+                    "import os" + os.linesep
+                    + "import signal" + os.linesep
+                    + "def main():" + os.linesep
+                    + "    os.kill(os.getpid(), signal.SIGKILL)" + os.linesep)
+
+            # rerun after changing an input file, failed scripts are not 
+            # added to the manifest
+            with open(inputs[paths[1]][0], 'w') as fd:
+                fd.write('new')
+            res = pyto.util.bulk.run_parallel(
+                path=[kill_path] + paths + [fail_path], n_processes=2,
+                manifest=manifest, inputs=inputs)
+            np_test.assert_equal(
+                [r['status'] for r in res], 
+                ['failed', 'skipped', 'done', 'skipped', 'failed'])
+            out = open(os.path.join(tmp_dir, 'ds_1', 'out.txt')).read()
+            np_test.assert_equal(len(out.splitlines()), 1)
+            out = open(os.path.join(tmp_dir, 'ds_2', 'out.txt')).read()
+            np_test.assert_equal(out.splitlines()[1].split()[1], 'new')
+            np_test.assert_equal('exited with code' in res[0]['error'], True)
+            np_test.assert_equal('_TestBulkError' in res[4]['error'], True)
+            completed = json.load(open(manifest))
+            np_test.assert_equal(
+                os.path.abspath(fail_path) in completed, False)
+            np_test.assert_equal(
+                os.path.abspath(kill_path) in completed, False)
+
+        finally:
+            shutil.rmtree(tmp_dir)
+
     def tearDown(self):
         """
         """
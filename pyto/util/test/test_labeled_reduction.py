@@ -0,0 +1,97 @@
+"""
+
+Tests module pyto.util.labeled_reduction.
+
+# Author: Vladan Lucic (Max Planck Institute for Biochemistry)
+# $Id$
+"""
+from __future__ import unicode_literals
+
+__version__ = "$Revision$"
+
+import unittest
+
+import numpy as np
+import numpy.testing as np_test
+import scipy as sp
+import scipy.ndimage
+
+from pyto.util.labeled_reduction import reduce
+
+
+class TestLabeledReduction(np_test.TestCase):
+    """
+    """
+
+    def setUp(self):
+        """
+        """
+        self.values = np.array(
+            [[1., 4, 2, 6],
+             [3, 2, 8, 8],
+             [5, 7, 0, 1]])
+        self.labels = np.array(
+            [[1, 1, 2, 2],
+             [1, 1, 2, 2],
+             [0, 3, 3, 3]])
+
+    def test_reduce(self):
+        """
+        Tests reduce()
+        """
+
+        # compare with ndimage
+        ids = [3, 1, 2]
+        modes = ['count', 'sum', 'mean', 'std', 'min', 'max', 'median']
+        count, sum_, mean, std, min_, max_, median = reduce(
+            values=self.values, labels=self.labels, ids=ids, modes=modes)
+        np_test.assert_equal(count, [3, 4, 4])
+        np_test.assert_almost_equal(
+            sum_, sp.ndimage.sum(self.values, self.labels, ids))
+        np_test.assert_almost_equal(
+            mean, sp.ndimage.mean(self.values, self.labels, ids))
+        np_test.assert_almost_equal(
+            std, sp.ndimage.standard_deviation(self.values, self.labels, ids))
+        np_test.assert_almost_equal(
+            min_, sp.ndimage.minimum(self.values, self.labels, ids))
+        np_test.assert_almost_equal(
+            max_, sp.ndimage.maximum(self.values, self.labels, ids))
+        np_test.assert_almost_equal(
+            median, sp.ndimage.median(self.values, self.labels, ids))
+
+        # positions, the first one if more than one
+        argmin, argmax = reduce(
+            values=self.values, labels=self.labels, ids=[1, 2, 3],
+            modes=['argmin', 'argmax'])
+        np_test.assert_equal(argmin, [0, 2, 10])
+        np_test.assert_equal(argmax, [1, 6, 9])
+
+        # single mode, repeated and non-existing ids
+        median = reduce(
+            values=self.values, labels=self.labels, ids=[3, 5, 3, 0],
+            modes='median')
+        np_test.assert_equal(median, [1, np.nan, 1, 5])
+
+        # non-existing ids
+        count, mean, argmin = reduce(
+            values=self.values, labels=self.labels, ids=[5, 2],
+            modes=['count', 'mean', 'argmin'], empty=-1)
+        np_test.assert_equal(count, [0, 4])
+        np_test.assert_equal(mean, [-1, 6])
+        np_test.assert_equal(argmin, [-1, 2])
+
+        # large labels
+        mean = reduce(
+            values=self.values, labels=1000*self.labels, ids=[2000, 1000],
+            modes='mean')
+        np_test.assert_almost_equal(mean, [6, 2.5])
+
+        # wrong mode
+        self.assertRaises(
+            ValueError, reduce, values=self.values, labels=self.labels,
+            ids=[1], modes='mode')
+
+
+if __name__ == '__main__':
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestLabeledReduction)
+    unittest.TextTestRunner(verbosity=2).run(suite)